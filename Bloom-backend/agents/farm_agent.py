@@ -3,8 +3,9 @@ from google.adk.tools import FunctionTool
 from tools.search_tool import get_search_tool
 from tools.weather_tool import get_current_weather, get_weather_forecast, get_planting_weather_advice
 from tools.vector_search_tool import search_farm_data, get_historical_yields, get_farm_coordinates, get_plot_analysis, get_growth_tracker_data
-from tools.earth_engine_tool import get_satellite_crop_health, get_soil_analysis, get_crop_monitoring_time_series, get_soil_moisture_map
+from tools.earth_engine_tool import get_satellite_crop_health, get_farm_crop_health, get_soil_analysis, get_farm_soil_analysis, get_crop_monitoring_time_series, get_soil_moisture_map
 from tools.widget_tool import create_widget
+from tools.farm_query_tool import query_farm_data
 
 def search_web(query: str) -> str:
     """Search the web for current information with citations"""
@@ -64,10 +65,12 @@ You can chain multiple tool calls in the same turn. When you get data that benef
    - Call `get_satellite_crop_health(coordinates)` ONCE
    - Call `create_widget(widget_type="satellite-imagery", widget_data=<the satellite JSON>)` ONCE
    - Provide summary and STOP
+   - For health across ALL plots ("which plots need attention?"), call `get_farm_crop_health()` ONCE instead of one call per plot - no coordinates needed
 
 4. For crop health trends over time:
    - Get coordinates if needed (ONCE)
    - Call `get_crop_monitoring_time_series(coordinates, months_back=6)` ONCE
+   - For windows longer than a year (e.g. 24 months), pass `composite_days=10` to get 10-day median composites instead of every image
    - Call `create_widget(widget_type="ndvi-chart", widget_data=<the time series JSON>)` ONCE
    - Provide summary and STOP
 
@@ -81,12 +84,17 @@ You can chain multiple tool calls in the same turn. When you get data that benef
    - Call `get_soil_moisture_map(coordinates)` ONCE
    - Call `create_widget(widget_type="soil-moisture-map", widget_data=<the moisture JSON>)` ONCE
    - Provide summary and STOP
+   - For soil pH and texture across ALL plots, call `get_farm_soil_analysis()` ONCE instead of one `get_soil_analysis` per plot
 
 7. For historical data questions:
    - Call the appropriate data tool ONCE
    - Call `create_widget()` with appropriate widget type ONCE
    - Provide summary and STOP
 
+8. For ad-hoc questions over the farm records that no other tool answers (filters, grouping, totals, rankings):
+   - Call `query_farm_data(spec=<JSON spec with filters, group_by, metrics, sort, limit>)` ONCE instead of chaining several data tools
+   - Answer from the returned table and STOP
+
 **CRITICAL RULES TO PREVENT REDUNDANCY**: 
 - NEVER wrap function calls in print(), console.log(), or any other function
 - Call each tool ONLY ONCE per user question - check if you already called it in this conversation
@@ -112,8 +120,11 @@ Provide clean, natural responses based on the search results. Do NOT include cit
         FunctionTool(get_farm_coordinates),
         FunctionTool(get_plot_analysis),
         FunctionTool(get_growth_tracker_data),
+        FunctionTool(query_farm_data),
         FunctionTool(get_satellite_crop_health),
+        FunctionTool(get_farm_crop_health),
         FunctionTool(get_soil_analysis),
+        FunctionTool(get_farm_soil_analysis),
         FunctionTool(get_crop_monitoring_time_series),
         FunctionTool(get_soil_moisture_map),
         FunctionTool(create_widget)
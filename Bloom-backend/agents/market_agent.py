@@ -3,6 +3,7 @@ from google.adk.tools import FunctionTool
 from tools.search_tool import get_search_tool
 from tools.market_tool import get_price_chart, get_expense_tracker, get_inventory_status, get_sell_timing_recommendation
 from tools.widget_tool import create_widget
+from tools.farm_query_tool import query_farm_data
 
 def search_web(query: str) -> str:
     """Search the web for current information with citations"""
@@ -45,10 +46,10 @@ YOU MUST APPLY THIS TO EVERY QUESTION : When you receive a question, you **must*
 1. For price trends:
    - Call `get_price_chart(crop=<optional>)` to get price history
    - Call `create_widget(widget_type="price-chart", widget_data=<the price JSON>)` to display it
-   - Provide a brief summary of what the widget shows
+   - Provide a brief summary of what the widget shows, using "analytics" (moving average, seasonal index, volatility, forecast) for outlook questions
 
 2. For expense tracking:
-   - Call `get_expense_tracker()` to get expense breakdown
+   - Call `get_expense_tracker()` to get expense breakdown, or `get_expense_tracker(start_date="YYYY-MM-DD", end_date="YYYY-MM-DD")` for a specific period
    - Call `create_widget(widget_type="expense-tracker", widget_data=<the expense JSON>)` to display it
    - Provide a brief summary of what the widget shows
 
@@ -62,7 +63,11 @@ YOU MUST APPLY THIS TO EVERY QUESTION : When you receive a question, you **must*
    - Call `create_widget(widget_type="sell-timing", widget_data=<the timing JSON>)` to display it
    - Provide a brief summary of what the widget shows
 
-5. For current market prices or suppliers:
+5. For other questions about the farm's own prices, revenues or costs (e.g. "revenue by crop in 2024"):
+   - Call `query_farm_data(spec=<JSON spec with filters, group_by, metrics, sort, limit>)` ONCE
+   - Answer from the returned table (no widget)
+
+6. For current market prices or suppliers:
    - Call `search_web(query)` to find current information
    - Provide clean responses based on search results
 
@@ -79,6 +84,7 @@ Provide clean, natural responses. Do NOT include citation markers - the system h
         FunctionTool(get_expense_tracker),
         FunctionTool(get_inventory_status),
         FunctionTool(get_sell_timing_recommendation),
+        FunctionTool(query_farm_data),
         FunctionTool(create_widget)
     ]
 )
\ No newline at end of file
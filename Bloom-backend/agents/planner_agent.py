@@ -3,6 +3,7 @@ from google.adk.tools import FunctionTool
 from tools.search_tool import get_search_tool
 from tools.planner_tool import get_crop_recommendation, get_profitability_forecast, get_rotation_plan
 from tools.widget_tool import create_widget
+from tools.farm_query_tool import query_farm_data
 
 def search_web(query: str) -> str:
     """Search the web for current information with citations"""
@@ -45,22 +46,31 @@ YOU MUST APPLY THIS TO EVERY QUESTION :When you receive a question, you must fir
 1. For crop recommendations:
    - Announce: "Let me analyze which crops would be most profitable for you."
    - Call `get_crop_recommendation(plot_name=<optional>)` to get recommendations
+   - Each crop carries the model's `predicted_yield_tons_per_ha` for next season next to its historical average
    - Announce: "I'll show you the crop recommendations."
    - Call `create_widget(widget_type="crop-recommendation", widget_data=<the recommendation JSON>)` to display it
 
 2. For profitability forecasts:
    - Announce: "Let me forecast the profitability for that crop."
    - Call `get_profitability_forecast(crop=<crop_name>, area_hectares=<area>)` to get forecast
+   - For "what if" questions (e.g. prices drop 20%), also pass `price_change_percent` and/or `yield_change_percent`
+   - Mention the simulated profit range (p10-p90) and the probability of loss from "simulation"
+   - "yield_model" compares the predicted yield with the historical mean yield (when its model is "historical_mean" no trained model exists yet, so do not present the yield as a prediction)
    - Announce: "Here's the profitability forecast."
    - Call `create_widget(widget_type="profitability-forecast", widget_data=<the forecast JSON>)` to display it
 
 3. For rotation planning:
    - Announce: "Let me check your crop rotation history and suggest the next crop."
-   - Call `get_rotation_plan(plot_name=<optional>)` to get rotation plan
+   - Call `get_rotation_plan(plot_name=<optional>)` to get rotation plan (whole-farm plan for the next 4 seasons)
+   - Pass `seasons_ahead`, `budget_per_season_kes` or `max_crop_share_percent` when the user gives a horizon, budget or diversification limit
    - Announce: "I'll show you the rotation plan."
    - Call `create_widget(widget_type="rotation-plan", widget_data=<the rotation JSON>)` to display it
 
-4. For general planning questions:
+4. For other questions about the farm's own records (e.g. "average potato yield per plot since 2023"):
+   - Call `query_farm_data(spec=<JSON spec with filters, group_by, metrics, sort, limit>)` ONCE
+   - Answer from the returned table (no widget)
+
+5. For general planning questions:
    - Announce what you're searching for
    - Call `search_web(query)` to find current information
    - Provide clean responses based on search results
@@ -76,6 +86,7 @@ Provide clean, natural responses based on the search results. Do NOT include cit
         FunctionTool(get_crop_recommendation),
         FunctionTool(get_profitability_forecast),
         FunctionTool(get_rotation_plan),
+        FunctionTool(query_farm_data),
         FunctionTool(create_widget)
     ]
 )
\ No newline at end of file
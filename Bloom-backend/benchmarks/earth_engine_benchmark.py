@@ -0,0 +1,386 @@
+"""
+Benchmark Earth Engine round trips of the satellite tools against a local stand-in.
+
+The stand-in replaces the ee module: expressions are built locally and every
+blocking call (getInfo, getThumbURL) sleeps for a simulated server round trip
+before evaluating the expression. "before" replays the previous call sequences
+of get_satellite_crop_health (collection size, full image metadata, NDVI
+reduction, then two thumbnails one after the other) and get_soil_moisture_map;
+"after" runs the current tools, which evaluate one composite ee.Dictionary and
+fetch thumbnails concurrently. Reports latency and blocking calls per analysis:
+cold (empty imagery cache and thumbnail store, so thumbnails are downloaded
+into the store), with the thumbnails already stored, for a repeated question
+served from the cache, and for one that needs a metadata-only revalidation
+probe, plus soil analysis served from the permanent soil cache. It then
+compares farm-wide crop health and soil for N plots (one reduceRegions
+evaluation each) with N per-plot calls, and the NDVI time series (previously a
+size check plus every mapped feature) with a cold and a warm series store.
+Last, the response size of the time series as the window grows, for every
+image versus 10-day median composites returned as parallel arrays.
+
+Usage (from Bloom-backend/):
+    python benchmarks/earth_engine_benchmark.py [--round-trip-ms 80 150 300] [--runs 5] [--plots 10 100 300]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("GOOGLE_APPLICATION_CREDENTIALS", "stand-in.json")
+
+from tools import earth_engine_tool
+from utils import imagery_cache, ndvi_series, soil_cache, thumbnail_store
+
+COORDINATES = [[36.80, -1.29], [36.81, -1.29], [36.81, -1.28], [36.80, -1.28], [36.80, -1.29]]
+
+IMAGE_ID = 'COPERNICUS/S2_SR_HARMONIZED/20251009T074311_20251009T075434_T37MBU'
+CLOUD_COVER = 4.2
+NDVI_STATS = {'NDVI_mean': 0.62, 'NDVI_min': 0.21, 'NDVI_max': 0.84, 'NDVI_stdDev': 0.09}
+SOIL_STATS = {'b0': 64, 'b0_1': 7}
+# Full image metadata is large: every band's type, CRS and transform
+BAND_COUNT = 26
+
+
+class Expression:
+    """An unevaluated stand-in expression: an operation on a parent expression"""
+
+    def __init__(self, engine, op, parent=None, args=(), kwargs=None):
+        self._engine, self._op, self._parent = engine, op, parent
+        self._args, self._kwargs = args, kwargs or {}
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: Expression(self._engine, name, self, args, kwargs)
+
+    def chain(self):
+        node, ops = self, []
+        while isinstance(node, Expression):
+            ops.append(node._op)
+            node = node._parent
+        return ops
+
+    def find(self, op):
+        node = self
+        while isinstance(node, Expression) and node._op != op:
+            node = node._parent
+        return node
+
+    def getInfo(self):
+        self._engine.round_trip()
+        result = self._engine.evaluate(self)
+        self._engine.payload_bytes += len(json.dumps(result))
+        return result
+
+    def getThumbURL(self, params=None):
+        self._engine.round_trip()
+        return f"https://earthengine.stand-in/thumbnails/{id(self):x}"
+
+
+class Download:
+    """requests.get stand-in: fetching a rendered thumbnail is one more round trip"""
+
+    def __init__(self, engine):
+        self._engine = engine
+
+    def __call__(self, url, timeout=None):
+        self._engine.round_trip()
+        response = type('Response', (), {'raise_for_status': lambda self: None})()
+        response.content = url.encode() * 512
+        return response
+
+
+class Namespace:
+    """ee, ee.Geometry, ee.Reducer, ...: attribute access builds expression constructors"""
+
+    def __init__(self, engine, path=''):
+        self._engine, self._path = engine, path
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return Namespace(self._engine, f"{self._path}.{name}" if self._path else name)
+
+    def __call__(self, *args, **kwargs):
+        return Expression(self._engine, self._path, None, args, kwargs)
+
+
+class LocalEarthEngine(Namespace):
+    """Stand-in for the ee module with a fixed simulated latency per blocking call"""
+
+    def __init__(self, round_trip_ms=150.0, image_count=6):
+        super().__init__(self)
+        self.round_trip_ms = round_trip_ms
+        self.image_count = image_count
+        # The best image was acquired two days ago and is also the newest one
+        self.image_time = int((time.time() - 2 * 86400) * 1000)
+        self.latest_time = self.image_time
+        self.plots = []
+        self.series_days = 365
+        self.calls = 0
+        self.payload_bytes = 0
+        self._lock = threading.Lock()
+
+    def round_trip(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.round_trip_ms / 1000)
+
+    def series(self):
+        """One acquisition every five days over series_days, ending with the newest image"""
+        return [(self.latest_time - i * 5 * 86400 * 1000, NDVI_STATS['NDVI_mean'], CLOUD_COVER)
+                for i in range(self.series_days // 5 + 1)][::-1]
+
+    def image_properties(self):
+        return {'system:time_start': self.image_time, 'CLOUDY_PIXEL_PERCENTAGE': CLOUD_COVER}
+
+    def evaluate(self, value):
+        """Evaluate an expression tree (server side: no extra latency)"""
+        if isinstance(value, dict):
+            return {key: self.evaluate(item) for key, item in value.items()}
+        if not isinstance(value, Expression):
+            return value
+
+        op, args = value._op, value._args
+        if op == 'size':
+            return self.image_count
+        if op == 'gt':
+            return self.evaluate(value._parent) > args[0]
+        if op == 'Algorithms.If':
+            return self.evaluate(args[1] if self.evaluate(args[0]) else args[2])
+        if op == 'Dictionary':
+            return self.evaluate(args[0])
+        if op == 'get' and value._parent is not None and value._parent._op == 'reduceColumns':
+            if 'reduceRegions' not in value.chain():
+                # [time_ms, ndvi, cloud_cover] per acquisition in the filtered date range
+                start, end = value.find('filterDate')._args
+                return [list(row) for row in self.series() if start <= row[0] < end]
+            if 'addBands' in value.chain():
+                # Per-plot [plot_id, pH, texture class, area m2] rows of the soil layers
+                return [[plot['plot_id'], SOIL_STATS['b0'], SOIL_STATS['b0_1'], 1000.0] for plot in self.plots]
+            # Per-plot [plot_id, mean, min, max, stdDev] rows of a reduceRegions table
+            return [[plot['plot_id'], NDVI_STATS['NDVI_mean'], NDVI_STATS['NDVI_min'],
+                     NDVI_STATS['NDVI_max'], NDVI_STATS['NDVI_stdDev']] for plot in self.plots]
+        if op == 'get':
+            return self.image_properties().get(args[0])
+        if op == 'id':
+            return IMAGE_ID
+        if op == 'aggregate_max':
+            return self.latest_time
+        if op == 'reduceRegion':
+            return dict(NDVI_STATS if 'normalizedDifference' in value.chain() else SOIL_STATS)
+        if op == 'area':
+            return 12345.0
+        if op == 'map':
+            # A full FeatureCollection: every feature with its metadata
+            return {'type': 'FeatureCollection', 'columns': {'date': 'Long', 'ndvi': 'Float', 'cloud_cover': 'Float'},
+                    'features': [{'type': 'Feature', 'geometry': None, 'id': f"{i:016x}",
+                                  'properties': {'date': t, 'ndvi': ndvi, 'cloud_cover': cloud}}
+                                 for i, (t, ndvi, cloud) in enumerate(self.series())]}
+        if op == 'aggregate_array':
+            # One value per composite period of the List.sequence the collection was built from
+            last = value.find('FeatureCollection')._args[0]._parent._args[1]
+            column = {'date': [self.latest_time - i * 10 * 86400 * 1000 for i in range(last, -1, -1)],
+                      'ndvi': [NDVI_STATS['NDVI_mean']] * (last + 1),
+                      'cloud_fraction': [CLOUD_COVER / 100] * (last + 1),
+                      'images': [2] * (last + 1)}
+            return column[args[0]]
+        if op == 'first':
+            return {
+                'type': 'Image',
+                'bands': [{'id': f"B{i}", 'data_type': {'type': 'PixelType', 'precision': 'int'},
+                           'crs': 'EPSG:32737', 'crs_transform': [10, 0, 199980, 0, -10, 10000]}
+                          for i in range(BAND_COUNT)],
+                'properties': self.image_properties()
+            }
+        return self.evaluate(value._parent) if value._parent is not None else None
+
+
+def legacy_crop_health(ee):
+    """The previous get_satellite_crop_health call sequence: five blocking calls, one after another"""
+    geometry = ee.Geometry.Polygon(COORDINATES)
+    collection = (ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED').filterBounds(geometry)
+                  .filterDate('2025-01-01', '2025-01-31').filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 20))
+                  .sort('CLOUDY_PIXEL_PERCENTAGE'))
+    image = collection.first()
+    if collection.size().getInfo() == 0:
+        return None
+    properties = image.getInfo()['properties']
+    ndvi = image.normalizedDifference(['B8', 'B4']).rename('NDVI')
+    stats = ndvi.reduceRegion(reducer=ee.Reducer.mean(), geometry=geometry, scale=10).getInfo()
+    bounds = geometry.buffer(500).bounds()
+    rgb = image.visualize(bands=['B4', 'B3', 'B2']).getThumbURL({'region': bounds})
+    ndvi_url = ndvi.visualize(min=0, max=1).getThumbURL({'region': bounds})
+    return properties, stats, rgb, ndvi_url
+
+
+def legacy_soil_moisture(ee):
+    """The previous get_soil_moisture_map call sequence: soil, size, NDVI, image metadata and area"""
+    geometry = ee.Geometry.Polygon(COORDINATES)
+    soil = (ee.Image('OpenLandMap/SOL/SOL_PH-H2O_USDA-4C1A2A_M/v02').select('b0')
+            .reduceRegion(reducer=ee.Reducer.mean(), geometry=geometry, scale=250).getInfo())
+    collection = (ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED').filterBounds(geometry)
+                  .filterDate('2025-01-01', '2025-01-17').sort('CLOUDY_PIXEL_PERCENTAGE'))
+    image = collection.first()
+    if collection.size().getInfo() == 0:
+        return None
+    ndvi = image.normalizedDifference(['B8', 'B4']).rename('NDVI')
+    stats = ndvi.reduceRegion(reducer=ee.Reducer.mean(), geometry=geometry, scale=10).getInfo()
+    date = image.getInfo()['properties']['system:time_start']
+    return soil, stats, date, geometry.area().getInfo()
+
+
+def farm_plots(count):
+    """count adjoining plots of about 0.1 ha in a strip east of COORDINATES"""
+    plots = []
+    for index in range(count):
+        west = 36.80 + index * 0.003
+        ring = [[west, -1.29], [west + 0.003, -1.29], [west + 0.003, -1.287], [west, -1.287], [west, -1.29]]
+        plots.append({'plot_id': f"plot_{index:03d}", 'plot_name': f"Plot {index}",
+                      'area_hectares': 0.1, 'coordinates': ring})
+    return plots
+
+
+def legacy_time_series(ee, months_back=6):
+    """The previous get_crop_monitoring_time_series: collection size, then every mapped feature"""
+    ee.series_days = months_back * 30
+    geometry = ee.Geometry.Polygon(COORDINATES)
+    collection = (ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED').filterBounds(geometry)
+                  .filterDate(0, ee.latest_time + 1).sort('system:time_start'))
+    if collection.size().getInfo() == 0:
+        return None
+    return collection.map(lambda image: image).getInfo()
+
+
+def measure(run, engine, runs, setup=None):
+    timings = []
+    engine.calls = 0
+    for _ in range(runs):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), engine.calls / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--round-trip-ms', type=float, nargs='+', default=[80, 150, 300])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--plots', type=int, nargs='+', default=[10, 100, 300])
+    args = parser.parse_args()
+
+    print(f"{'round trip':>10} {'analysis':<22} {'before ms':>10} {'calls':>6} {'after ms':>10} {'calls':>6} {'speedup':>8}")
+    cache_dir = tempfile.mkdtemp(prefix="imagery-cache-")
+    for round_trip_ms in args.round_trip_ms:
+        engine = LocalEarthEngine(round_trip_ms)
+        cache_path = os.path.join(cache_dir, f"{round_trip_ms:.0f}.sqlite")
+        with patch.object(earth_engine_tool, 'ee', engine), \
+             patch.object(earth_engine_tool, 'initialize_earth_engine', lambda: None), \
+             patch.object(imagery_cache, 'CACHE_PATH', cache_path), \
+             patch.object(ndvi_series, 'SERIES_PATH', cache_path.replace('.sqlite', '-series.sqlite')), \
+             patch.object(thumbnail_store, 'IMAGERY_DIR', cache_path.replace('.sqlite', '-imagery')), \
+             patch.object(thumbnail_store.requests, 'get', Download(engine)), \
+             patch.object(soil_cache, 'CACHE_PATH', cache_path.replace('.sqlite', '-soil.sqlite')):
+            cache = imagery_cache.get_imagery_cache()
+            thumbnails = thumbnail_store.get_thumbnail_store()
+            soil = soil_cache.get_soil_cache()
+            earth_engine_tool.reset_earth_engine()
+            before = before_health = measure(lambda: legacy_crop_health(engine), engine, args.runs)
+            # Cold: every run starts from an empty imagery cache and thumbnail store
+            after = measure(lambda: earth_engine_tool.get_satellite_crop_health(COORDINATES), engine, args.runs,
+                            setup=lambda: (cache.clear(), thumbnails.clear()))
+            print(f"{round_trip_ms:>10.0f} {'satellite_crop_health':<22} {before[0]:>10.1f} {before[1]:>6.0f} "
+                  f"{after[0]:>10.1f} {after[1]:>6.0f} {before[0] / after[0]:>7.1f}x")
+            # Analysis recomputed, thumbnails already stored: no renders or downloads
+            after = measure(lambda: earth_engine_tool.get_satellite_crop_health(COORDINATES), engine, args.runs,
+                            setup=cache.clear)
+            print(f"{round_trip_ms:>10.0f} {'crop_health (stored)':<22} {before[0]:>10.1f} {before[1]:>6.0f} "
+                  f"{after[0]:>10.1f} {after[1]:>6.0f} {before[0] / after[0]:>7.1f}x")
+
+            before = measure(lambda: legacy_soil_moisture(engine), engine, args.runs)
+            after = measure(lambda: earth_engine_tool.get_soil_moisture_map(COORDINATES), engine, args.runs,
+                            setup=lambda: (cache.clear(), soil.clear()))
+            print(f"{round_trip_ms:>10.0f} {'soil_moisture_map':<22} {before[0]:>10.1f} {before[1]:>6.0f} "
+                  f"{after[0]:>10.1f} {after[1]:>6.0f} {before[0] / after[0]:>7.1f}x")
+
+            # Static soil layers: fetched once per geometry, then served from the soil cache
+            before = measure(lambda: earth_engine_tool.get_soil_analysis(COORDINATES), engine, args.runs,
+                             setup=soil.clear)
+            after = measure(lambda: earth_engine_tool.get_soil_analysis(COORDINATES), engine, args.runs)
+            print(f"{round_trip_ms:>10.0f} {'soil_analysis (cached)':<22} {before[0]:>10.1f} {before[1]:>6.0f} "
+                  f"{after[0]:>10.1f} {after[1]:>6.0f} {before[0] / after[0]:>7.0f}x")
+
+            # Repeat question: served from the imagery cache, then revalidated by a metadata probe
+            earth_engine_tool.get_satellite_crop_health(COORDINATES)
+            hit = measure(lambda: earth_engine_tool.get_satellite_crop_health(COORDINATES), engine, args.runs)
+            print(f"{round_trip_ms:>10.0f} {'crop_health (cached)':<22} {before_health[0]:>10.1f} "
+                  f"{before_health[1]:>6.0f} {hit[0]:>10.1f} {hit[1]:>6.0f} {before_health[0] / hit[0]:>7.0f}x")
+            engine.latest_time -= int(imagery_cache.REVISIT_DAYS * imagery_cache.DAY_MS)
+            expire = lambda: cache.revalidate(imagery_cache.cache_key(
+                'satellite_crop_health', COORDINATES, days_back=30), engine.latest_time, now=0)
+            probe = measure(lambda: earth_engine_tool.get_satellite_crop_health(COORDINATES), engine, args.runs,
+                            setup=expire)
+            engine.latest_time += int(imagery_cache.REVISIT_DAYS * imagery_cache.DAY_MS)
+            print(f"{round_trip_ms:>10.0f} {'crop_health (probe)':<22} {before_health[0]:>10.1f} "
+                  f"{before_health[1]:>6.0f} {probe[0]:>10.1f} {probe[1]:>6.0f} {before_health[0] / probe[0]:>7.1f}x")
+
+            # Time series: a warm store only fetches images newer than its last sync
+            series_store = ndvi_series.get_ndvi_series_store()
+            before = measure(lambda: legacy_time_series(engine), engine, args.runs)
+            cold = measure(lambda: earth_engine_tool.get_crop_monitoring_time_series(COORDINATES), engine,
+                           args.runs, setup=series_store.clear)
+            warm = measure(lambda: earth_engine_tool.get_crop_monitoring_time_series(COORDINATES), engine,
+                           args.runs)
+            for label, after in (("time_series (cold)", cold), ("time_series (warm)", warm)):
+                print(f"{round_trip_ms:>10.0f} {label:<22} {before[0]:>10.1f} {before[1]:>6.0f} "
+                      f"{after[0]:>10.1f} {after[1]:>6.0f} {before[0] / after[0]:>7.1f}x")
+            engine.series_days = 365
+
+            # Farm-wide: one reduceRegions over every plot vs one crop health call per plot
+            for count in args.plots:
+                engine.plots = farm_plots(count)
+                per_plot = lambda: [earth_engine_tool.get_satellite_crop_health(plot['coordinates'])
+                                    for plot in engine.plots]
+                before = measure(per_plot, engine, 1, setup=lambda: (cache.clear(), thumbnails.clear()))
+                with patch.object(earth_engine_tool, '_farm_plots', lambda: engine.plots):
+                    after = measure(earth_engine_tool.get_farm_crop_health, engine, args.runs, setup=cache.clear)
+                label = f"farm_crop_health ({count})"
+                print(f"{round_trip_ms:>10.0f} {label:<22} {before[0]:>10.1f} {before[1]:>6.0f} "
+                      f"{after[0]:>10.1f} {after[1]:>6.0f} {before[0] / after[0]:>7.0f}x")
+
+                # Soil for every plot: one reduceRegions vs one soil analysis per plot (cold soil cache)
+                per_plot = lambda: [earth_engine_tool.get_soil_analysis(plot['coordinates'])
+                                    for plot in engine.plots]
+                before = measure(per_plot, engine, 1, setup=soil.clear)
+                with patch.object(earth_engine_tool, '_farm_plots', lambda records=None: engine.plots):
+                    after = measure(earth_engine_tool.get_farm_soil_analysis, engine, args.runs, setup=soil.clear)
+                label = f"farm_soil ({count})"
+                print(f"{round_trip_ms:>10.0f} {label:<22} {before[0]:>10.1f} {before[1]:>6.0f} "
+                      f"{after[0]:>10.1f} {after[1]:>6.0f} {before[0] / after[0]:>7.0f}x")
+        earth_engine_tool.reset_earth_engine()
+
+    print()
+    print(f"{'months':>10} {'time series payload':<22} {'every image KB':>15} {'10-day composite KB':>20}")
+    engine = LocalEarthEngine(0)
+    with patch.object(earth_engine_tool, 'ee', engine), \
+         patch.object(earth_engine_tool, 'initialize_earth_engine', lambda: None):
+        for months in (6, 12, 24, 48):
+            engine.payload_bytes = 0
+            legacy_time_series(engine, months)
+            before = engine.payload_bytes
+            engine.payload_bytes = 0
+            earth_engine_tool.get_crop_monitoring_time_series(COORDINATES, months, composite_days=10)
+            print(f"{months:>10} {'':<22} {before / 1024:>15.1f} {engine.payload_bytes / 1024:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Evaluate reduced embedding dimensionality on the farm corpus.
+
+For each candidate output size the full-size vectors are truncated and
+re-normalised (equivalent to requesting that output_dimensionality from
+gemini-embedding-001), then compared with full-size retrieval:
+
+- recall@k: overlap of top-k neighbours with the full-dimension top-k
+- bytes per vector, corpus size and findNeighbors query payload size
+- brute-force dot-product latency over the corpus tiled to --scale rows
+
+Vectors come from the latest embeddings export by default, or are generated
+from the merged farm data with --live (requires Gemini credentials).
+
+Usage (from Bloom-backend/):
+    python benchmarks/embedding_dimension_eval.py [--embeddings-file PATH] [--live] [--k 5]
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.embeddings import (
+    EMBEDDING_MODEL,
+    EMBEDDING_TASK_TYPE,
+    EMBEDDINGS_DIR,
+    FULL_EMBEDDING_DIMENSION,
+    truncate_embeddings
+)
+from utils.farm_text import create_text_representation
+from utils.lexical_index import JSON_DATA_PATH
+
+CANDIDATE_DIMENSIONS = [128, 256, 512, 768, 1536, 3072]
+
+
+def load_export(path):
+    """Vectors from a JSONL embeddings export"""
+    vectors = []
+    with open(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                vectors.append(json.loads(line)['embedding'])
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def embed_live(batch_size=5):
+    """Embed the merged farm records at full dimensionality"""
+    from google import genai
+    from google.genai import types
+
+    with open(JSON_DATA_PATH, 'r') as f:
+        records = json.load(f)
+
+    client = genai.Client()
+    vectors = []
+    for i in range(0, len(records), batch_size):
+        texts = [create_text_representation(r) for r in records[i:i + batch_size]]
+        result = client.models.embed_content(
+            model=EMBEDDING_MODEL,
+            contents=texts,
+            config=types.EmbedContentConfig(
+                task_type=EMBEDDING_TASK_TYPE,
+                output_dimensionality=FULL_EMBEDDING_DIMENSION
+            )
+        )
+        vectors.extend(e.values for e in result.embeddings)
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def top_k_neighbours(matrix, k):
+    """Leave-one-out top-k neighbour ids for every row"""
+    scores = matrix @ matrix.T
+    np.fill_diagonal(scores, -np.inf)
+    k = min(k, len(matrix) - 1)
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return [set(row) for row in top]
+
+
+def search_latency_ms(matrix, scale, repeats=20):
+    """Mean brute-force dot-product top-10 latency for one query over a tiled corpus"""
+    tiled = np.tile(matrix, (max(1, scale // len(matrix)), 1))
+    query = matrix[0]
+    start = time.perf_counter()
+    for _ in range(repeats):
+        scores = tiled @ query
+        np.argpartition(-scores, 10)[:10]
+    return (time.perf_counter() - start) / repeats * 1000, len(tiled)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--embeddings-file', help='JSONL embeddings export (default: latest in embeddings/)')
+    parser.add_argument('--live', action='store_true', help='Embed the merged farm data instead of reading an export')
+    parser.add_argument('--k', type=int, default=5, help='Neighbours compared per query')
+    parser.add_argument('--scale', type=int, default=10000, help='Rows in the latency test corpus')
+    args = parser.parse_args()
+
+    if args.live:
+        full = embed_live()
+        source = "live embeddings"
+    else:
+        path = args.embeddings_file
+        if not path:
+            exports = sorted(glob.glob(os.path.join(EMBEDDINGS_DIR, 'farm_embeddings_v*.json')))
+            exports = [e for e in exports if not e.endswith('.meta.json')]
+            if not exports:
+                print("No embeddings export found; run the setup script or pass --live")
+                return
+            path = exports[-1]
+        full = load_export(path)
+        source = os.path.basename(path)
+
+    full_dimension = full.shape[1]
+    full = truncate_embeddings(full, full_dimension)
+    reference = top_k_neighbours(full, args.k)
+    print(f"Corpus: {len(full)} vectors of dimension {full_dimension} from {source}\n")
+
+    print(f"{'dim':>6}{'recall@' + str(args.k):>11}{'bytes/vec':>11}{'corpus KB':>11}"
+          f"{'payload KB':>12}{'search ms':>11}")
+    for dimension in [d for d in CANDIDATE_DIMENSIONS if d <= full_dimension]:
+        reduced = truncate_embeddings(full, dimension)
+        neighbours = top_k_neighbours(reduced, args.k)
+        recall = np.mean([len(a & b) / len(b) for a, b in zip(neighbours, reference)])
+
+        bytes_per_vector = dimension * 4
+        payload = len(json.dumps({"datapoint": {"featureVector": reduced[0].tolist()}}).encode())
+        latency, rows = search_latency_ms(reduced, args.scale)
+
+        print(f"{dimension:>6}{recall:>11.3f}{bytes_per_vector:>11}{bytes_per_vector * len(full) / 1024:>11.1f}"
+              f"{payload / 1024:>12.1f}{latency:>11.3f}")
+
+    print(f"\nSearch latency measured over {rows} tiled vectors (float32, brute force).")
+
+
+if __name__ == "__main__":
+    main()
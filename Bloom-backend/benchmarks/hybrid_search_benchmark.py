@@ -0,0 +1,109 @@
+"""
+Benchmark hybrid (BM25 + vector, RRF) retrieval against vector-only search.
+
+Queries are labelled from the merged farm data itself: exact plot ids,
+planting dates and crop stages whose relevant records are known exactly.
+Reports precision@k and mean latency for lexical-only, vector-only and
+hybrid retrieval. Vector rows are skipped when the Vector Search endpoint
+is not configured or reachable.
+
+Usage (from Bloom-backend/):
+    python benchmarks/hybrid_search_benchmark.py [--k 5]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.lexical_index import JSON_DATA_PATH, get_lexical_index
+
+
+def build_labelled_queries(records):
+    """Queries with exactly known relevant datapoint ids"""
+    by_plot_id = defaultdict(set)
+    by_planting_date = defaultdict(set)
+    by_stage = defaultdict(set)
+    for record in records:
+        plot_id = record.get('plot_id')
+        if not plot_id:
+            continue
+        by_plot_id[plot_id].add(plot_id)
+        if record.get('planting_date'):
+            by_planting_date[record['planting_date']].add(plot_id)
+        if record.get('crop_stage'):
+            by_stage[record['crop_stage']].add(plot_id)
+
+    queries = []
+    for plot_id, relevant in sorted(by_plot_id.items()):
+        queries.append(('plot_id', f"{plot_id}", relevant))
+    for date, relevant in sorted(by_planting_date.items()):
+        queries.append(('date', f"planted on {date}", relevant))
+    for stage, relevant in sorted(by_stage.items()):
+        if stage != 'Harvested':  # Nearly every record; not a discriminating query
+            queries.append(('stage', f"plots in {stage} stage", relevant))
+    return queries
+
+
+def precision_at_k(ranked_ids, relevant, k):
+    """Precision@k, normalised by the number of relevant documents when fewer than k exist"""
+    top = list(dict.fromkeys(ranked_ids))[:k]
+    if not top:
+        return 0.0
+    hits = sum(1 for doc_id in top if doc_id in relevant)
+    return hits / min(k, len(relevant))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--k', type=int, default=5, help='Results per query')
+    args = parser.parse_args()
+
+    with open(JSON_DATA_PATH, 'r') as f:
+        records = json.load(f)
+    queries = build_labelled_queries(records)
+
+    start = time.perf_counter()
+    get_lexical_index()
+    print(f"Lexical index ready in {(time.perf_counter() - start) * 1000:.1f} ms ({len(records)} records)")
+
+    methods = {}
+    try:
+        from tools import vector_search_tool as vst
+        methods['lexical'] = lambda q: [r['plot_id'] for r in vst._lexical_search(q, args.k * 2)]
+
+        probe, error = vst._vector_search(queries[0][1], args.k)
+        if error:
+            print(f"Vector search unavailable ({error}); reporting lexical only")
+        else:
+            methods['vector'] = lambda q: [r['plot_id'] for r in vst._vector_search(q, args.k * 2)[0]]
+            methods['hybrid'] = lambda q: [r['plot_id'] for r in json.loads(
+                vst.search_farm_data(q, max_results=args.k))['results']]
+    except ValueError as e:
+        # Vector Search configuration missing: benchmark the lexical index directly
+        print(f"Vector search not configured ({e}); reporting lexical only")
+        index = get_lexical_index()
+        methods['lexical'] = lambda q: [hit['id'] for hit in index.search(q, args.k * 2)]
+
+    print(f"\n{'method':<10}{'query type':<12}{'P@' + str(args.k):>8}{'mean ms':>10}")
+    for name, method in methods.items():
+        per_type = defaultdict(lambda: {'precision': [], 'latency': []})
+        for query_type, query, relevant in queries:
+            start = time.perf_counter()
+            ranked = method(query)
+            elapsed = (time.perf_counter() - start) * 1000
+            per_type[query_type]['precision'].append(precision_at_k(ranked, relevant, args.k))
+            per_type[query_type]['latency'].append(elapsed)
+
+        for query_type, values in per_type.items():
+            precision = sum(values['precision']) / len(values['precision'])
+            latency = sum(values['latency']) / len(values['latency'])
+            print(f"{name:<10}{query_type:<12}{precision:>8.3f}{latency:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
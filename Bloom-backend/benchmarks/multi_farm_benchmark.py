@@ -0,0 +1,121 @@
+"""
+Benchmark the farmer_id-partitioned data layer on a synthetic fleet.
+
+Each synthetic farm is a copy of the merged demo farm with its own farmer_id
+and scaled yields, prices and revenues, written as its own partition. Requests
+pick a random farm and run the tool workload (price chart, crop recommendations
+and a query engine selection) inside that farm's partition. Reports cold and warm
+request latency, partition loads and LRU evictions per fleet size, plus the
+time to load the same fleet as one merged file for comparison.
+
+Usage (from Bloom-backend/):
+    python benchmarks/multi_farm_benchmark.py [--farms 10 100 1000] [--requests 500] [--cache-size 64]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import farm_data_store
+from utils.farm_data_store import JSON_DATA_PATH, FarmDataStore, FarmPartitionRegistry, farm_partition, partition_path
+from utils.farm_aggregates import get_farm_aggregates
+from utils.farm_query_engine import get_query_engine
+
+SCALED_FIELDS = ['avg_yield_per_ha', 'yield_tonnes_per_ha', 'total_harvest_kg', 'revenue_kes',
+                 'total_revenue_kes', 'selling_price_kes_per_kg', 'profit_kes']
+
+
+def write_fleet(records, farms_dir, count, seed=7):
+    """Write count synthetic farm partitions; returns their farmer_ids"""
+    rng = random.Random(seed)
+    farmer_ids = []
+    for i in range(count):
+        farmer_id = f"synthetic-farm-{i:05d}"
+        factor = rng.uniform(0.6, 1.4)
+        farm = []
+        for record in records:
+            copy = dict(record, farm_farmer_id=farmer_id, farm_farm_name=f"Synthetic Farm {i}")
+            for field in SCALED_FIELDS:
+                if isinstance(copy.get(field), (int, float)) and copy[field] == copy[field]:
+                    copy[field] = round(copy[field] * factor, 2)
+            farm.append(copy)
+
+        path = partition_path(farmer_id, farms_dir)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(farm, f)
+        farmer_ids.append(farmer_id)
+    return farmer_ids
+
+
+def tool_workload():
+    """The data access a market/farm tool call performs"""
+    aggregates = get_farm_aggregates()
+    aggregates.price_chart('Maize')
+    _ = aggregates.crop_recommendations
+    get_query_engine().select(crop='Maize')
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--farms', type=int, nargs='+', default=[10, 100, 1000], help='Fleet sizes to test')
+    parser.add_argument('--requests', type=int, default=500, help='Requests per fleet size')
+    parser.add_argument('--cache-size', type=int, default=64, help='Partitions kept in memory')
+    args = parser.parse_args()
+
+    with open(JSON_DATA_PATH, 'r') as f:
+        records = json.load(f)
+
+    print(f"{'farms':>7}{'cold ms':>10}{'warm ms':>10}{'warm p95':>10}{'loads':>8}{'evicted':>9}{'one-file load ms':>18}")
+    original_registry = farm_data_store._partitions
+    for count in args.farms:
+        farms_dir = tempfile.mkdtemp(prefix='bloom_farms_')
+        try:
+            farmer_ids = write_fleet(records, farms_dir, count)
+            registry = FarmPartitionRegistry(farms_dir, max_partitions=args.cache_size, check_interval=60)
+            farm_data_store._partitions = registry
+
+            rng = random.Random(count)
+            cold, warm = [], []
+            for _ in range(args.requests):
+                farmer_id = rng.choice(farmer_ids)
+                was_loaded = farmer_id in registry._stores
+                start = time.perf_counter()
+                with farm_partition(farmer_id):
+                    tool_workload()
+                elapsed = (time.perf_counter() - start) * 1000
+                (warm if was_loaded else cold).append(elapsed)
+
+            # The unpartitioned alternative: every farm in one merged file
+            fleet_path = os.path.join(farms_dir, 'fleet.json')
+            with open(fleet_path, 'w') as f:
+                json.dump([dict(r, farm_farmer_id=fid) for fid in farmer_ids for r in records], f)
+            start = time.perf_counter()
+            FarmDataStore(fleet_path, check_interval=60)
+            one_file_ms = (time.perf_counter() - start) * 1000
+
+            print(f"{count:>7}"
+                  f"{statistics.mean(cold) if cold else 0:>10.2f}"
+                  f"{statistics.mean(warm) if warm else 0:>10.3f}"
+                  f"{percentile(warm, 0.95) if warm else 0:>10.3f}"
+                  f"{registry.loads:>8}{registry.evictions:>9}{one_file_ms:>18.1f}")
+        finally:
+            farm_data_store._partitions = original_registry
+            shutil.rmtree(farms_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark the whole-farm rotation optimiser as plots and seasons grow.
+
+Synthetic farms copy the demo farm's per-hectare crop economics onto N plots
+with random areas and recent crop histories; larger crop counts add synthetic
+crops scaled from the demo ones. Each (crops, plots, seasons) case is
+solved without farm-wide limits (exact per-plot DP), and with a per-season
+input budget plus a cap on hectares per crop (Lagrangian relaxation, repair
+and bounded branch and bound). Reports solve time, the optimality gap to the
+relaxation bound and whether branch and bound proved the plan optimal.
+
+Usage (from Bloom-backend/):
+    python benchmarks/rotation_benchmark.py [--crops 3 5] [--plots 5 10 25 50 100] [--seasons 2 4 6 8]
+"""
+
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.farm_data_store import get_farm_data_store
+from utils.rotation_optimizer import RotationProblem, optimize_rotation, season_economics
+from utils.price_analytics import next_periods
+
+
+def synthetic_plots(count, crops, seed=11):
+    rng = random.Random(seed)
+    return [{
+        'plot_id': f"plot_{i:03d}",
+        'plot_name': f"Plot {i}",
+        'area_hectares': round(rng.uniform(0.5, 3.0), 1),
+        'history': [rng.choice(crops) for _ in range(3)]
+    } for i in range(count)]
+
+
+def with_synthetic_crops(profit, cost, count, seed=7):
+    """Economics with extra crops (scaled copies of the demo crops) up to count crops"""
+    rng = random.Random(seed)
+    profit, cost = dict(profit), dict(cost)
+    demo = sorted(profit)
+    for i in range(len(demo), count):
+        source, scale = demo[i % len(demo)], rng.uniform(0.6, 1.4)
+        profit[f"Crop {i + 1}"] = {s: v * scale for s, v in profit[source].items()}
+        cost[f"Crop {i + 1}"] = {s: v * rng.uniform(0.8, 1.2) for s, v in cost[source].items()}
+    return profit, cost
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--crops', type=int, nargs='+', default=[3, 5], help='Crop counts to test')
+    parser.add_argument('--plots', type=int, nargs='+', default=[5, 10, 25, 50, 100], help='Plot counts to test')
+    parser.add_argument('--seasons', type=int, nargs='+', default=[2, 4, 6, 8], help='Planning horizons to test')
+    parser.add_argument('--budget-share', type=float, default=0.6,
+                        help='Per-season budget as a share of the cost of planting every plot with its dearest crop')
+    parser.add_argument('--crop-share', type=float, default=40.0, help='Max percent of farm area per crop per season')
+    args = parser.parse_args()
+
+    demo_profit, demo_cost = season_economics(get_farm_data_store().farm_records)
+    seasons = sorted(next(iter(demo_profit.values())))
+
+    print(f"{'crops':>6}{'plots':>6}{'seasons':>9}{'free ms':>10}{'limited ms':>12}{'gap %':>8}{'iters':>7}{'b&b':>6}")
+    for crop_count in args.crops:
+        profit, cost = with_synthetic_crops(demo_profit, demo_cost, crop_count)
+        crops = sorted(profit)
+        dearest = max(c for by_season in cost.values() for c in by_season.values())
+        for plot_count in args.plots:
+            plots = synthetic_plots(plot_count, crops)
+            total_area = sum(p['area_hectares'] for p in plots)
+            for season_count in args.seasons:
+                periods = next_periods(f"2025 {seasons[0]}", seasons, season_count)
+                free = optimize_rotation(RotationProblem(plots, periods, profit, cost))
+                limited = optimize_rotation(RotationProblem(
+                    plots, periods, profit, cost,
+                    budget_per_season=args.budget_share * dearest * total_area,
+                    max_crop_hectares={crop: total_area * args.crop_share / 100 for crop in crops}))
+                print(f"{len(crops):>6}{plot_count:>6}{season_count:>9}{free['solve_ms']:>10.1f}{limited['solve_ms']:>12.1f}"
+                      f"{limited['gap_percent']:>8.2f}{limited['iterations']:>7}"
+                      f"{'yes' if limited['branch_and_bound_complete'] else 'no':>6}")
+
+
+if __name__ == "__main__":
+    main()
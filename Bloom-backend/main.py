@@ -15,6 +15,10 @@ from pydantic import BaseModel
 from typing import Optional
 from agents.mainagent import root_agent
 from utils.json_parser import extract_widget_data, extract_citations
+from utils.incremental_ingest import IngestWatcher, ingest_sources
+from utils.farm_data_store import set_current_farmer, validate_farmer_id
+from utils.thumbnail_store import get_thumbnail_store
+from tools.earth_engine_tool import get_earth_engine_health
 import PyPDF2
 import io
 
@@ -96,11 +100,14 @@ class ChatRequest(BaseModel):
     message: str
     user_id: str = "default_user"
     session_id: Optional[str] = None
+    # Farm partition the agents' tools read (omit for the single-farm deployment)
+    farmer_id: Optional[str] = None
     pdf_context_ids: Optional[list[str]] = None
 
 class HealthResponse(BaseModel):
     status: str
     version: str
+    earth_engine: Optional[dict] = None
 
 class PDFUploadResponse(BaseModel):
     success: bool
@@ -108,9 +115,44 @@ class PDFUploadResponse(BaseModel):
     filename: str
     text_length: int
 
+class IngestRequest(BaseModel):
+    update_embeddings: bool = False
+    force_full: bool = False
+    prefetch_soil: bool = True
+
+# Optional background watcher on the farm CSV exports (INGEST_WATCH_INTERVAL seconds)
+ingest_watcher: Optional[IngestWatcher] = None
+
+@app.on_event("startup")
+async def start_ingest_watcher():
+    global ingest_watcher
+    interval = os.getenv("INGEST_WATCH_INTERVAL")
+    if interval:
+        ingest_watcher = IngestWatcher(
+            interval=float(interval),
+            update_embeddings=os.getenv("INGEST_UPDATE_EMBEDDINGS", "").lower() == "true",
+            prefetch_soil=os.getenv("INGEST_PREFETCH_SOIL", "true").lower() == "true"
+        )
+        ingest_watcher.start()
+        logger.info(f"👀 Watching farm data exports every {interval}s")
+
+@app.on_event("shutdown")
+async def stop_ingest_watcher():
+    if ingest_watcher:
+        ingest_watcher.stop()
+
 @app.post("/chat/stream")
 async def chat_stream(request: ChatRequest):
+    if request.farmer_id:
+        try:
+            validate_farmer_id(request.farmer_id)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
     async def generate_stream():
+        # Tools called while streaming only see this farm's partition (the streaming
+        # task's context, and with it the setting, ends with the response)
+        set_current_farmer(request.farmer_id)
         try:
             session_id = request.session_id or str(uuid.uuid4())
             yield f"data: {json.dumps({'type': 'session', 'session_id': session_id})}\n\n"
@@ -291,7 +333,26 @@ async def upload_pdf(file: UploadFile = File(...)):
 
 @app.get("/health", response_model=HealthResponse)
 async def health():
-    return HealthResponse(status="healthy", version="1.0.0")
+    # Earth Engine initialises lazily on the first satellite call; report its state without forcing it
+    earth_engine = get_earth_engine_health()
+    status = "degraded" if earth_engine['status'] == 'failed' else "healthy"
+    return HealthResponse(status=status, version="1.0.0", earth_engine=earth_engine)
+
+@app.post("/api/ingest")
+async def ingest_farm_data(request: IngestRequest):
+    """Apply new or changed farm CSV rows to the merged data without a full rebuild"""
+    try:
+        summary = await asyncio.to_thread(
+            ingest_sources,
+            update_embeddings=request.update_embeddings,
+            force_full=request.force_full,
+            prefetch_soil=request.prefetch_soil
+        )
+        logger.info(f"📥 Ingest {summary['mode']} in {summary['duration_ms']}ms")
+        return summary
+    except Exception as e:
+        logger.error(f"Error ingesting farm data: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error ingesting farm data: {str(e)}")
 
 @app.get("/api/reports/{filename}")
 async def download_report(filename: str):
@@ -310,6 +371,24 @@ async def download_report(filename: str):
         filename=filename
     )
 
+@app.get("/api/imagery/{digest}.png")
+async def get_imagery(digest: str):
+    """Serve a stored satellite thumbnail (content-addressed, so it never changes)"""
+    from fastapi.responses import FileResponse
+    
+    filepath = get_thumbnail_store().path(digest)
+    if filepath is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    return FileResponse(
+        filepath,
+        media_type='image/png',
+        headers={
+            "Cache-Control": "public, max-age=31536000, immutable",
+            "ETag": f'"{digest}"'
+        }
+    )
+
 @app.post("/api/reports/clear")
 async def clear_reports():
     """Clear all reports from the reports folder"""
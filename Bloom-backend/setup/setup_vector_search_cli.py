@@ -6,11 +6,33 @@ This is simpler and more reliable than the Python API approach.
 import json
 import subprocess
 import os
+import sys
 import time
 from google import genai
 from google.genai import types
 from dotenv import load_dotenv
 
+# Make the backend packages importable when run as a script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.farm_text import (
+    create_text_representation,
+    create_record_metadata,
+    record_datapoint_id,
+    build_restricts,
+    build_numeric_restricts
+)
+from utils.lexical_index import build_lexical_index
+from utils.columnar_snapshot import ColumnarSnapshot
+from utils.embeddings import (
+    EMBEDDING_MODEL,
+    EMBEDDING_TASK_TYPE,
+    FULL_EMBEDDING_DIMENSION,
+    get_embedding_dimension,
+    normalize_embedding,
+    write_index_metadata
+)
+
 # Load environment variables
 load_dotenv()
 
@@ -76,20 +98,22 @@ def run_data_processing():
         result = subprocess.run(['python', 'setup/data_processing.py', '--json-only'], 
                               capture_output=True, text=True, check=True)
         
-        # Debug: show what we actually got
-        print(f"Script stdout length: {len(result.stdout)}")
-        print(f"Script stderr: {result.stderr}")
-        if len(result.stdout) < 200:
-            print(f"Script stdout: {repr(result.stdout)}")
-        else:
-            print(f"Script stdout preview: {repr(result.stdout[:200])}")
+        if result.stderr:
+            print(f"Script stderr: {result.stderr}")
         
         if not result.stdout.strip():
             print("❌ No output from data processing script")
             return None
-            
-        farm_data = json.loads(result.stdout)
-        print(f"✅ Processed {len(farm_data)} farm records")
+        
+        # The script reports where it wrote the columnar snapshot; read the columns directly
+        summary = json.loads(result.stdout.strip().splitlines()[-1])
+        snapshot = ColumnarSnapshot.load(summary['snapshot_dir'])
+        if snapshot.version != summary['version']:
+            print(f"❌ Snapshot version mismatch: expected {summary['version']}, found {snapshot.version}")
+            return None
+        
+        farm_data = snapshot.to_records()
+        print(f"✅ Processed {len(farm_data)} farm records (snapshot {snapshot.version})")
         return farm_data
     except json.JSONDecodeError as e:
         print(f"❌ JSON decode error: {e}")
@@ -99,40 +123,10 @@ def run_data_processing():
         print(f"❌ Error getting farm data: {e}")
         return None
 
-def create_text_representation(record):
-    """Convert farm record to text for embedding"""
-    
-    # Get coordinates from either plot-level or farm-level data
-    plot_coords = record.get('coordinates_geojson', '')
-    farm_lat = record.get('farm_latitude', record.get('latitude', ''))
-    farm_lon = record.get('farm_longitude', record.get('longitude', ''))
-    
-    text = f"""
-    Farm: {record.get('farm_farm_name', 'Unknown Farm')}
-    Farm Location: Latitude {farm_lat}, Longitude {farm_lon}
-    County: {record.get('farm_county', 'Unknown')}
-    Plot: {record.get('plot_name', 'Unknown')} ({record.get('plot_id', 'Unknown')})
-    Plot Coordinates: {plot_coords}
-    Area: {record.get('area_hectares', 0)} hectares
-    Soil Type: {record.get('farm_soil_type_main', 'Unknown')}
-    Current Crop: {record.get('current_crop', 'Unknown')}
-    Planting Date: {record.get('planting_date', 'Unknown')}
-    Expected Harvest: {record.get('expected_harvest', 'Unknown')}
-    Crop Stage: {record.get('crop_stage', 'Unknown')}
-    Average Yield per Hectare: {record.get('avg_yield_per_ha', 0)} tons
-    Total Harvest: {record.get('total_harvest_kg', 0)} kg
-    Total Revenue: {record.get('total_revenue_kes', 0)} KES
-    Profit Margin: {record.get('profit_margin_percent', 0)}%
-    Input Costs: Seeds {record.get('seeds_cost_kes', 0)} KES, Fertilizer {record.get('fertilizer_cost_kes', 0)} KES
-    Current Inventory: {record.get('current_stock_kg', 0)} kg available
-    Next Rotation Crop: {record.get('next_crop', 'Unknown')}
-    Yield Performance: Min {record.get('min_yield_per_ha', 0)} - Max {record.get('max_yield_per_ha', 0)} tons/ha
-    """.strip()
-    return text
-
-def generate_embeddings_batch(farm_data, batch_size=5):
+def generate_embeddings_batch(farm_data, batch_size=5, dimension=None):
     """Generate embeddings in batches to avoid rate limits"""
-    print("🧠 Generating embeddings in batches...")
+    dimension = dimension or get_embedding_dimension()
+    print(f"🧠 Generating {dimension}-dimensional embeddings in batches...")
     
     # Set up authentication for Gemini
     os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = SERVICE_ACCOUNT_PATH
@@ -151,31 +145,22 @@ def generate_embeddings_batch(farm_data, batch_size=5):
         try:
             # Generate embeddings for the batch
             result = client.models.embed_content(
-                model="gemini-embedding-001",
+                model=EMBEDDING_MODEL,
                 contents=texts,
-                config=types.EmbedContentConfig(task_type="SEMANTIC_SIMILARITY")
+                config=types.EmbedContentConfig(
+                    task_type=EMBEDDING_TASK_TYPE,
+                    output_dimensionality=dimension
+                )
             )
             
             # Store embeddings with metadata
             for j, embedding in enumerate(result.embeddings):
                 record = batch[j]
                 data_point = {
-                    "id": record.get('plot_id_y', f"record_{i+j}"),
-                    "embedding": embedding.values,
-                    "embedding_metadata": {
-                        "plot_name": record.get('plot_name_x', 'Unknown'),
-                        "crop": record.get('current_crop', 'Unknown'),
-                        "stage": record.get('crop_stage', 'Unknown'),
-                        "yield": record.get('avg_yield_per_ha', 0),
-                        "revenue": record.get('total_revenue_kes', 0),
-                        "area": record.get('area_hectares_x', 0),
-                        "farm_name": record.get('farm_farm_name', 'Unknown'),
-                        "latitude": record.get('farm_latitude', 0),
-                        "longitude": record.get('farm_longitude', 0),
-                        "county": record.get('farm_county', 'Unknown'),
-                        "coordinates_geojson": record.get('coordinates_geojson', ''),
-                        "text": create_text_representation(record)
-                    }
+                    "id": record_datapoint_id(record, i + j),
+                    # Reduced-dimension outputs must be normalised for dot-product search
+                    "embedding": normalize_embedding(embedding.values) if dimension < FULL_EMBEDDING_DIMENSION else embedding.values,
+                    "embedding_metadata": create_record_metadata(record)
                 }
                 all_embeddings.append(data_point)
             
@@ -233,6 +218,8 @@ def prepare_embeddings_file(embeddings_data):
         jsonl_record = {
             "id": data_point["id"],
             "embedding": data_point["embedding"],
+            "restricts": build_restricts(data_point["embedding_metadata"]),
+            "numeric_restricts": build_numeric_restricts(data_point["embedding_metadata"]),
             "embedding_metadata": data_point["embedding_metadata"]
         }
         jsonl_lines.append(json.dumps(jsonl_record))
@@ -247,6 +234,11 @@ def prepare_embeddings_file(embeddings_data):
         f.write('\n'.join(jsonl_lines))
     
     print(f"✅ Created {embeddings_file} ({len(jsonl_lines)} records)")
+    
+    # Record the dimension so the query path can be checked against the index
+    dimension = len(embeddings_data[0]["embedding"]) if embeddings_data else 0
+    metadata_file = write_index_metadata(embeddings_file, dimension, len(jsonl_lines))
+    print(f"✅ Wrote index metadata to {metadata_file} (dimension {dimension})")
     print("📝 Note: All metadata (coordinates, etc.) is embedded in the vector data")
     
     return embeddings_file
@@ -307,24 +299,28 @@ def main():
     if not farm_data:
         return
     
-    # Step 3: Generate embeddings
+    # Step 3: Build the lexical (BM25) index over the same record text
+    lexical_index = build_lexical_index(farm_data)
+    print(f"✅ Built lexical index ({len(lexical_index)} documents, {len(lexical_index.postings)} terms)")
+    
+    # Step 4: Generate embeddings
     embeddings_data = generate_embeddings_batch(farm_data)
     if not embeddings_data:
         return
     
-    # Step 4: Create GCS bucket
+    # Step 5: Create GCS bucket
     if not create_gcs_bucket():
         return
     
-    # Step 5: Prepare embeddings file
+    # Step 6: Prepare embeddings file
     embeddings_file = prepare_embeddings_file(embeddings_data)
     
-    # Step 6: Upload to GCS
+    # Step 7: Upload to GCS
     gcs_uri = upload_to_gcs(embeddings_file)
     if not gcs_uri:
         return
     
-    # Step 7: Print manual steps for index creation
+    # Step 8: Print manual steps for index creation
     dimensions = len(embeddings_data[0]["embedding"])
     print_manual_steps(gcs_uri, dimensions, embeddings_file)
     
@@ -0,0 +1,47 @@
+"""
+Train the yield prediction model on the merged farm records and persist it as a
+versioned artifact (generated_data/models/, or models/farms/<farmer_id>/ for a
+farm partition). Run after setup/data_processing.py so the model sees the
+latest records; running services pick the new artifact up on their next call.
+Services never train: a farm without an artifact is served historical means.
+
+Usage (from Bloom-backend/):
+    python setup/train_yield_model.py [--models-dir DIR] [--farmer-id ID | --all-farms]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Make the backend packages importable when run as a script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.farm_data_store import get_farm_data_store, get_partition_registry
+from utils.yield_model import MODELS_DIR, farm_models_dir, train_yield_model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and persist the yield prediction model")
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--farmer-id', default=None, help="Train on one farm partition")
+    parser.add_argument('--all-farms', action='store_true', help="Train one model per farm partition")
+    args = parser.parse_args()
+
+    farmer_ids = get_partition_registry().farmer_ids() if args.all_farms else [args.farmer_id]
+    for farmer_id in farmer_ids:
+        store = get_farm_data_store(farmer_id=farmer_id)
+        try:
+            model = train_yield_model(store.records, store.version)
+        except ValueError as e:
+            # Too few yields on this farm; its tools fall back to historical means
+            print(f"Skipped {farmer_id or 'farm data'}: {e}")
+            continue
+        artifact = model.save(farm_models_dir(farmer_id, args.models_dir))
+
+        print(f"Saved {artifact}")
+        print(json.dumps(model.manifest, indent=2))
+
+
+if __name__ == "__main__":
+    main()
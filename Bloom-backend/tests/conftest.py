@@ -0,0 +1,13 @@
+"""
+Shared test configuration.
+
+The vector search and Earth Engine tools validate their configuration at import
+time, so placeholder values are set here, before any test module is collected.
+Values already present in the environment are kept.
+"""
+
+import os
+
+for var in ["VECTOR_SEARCH_API_ENDPOINT", "VECTOR_SEARCH_INDEX_ENDPOINT",
+            "VECTOR_SEARCH_DEPLOYED_INDEX_ID", "GOOGLE_APPLICATION_CREDENTIALS", "GCLOUD_PATH"]:
+    os.environ.setdefault(var, "test-value")
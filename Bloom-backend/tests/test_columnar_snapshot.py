@@ -0,0 +1,119 @@
+"""
+Tests for the versioned columnar snapshot of merged farm data
+"""
+
+import os
+import sys
+import json
+import hashlib
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.columnar_snapshot import ColumnarSnapshot, write_snapshot, read_manifest, load_snapshot_records
+from utils import farm_data_store
+from utils.farm_data_store import FarmDataStore
+
+
+RECORDS = [
+    {"plot_id": "plot_A_2023_S1", "plot_name": "North Field", "total_cost_kes": 147000,
+     "revenue_kes": 247000.0, "profit_kes": float('nan'), "current_stock_kg": "0", "category": None},
+    {"plot_id": "plot_B_2023_S1", "plot_name": "East Ridge", "total_cost_kes": 90000,
+     "revenue_kes": None, "profit_kes": 1200.5, "current_stock_kg": 50, "category": "Seeds"},
+]
+
+
+class TestColumnarSnapshot:
+    def test_round_trip(self, tmp_path):
+        snapshot_dir = str(tmp_path / "snapshot")
+        write_snapshot(RECORDS, snapshot_dir)
+
+        records = ColumnarSnapshot.load(snapshot_dir, verify=True).to_records()
+        assert records[0]['total_cost_kes'] == 147000
+        assert isinstance(records[0]['total_cost_kes'], int)
+        assert records[0]['profit_kes'] is None
+        assert records[1]['revenue_kes'] is None
+        assert records[1]['category'] == "Seeds"
+        # Mixed-type columns keep their original values
+        assert [r['current_stock_kg'] for r in records] == ["0", 50]
+
+    def test_columns_are_memory_mapped(self, tmp_path):
+        snapshot_dir = str(tmp_path / "snapshot")
+        write_snapshot(RECORDS, snapshot_dir)
+
+        snapshot = ColumnarSnapshot.load(snapshot_dir)
+        assert isinstance(snapshot.arrays['total_cost_kes'], np.memmap)
+        assert snapshot.arrays['plot_name'].dtype == np.int32
+
+    def test_new_version_replaces_current(self, tmp_path):
+        snapshot_dir = str(tmp_path / "snapshot")
+        first = write_snapshot(RECORDS[:1], snapshot_dir)
+        second = write_snapshot(RECORDS, snapshot_dir)
+
+        assert first['version'] != second['version']
+        assert read_manifest(snapshot_dir)['version'] == second['version']
+        assert ColumnarSnapshot.load(snapshot_dir).record_count == 2
+
+    def test_tampered_snapshot_fails_verification(self, tmp_path):
+        snapshot_dir = str(tmp_path / "snapshot")
+        manifest = write_snapshot(RECORDS, snapshot_dir)
+        np.save(os.path.join(snapshot_dir, manifest['version'], "2.npy"), np.array([1, 2]))
+
+        with pytest.raises(ValueError):
+            ColumnarSnapshot.load(snapshot_dir, verify=True)
+
+    def test_stale_snapshot_is_ignored(self, tmp_path):
+        snapshot_dir = str(tmp_path / "snapshot")
+        write_snapshot(RECORDS, snapshot_dir, source_hash="abc")
+
+        assert load_snapshot_records(snapshot_dir, source_hash="abc") is not None
+        assert load_snapshot_records(snapshot_dir, source_hash="def") is None
+
+
+def test_store_reads_matching_snapshot(tmp_path):
+    path = str(tmp_path / "merged.json")
+    with open(path, 'w') as f:
+        json.dump(RECORDS, f)
+    with open(path, 'rb') as f:
+        source_hash = hashlib.sha256(f.read()).hexdigest()
+
+    # Snapshot content differs from the JSON only so the test can tell which one was read
+    write_snapshot([dict(r, plot_name="From Snapshot") for r in RECORDS],
+                   str(tmp_path / "snapshot"), source_hash=source_hash)
+
+    store = FarmDataStore(path)
+    assert {r['plot_name'] for r in store.records} == {"From Snapshot"}
+
+
+def test_store_skips_json_when_manifest_matches(tmp_path):
+    path = str(tmp_path / "merged.json")
+    with open(path, 'w') as f:
+        json.dump(RECORDS, f)
+    write_snapshot(RECORDS, str(tmp_path / "snapshot"), source_path=path)
+
+    # Size and mtime recorded in the manifest match, so the JSON is never hashed
+    with patch.object(farm_data_store.hashlib, 'sha256', side_effect=AssertionError("JSON was hashed")):
+        store = FarmDataStore(path)
+    snapshot = store.snapshot
+    assert snapshot.columns is not None
+    assert snapshot._records is None
+    assert [r.plot_name for r in store.farm_records] == ["North Field", "East Ridge"]
+    assert store.farm_records[0].cost_kes == 147000
+    # Record dicts are only decoded when asked for
+    assert store.records[1]['category'] == "Seeds"
+
+
+def test_store_reads_json_changed_after_snapshot(tmp_path):
+    path = str(tmp_path / "merged.json")
+    with open(path, 'w') as f:
+        json.dump(RECORDS, f)
+    write_snapshot(RECORDS, str(tmp_path / "snapshot"), source_path=path)
+    with open(path, 'w') as f:
+        json.dump(RECORDS[:1], f)
+
+    store = FarmDataStore(path)
+    assert store.snapshot.columns is None
+    assert len(store.records) == 1
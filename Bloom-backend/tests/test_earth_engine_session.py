@@ -0,0 +1,197 @@
+"""
+Tests for the process-wide Earth Engine session (credentials are loaded and
+ee.Initialize runs once, even under concurrent first calls) and for analyses
+evaluated in a single round trip
+"""
+
+import os
+import sys
+import json
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import earth_engine_tool
+from utils import imagery_cache, soil_cache
+from tools.earth_engine_tool import (
+    EarthEngineError,
+    get_earth_engine_health,
+    get_earth_engine_tool,
+    get_soil_analysis,
+    initialize_earth_engine,
+    reset_earth_engine
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_session():
+    reset_earth_engine()
+    yield
+    reset_earth_engine()
+
+
+@pytest.fixture
+def ee_mock():
+    with patch.object(earth_engine_tool.ee, 'ServiceAccountCredentials') as credentials, \
+         patch.object(earth_engine_tool.ee, 'Initialize') as initialize:
+        credentials.return_value = MagicMock(service_account_email="bloom@example.iam.gserviceaccount.com")
+        yield credentials, initialize
+
+
+class TestEarthEngineSession:
+    def test_initialises_once(self, ee_mock):
+        credentials, initialize = ee_mock
+        assert get_earth_engine_health()['status'] == "not_initialized"
+        first = get_earth_engine_tool()
+        assert get_earth_engine_tool() is first
+        initialize_earth_engine()
+        assert credentials.call_count == 1 and initialize.call_count == 1
+
+        health = get_earth_engine_health()
+        assert health['status'] == "ready"
+        assert health['service_account'] == "bloom@example.iam.gserviceaccount.com"
+        assert health['attempts'] == 1
+
+    def test_concurrent_first_calls_initialise_once(self, ee_mock):
+        _, initialize = ee_mock
+        initialize.side_effect = lambda credentials: time.sleep(0.05)
+        threads = [threading.Thread(target=initialize_earth_engine) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert initialize.call_count == 1
+
+    def test_failure_is_cached_until_retry(self, ee_mock):
+        _, initialize = ee_mock
+        initialize.side_effect = Exception("permission denied")
+        with pytest.raises(EarthEngineError):
+            initialize_earth_engine()
+        with pytest.raises(EarthEngineError, match="permission denied"):
+            initialize_earth_engine()
+        assert initialize.call_count == 1
+        assert get_earth_engine_health()['status'] == "failed"
+
+        # After the retry interval the next call tries again
+        initialize.side_effect = None
+        with patch.object(earth_engine_tool, 'INIT_RETRY_SECONDS', 0):
+            initialize_earth_engine()
+        assert initialize.call_count == 2
+        assert get_earth_engine_health()['status'] == "ready"
+
+    def test_tool_returns_error_json_when_unavailable(self, ee_mock):
+        _, initialize = ee_mock
+        initialize.side_effect = Exception("no credentials")
+        result = json.loads(get_soil_analysis([[36.8, -1.29]]))
+        assert "no credentials" in result['error']
+
+
+def _summary(ndvi_mean=0.62):
+    return {
+        'image': {
+            'time_start': 1760000000000,
+            'cloud_cover': 4.2,
+            'ndvi': {'NDVI_mean': ndvi_mean, 'NDVI_min': 0.2, 'NDVI_max': 0.8, 'NDVI_stdDev': 0.1}
+        },
+        'area_m2': 25000.0,
+        'soil': {'b0': 64, 'b0_1': 7}
+    }
+
+
+@pytest.fixture
+def ee_module(tmp_path):
+    with patch.object(earth_engine_tool, 'ee') as ee, \
+         patch.object(earth_engine_tool, 'initialize_earth_engine'), \
+         patch.object(imagery_cache, 'CACHE_PATH', str(tmp_path / "imagery_cache.sqlite")), \
+         patch.object(soil_cache, 'CACHE_PATH', str(tmp_path / "soil_cache.sqlite")):
+        yield ee
+
+
+class TestSingleRoundTrip:
+    def test_crop_health_evaluates_one_dictionary(self, ee_module):
+        ee_module.Dictionary.return_value.getInfo.return_value = _summary()
+        image = ee_module.Image.return_value
+        image.visualize.return_value.getThumbURL.return_value = "https://thumb/rgb"
+        ndvi = image.normalizedDifference.return_value.rename.return_value
+        ndvi.visualize.return_value.getThumbURL.return_value = "https://thumb/ndvi"
+        result = json.loads(earth_engine_tool.get_satellite_crop_health([[36.8, -1.29]]))
+
+        assert ee_module.Dictionary.return_value.getInfo.call_count == 1
+        assert result['ndvi_analysis']['mean_ndvi'] == 0.62
+        assert result['image_info']['cloud_cover_percent'] == 4.2
+        assert result['crop_health']['health_status'] == "Good"
+        assert result['imagery'] == {"rgb_image_url": "https://thumb/rgb", "ndvi_image_url": "https://thumb/ndvi"}
+
+    def test_crop_health_without_images(self, ee_module):
+        ee_module.Dictionary.return_value.getInfo.return_value = {'image': None}
+        result = json.loads(earth_engine_tool.get_satellite_crop_health([[36.8, -1.29]]))
+        assert "No suitable satellite images" in result['error']
+
+    def test_thumbnails_requested_concurrently(self):
+        tool = earth_engine_tool.EarthEngineTool.__new__(earth_engine_tool.EarthEngineTool)
+        barrier = threading.Barrier(2, timeout=5)
+
+        def thumbnail(params):
+            # Both requests must be in flight at once to pass the barrier
+            barrier.wait()
+            return "url"
+
+        images = {}
+        for name in ("rgb", "ndvi"):
+            image = MagicMock()
+            image.visualize.return_value.getThumbURL.side_effect = thumbnail
+            images[name] = (image, {})
+        assert tool._thumbnail_urls(images, MagicMock()) == {"rgb": "url", "ndvi": "url"}
+
+    def test_soil_moisture_map_one_round_trip(self, ee_module):
+        ee_module.Dictionary.return_value.getInfo.return_value = _summary(ndvi_mean=0.3)
+        result = json.loads(earth_engine_tool.get_soil_moisture_map([[36.8, -1.29]]))
+
+        assert ee_module.Dictionary.return_value.getInfo.call_count == 1
+        assert result['area_hectares'] == 2.5
+        assert result['moisture_analysis']['status'] == "Low"
+        assert result['soil_properties']['texture_name'] == "Loam"
+
+
+class TestFarmCropHealth:
+    def _summary(self, plots):
+        return {'image': {'image_id': "S2/farm", 'time_start': 1760000000000, 'latest_time': 1760000000000,
+                          'cloud_cover': 2.0, 'plots': plots}}
+
+    def test_every_plot_from_one_evaluation(self, ee_module):
+        ee_module.Dictionary.return_value.getInfo.return_value = self._summary([
+            ["plot_A", 0.7, 0.3, 0.9, 0.1],
+            ["plot_B", 0.5, 0.2, 0.8, 0.1],
+            ["plot_C", 0.25, 0.1, 0.4, 0.05],
+            ["plot_D", None, None, None, None]
+        ])
+        result = json.loads(earth_engine_tool.get_farm_crop_health())
+
+        assert ee_module.Dictionary.return_value.getInfo.call_count == 1
+        ee_module.FeatureCollection.return_value.geometry.assert_called_once()
+        assert ee_module.Feature.call_count == 4
+        plots = {plot['plot_id']: plot for plot in result['plots']}
+        assert plots['plot_A']['plot_name'] == "North Field"
+        assert plots['plot_A']['ndvi_analysis']['mean_ndvi'] == 0.7
+        assert plots['plot_A']['crop_health']['health_status'] == "Good"
+        assert plots['plot_D']['ndvi_analysis'] is None
+
+        summary = result['farm_summary']
+        assert summary['plots_analyzed'] == 3
+        assert summary['plots_without_data'] == ["plot_D"]
+        # Weighted by area: (0.7 * 2.5 + 0.5 * 2.0 + 0.25 * 1.5) / 6.0
+        assert summary['farm_mean_ndvi'] == 0.521
+        assert summary['plots_needing_attention'] == ["West Valley"]
+
+    def test_repeat_served_from_cache(self, ee_module):
+        evaluate = ee_module.Dictionary.return_value.getInfo
+        evaluate.return_value = {'image': None}
+        first = json.loads(earth_engine_tool.get_farm_crop_health())
+        second = json.loads(earth_engine_tool.get_farm_crop_health())
+        assert "No suitable satellite images" in first['error']
+        assert second['cache']['status'] == "hit"
+        assert evaluate.call_count == 1
@@ -0,0 +1,58 @@
+"""
+Tests for configurable embedding dimensionality
+"""
+
+import os
+import sys
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.embeddings import (
+    FULL_EMBEDDING_DIMENSION,
+    get_embedding_dimension,
+    normalize_embedding,
+    truncate_embeddings,
+    write_index_metadata,
+    read_latest_index_metadata
+)
+
+
+class TestEmbeddingDimension:
+    def test_defaults_to_full_dimension(self):
+        with patch.dict(os.environ, {}, clear=True):
+            assert get_embedding_dimension() == FULL_EMBEDDING_DIMENSION
+
+    def test_configured_dimension(self):
+        with patch.dict(os.environ, {"EMBEDDING_DIMENSION": "768"}):
+            assert get_embedding_dimension() == 768
+
+    def test_rejects_out_of_range(self):
+        with patch.dict(os.environ, {"EMBEDDING_DIMENSION": "8192"}):
+            with pytest.raises(ValueError):
+                get_embedding_dimension()
+
+
+def test_normalize_embedding():
+    assert normalize_embedding([3.0, 4.0]) == pytest.approx([0.6, 0.8])
+    assert normalize_embedding([0.0, 0.0]) == [0.0, 0.0]
+
+
+def test_truncate_embeddings_renormalises():
+    matrix = np.array([[3.0, 4.0, 12.0], [1.0, 0.0, 0.0]])
+    truncated = truncate_embeddings(matrix, 2)
+    assert truncated.shape == (2, 2)
+    assert np.allclose(np.linalg.norm(truncated, axis=1), 1.0)
+
+
+def test_index_metadata_records_dimension(tmp_path):
+    embeddings_file = str(tmp_path / "farm_embeddings_v20250101_000000.json")
+    write_index_metadata(embeddings_file, 256, 30)
+
+    metadata = read_latest_index_metadata(str(tmp_path))
+    assert metadata['dimension'] == 256
+    assert metadata['record_count'] == 30
+    assert metadata['embeddings_file'] == "farm_embeddings_v20250101_000000.json"
@@ -0,0 +1,99 @@
+"""
+Tests for the chunked expense ledger: streamed rollups and date-range queries
+must match a full pandas pass over financial_history.csv
+"""
+
+import os
+import sys
+import json
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.expense_ledger import ExpenseLedger, get_expense_ledger, ledger_path
+
+from tools.market_tool import get_expense_tracker
+
+LEDGER = ledger_path()
+
+
+@pytest.fixture(scope="module")
+def frame():
+    df = pd.read_csv(LEDGER)
+    df['date'] = pd.to_datetime(df['date'])
+    return df
+
+
+def _expected_range(frame, start, end):
+    mask = (frame['date'] >= start) & (frame['date'] <= end)
+    return frame[mask]
+
+
+class TestExpenseLedger:
+    def test_chunked_matches_single_pass(self):
+        single = ExpenseLedger.from_csv(LEDGER)
+        chunked = ExpenseLedger.from_csv(LEDGER, chunk_size=7)
+        assert chunked.summary() == single.summary()
+        assert chunked.summary("2023-02-10", "2024-05-20") == single.summary("2023-02-10", "2024-05-20")
+
+    def test_totals_match_pandas(self, frame):
+        result = get_expense_ledger().summary()
+        assert result['total_expenses'] == round(float(frame['cost_kes'].sum()), 2)
+        assert result['transaction_count'] == len(frame)
+        expected = frame.groupby('category')['cost_kes'].sum()
+        assert {e['category']: e['amount'] for e in result['expense_breakdown']} == \
+            {category: round(float(amount), 2) for category, amount in expected.items() if amount > 0}
+        assert result['plot_expenses'] == {
+            plot: round(float(amount), 2) for plot, amount in frame.groupby('related_plot_id')['cost_kes'].sum().items()
+        }
+
+    def test_range_totals_match_pandas(self, frame):
+        ledger = get_expense_ledger()
+        for start, end in [("2022-01-01", "2022-12-31"), ("2023-03-17", "2023-08-02"),
+                           ("2024-06-01", "2024-06-01"), ("2030-01-01", "2030-12-31")]:
+            expected = _expected_range(frame, start, end)
+            ranged = ledger.range_summary(start, end)
+            assert ranged['total'] == round(float(expected['cost_kes'].sum()), 2)
+            assert ranged['count'] == len(expected)
+            assert {c: v['amount'] for c, v in ranged['by_category'].items()} == \
+                {c: round(float(a), 2) for c, a in expected.groupby('category')['cost_kes'].sum().items()}
+
+    def test_transactions_sorted_and_limited(self, frame):
+        rows = get_expense_ledger().transactions("2023-01-01", "2023-12-31", limit=None)
+        expected = _expected_range(frame, "2023-01-01", "2023-12-31")
+        assert len(rows) == len(expected)
+        assert [r['date'] for r in rows] == sorted(r['date'] for r in rows)
+        assert get_expense_ledger().transactions("2023-01-01", "2023-12-31", limit=3) == rows[:3]
+
+    def test_monthly_edges_use_partial_months(self, frame):
+        start, end = "2023-03-17", "2023-08-02"
+        months = get_expense_ledger().monthly_totals(start, end)
+        expected = _expected_range(frame, start, end)
+        expected = expected.groupby([expected['date'].dt.strftime('%Y-%m'), 'category'])['cost_kes'].sum()
+        flattened = {(month, category): amount for month, values in months.items() for category, amount in values.items()}
+        assert flattened == {(m, c.lower()): round(float(a), 2) for (m, c), a in expected.items()}
+
+    def test_missing_ledger_is_empty(self, tmp_path):
+        ledger = get_expense_ledger(str(tmp_path / "financial_history.csv"))
+        assert len(ledger) == 0
+        assert ledger.summary()['total_expenses'] == 0
+
+
+class TestExpenseTrackerTool:
+    def test_full_history(self):
+        result = json.loads(get_expense_tracker())
+        assert result['analysis_type'] == "expense_tracker"
+        assert result['total_expenses'] == get_expense_ledger().summary()['total_expenses']
+        assert result['top_expense'] == result['expense_breakdown'][0]['category']
+        assert round(sum(e['percentage'] for e in result['expense_breakdown'])) == 100
+
+    def test_date_range(self, frame):
+        result = json.loads(get_expense_tracker("2023-01-01", "2023-06-30"))
+        assert result['date_range'] == {"start": "2023-01-01", "end": "2023-06-30"}
+        assert result['total_expenses'] == round(float(_expected_range(frame, "2023-01-01", "2023-06-30")['cost_kes'].sum()), 2)
+        assert result['period_expenses'] is None
+
+    def test_invalid_date(self):
+        assert "error" in json.loads(get_expense_tracker("last spring"))
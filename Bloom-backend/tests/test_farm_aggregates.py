@@ -0,0 +1,118 @@
+"""
+Consistency tests: materialised aggregates must match live computation
+"""
+
+import os
+import sys
+import json
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from sklearn.linear_model import Ridge
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import yield_model
+from utils.farm_aggregates import (
+    FarmAggregates,
+    compute_price_chart,
+    compute_crop_recommendations,
+    compute_growth_summaries,
+    get_farm_aggregates
+)
+from utils.farm_data_store import FarmDataStore, get_farm_data_store
+from utils.yield_model import YieldModel, reset_yield_model, training_frame
+
+from tools.market_tool import get_price_chart
+from tools.planner_tool import get_crop_recommendation
+from tools.vector_search_tool import get_growth_tracker_data
+
+
+def _live_records(**filters):
+    return get_farm_data_store().find_records(**filters)
+
+
+def _small_yield_model(records, data_version):
+    """Ridge on the crop alone: enough for the planner tools to report predictions"""
+    frame = training_frame(records)
+    frame = frame[frame['yield_tons_per_ha'].fillna(0) > 0]
+    pipeline = Pipeline([('encode', OneHotEncoder(handle_unknown='ignore')), ('model', Ridge(alpha=1.0))])
+    pipeline.fit(frame[['crop']], np.log(frame['yield_tons_per_ha'].astype(float)))
+    return YieldModel(pipeline, {
+        'version': "test-small", 'model': "ridge", 'data_version': data_version,
+        'categorical_features': ['crop'], 'numeric_features': [],
+        'cv_mae_tons_per_ha': None, 'baseline_mae_tons_per_ha': None
+    })
+
+
+@pytest.fixture
+def injected_yield_model(tmp_path):
+    """Planner calls load this model from tmp_path, never from generated_data/models"""
+    with patch.object(yield_model, 'MODELS_DIR', str(tmp_path)):
+        reset_yield_model()
+        store = get_farm_data_store()
+        _small_yield_model(store.records, store.version).save(str(tmp_path))
+        yield
+    reset_yield_model()
+
+
+class TestAggregatesMatchLiveComputation:
+    def test_price_chart(self):
+        for crop in [None, "Maize", "beans", "Potatoes", "Sorghum"]:
+            result = json.loads(get_price_chart(crop))
+            price_data, trends = compute_price_chart(_live_records(crop=crop))
+            assert result['price_data'] == price_data
+            assert result['trends'] == trends
+
+    def test_crop_recommendation(self, injected_yield_model):
+        result = json.loads(get_crop_recommendation())
+        assert result['yield_model']['version'] == "test-small"
+        # Aggregated fields plus the model's predicted yield
+        for recommendation in result['recommendations']:
+            assert recommendation.pop('predicted_yield_tons_per_ha') > 0
+        assert result['recommendations'] == compute_crop_recommendations(_live_records())
+
+    def test_growth_tracker_every_filter_combination(self):
+        store = get_farm_data_store()
+        plots = [None] + [r.plot_name for r in store.farm_records if r.plot_name]
+        crops = [None] + [r.crop for r in store.farm_records if r.crop]
+        for plot_name in set(plots):
+            for crop in set(crops):
+                result = json.loads(get_growth_tracker_data(plot_name=plot_name, crop_type=crop))
+                expected = json.loads(json.dumps(
+                    compute_growth_summaries(_live_records(plot_name=plot_name, crop=crop))))
+                assert result['plot_data'] == expected, (plot_name, crop)
+
+
+def test_aggregates_rebuilt_on_data_change(tmp_path):
+    path = str(tmp_path / "merged.json")
+    records = [
+        {"plot_id": "plot_A_2023_S1", "plot_name": "North Field", "current_crop": "Maize",
+         "selling_price_kes_per_kg": 40.0},
+        {"plot_id": "plot_A_2024_S1", "plot_name": "North Field", "current_crop": "Maize",
+         "selling_price_kes_per_kg": 50.0},
+    ]
+    with open(path, 'w') as f:
+        json.dump(records[:1], f)
+
+    store = FarmDataStore(path, check_interval=0)
+    first = store.derived('aggregates', lambda s: FarmAggregates.build(s.farm_records, s.version), eager=True)
+    assert first.price_trends['Maize']['trend'] == 'Insufficient data'
+
+    with open(path, 'w') as f:
+        json.dump(records, f)
+    os.utime(path, (1, 1))
+    store.refresh()
+
+    # Eager aggregates are materialised during the reload, before first use
+    assert 'aggregates' in store._snapshot._derived
+    second = store.derived('aggregates', lambda s: None)
+    assert second.version != first.version
+    assert second.price_trends['Maize']['trend'] == 'Increasing'
+
+
+def test_shared_aggregates_follow_store_version():
+    assert get_farm_aggregates().version == get_farm_data_store().version
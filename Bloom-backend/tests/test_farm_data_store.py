@@ -0,0 +1,94 @@
+"""
+Tests for the shared, hot-reloading farm data store
+"""
+
+import os
+import sys
+import json
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.farm_data_store import FarmDataStore, get_farm_data_store, JSON_DATA_PATH
+
+
+RECORDS = [
+    {"plot_id": "plot_A_2023_S1", "plot_name": "North Field", "current_crop": "Maize"},
+    {"plot_id": "plot_A_2024_S2", "plot_name": "North Field", "crop": "Beans"},
+    {"plot_id": "plot_C_2024_S2", "plot_name": "West Valley", "current_crop": "Potatoes"},
+]
+
+
+def _write(path, records):
+    with open(path, 'w') as f:
+        json.dump(records, f)
+
+
+class TestFarmDataStore:
+    def test_indexes(self, tmp_path):
+        path = str(tmp_path / "merged.json")
+        _write(path, RECORDS)
+        store = FarmDataStore(path)
+
+        assert len(store.records) == 3
+        assert [r['plot_id'] for r in store.find(crop="beans")] == ["plot_A_2024_S2"]
+        assert len(store.find(base_plot="plot_A")) == 2
+        assert [r['plot_id'] for r in store.find(plot_name="north field", year=2023)] == ["plot_A_2023_S1"]
+        assert len(store.find(season="S2")) == 2
+        assert store.get("plot_C_2024_S2")['plot_name'] == "West Valley"
+        assert store.find(crop="Sorghum") == []
+
+    def test_reloads_only_when_file_changes(self, tmp_path):
+        path = str(tmp_path / "merged.json")
+        _write(path, RECORDS[:1])
+        store = FarmDataStore(path, check_interval=0)
+        first = store.snapshot
+
+        # Same content: the snapshot is reused
+        assert store.refresh() is False
+        assert store.snapshot is first
+
+        _write(path, RECORDS)
+        os.utime(path, (1, 1))
+        assert len(store.records) == 3
+        assert store.snapshot is not first
+
+    def test_no_file_reads_between_changes(self, tmp_path):
+        path = str(tmp_path / "merged.json")
+        _write(path, RECORDS)
+        store = FarmDataStore(path, check_interval=0)
+
+        with patch('builtins.open', side_effect=AssertionError("unexpected read")):
+            for _ in range(5):
+                assert len(store.records) == 3
+
+    def test_bad_file_keeps_previous_snapshot(self, tmp_path):
+        path = str(tmp_path / "merged.json")
+        _write(path, RECORDS)
+        store = FarmDataStore(path, check_interval=0)
+
+        with open(path, 'w') as f:
+            f.write("{not json")
+        os.utime(path, (2, 2))
+        assert len(store.records) == 3
+
+    def test_derived_cache_follows_version(self, tmp_path):
+        path = str(tmp_path / "merged.json")
+        _write(path, RECORDS[:2])
+        store = FarmDataStore(path, check_interval=0)
+        builds = []
+
+        def build(snapshot):
+            builds.append(len(snapshot.records))
+            return len(snapshot.records)
+
+        assert store.derived('count', build) == 2
+        assert store.derived('count', build) == 2
+        _write(path, RECORDS)
+        os.utime(path, (3, 3))
+        assert store.derived('count', build) == 3
+        assert builds == [2, 3]
+
+
+def test_store_is_shared_per_path():
+    assert get_farm_data_store() is get_farm_data_store(JSON_DATA_PATH)
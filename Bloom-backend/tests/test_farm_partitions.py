@@ -0,0 +1,131 @@
+"""
+Tests for the farmer_id-partitioned data layer
+"""
+
+import os
+import sys
+import json
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import farm_data_store
+from utils.farm_data_store import (
+    FarmPartitionRegistry,
+    JSON_DATA_PATH,
+    farm_partition,
+    get_current_farmer,
+    get_farm_data_store,
+    partition_path
+)
+from utils.farm_aggregates import get_farm_aggregates
+from utils.farm_merge import split_by_farmer, write_farm_partitions
+from utils.lexical_index import get_lexical_index
+
+from tools.vector_search_tool import get_farm_coordinates
+
+
+def _farm_records(farmer_id, crop, price):
+    return [
+        {"plot_id": f"plot_A_{year}_S1", "base_plot_id": "plot_A", "plot_name": "North Field",
+         "current_crop": crop, "selling_price_kes_per_kg": price + year - 2023, "area_hectares": 2.5,
+         "coordinates_geojson": "[[35.93, -0.37], [35.94, -0.37], [35.93, -0.37]]",
+         "farm_farmer_id": farmer_id, "farm_farm_name": f"{farmer_id} farm"}
+        for year in (2023, 2024)
+    ]
+
+
+@pytest.fixture
+def fleet(tmp_path):
+    farms_dir = str(tmp_path / "farms")
+    for farmer_id, crop, price in [("farm-a", "Maize", 40), ("farm-b", "Beans", 90), ("farm-c", "Sorghum", 30)]:
+        path = partition_path(farmer_id, farms_dir)
+        os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            json.dump(_farm_records(farmer_id, crop, price), f)
+
+    registry = FarmPartitionRegistry(farms_dir, max_partitions=2)
+    with patch.object(farm_data_store, '_partitions', registry):
+        yield registry
+
+
+class TestPartitionRegistry:
+    def test_current_farm_selects_partition(self, fleet):
+        with farm_partition("farm-b"):
+            assert get_current_farmer() == "farm-b"
+            assert {r['current_crop'] for r in get_farm_data_store().records} == {"Beans"}
+            assert list(get_farm_aggregates().price_data) == ["Beans"]
+        assert get_current_farmer() is None
+        assert os.path.samefile(get_farm_data_store().path, JSON_DATA_PATH)
+
+    def test_lru_bounds_loaded_partitions(self, fleet):
+        for farmer_id in ["farm-a", "farm-b", "farm-a", "farm-c"]:
+            get_farm_data_store(farmer_id=farmer_id)
+
+        # farm-b was least recently used when farm-c was loaded
+        assert fleet.loaded() == ["farm-a", "farm-c"]
+        assert fleet.loads == 3 and fleet.evictions == 1
+        assert fleet.farmer_ids() == ["farm-a", "farm-b", "farm-c"]
+
+    def test_unknown_farm_is_empty_not_another_farm(self, fleet):
+        with farm_partition("farm-z"):
+            assert get_farm_data_store().records == []
+
+    def test_invalid_farmer_id_rejected(self):
+        for farmer_id in ["../etc", "", "a/b"]:
+            with pytest.raises(ValueError):
+                with farm_partition(farmer_id):
+                    pass
+
+    def test_lexical_index_per_partition(self, fleet):
+        with farm_partition("farm-a"):
+            hits = get_lexical_index().search("maize")
+        assert hits and all(hit['metadata']['farmer_id'] == "farm-a" for hit in hits)
+        with farm_partition("farm-b"):
+            assert get_lexical_index().search("maize") == []
+
+    def test_coordinates_come_from_farm_data(self, fleet):
+        with farm_partition("farm-c"):
+            result = json.loads(get_farm_coordinates())
+        assert result['farm_name'] == "farm-c farm"
+        assert result['plots']['plot_A']['coordinates'][0] == [35.93, -0.37]
+
+
+def test_sources_split_into_partitions(tmp_path):
+    dataframes = {
+        'farm_identity': pd.DataFrame([
+            {"farmer_id": "farm-a", "farm_name": "A"},
+            {"farmer_id": "farm-b", "farm_name": "B"},
+        ]),
+        'plot_details': pd.DataFrame([
+            {"farmer_id": "farm-a", "plot_id": "plot_A_2023_S1", "current_crop": "Maize"},
+            {"farmer_id": "farm-b", "plot_id": "plot_A_2023_S1", "current_crop": "Beans"},
+            {"farmer_id": "farm-b", "plot_id": "plot_B_2023_S1", "current_crop": "Beans"},
+        ]),
+        # Shared by every farm
+        'crop_performance': pd.DataFrame([{"crop_type": "Beans", "avg_yield_per_ha": 1.1}]),
+    }
+
+    assert set(split_by_farmer(dataframes)) == {"farm-a", "farm-b"}
+
+    farms_dir = str(tmp_path / "farms")
+    summaries = write_farm_partitions(dataframes, farms_dir)
+    assert {s['farmer_id']: s['record_count'] for s in summaries} == {"farm-a": 1, "farm-b": 2}
+
+    with open(partition_path("farm-b", farms_dir)) as f:
+        records = json.load(f)
+    assert {r['farm_farm_name'] for r in records} == {"B"}
+    assert {r['avg_yield_per_ha'] for r in records} == {1.1}
+    assert os.path.exists(os.path.join(farms_dir, "farm-b", "snapshot", "manifest.json"))
+
+
+def test_several_farms_need_farmer_id_on_plots():
+    dataframes = {
+        'farm_identity': pd.DataFrame([{"farmer_id": "farm-a"}, {"farmer_id": "farm-b"}]),
+        'plot_details': pd.DataFrame([{"plot_id": "plot_A_2023_S1", "current_crop": "Maize"}]),
+    }
+    with pytest.raises(ValueError):
+        split_by_farmer(dataframes)
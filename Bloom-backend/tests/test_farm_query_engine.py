@@ -0,0 +1,152 @@
+"""
+Tests for the columnar farm query engine and the analytics tools built on it
+"""
+
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.farm_query_engine import FarmQueryEngine, JSON_DATA_PATH
+
+from tools.vector_search_tool import (
+    get_historical_yields,
+    get_crop_performance_comparison,
+    get_plot_analysis
+)
+from tools.farm_query_tool import query_farm_data
+
+
+RECORDS = [
+    {"plot_id": "plot_A_2022_S1", "plot_name": "North Field", "current_crop": "Maize",
+     "crop_stage": "Harvested", "yield_tonnes_per_ha": 1.9, "revenue_kes": 247000.0, "area_hectares": 2.5},
+    {"plot_id": "plot_A_2022_S2", "plot_name": "North Field", "current_crop": None, "crop": "Beans",
+     "crop_stage": "Harvested", "yield_tonnes_per_ha": None, "yield_tonnes_per_ha_profit": 0.72,
+     "revenue_kes_profit": 171000.0, "area_hectares": 2.5},
+    {"plot_id": "plot_B_2023_S1", "plot_name": "East Ridge", "current_crop": "Maize",
+     "crop_stage": "Harvested", "yield_tonnes_per_ha": 1.5, "revenue_kes": 195000.0, "area_hectares": 2.0},
+    {"plot_id": "plot_B_2025_S1", "plot_name": "East Ridge", "current_crop": "Maize",
+     "crop_stage": "Planted", "yield_tonnes_per_ha": float('nan'), "area_hectares": 2.0},
+]
+
+
+@pytest.fixture
+def engine():
+    return FarmQueryEngine(RECORDS)
+
+
+class TestFarmQueryEngine:
+    def test_normalised_columns(self, engine):
+        """Fallback fields and plot_id parts are resolved once"""
+        beans = engine.frame.iloc[1]
+        assert beans['crop'] == "Beans"
+        assert beans['yield_tons_per_ha'] == 0.72
+        assert beans['revenue_kes'] == 171000.0
+        assert beans['year'] == 2022
+        assert beans['season'] == "S2"
+        assert beans['base_plot_id'] == "plot_A"
+
+    def test_filters(self, engine):
+        """Filters are exact and case-insensitive; plot names match as substrings"""
+        assert len(engine.select(crop="maize")) == 3
+        assert len(engine.select(plot_name="north")) == 2
+        assert len(engine.select(crop="Maize", min_yield=1.6)) == 1
+        assert len(engine.select(year=2023, season="s1")) == 1
+        assert len(engine.select(stage="planted")) == 1
+
+    def test_summarize_ignores_missing_values(self, engine):
+        """Statistics cover every matching row with a value"""
+        stats = engine.summarize(engine.select(crop="Maize")['yield_tons_per_ha'])
+        assert stats['count'] == 2
+        assert stats['mean'] == pytest.approx(1.7)
+        assert stats['min'] == 1.5
+        assert stats['max'] == 1.9
+
+    def test_group_stats(self, engine):
+        """Group-by produces one row per group with named aggregates"""
+        grouped = engine.group_stats(engine.frame, ['crop'], {'yield_tons_per_ha': ['mean', 'count']})
+        by_crop = grouped.set_index('crop')
+        assert by_crop.loc['Maize', 'yield_tons_per_ha_count'] == 2
+        assert by_crop.loc['Beans', 'yield_tons_per_ha_mean'] == pytest.approx(0.72)
+
+    def test_to_records_is_json_safe(self, engine):
+        """NaN values are converted to None"""
+        records = engine.to_records(engine.select(stage="Planted"))
+        assert records[0]['yield_tons_per_ha'] is None
+        json.dumps(records)
+
+
+class TestQuerySpecs:
+    """Declarative specs run filter, group, aggregate, sort and limit in one pass"""
+
+    def test_group_and_aggregate(self, engine):
+        result = engine.query({"group_by": ["crop"], "metrics": ["count", "yield_tons_per_ha:mean"],
+                               "sort": ["-count"]})
+        assert result['columns'] == ["crop", "count", "yield_tons_per_ha_mean"]
+        assert result['rows'] == [["Maize", 3, 1.7], ["Beans", 1, 0.72]]
+
+    def test_filter_operators(self, engine):
+        spec = {"filters": {"crop": ["maize", "BEANS"], "year": {"gte": 2023}, "plot_name": {"contains": "ridge"}},
+                "columns": ["plot_id", "year"], "sort": ["-year"]}
+        result = engine.query(spec)
+        assert result['rows'] == [["plot_B_2025_S1", 2025], ["plot_B_2023_S1", 2023]]
+        assert result['matched_records'] == 2
+
+    def test_aggregate_without_groups(self, engine):
+        result = engine.query({"filters": {"crop": "Maize"}, "metrics": ["revenue_kes:sum", "count"]})
+        assert result['rows'] == [[442000.0, 3]]
+
+    def test_limit_marks_truncation(self, engine):
+        result = engine.query({"columns": ["plot_id"], "limit": 1})
+        assert result['row_count'] == 1 and result['total_rows'] == 4 and result['truncated']
+
+    def test_invalid_spec_lists_every_problem(self, engine):
+        with pytest.raises(ValueError) as error:
+            engine.query({"filters": {"crop": {"gt": 1}, "soil": "clay"}, "metrics": ["yield:median"],
+                          "sort": ["profit"], "limit": 0})
+        message = str(error.value)
+        for fragment in ["'gt'", "'soil'", "'yield:median'", "'profit'", "limit"]:
+            assert fragment in message
+
+    def test_tool_returns_error_with_schema(self):
+        result = json.loads(query_farm_data('{"group_by": ["farm"]}'))
+        assert "error" in result and "schema" in result
+        assert "error" in json.loads(query_farm_data("not json"))
+
+
+class TestAnalyticsTools:
+    """The structured tools return exact statistics over the merged data"""
+
+    @pytest.fixture(autouse=True)
+    def merged(self):
+        with open(JSON_DATA_PATH, 'r') as f:
+            self.engine = FarmQueryEngine(json.load(f))
+
+    def test_historical_yields_are_exact(self):
+        result = json.loads(get_historical_yields(crop_type="Maize", plot_name="North Field"))
+        rows = self.engine.select(crop="Maize", plot_name="North Field")
+
+        assert result['total_matching_records'] == len(rows)
+        assert result['statistics']['avg_yield'] == round(rows['yield_tons_per_ha'].mean(), 2)
+        assert all(r['crop'] == "Maize" for r in result['results'])
+
+    def test_crop_comparison_covers_all_records(self):
+        result = json.loads(get_crop_performance_comparison(["Maize", "Beans"]))
+        assert result['performance_data']['Maize']['records_count'] == len(self.engine.select(crop="Maize"))
+        assert result['best_performing_crop'] in ("Maize", "Beans")
+
+    def test_plot_analysis(self):
+        result = json.loads(get_plot_analysis("North Field"))
+        north = result['plots_data']['North Field']
+        assert north['seasons_count'] == len(self.engine.select(plot_name="North Field"))
+        assert result['plots_analyzed'] == 1
+
+    def test_query_tool_matches_engine(self):
+        spec = {"filters": {"crop": "Maize"}, "group_by": ["plot_name"], "metrics": ["yield_tons_per_ha:mean"]}
+        result = json.loads(query_farm_data(json.dumps(spec)))
+        rows = self.engine.select(crop="Maize")
+        expected = rows.groupby('plot_name')['yield_tons_per_ha'].mean().round(4).to_dict()
+        assert dict(result['rows']) == expected
@@ -0,0 +1,53 @@
+"""
+Tests for the typed farm record representation
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.farm_records import FarmRecord, COST_CATEGORIES, parse_plot_id
+
+
+RAW = {
+    "plot_id": "plot_B_2024_S2", "plot_name_fin": "East Ridge", "crop": "Beans",
+    "crop_stage": "Harvested", "yield_tonnes_per_ha_profit": 0.9, "revenue_kes_profit": 180000.0,
+    "total_cost_kes": 90000, "profit_kes": 90000.0, "selling_price_kes_per_kg": float('nan'),
+    "selling_price_kes_per_kg_profit": 100.0, "area_hectares": 2.0,
+    "fertilizer_cost_kes": 1000, "labor_cost_kes": 2500,
+    "crop_type_inv": "Beans", "current_stock_kg_inv": "300", "estimated_value_kes": 30000,
+}
+
+
+class TestFarmRecord:
+    def test_fallbacks_and_types(self):
+        record = FarmRecord.from_dict(RAW)
+
+        assert record.plot_name == "East Ridge"
+        assert record.crop == "Beans"
+        assert record.year == 2024
+        assert record.season == "S2"
+        assert record.base_plot_id == "plot_B"
+        assert record.period == "2024 S2"
+        assert record.yield_tons_per_ha == 0.9
+        assert record.cost_kes == 90000
+        # NaN primary columns fall through to the duplicate column
+        assert record.price_per_kg == 100.0
+        assert record.stock_kg == 300.0
+
+    def test_costs_aligned_with_categories(self):
+        record = FarmRecord.from_dict(RAW)
+        assert len(record.costs) == len(COST_CATEGORIES)
+        assert record.cost('fertilizer') == 1000
+        assert record.cost('labor') == 2500
+        assert record.cost('transport') == 0
+
+    def test_slots_only(self):
+        record = FarmRecord.from_dict(RAW)
+        assert not hasattr(record, '__dict__')
+
+
+def test_parse_plot_id():
+    assert parse_plot_id("plot_A_2023_S1") == {'base_plot_id': "plot_A", 'year': 2023, 'season': "S1"}
+    assert parse_plot_id("plot_A")['year'] is None
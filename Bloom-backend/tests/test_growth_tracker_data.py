@@ -6,10 +6,13 @@ using vector search tool's historical yields and crop performance data.
 import sys
 import os
 import json
+from unittest.mock import patch
 
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from tools import vector_search_tool
+from utils.lexical_index import get_lexical_index
 from tools.vector_search_tool import (
     get_historical_yields,
     get_crop_performance_comparison,
@@ -17,7 +20,7 @@ from tools.vector_search_tool import (
     search_farm_data
 )
 
-def test_growth_tracker_data_availability():
+def test_growth_tracker_data_availability(tmp_path):
     """Test if we can get data needed for growth tracker widget"""
     print("\n" + "="*80)
     print("TESTING GROWTH TRACKER DATA AVAILABILITY")
@@ -76,7 +79,11 @@ def test_growth_tracker_data_availability():
     
     # Test 4: Search for growth stage information
     print("\n4. Testing search for crop stage/growth data...")
-    growth_search = search_farm_data("crop growth stages and planting dates", max_results=5)
+    # The lexical half of the search builds its index under tmp_path, not generated_data
+    index_path = str(tmp_path / "lexical_index.json")
+    with patch.object(vector_search_tool, 'get_lexical_index',
+                      side_effect=lambda: get_lexical_index(index_path=index_path)):
+        growth_search = search_farm_data("crop growth stages and planting dates", max_results=5)
     growth_json = json.loads(growth_search)
     
     print(f"   ✓ Results found: {growth_json.get('results_count', 0)}")
@@ -0,0 +1,167 @@
+"""
+Tests for the Earth Engine analysis cache: entries are served until a newer
+qualifying Sentinel-2 image can exist, revalidated by a metadata-only probe,
+and recomputed only when the best image changed
+"""
+
+import os
+import sys
+import json
+import time
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import imagery_cache
+from utils.imagery_cache import ImageryCache, cache_key, geometry_hash
+
+from tools import earth_engine_tool
+from tools.earth_engine_tool import get_satellite_crop_health
+
+COORDINATES = [[36.80, -1.29], [36.81, -1.29], [36.81, -1.28], [36.80, -1.29]]
+
+
+def _now_ms(days_ago=0.0):
+    return int((time.time() - days_ago * 86400) * 1000)
+
+
+def _summary(image_id="S2/img1", days_ago=2.0):
+    return {'image': {
+        'image_id': image_id,
+        'time_start': _now_ms(days_ago),
+        'latest_time': _now_ms(days_ago),
+        'cloud_cover': 3.0,
+        'ndvi': {'NDVI_mean': 0.55, 'NDVI_min': 0.1, 'NDVI_max': 0.8, 'NDVI_stdDev': 0.1}
+    }}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ImageryCache(str(tmp_path / "cache.sqlite"))
+
+
+@pytest.fixture
+def ee_module(tmp_path):
+    with patch.object(earth_engine_tool, 'ee') as ee, \
+         patch.object(earth_engine_tool, 'initialize_earth_engine'), \
+         patch.object(earth_engine_tool, '_crop_health_thumbnails', return_value={}), \
+         patch.object(imagery_cache, 'CACHE_PATH', str(tmp_path / "imagery_cache.sqlite")):
+        yield ee
+
+
+class TestImageryCache:
+    def test_keys_are_stable_and_window_specific(self):
+        assert geometry_hash(COORDINATES) == geometry_hash([[x + 1e-9, y] for x, y in COORDINATES])
+        assert cache_key("ndvi", COORDINATES, days_back=30) != cache_key("ndvi", COORDINATES, days_back=60)
+
+    def test_round_trip(self, cache):
+        cache.put("k", {"mean_ndvi": 0.5}, "S2/img1", 10, 20)
+        entry = cache.get("k")
+        assert entry['result'] == {"mean_ndvi": 0.5}
+        assert (entry['image_id'], entry['image_time'], entry['latest_time']) == ("S2/img1", 10, 20)
+        assert cache.get("missing") is None
+
+    def test_fresh_until_next_revisit(self, cache):
+        now = time.time()
+        window_start = _now_ms(30)
+        entry = cache.put("k", {}, "S2/img1", _now_ms(2), _now_ms(2), now=now - 7 * 3600)
+        # Probed 7 hours ago, but no newer acquisition can exist for another three days
+        assert cache.is_fresh(entry, window_start, now)
+        entry = cache.put("k", {}, "S2/img1", _now_ms(6), _now_ms(6), now=now - 7 * 3600)
+        assert not cache.is_fresh(entry, window_start, now)
+        # Recently probed entries are served even past the revisit
+        entry = cache.put("k", {}, "S2/img1", _now_ms(6), _now_ms(6), now=now - 3600)
+        assert cache.is_fresh(entry, window_start, now)
+
+    def test_image_leaving_the_window_is_stale(self, cache):
+        entry = cache.put("k", {}, "S2/img1", _now_ms(31), _now_ms(1))
+        assert not cache.is_fresh(entry, _now_ms(30))
+
+    def test_negative_results_expire_sooner(self, cache):
+        now = time.time()
+        entry = cache.put("k", {"error": "none"}, now=now - 3600)
+        assert cache.is_fresh(entry, _now_ms(30), now)
+        entry = cache.put("k", {"error": "none"}, now=now - 13 * 3600)
+        assert not cache.is_fresh(entry, _now_ms(30), now)
+
+    def test_prune(self, cache):
+        cache.put("old", {}, now=time.time() - 90 * 86400)
+        cache.put("new", {})
+        assert cache.prune() == 1
+        assert cache.get("old") is None and cache.get("new") is not None
+
+    def test_put_prunes_periodically(self, cache):
+        cache.put("old", {}, now=time.time() - 90 * 86400)
+        cache.put("new", {})
+        # Within the interval the stale entry is left alone
+        assert cache.get("old") is not None
+        later = time.time() + (imagery_cache.PRUNE_INTERVAL_HOURS + 1) * 3600
+        with patch.object(imagery_cache.time, 'time', return_value=later):
+            cache.put("newer", {})
+        assert cache.get("old") is None and cache.get("new") is not None
+
+
+class TestCachedCropHealth:
+    def test_repeat_question_served_from_cache(self, ee_module):
+        evaluate = ee_module.Dictionary.return_value.getInfo
+        evaluate.return_value = _summary()
+        first = json.loads(get_satellite_crop_health(COORDINATES))
+        second = json.loads(get_satellite_crop_health(COORDINATES))
+
+        assert evaluate.call_count == 1
+        assert first['cache'] == {"status": "miss", "image_id": "S2/img1"}
+        assert second['cache'] == {"status": "hit", "image_id": "S2/img1"}
+        assert second['ndvi_analysis'] == first['ndvi_analysis']
+
+    def test_probe_revalidates_unchanged_image(self, ee_module):
+        evaluate = ee_module.Dictionary.return_value.getInfo
+        evaluate.side_effect = [_summary(days_ago=8),
+                                {'probe': {'image_id': "S2/img1", 'latest_time': _now_ms(8)}}]
+        get_satellite_crop_health(COORDINATES)
+        key = cache_key('satellite_crop_health', COORDINATES, days_back=30)
+        imagery_cache.get_imagery_cache().revalidate(key, _now_ms(8), now=time.time() - 7 * 3600)
+
+        result = json.loads(get_satellite_crop_health(COORDINATES))
+        assert result['cache']['status'] == "revalidated"
+        assert evaluate.call_count == 2
+
+    def test_newer_image_triggers_recompute(self, ee_module):
+        evaluate = ee_module.Dictionary.return_value.getInfo
+        evaluate.side_effect = [_summary(days_ago=8),
+                                {'probe': {'image_id': "S2/img2", 'latest_time': _now_ms(1)}},
+                                _summary("S2/img2", days_ago=1)]
+        get_satellite_crop_health(COORDINATES)
+        key = cache_key('satellite_crop_health', COORDINATES, days_back=30)
+        imagery_cache.get_imagery_cache().revalidate(key, _now_ms(8), now=time.time() - 7 * 3600)
+
+        result = json.loads(get_satellite_crop_health(COORDINATES))
+        assert result['cache'] == {"status": "miss", "image_id": "S2/img2"}
+        assert evaluate.call_count == 3
+
+    def test_no_images_result_is_cached(self, ee_module):
+        evaluate = ee_module.Dictionary.return_value.getInfo
+        evaluate.return_value = {'image': None}
+        first = json.loads(get_satellite_crop_health(COORDINATES))
+        second = json.loads(get_satellite_crop_health(COORDINATES))
+        assert "No suitable satellite images" in second['error']
+        assert second['cache']['status'] == "hit"
+        assert first['error'] == second['error']
+        assert evaluate.call_count == 1
+
+    def test_expired_thumbnails_regenerated_for_cached_image(self, ee_module):
+        ee_module.Dictionary.return_value.getInfo.return_value = _summary()
+        earth_engine_tool._crop_health_thumbnails.return_value = {"rgb_image_url": "https://thumb/old"}
+        get_satellite_crop_health(COORDINATES)
+        key = cache_key('satellite_crop_health', COORDINATES, days_back=30)
+        cache = imagery_cache.get_imagery_cache()
+        entry = cache.get(key)
+        cache.put(key, entry['result'], entry['image_id'], entry['image_time'], entry['latest_time'],
+                  now=time.time() - 3 * 3600)
+
+        earth_engine_tool._crop_health_thumbnails.return_value = {"rgb_image_url": "https://thumb/new"}
+        result = json.loads(get_satellite_crop_health(COORDINATES))
+        assert result['imagery'] == {"rgb_image_url": "https://thumb/new"}
+        ee_module.Image.assert_called_with("S2/img1")
+        assert cache.get(key)['result']['imagery'] == {"rgb_image_url": "https://thumb/new"}
@@ -0,0 +1,143 @@
+"""
+Tests for incremental ingestion of the farm CSV exports
+"""
+
+import os
+import sys
+import json
+import shutil
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.columnar_snapshot import ColumnarSnapshot
+from utils.expense_ledger import LEDGER_FILE
+from utils.farm_data_store import FarmDataStore, partition_path
+from utils.farm_merge import DATA_DIR, load_source_frames, merge_farm_data, to_documents, write_farm_partitions
+from utils.incremental_ingest import ingest_sources, fingerprint_rows, diff_rows, IngestWatcher
+
+
+def _normalise(records):
+    # NaN never equals itself; compare it as None
+    return [{k: (None if isinstance(v, float) and v != v else v) for k, v in r.items()} for r in records]
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    data_dir = tmp_path / "data"
+    shutil.copytree(DATA_DIR, data_dir)
+    return {
+        "data_dir": str(data_dir),
+        "json_path": str(tmp_path / "merged_farm_data.json"),
+        "state_path": str(tmp_path / "ingest_state.json"),
+        "snapshot_dir": str(tmp_path / "snapshot"),
+        "farms_dir": str(tmp_path / "farms"),
+    }
+
+
+def _load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+class TestIngest:
+    def test_first_ingest_is_full_then_unchanged(self, workspace):
+        first = ingest_sources(**workspace)
+        assert first["mode"] == "full"
+        assert _normalise(_load(workspace["json_path"])) == _normalise(
+            to_documents(merge_farm_data(load_source_frames(workspace["data_dir"]))))
+
+        assert ingest_sources(**workspace)["mode"] == "unchanged"
+
+    def test_incremental_matches_full_merge(self, workspace):
+        # Edits are made on the CSV text, as an export appending or updating rows would
+        ingest_sources(**workspace)
+        data_dir = workspace["data_dir"]
+
+        history_path = os.path.join(data_dir, "financial_history.csv")
+        history = pd.read_csv(history_path, dtype=str, keep_default_na=False)
+        new_row = history.iloc[0].copy()
+        new_row["transaction_id"] = "TXN_NEW_001"
+        new_row["cost_kes"] = "12345"
+        pd.concat([history, new_row.to_frame().T]).to_csv(history_path, index=False)
+
+        yields_path = os.path.join(data_dir, "yields_and_inventory.csv")
+        yields = pd.read_csv(yields_path, dtype=str, keep_default_na=False)
+        yields.loc[0, "yield_tonnes_per_ha"] = "9.99"
+        yields.loc[0, "current_stock_kg"] = "500"
+        yields.to_csv(yields_path, index=False)
+
+        result = ingest_sources(**workspace)
+        assert result["mode"] == "incremental"
+        assert result["sources_changed"]["financial_history"]["added"] == 1
+        assert result["sources_changed"]["yields_inventory"]["changed"] == 1
+
+        expected_plots = {new_row["related_plot_id"], yields.loc[0, "plot_id"]}
+        assert result["records_remerged"] == len(expected_plots)
+        # Only the stock level appears in the embedded text, so one datapoint needs re-embedding
+        assert result["datapoints_stale"] == 1
+
+        merged = _load(workspace["json_path"])
+        expected = to_documents(merge_farm_data(load_source_frames(data_dir)))
+        assert _normalise(merged) == _normalise(expected)
+
+        # The snapshot follows the JSON so the store can hot-reload it
+        assert ColumnarSnapshot.load(workspace["snapshot_dir"]).record_count == len(merged)
+
+    def test_farm_wide_change_forces_full_merge(self, workspace):
+        ingest_sources(**workspace)
+        costs_path = os.path.join(workspace["data_dir"], "input_costs_breakdown.csv")
+        costs = pd.read_csv(costs_path, dtype=str, keep_default_na=False)
+        costs.loc[0, "total_cost_kes"] = "1"
+        costs.to_csv(costs_path, index=False)
+
+        assert ingest_sources(**workspace)["mode"] == "full"
+
+    def test_partitions_follow_changed_farms(self, workspace):
+        farms_dir = workspace["farms_dir"]
+        write_farm_partitions(load_source_frames(workspace["data_dir"]), farms_dir)
+        farmer_id = "bloom-demo-user-101"
+        store = FarmDataStore(partition_path(farmer_id, farms_dir), check_interval=0)
+
+        assert ingest_sources(**workspace)["partitions"] == {"farms": 1, "rewritten": [farmer_id]}
+        history_path = os.path.join(workspace["data_dir"], "financial_history.csv")
+        history = pd.read_csv(history_path, dtype=str, keep_default_na=False)
+        history.loc[0, "cost_kes"] = "12345"
+        history.to_csv(history_path, index=False)
+
+        result = ingest_sources(**workspace)
+        assert result["partitions"] == {"farms": 1, "rewritten": [farmer_id]}
+        ledger = pd.read_csv(os.path.join(farms_dir, farmer_id, LEDGER_FILE), dtype=str)
+        assert ledger.loc[0, "cost_kes"] == "12345"
+        # The farm's store hot-reloads the rewritten partition and snapshot
+        assert store.snapshot.columns is not None
+        assert _normalise(store.records) == _normalise(_load(partition_path(farmer_id, farms_dir)))
+
+        # Farms whose rows did not change are left alone
+        costs_path = os.path.join(workspace["data_dir"], "input_costs_breakdown.csv")
+        with open(costs_path, 'a') as f:
+            f.write("\n")
+        assert ingest_sources(**workspace)["partitions"] == {"farms": 1, "rewritten": []}
+
+
+def test_row_diff_reports_old_and_new_links():
+    old = fingerprint_rows("financial_history", pd.DataFrame([
+        {"transaction_id": "T1", "related_plot_id": "plot_A_2023_S1", "cost_kes": 10},
+        {"transaction_id": "T2", "related_plot_id": "plot_B_2023_S1", "cost_kes": 20},
+    ]))
+    new = fingerprint_rows("financial_history", pd.DataFrame([
+        {"transaction_id": "T1", "related_plot_id": "plot_C_2023_S1", "cost_kes": 10},
+        {"transaction_id": "T2", "related_plot_id": "plot_B_2023_S1", "cost_kes": 20},
+    ]))
+    change = diff_rows(old, new)
+    assert change["changed"] == ["T1"]
+    assert change["links"] == {"plot_A_2023_S1", "plot_C_2023_S1"}
+
+
+def test_watcher_ingests_only_on_change(workspace):
+    data_dir = workspace.pop("data_dir")
+    watcher = IngestWatcher(interval=0.1, data_dir=data_dir, **workspace)
+    assert watcher.check()["mode"] == "full"
+    assert watcher.check() is None
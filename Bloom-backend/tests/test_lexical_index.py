@@ -0,0 +1,118 @@
+"""
+Tests for the BM25 lexical index and hybrid search fusion
+"""
+
+import os
+import sys
+import json
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.lexical_index import BM25Index, tokenize, reciprocal_rank_fusion, get_lexical_index
+
+from tools import vector_search_tool
+from tools.vector_search_tool import search_farm_data
+
+
+RECORDS = [
+    {"plot_id": "plot_C_2023_S2", "plot_name": "West Valley", "current_crop": "Potatoes",
+     "crop_stage": "Harvested", "planting_date": "2023-11-01"},
+    {"plot_id": "plot_C_2025_S1", "plot_name": "West Valley", "current_crop": "Potatoes",
+     "crop_stage": "Tuber Bulking", "planting_date": "2025-03-28"},
+    {"plot_id": "plot_A_2025_S1", "plot_name": "North Field", "current_crop": "Maize",
+     "crop_stage": "Tasseling/Silking", "planting_date": "2025-03-25"},
+]
+
+
+class TestTokenize:
+    def test_compound_identifiers_kept(self):
+        """Plot ids and dates are kept whole and also split into parts"""
+        tokens = tokenize("Plot: West Valley (plot_C_2023_S2) planted 2023-11-01")
+        assert "plot_c_2023_s2" in tokens
+        assert "2023" in tokens
+        assert "2023-11-01" in tokens
+        assert "west" in tokens
+
+
+class TestBM25Index:
+    def test_exact_identifier_ranks_first(self):
+        index = BM25Index.from_records(RECORDS)
+        results = index.search("plot_C_2023_S2", k=3)
+        assert results[0]['id'] == "plot_C_2023_S2"
+
+    def test_stage_query(self):
+        index = BM25Index.from_records(RECORDS)
+        results = index.search("Tuber Bulking", k=3)
+        assert [r['id'] for r in results] == ["plot_C_2025_S1"]
+
+    def test_doc_filter_is_applied_before_ranking(self):
+        index = BM25Index.from_records(RECORDS)
+        results = index.search("2025", k=3, doc_filter=lambda m: m['crop'] == "Maize")
+        assert [r['id'] for r in results] == ["plot_A_2025_S1"]
+
+    def test_save_and_load(self, tmp_path):
+        index = BM25Index.from_records(RECORDS, source_hash="abc")
+        path = str(tmp_path / "lexical_index.json")
+        index.save(path)
+
+        loaded = BM25Index.load(path)
+        assert loaded.source_hash == "abc"
+        assert loaded.search("Tuber Bulking", 1) == index.search("Tuber Bulking", 1)
+
+    def test_persisted_index_rebuilt_when_data_changes(self, tmp_path):
+        data_path = str(tmp_path / "merged.json")
+        index_path = str(tmp_path / "lexical_index.json")
+        with open(data_path, 'w') as f:
+            json.dump(RECORDS[:1], f)
+        assert len(get_lexical_index(data_path, index_path)) == 1
+
+        with open(data_path, 'w') as f:
+            json.dump(RECORDS, f)
+        os.utime(data_path, (1, 1))
+        assert len(get_lexical_index(data_path, index_path)) == 3
+
+
+def test_reciprocal_rank_fusion():
+    """Documents ranked well by both lists win"""
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]])
+    assert fused[0][0] == "b"
+    assert {doc for doc, _ in fused} == {"a", "b", "c", "d"}
+
+
+class TestHybridSearch:
+    @pytest.fixture(autouse=True)
+    def index_in_tmp_path(self, tmp_path):
+        """Build the farm data's index under tmp_path instead of generated_data"""
+        index_path = str(tmp_path / "lexical_index.json")
+        with patch.object(vector_search_tool, 'get_lexical_index',
+                          side_effect=lambda: get_lexical_index(index_path=index_path)):
+            yield
+
+    def test_lexical_results_when_vector_search_fails(self):
+        with patch.object(vector_search_tool, '_vector_search', return_value=([], "Vector search failed")):
+            result = json.loads(search_farm_data("plot_C_2023_S2", max_results=3))
+
+        assert result['search_mode'] == "lexical"
+        assert result['results'][0]['plot_id'] == "plot_C_2023_S2"
+        assert result['vector_search_error'] == "Vector search failed"
+
+    def test_vector_and_lexical_rankings_are_fused(self):
+        vector_hits = [
+            {'plot_id': "plot_B_2022_S1", 'similarity_score': 0.8, 'plot_name': "East Ridge", 'crop': "Beans",
+             'stage': "Harvested", 'yield_tons_per_ha': 0.71, 'revenue_kes': 0, 'area_hectares': 2.0,
+             'full_description': ''},
+            {'plot_id': "plot_C_2023_S2", 'similarity_score': 0.7, 'plot_name': "West Valley", 'crop': "Potatoes",
+             'stage': "Harvested", 'yield_tons_per_ha': 9.0, 'revenue_kes': 0, 'area_hectares': 1.5,
+             'full_description': ''},
+        ]
+        with patch.object(vector_search_tool, '_vector_search', return_value=(vector_hits, None)):
+            result = json.loads(search_farm_data("plot_C_2023_S2", max_results=3))
+
+        assert result['search_mode'] == "hybrid"
+        top = result['results'][0]
+        assert top['plot_id'] == "plot_C_2023_S2"
+        assert top['similarity_score'] == 0.7
+        assert top['lexical_score'] > 0
@@ -0,0 +1,172 @@
+"""
+Tests for the local NDVI time-series store: acquisitions are appended once,
+rollups are maintained on insert and the time-series tool only asks Earth
+Engine for images newer than the last sync, and composite mode returns one
+median per period as parallel arrays
+"""
+
+import os
+import sys
+import json
+import time
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import ndvi_series
+from utils.ndvi_series import DAY_MS, INGEST_LAG_DAYS, NdviSeriesStore, rollup_bucket
+
+from tools import earth_engine_tool
+from tools.earth_engine_tool import get_crop_monitoring_time_series
+
+COORDINATES = [[36.80, -1.29], [36.81, -1.29], [36.81, -1.28], [36.80, -1.29]]
+
+
+def _ms(year, month, day):
+    return int(datetime(year, month, day, 8, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def _now_ms(days_ago=0.0):
+    return int((time.time() - days_ago * 86400) * 1000)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return NdviSeriesStore(str(tmp_path / "series.sqlite"))
+
+
+@pytest.fixture
+def ee_module(tmp_path):
+    with patch.object(earth_engine_tool, 'ee') as ee, \
+         patch.object(earth_engine_tool, 'initialize_earth_engine'), \
+         patch.object(ndvi_series, 'SERIES_PATH', str(tmp_path / "ndvi_series.sqlite")):
+        yield ee
+
+
+class TestNdviSeriesStore:
+    def test_buckets(self):
+        assert rollup_bucket('week', _ms(2025, 10, 9)) == "2025-W41"
+        assert rollup_bucket('month', _ms(2025, 10, 9)) == "2025-10"
+        with pytest.raises(ValueError):
+            rollup_bucket('year', _ms(2025, 10, 9))
+
+    def test_append_is_idempotent(self, store):
+        rows = [(_ms(2025, 10, 1), 0.5, 3.0), (_ms(2025, 10, 6), 0.6, 1.0)]
+        assert store.append("s", rows, _ms(2025, 9, 1), _ms(2025, 10, 10)) == 2
+        assert store.append("s", rows, _ms(2025, 10, 1), _ms(2025, 10, 10)) == 0
+        assert [o['ndvi'] for o in store.observations("s", _ms(2025, 9, 1), _ms(2025, 10, 10))] == [0.5, 0.6]
+        assert store.coverage("s") == (_ms(2025, 9, 1), _ms(2025, 10, 10))
+
+    def test_rollups_updated_incrementally(self, store):
+        store.append("s", [(_ms(2025, 10, 1), 0.5, None)], _ms(2025, 9, 1), _ms(2025, 10, 2))
+        store.append("s", [(_ms(2025, 10, 2), 0.7, None), (_ms(2025, 10, 20), 0.4, None)],
+                     _ms(2025, 10, 2), _ms(2025, 10, 21))
+        monthly = store.rollups("s", 'month', _ms(2025, 9, 1), _ms(2025, 10, 21))
+        assert monthly == [{'month': "2025-10", 'observations': 3, 'mean_ndvi': 0.533,
+                            'min_ndvi': 0.4, 'max_ndvi': 0.7}]
+        weekly = store.rollups("s", 'week', _ms(2025, 9, 1), _ms(2025, 10, 21))
+        assert [(w['week'], w['observations']) for w in weekly] == [("2025-W40", 2), ("2025-W43", 1)]
+
+    def test_missing_ranges(self, store):
+        start, end = _ms(2025, 4, 1), _ms(2025, 10, 1)
+        assert store.missing_ranges("s", start, end) == [(start, end)]
+        store.append("s", [], start, end)
+        later = _ms(2025, 10, 8)
+        # Newer acquisitions, plus the last few days again for late publication
+        assert store.missing_ranges("s", _ms(2025, 4, 8), later) == [(end - INGEST_LAG_DAYS * DAY_MS, later)]
+        # A longer window also fetches the older gap
+        assert store.missing_ranges("s", _ms(2025, 3, 1), later)[0] == (_ms(2025, 3, 1), start)
+
+    def test_window_after_coverage_fetches_the_gap(self, store):
+        origin = _ms(2025, 1, 1)
+        store.append("s", [], origin, origin + 180 * DAY_MS)
+        ranges = store.missing_ranges("s", origin + 240 * DAY_MS, origin + 270 * DAY_MS)
+        # Days 180-240 were never fetched, so they are requested along with the window
+        assert ranges == [(origin + (180 - INGEST_LAG_DAYS) * DAY_MS, origin + 270 * DAY_MS)]
+        for range_start, range_end in ranges:
+            store.append("s", [(origin + 200 * DAY_MS, 0.5, None)], range_start, range_end)
+
+        # A later six-month request has nothing left to fetch inside the coverage
+        ranges = store.missing_ranges("s", origin + 90 * DAY_MS, origin + 272 * DAY_MS)
+        assert ranges == [(origin + (270 - INGEST_LAG_DAYS) * DAY_MS, origin + 272 * DAY_MS)]
+        assert len(store.observations("s", origin + 90 * DAY_MS, origin + 272 * DAY_MS)) == 1
+
+
+class TestIncrementalTimeSeries:
+    def test_second_call_fetches_only_new_images(self, ee_module):
+        evaluate = ee_module.Dictionary.return_value.getInfo
+        evaluate.side_effect = [
+            {'0': [[_now_ms(40), 0.45, 5.0], [_now_ms(20), 0.55, 2.0], [_now_ms(10), None, 9.0]]},
+            {'0': [[_now_ms(1), 0.65, 1.0]]}
+        ]
+        first = json.loads(get_crop_monitoring_time_series(COORDINATES))
+        assert first['data_points'] == 2
+        assert first['series_store']['new_images'] == 2
+
+        second = json.loads(get_crop_monitoring_time_series(COORDINATES))
+        assert evaluate.call_count == 2
+        assert second['series_store']['new_images'] == 1
+        assert len(second['series_store']['fetched_ranges']) == 1
+        # The second request only spans the last few days, not six months
+        range_start, range_end = ee_module.ImageCollection.return_value.filterBounds.return_value \
+            .filterDate.call_args[0]
+        assert range_end - range_start < (INGEST_LAG_DAYS + 1) * DAY_MS
+
+        assert [point['ndvi'] for point in second['time_series_data']] == [0.45, 0.55, 0.65]
+        assert second['trend_analysis']['overall_trend'] == "Improving"
+        assert sum(month['observations'] for month in second['monthly_ndvi']) == 3
+
+    def test_dates_match_the_rollup_buckets(self, ee_module):
+        # 01:00 UTC is still the previous day west of UTC
+        acquired = _now_ms(10) // DAY_MS * DAY_MS + 3600 * 1000
+        ee_module.Dictionary.return_value.getInfo.return_value = {'0': [[acquired, 0.5, 1.0]]}
+        with patch.dict(os.environ, {'TZ': 'America/Los_Angeles'}):
+            time.tzset()
+            result = json.loads(get_crop_monitoring_time_series(COORDINATES))
+        time.tzset()
+
+        date = result['time_series_data'][0]['date']
+        assert date == datetime.fromtimestamp(acquired / 1000, tz=timezone.utc).strftime('%Y-%m-%d')
+        assert result['monthly_ndvi'][0]['month'] == date[:7]
+
+    def test_no_images(self, ee_module):
+        ee_module.Dictionary.return_value.getInfo.return_value = {'0': []}
+        result = json.loads(get_crop_monitoring_time_series(COORDINATES))
+        assert "No suitable satellite images" in result['error']
+
+
+class TestCompositeTimeSeries:
+    def test_parallel_arrays_from_one_evaluation(self, ee_module):
+        evaluate = ee_module.Dictionary.return_value.getInfo
+        evaluate.return_value = {
+            'dates': [_now_ms(30), _now_ms(20), _now_ms(10)],
+            'ndvi': [0.4, 0.5, 0.62],
+            'cloud_fraction': [0.12, 0.05, 0.2],
+            'images': [2, 1, 3]
+        }
+        result = json.loads(get_crop_monitoring_time_series(COORDINATES, months_back=24, composite_days=10))
+
+        assert evaluate.call_count == 1
+        ee_module.List.sequence.assert_called_once_with(0, 71)
+        assert result['composite'] == {"days": 10, "reducer": "median", "periods": 72}
+        assert [point['ndvi'] for point in result['time_series_data']] == [0.4, 0.5, 0.62]
+        assert result['time_series_data'][0]['images'] == 2
+        assert result['trend_analysis']['overall_trend'] == "Improving"
+        # Composites bypass the per-acquisition store
+        assert 'series_store' not in result
+
+    def test_no_composites(self, ee_module):
+        ee_module.Dictionary.return_value.getInfo.return_value = {
+            'dates': [], 'ndvi': [], 'cloud_fraction': [], 'images': []}
+        result = json.loads(get_crop_monitoring_time_series(COORDINATES, composite_days=7))
+        assert "No suitable satellite images" in result['error']
+
+    def test_long_windows_widen_periods(self, ee_module):
+        ee_module.Dictionary.return_value.getInfo.return_value = {
+            'dates': [_now_ms(5)], 'ndvi': [0.5], 'cloud_fraction': [0.1], 'images': [1]}
+        result = json.loads(get_crop_monitoring_time_series(COORDINATES, months_back=48, composite_days=10))
+        assert result['composite']['periods'] <= earth_engine_tool.MAX_COMPOSITE_PERIODS
+        assert result['composite']['days'] == 18
@@ -0,0 +1,135 @@
+"""
+Tests for the vectorised price analytics: every crop fitted at once must match
+a per-crop computation, and models are cached per data version
+"""
+
+import os
+import sys
+import json
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.farm_data_store import FarmDataStore, get_farm_data_store
+from utils.farm_records import build_farm_records
+from utils.price_analytics import (
+    ALPHA_GRID,
+    BETA_GRID,
+    GAMMA_GRID,
+    PriceAnalytics,
+    fit_holt_winters,
+    get_price_analytics,
+    moving_average,
+    next_periods,
+    price_matrix
+)
+
+from tools.market_tool import get_price_chart, get_sell_timing_recommendation
+
+
+def _holt_winters(y, m, alpha, beta, gamma):
+    """Scalar reference: one-step-ahead SSE and final state"""
+    level = np.mean(y[:m])
+    trend = (np.mean(y[m:2 * m]) - np.mean(y[:m])) / m if len(y) >= 2 * m else 0.0
+    season = list(np.array(y[:m]) - level)
+    sse = 0.0
+    for t in range(m, len(y)):
+        s = season[t % m]
+        sse += (y[t] - (level + trend + s)) ** 2
+        previous_level = level
+        level = alpha * (y[t] - s) + (1 - alpha) * (level + trend)
+        trend = beta * (level - previous_level) + (1 - beta) * trend
+        season[t % m] = gamma * (y[t] - level) + (1 - gamma) * s
+    return sse, level, trend, season
+
+
+class TestPriceAnalytics:
+    def test_price_matrix_matches_period_means(self):
+        records = get_farm_data_store().farm_records
+        crops, periods, seasons, prices = price_matrix(records)
+        frame = pd.DataFrame([(r.crop, r.period, r.price_per_kg) for r in records if r.crop and r.price_per_kg],
+                             columns=['crop', 'period', 'price'])
+        expected = frame.groupby(['crop', 'period'])['price'].mean()
+        for (crop, period), price in expected.items():
+            assert prices[crops.index(crop), periods.index(period)] == price
+        assert seasons == ['S1', 'S2']
+
+    def test_moving_average_matches_rolling(self):
+        prices = np.array([[1.0, 2.0, np.nan, 4.0, 5.0], [np.nan, 3.0, 3.0, 6.0, 9.0]])
+        expected = pd.DataFrame(prices.T).rolling(3, min_periods=1).mean().to_numpy().T
+        np.testing.assert_allclose(moving_average(prices, 3), expected)
+
+    def test_vectorised_fit_matches_per_crop_search(self):
+        rng = np.random.default_rng(3)
+        periods = np.arange(10)
+        prices = np.vstack([50 + 2 * periods + 5 * (periods % 2) + rng.normal(0, 1, 10),
+                            90 - periods + rng.normal(0, 3, 10)])
+        model = fit_holt_winters(prices, 2, horizon=2)
+
+        for i, y in enumerate(prices):
+            params = (model['alpha'][i], model['beta'][i], model['gamma'][i])
+            sse, level, trend, season = _holt_winters(y, 2, *params)
+            np.testing.assert_allclose(model['rmse'][i], np.sqrt(sse / 8))
+            np.testing.assert_allclose(model['forecast'][i], [level + trend + season[0],
+                                                              level + 2 * trend + season[1]])
+            # No grid point does better for this crop
+            best = min(_holt_winters(y, 2, a, b, g)[0] for a in ALPHA_GRID for b in BETA_GRID for g in GAMMA_GRID)
+            np.testing.assert_allclose(sse, best)
+
+    def test_short_series_fall_back_to_naive(self):
+        records = build_farm_records([
+            {"plot_id": "plot_A_2024_S1", "current_crop": "Maize", "selling_price_kes_per_kg": 50},
+            {"plot_id": "plot_A_2024_S2", "current_crop": "Maize", "selling_price_kes_per_kg": 55},
+            {"plot_id": "plot_B_2025_S1", "current_crop": "Maize", "selling_price_kes_per_kg": 60},
+            {"plot_id": "plot_B_2025_S1", "current_crop": "Beans", "selling_price_kes_per_kg": 100},
+        ])
+        analytics = PriceAnalytics.build(records)
+        assert analytics.models['Maize']['model']['method'] == "holt_winters_additive"
+        assert analytics.models['Beans']['model']['method'] == "naive"
+        assert [f['price'] for f in analytics.models['Beans']['forecast']] == [100.0, 100.0]
+        assert [f['period'] for f in analytics.models['Maize']['forecast']] == ["2025 S2", "2026 S1"]
+
+    def test_next_periods_wrap_years(self):
+        assert next_periods("2024 S2", ["S1", "S2"], 3) == ["2025 S1", "2025 S2", "2026 S1"]
+
+    def test_models_cached_per_data_version(self, tmp_path):
+        path = str(tmp_path / "merged.json")
+        records = [{"plot_id": f"plot_A_{year}_S{season}", "current_crop": "Maize",
+                    "selling_price_kes_per_kg": 40 + year - 2022 + season}
+                   for year in (2022, 2023, 2024) for season in (1, 2)]
+        with open(path, 'w') as f:
+            json.dump(records, f)
+        store = FarmDataStore(path, check_interval=0)
+        with patch('utils.price_analytics.get_farm_data_store', return_value=store):
+            first = get_price_analytics()
+            assert get_price_analytics() is first
+
+            with open(path, 'w') as f:
+                json.dump(records[:-1], f)
+            os.utime(path, (3, 3))
+            refitted = get_price_analytics()
+        assert refitted is not first
+        assert refitted.models['Maize']['latest_period'] == "2024 S1"
+
+
+class TestMarketTools:
+    def test_price_chart_includes_analytics(self):
+        result = json.loads(get_price_chart("maize"))
+        assert list(result['analytics']) == list(result['price_data']) == ["Maize"]
+        analytics = result['analytics']['Maize']
+        assert analytics['latest_price'] == result['trends']['Maize']['current_price']
+        assert len(analytics['forecast']) == 2
+        for point in analytics['forecast']:
+            assert point['lower'] <= point['price'] <= point['upper']
+
+    def test_sell_timing_includes_forecast(self):
+        result = json.loads(get_sell_timing_recommendation("Potatoes"))
+        assert result['forecast'] == get_price_analytics().models['Potatoes']['forecast']
+        expected = (result['forecast'][0]['price'] - result['current_price']) / result['current_price'] * 100
+        assert result['expected_change_percent'] == round(expected, 1)
+
+    def test_sell_timing_unknown_crop(self):
+        assert "error" in json.loads(get_sell_timing_recommendation("Rice"))
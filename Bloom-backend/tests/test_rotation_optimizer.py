@@ -0,0 +1,134 @@
+"""
+Tests for the whole-farm rotation optimiser: small farms are checked against
+exhaustive search over every plot's sequences
+"""
+
+import os
+import sys
+import json
+import itertools
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.farm_data_store import get_farm_data_store
+from utils.rotation_optimizer import (
+    FALLOW,
+    RotationProblem,
+    build_rotation_problem,
+    optimize_rotation,
+    plot_histories
+)
+
+from tools.planner_tool import get_rotation_plan
+
+PROFIT = {"Maize": {"S1": 50000, "S2": 65000}, "Beans": {"S1": 30000, "S2": 35000},
+          "Potatoes": {"S1": 210000, "S2": 240000}}
+COST = {"Maize": {"S1": 50000, "S2": 45000}, "Beans": {"S1": 40000, "S2": 40000},
+        "Potatoes": {"S1": 60000, "S2": 57000}}
+PLOTS = [
+    {"plot_id": "plot_A", "plot_name": "North", "area_hectares": 2.5, "history": ["Beans", "Maize"]},
+    {"plot_id": "plot_B", "plot_name": "East", "area_hectares": 2.0, "history": ["Maize", "Potatoes"]},
+    {"plot_id": "plot_C", "plot_name": "West", "area_hectares": 1.0, "history": ["Potatoes"]},
+]
+PERIODS = ["2025 S2", "2026 S1", "2026 S2"]
+
+
+def _exhaustive(problem):
+    best = float('-inf')
+    per_plot = [list(itertools.product(problem.options, repeat=len(problem.periods))) for _ in problem.plots]
+    for combination in itertools.product(*per_plot):
+        plan = {plot['plot_id']: list(crops) for plot, crops in zip(problem.plots, combination)}
+        if problem.feasible(plan):
+            best = max(best, problem.profit_of(plan))
+    return best
+
+
+class TestRotationOptimizer:
+    def test_rules(self):
+        problem = RotationProblem(PLOTS, PERIODS, PROFIT, COST)
+        assert not problem.allowed_after(("Beans", "Maize"), "Maize")
+        assert not problem.allowed_after(("Maize", "Potatoes"), "Maize")  # no break in three seasons
+        assert problem.allowed_after(("Maize", "Potatoes"), "Beans")
+        assert problem.allowed_after((None, "Potatoes"), "Maize")
+        assert problem.allowed_after(("Potatoes", FALLOW), FALLOW)
+
+    def test_unconstrained_plan_is_exact(self):
+        problem = RotationProblem(PLOTS[:2], PERIODS, PROFIT, COST)
+        result = optimize_rotation(problem)
+        assert result['status'] == "optimal" and result['gap_percent'] == 0
+        assert problem.feasible(result['plan'])
+        assert result['expected_profit_kes'] == pytest.approx(_exhaustive(problem))
+
+    @pytest.mark.parametrize("limits", [
+        {"budget_per_season": 150000},
+        {"max_crop_hectares": {"Potatoes": 2.5}},
+        {"budget_per_season": 200000, "max_crop_hectares": {"Potatoes": 3.0, "Maize": 2.0}},
+    ])
+    def test_limited_plan_matches_exhaustive_search(self, limits):
+        problem = RotationProblem(PLOTS[:2], PERIODS, PROFIT, COST, **limits)
+        result = optimize_rotation(problem)
+        assert problem.feasible(result['plan'])
+        assert result['expected_profit_kes'] == pytest.approx(_exhaustive(problem))
+        assert result['upper_bound_kes'] >= result['expected_profit_kes'] - 0.01
+
+    def test_larger_farm_stays_feasible_and_bounded(self):
+        plots = [dict(plot, plot_id=f"{plot['plot_id']}_{i}") for i in range(10) for plot in PLOTS]
+        problem = RotationProblem(plots, PERIODS + ["2027 S1", "2027 S2", "2028 S1"], PROFIT, COST,
+                                  budget_per_season=1500000, max_crop_hectares={"Potatoes": 25.0})
+        result = optimize_rotation(problem)
+        assert problem.feasible(result['plan'])
+        assert result['expected_profit_kes'] <= result['upper_bound_kes'] + 0.01
+        assert result['gap_percent'] < 10
+
+    def test_longer_horizon_matches_exhaustive_search(self):
+        problem = RotationProblem(PLOTS[:2], PERIODS + ["2027 S1"], PROFIT, COST,
+                                  budget_per_season=180000, max_crop_hectares={"Potatoes": 2.5})
+        result = optimize_rotation(problem)
+        assert problem.feasible(result['plan'])
+        assert result['expected_profit_kes'] == pytest.approx(_exhaustive(problem))
+
+    def test_eight_seasons_of_five_crops(self):
+        profit = dict(PROFIT, Cabbage={"S1": 120000, "S2": 135000}, Tomatoes={"S1": 160000, "S2": 150000})
+        cost = dict(COST, Cabbage={"S1": 45000, "S2": 47000}, Tomatoes={"S1": 70000, "S2": 72000})
+        plots = [dict(plot, plot_id=f"{plot['plot_id']}_{i}") for i in range(5) for plot in PLOTS]
+        periods = [f"{2025 + (t + 1) // 2} S{1 + (t + 1) % 2}" for t in range(8)]
+        problem = RotationProblem(plots, periods, profit, cost,
+                                  max_crop_hectares={crop: 11.0 for crop in profit})
+        result = optimize_rotation(problem)
+        assert problem.feasible(result['plan'])
+        assert result['expected_profit_kes'] <= result['upper_bound_kes'] + 0.01
+
+    def test_histories_from_records(self):
+        plots = {p['plot_name']: p for p in plot_histories(get_farm_data_store().farm_records)}
+        assert plots['North Field']['history'][-2:] == ["Potatoes", "Maize"]
+        assert plots['North Field']['area_hectares'] == 2.5
+
+    def test_problem_needs_economics(self):
+        with pytest.raises(ValueError):
+            build_rotation_problem([])
+
+
+class TestRotationPlanTool:
+    def test_plan_for_every_plot(self):
+        result = json.loads(get_rotation_plan(seasons_ahead=4))
+        assert len(result['planning_periods']) == 4
+        assert result['optimization']['status'] == "optimal"
+        for rotation in result['rotation_plans'].values():
+            plan = [step['crop'] for step in rotation['optimized_plan']]
+            assert rotation['suggested_next_crop'] == plan[0]
+            assert plan[0] != rotation['last_crop']
+
+    def test_farm_wide_limits(self):
+        result = json.loads(get_rotation_plan(seasons_ahead=3, max_crop_share_percent=40))
+        area = {"North Field": 2.5, "East Ridge": 2.0, "West Valley": 1.5, "South Slope": 1.0}
+        for t in range(3):
+            potatoes = sum(area[plot] for plot, rotation in result['rotation_plans'].items()
+                           if rotation['optimized_plan'][t]['crop'] == "Potatoes")
+            assert potatoes <= 0.4 * sum(area.values()) + 1e-9
+
+    def test_plot_filter_and_validation(self):
+        result = json.loads(get_rotation_plan("west valley"))
+        assert list(result['rotation_plans']) == ["West Valley"]
+        assert "error" in json.loads(get_rotation_plan(seasons_ahead=12))
@@ -0,0 +1,122 @@
+"""
+Tests for the Monte Carlo scenario engine behind the profitability forecast
+"""
+
+import os
+import sys
+import json
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from sklearn.linear_model import Ridge
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import yield_model
+from utils.farm_data_store import get_farm_data_store
+from utils.scenario_engine import ScenarioModel, get_scenario_model, historical_seasons
+from utils.yield_model import YieldModel, reset_yield_model, training_frame
+
+from tools.planner_tool import get_profitability_forecast
+
+OBSERVATIONS = np.array([[2.0, 50.0, 60000.0], [1.5, 60.0, 70000.0], [2.2, 45.0, 65000.0], [1.8, 55.0, 90000.0]])
+
+
+def _small_yield_model(records, data_version):
+    """Ridge on the crop alone: enough for the planner tools to report predictions"""
+    frame = training_frame(records)
+    frame = frame[frame['yield_tons_per_ha'].fillna(0) > 0]
+    pipeline = Pipeline([('encode', OneHotEncoder(handle_unknown='ignore')), ('model', Ridge(alpha=1.0))])
+    pipeline.fit(frame[['crop']], np.log(frame['yield_tons_per_ha'].astype(float)))
+    return YieldModel(pipeline, {
+        'version': "test-small", 'model': "ridge", 'data_version': data_version,
+        'categorical_features': ['crop'], 'numeric_features': [],
+        'cv_mae_tons_per_ha': None, 'baseline_mae_tons_per_ha': None
+    })
+
+
+@pytest.fixture
+def injected_yield_model(tmp_path):
+    """Planner calls load this model from tmp_path, never from generated_data/models"""
+    with patch.object(yield_model, 'MODELS_DIR', str(tmp_path)):
+        reset_yield_model()
+        store = get_farm_data_store()
+        _small_yield_model(store.records, store.version).save(str(tmp_path))
+        yield
+    reset_yield_model()
+
+
+class TestScenarioModel:
+    def test_draws_stay_near_history(self):
+        model = ScenarioModel("Maize", OBSERVATIONS, simulations=50000, seed=1)
+        assert model.simulations == 50000
+        assert (model.yield_t_ha >= 0).all() and (model.cost_per_ha >= 0).all()
+        historical_revenue = (OBSERVATIONS[:, 0] * 1000 * OBSERVATIONS[:, 1]).mean()
+        assert abs(model.revenue_per_ha.mean() - historical_revenue) / historical_revenue < 0.02
+
+    def test_probability_of_loss_matches_direct_count(self):
+        model = ScenarioModel("Maize", OBSERVATIONS, simulations=50000, seed=2)
+        for price, yield_ in [(1.0, 1.0), (0.7, 0.85), (0.6, 0.6), (1.3, 1.0)]:
+            profit = model.revenue_per_ha * price * yield_ - model.cost_per_ha
+            assert model.probability_of_loss(price, yield_) == np.mean(profit < 0)
+
+    def test_amounts_scale_with_area(self):
+        model = ScenarioModel("Maize", OBSERVATIONS, simulations=20000, seed=3)
+        one, three = model.simulate(1.0, 0.9), model.simulate(3.0, 0.9)
+        assert abs(three['expected_profit_kes'] - 3 * one['expected_profit_kes']) < 0.1
+        assert three['probability_of_loss'] == one['probability_of_loss']
+        profit = (model.revenue_per_ha * 0.9 - model.cost_per_ha) * 3
+        assert abs(three['profit_percentiles_kes']['p50'] - np.percentile(profit, 50)) < 0.1
+
+    def test_sensitivity_grid(self):
+        model = ScenarioModel("Maize", OBSERVATIONS, simulations=20000, seed=4)
+        grid = model.sensitivity(price_factors=(0.8, 1.0), yield_factors=(0.9, 1.0, 1.1), areas=(1.0, 2.0))
+        assert np.array(grid['expected_profit_kes']).shape == (2, 3, 2)
+        assert np.array(grid['probability_of_loss']).shape == (2, 3)
+        simulated = model.simulate(2.0, 0.8, 1.1)
+        assert abs(grid['expected_profit_kes'][0][2][1] - simulated['expected_profit_kes']) < 0.1
+        assert grid['probability_of_loss'][0][2] == simulated['probability_of_loss']
+        # Lower prices never make losses less likely
+        assert all(a >= b for a, b in zip(grid['probability_of_loss'][0], grid['probability_of_loss'][1]))
+
+    def test_model_cached_per_crop(self):
+        model = get_scenario_model("maize")
+        assert get_scenario_model("MAIZE") is model
+        assert len(model.observations) == len(historical_seasons(get_farm_data_store().find_records(crop="Maize")))
+        assert get_scenario_model("Rice") is None
+
+
+@pytest.mark.usefixtures("injected_yield_model")
+class TestProfitabilityForecast:
+    def test_forecast_includes_simulation(self):
+        result = json.loads(get_profitability_forecast("Potatoes", 2.0))
+        simulation = result['simulation']
+        assert simulation['simulations'] >= 10000
+        percentiles = list(simulation['profit_percentiles_kes'].values())
+        assert percentiles == sorted(percentiles)
+        assert 0 <= simulation['probability_of_loss'] <= 1
+        assert 2.0 in result['sensitivity']['areas_hectares']
+        assert result['confidence'] in ("High", "Medium", "Low")
+
+    def test_price_shock_scenario(self):
+        base = json.loads(get_profitability_forecast("Maize", 1.0))
+        shocked = json.loads(get_profitability_forecast("Maize", 1.0, price_change_percent=-40))
+        assert shocked['scenario']['price_change_percent'] == -40
+        assert shocked['simulation']['expected_profit_kes'] < base['simulation']['expected_profit_kes']
+        assert shocked['simulation']['probability_of_loss'] >= base['simulation']['probability_of_loss']
+        # The point forecast applies the same shock: revenue falls 40%, costs stay
+        assert shocked['forecast']['expected_revenue_kes'] == round(base['forecast']['expected_revenue_kes'] * 0.6, 2)
+        assert shocked['forecast']['expected_cost_kes'] == base['forecast']['expected_cost_kes']
+        revenue_drop = base['forecast']['expected_revenue_kes'] - shocked['forecast']['expected_revenue_kes']
+        assert abs(base['forecast']['expected_profit_kes'] - revenue_drop
+                   - shocked['forecast']['expected_profit_kes']) < 0.05
+        assert shocked['scenario']['baseline_profit_kes'] == base['forecast']['expected_profit_kes']
+        assert shocked['historical_averages'] == base['historical_averages']
+
+    def test_invalid_inputs(self):
+        assert "error" in json.loads(get_profitability_forecast("Maize", 0))
+        assert "error" in json.loads(get_profitability_forecast("Maize", 1.0, price_change_percent=-150))
+        assert "error" in json.loads(get_profitability_forecast("Rice"))
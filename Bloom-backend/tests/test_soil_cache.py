@@ -0,0 +1,105 @@
+"""
+Tests for the permanent soil-property cache: statistics are fetched once per
+geometry and dataset version, every plot is fetched in one reduceRegions
+evaluation, and ingestion pre-populates the cache
+"""
+
+import os
+import sys
+import json
+import shutil
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import imagery_cache, soil_cache
+from utils.farm_merge import DATA_DIR
+from utils.incremental_ingest import ingest_sources
+from utils.soil_cache import SoilCache
+
+from tools import earth_engine_tool
+from tools.earth_engine_tool import SOIL_DATASET_VERSION, get_farm_soil_analysis, get_soil_analysis
+
+COORDINATES = [[36.80, -1.29], [36.81, -1.29], [36.81, -1.28], [36.80, -1.29]]
+SOIL = {'soil': {'b0': 64, 'b0_1': 7}, 'area_m2': 25000.0}
+PLOT_ROWS = [["plot_A", 64, 7, 25000.0], ["plot_B", 58, 9, 20000.0],
+             ["plot_C", 71, 1, 15000.0], ["plot_D", 66, 7, 10000.0]]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SoilCache(str(tmp_path / "soil.sqlite"))
+
+
+@pytest.fixture
+def ee_module(tmp_path):
+    with patch.object(earth_engine_tool, 'ee') as ee, \
+         patch.object(earth_engine_tool, 'initialize_earth_engine'), \
+         patch.object(imagery_cache, 'CACHE_PATH', str(tmp_path / "imagery_cache.sqlite")), \
+         patch.object(soil_cache, 'CACHE_PATH', str(tmp_path / "soil_cache.sqlite")):
+        yield ee
+
+
+class TestSoilCache:
+    def test_no_expiry_until_dataset_version_changes(self, cache):
+        cache.put(COORDINATES, "v02", SOIL)
+        assert cache.get(COORDINATES, "v02") == SOIL
+        assert cache.get(COORDINATES, "v03") is None
+        cache.put(COORDINATES, "v03", {'soil': {'b0': 60, 'b0_1': 7}, 'area_m2': 25000.0})
+        assert cache.get(COORDINATES, "v02") is None
+        assert cache.stats == {'hits': 1, 'misses': 2}
+
+    def test_keyed_by_geometry(self, cache):
+        cache.put(COORDINATES, "v02", SOIL)
+        assert cache.get([[x + 0.01, y] for x, y in COORDINATES], "v02") is None
+
+
+class TestCachedSoilTools:
+    def test_soil_analysis_fetched_once(self, ee_module):
+        evaluate = ee_module.Dictionary.return_value.getInfo
+        evaluate.return_value = SOIL
+        first = json.loads(get_soil_analysis(COORDINATES))
+        second = json.loads(get_soil_analysis(COORDINATES))
+
+        assert evaluate.call_count == 1
+        assert (first['cache'], second['cache']) == ({"status": "miss"}, {"status": "hit"})
+        assert second['soil_properties'] == first['soil_properties']
+        assert second['area_hectares'] == 2.5
+
+    def test_moisture_map_uses_cached_soil(self, ee_module):
+        soil_cache.get_soil_cache().put(COORDINATES, SOIL_DATASET_VERSION, SOIL)
+        evaluate = ee_module.Dictionary.return_value.getInfo
+        evaluate.return_value = {'image': None}
+        result = json.loads(earth_engine_tool.get_soil_moisture_map(COORDINATES))
+
+        assert sorted(ee_module.Dictionary.call_args[0][0]) == ['image']
+        assert result['soil_properties']['texture_name'] == "Loam"
+        assert result['area_hectares'] == 2.5
+
+    def test_farm_soil_in_one_reduce_regions(self, ee_module):
+        evaluate = ee_module.Dictionary.return_value.getInfo
+        evaluate.return_value = {'plots': PLOT_ROWS}
+        first = json.loads(get_farm_soil_analysis())
+        second = json.loads(get_farm_soil_analysis())
+
+        assert evaluate.call_count == 1
+        assert first['cache'] == {"cached_plots": 0, "fetched_plots": 4}
+        assert second['cache'] == {"cached_plots": 4, "fetched_plots": 0}
+        plots = {plot['plot_id']: plot for plot in second['plots']}
+        assert plots['plot_B']['soil_properties']['texture_name'] == "Sandy Loam"
+        assert plots['plot_C']['area_hectares'] == 1.5
+        assert second['farm_summary']['texture_counts'] == {"Loam": 2, "Sandy Loam": 1, "Clay": 1}
+
+    def test_ingest_prefetches_soil(self, ee_module, tmp_path):
+        data_dir = tmp_path / "data"
+        shutil.copytree(DATA_DIR, data_dir)
+        ee_module.Dictionary.return_value.getInfo.return_value = {'plots': PLOT_ROWS}
+        summary = ingest_sources(str(data_dir), json_path=str(tmp_path / "merged.json"),
+                                 state_path=str(tmp_path / "state.json"),
+                                 snapshot_dir=str(tmp_path / "snapshot"), prefetch_soil=True)
+
+        assert summary['soil_cache'] == {"plots": 4, "cached": 0, "fetched": 4, "missing": []}
+        # Soil questions after ingest need no Earth Engine request
+        assert json.loads(get_farm_soil_analysis())['cache']['fetched_plots'] == 0
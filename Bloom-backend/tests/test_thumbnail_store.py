@@ -0,0 +1,108 @@
+"""
+Tests for the local thumbnail store: renders are fetched from Earth Engine
+once, stored content-addressed, served from /api/imagery URLs and evicted
+least recently used first when the store outgrows its size bound
+"""
+
+import os
+import sys
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import imagery_cache, thumbnail_store
+from utils.thumbnail_store import ThumbnailStore, digest_from_url, thumbnail_key
+
+from tools import earth_engine_tool
+from tools.earth_engine_tool import get_satellite_crop_health
+
+COORDINATES = [[36.80, -1.29], [36.81, -1.29], [36.81, -1.28], [36.80, -1.29]]
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ThumbnailStore(str(tmp_path / "imagery"), max_bytes=1024)
+
+
+@pytest.fixture
+def ee_module(tmp_path):
+    with patch.object(earth_engine_tool, 'ee') as ee, \
+         patch.object(earth_engine_tool, 'initialize_earth_engine'), \
+         patch.object(imagery_cache, 'CACHE_PATH', str(tmp_path / "imagery_cache.sqlite")), \
+         patch.object(thumbnail_store, 'IMAGERY_DIR', str(tmp_path / "imagery")), \
+         patch.object(thumbnail_store.requests, 'get') as download, \
+         patch.dict(os.environ, {"API_BASE_URL": "http://localhost:8000"}):
+        download.return_value = MagicMock(content=PNG)
+        yield ee, download
+
+
+class TestThumbnailStore:
+    def test_render_keys(self):
+        key = thumbnail_key("S2/img1", "rgb", {"min": 0}, COORDINATES)
+        assert key == thumbnail_key("S2/img1", "rgb", {"min": 0}, COORDINATES)
+        assert key != thumbnail_key("S2/img2", "rgb", {"min": 0}, COORDINATES)
+        assert key != thumbnail_key("S2/img1", "ndvi", {"min": 0}, COORDINATES)
+
+    def test_content_addressed(self, store):
+        digest = store.put("a", PNG)
+        assert store.put("b", PNG) == digest
+        assert store.lookup("a") == store.lookup("b") == digest
+        assert open(store.path(digest), 'rb').read() == PNG
+        assert digest_from_url(f"http://localhost:8000/api/imagery/{digest}.png") == digest
+        assert digest_from_url("https://earthengine.googleapis.com/v1/thumbnails/abc:getPixels") is None
+
+    def test_rejects_non_digest_paths(self, store):
+        assert store.path("../index.sqlite") is None
+        assert store.path("0" * 64) is None
+
+    def test_evicts_least_recently_served(self, store):
+        first = store.put("first", b"1" * 400)
+        second = store.put("second", b"2" * 400)
+        time.sleep(0.01)
+        store.path(first)
+        store.put("third", b"3" * 400)
+        assert store.has(first) and not store.has(second)
+        assert store.lookup("second") is None
+        assert store.stats['evicted'] == 1
+
+
+class TestServedThumbnails:
+    def _render(self, ee):
+        ee.Dictionary.return_value.getInfo.return_value = self._summary()
+        render = ee.Image.return_value.visualize.return_value.getThumbURL
+        render.return_value = "https://earthengine/thumb"
+        ndvi = ee.Image.return_value.normalizedDifference.return_value.rename.return_value
+        ndvi.visualize.return_value.getThumbURL.return_value = "https://earthengine/ndvi"
+        return render
+
+    def _summary(self):
+        now = int(time.time() * 1000)
+        return {'image': {'image_id': "S2/img1", 'time_start': now, 'latest_time': now, 'cloud_cover': 1.0,
+                          'ndvi': {'NDVI_mean': 0.6, 'NDVI_min': 0.2, 'NDVI_max': 0.8, 'NDVI_stdDev': 0.1}}}
+
+    def test_rendered_once_then_served_locally(self, ee_module):
+        ee, download = ee_module
+        render = self._render(ee)
+
+        result = json.loads(get_satellite_crop_health(COORDINATES))
+        url = result['imagery']['rgb_image_url']
+        assert url.startswith("http://localhost:8000/api/imagery/")
+        assert download.call_count == 2
+
+        # The analysis cache is cleared, but the renders are not requested again
+        imagery_cache.get_imagery_cache().clear()
+        again = json.loads(get_satellite_crop_health(COORDINATES))
+        assert again['imagery']['rgb_image_url'] == url
+        assert render.call_count == 1 and download.call_count == 2
+
+    def test_download_failure_falls_back_to_earth_engine_url(self, ee_module):
+        ee, download = ee_module
+        self._render(ee)
+        download.side_effect = Exception("timeout")
+        result = json.loads(get_satellite_crop_health(COORDINATES))
+        assert result['imagery']['rgb_image_url'] == "https://earthengine/thumb"
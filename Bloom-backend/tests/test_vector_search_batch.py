@@ -0,0 +1,155 @@
+"""
+Tests for batched multi-query vector search and filter pushdown
+"""
+
+import os
+import sys
+import json
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import vector_search_tool
+from tools.vector_search_tool import (
+    VectorSearchTool,
+    build_search_filters,
+    matches_search_filters,
+    scope_filters_to_farm
+)
+
+from utils.farm_data_store import farm_partition
+
+
+def _neighbor(plot_id, crop, yield_value, revenue, area, distance=0.1):
+    return {
+        "distance": distance,
+        "datapoint": {
+            "datapointId": plot_id,
+            "restricts": [
+                {"namespace": "plot_name", "allowList": ["North Field"]},
+                {"namespace": "crop", "allowList": [crop]},
+                {"namespace": "yield", "allowList": [str(yield_value)]},
+                {"namespace": "revenue", "allowList": [str(revenue)]},
+                {"namespace": "area", "allowList": [str(area)]},
+            ]
+        }
+    }
+
+
+def _make_tool(num_queries):
+    tool = VectorSearchTool.__new__(VectorSearchTool)
+    tool._json_data = None
+    tool.client = MagicMock()
+    tool.client.models.embed_content.return_value = MagicMock(
+        embeddings=[MagicMock(values=[float(i), 1.0]) for i in range(num_queries)]
+    )
+    tool._get_access_token = MagicMock(return_value="token")
+    return tool
+
+
+class TestSearchBatch:
+    def test_single_embedding_call_and_single_request(self):
+        """All queries are embedded together and sent in one findNeighbors call"""
+        tool = _make_tool(3)
+        response = MagicMock()
+        response.json.return_value = {"nearestNeighbors": [
+            {"neighbors": [_neighbor("plot_A_2022_S1", "Maize", 1.9, 247000, 2.5)]},
+            {"neighbors": [_neighbor("plot_B_2022_S1", "Beans", 0.75, 142500, 2.0)]},
+            {"neighbors": []},
+        ]}
+
+        with patch.object(vector_search_tool.requests, 'post', return_value=response) as mock_post:
+            results = tool.search_batch(["maize", "beans", "potatoes"], num_results=5)
+
+        assert tool.client.models.embed_content.call_count == 1
+        assert tool.client.models.embed_content.call_args.kwargs['contents'] == ["maize", "beans", "potatoes"]
+        assert mock_post.call_count == 1
+
+        queries = mock_post.call_args.kwargs['json']['queries']
+        assert len(queries) == 3
+        assert all(q['neighborCount'] == 5 for q in queries)
+
+        assert len(results) == 3
+        assert results[0][0]['crop'] == "Maize"
+        assert results[1][0]['plot_id'] == "plot_B_2022_S1"
+        assert results[2] == []
+
+    def test_missing_query_entries_are_padded(self):
+        """A response with fewer entries than queries still yields one list per query"""
+        tool = _make_tool(2)
+        batch = tool._format_batch_results({"nearestNeighbors": [{"neighbors": []}]}, 2)
+        assert batch == [[], []]
+
+    def test_embedding_failure_returns_none(self):
+        """Embedding errors are reported as a failed search"""
+        tool = _make_tool(1)
+        tool.client.models.embed_content.side_effect = Exception("quota")
+        assert tool.search_batch(["maize"]) is None
+
+    def test_empty_queries(self):
+        """No queries means no network calls"""
+        tool = _make_tool(0)
+        assert tool.search_batch([]) == []
+        tool.client.models.embed_content.assert_not_called()
+
+
+class TestSearchFilters:
+    def test_no_filters(self):
+        """No filters means an unrestricted query"""
+        assert build_search_filters() is None
+        assert matches_search_filters({"crop": "Maize"}, None)
+
+    def test_token_and_numeric_restricts(self):
+        """Tool filters become token and numeric restricts"""
+        filters = build_search_filters(crop_type="maize", plot_name="North Field", min_yield=1.5)
+
+        assert {"namespace": "crop", "allowList": ["maize", "Maize"]} in filters['restricts']
+        assert {"namespace": "plot_name", "allowList": ["North Field"]} in filters['restricts']
+        assert filters['numericRestricts'] == [
+            {"namespace": "yield", "valueFloat": 1.5, "op": "GREATER_EQUAL"}
+        ]
+
+    def test_local_matching(self):
+        """Local pre-filtering follows the same restrict semantics"""
+        filters = build_search_filters(crop_type="Maize", min_yield=1.5)
+
+        assert matches_search_filters({"crop": "Maize", "yield": "1.83"}, filters)
+        assert not matches_search_filters({"crop": "Beans", "yield": "1.83"}, filters)
+        assert not matches_search_filters({"crop": "Maize", "yield": "0.7"}, filters)
+        assert not matches_search_filters({"crop": "Maize"}, filters)
+
+    def test_filters_pushed_into_request(self):
+        """Filters are sent on each findNeighbors datapoint instead of applied afterwards"""
+        tool = _make_tool(2)
+        response = MagicMock()
+        response.json.return_value = {"nearestNeighbors": [
+            {"neighbors": [_neighbor("plot_A_2022_S1", "Maize", 1.9, 247000, 2.5)]},
+            {"neighbors": []}
+        ]}
+        filters = [build_search_filters(crop_type="Maize", min_yield=1.0), None]
+
+        with patch.object(vector_search_tool.requests, 'post', return_value=response) as mock_post:
+            results = tool.search_batch(["maize yields", "all plots"], 20, filters)
+
+        maize_query, open_query = mock_post.call_args.kwargs['json']['queries']
+        assert maize_query['datapoint']['restricts'] == [{"namespace": "crop", "allowList": ["Maize"]}]
+        assert maize_query['datapoint']['numericRestricts'][0]['valueFloat'] == 1.0
+        assert 'restricts' not in open_query['datapoint']
+        assert len(results[0]) == 1
+
+    def test_queries_scoped_to_current_farm(self):
+        """Every query carries the current farm's farmer_id restrict"""
+        tool = _make_tool(2)
+        response = MagicMock()
+        response.json.return_value = {"nearestNeighbors": []}
+        filters = [build_search_filters(crop_type="Maize"), None]
+
+        with farm_partition("farm-001"):
+            with patch.object(vector_search_tool.requests, 'post', return_value=response) as mock_post:
+                tool.search_batch(["maize yields", "all plots"], 20, filters)
+
+        farm_restrict = {"namespace": "farmer_id", "allowList": ["farm-001"]}
+        for query in mock_post.call_args.kwargs['json']['queries']:
+            assert farm_restrict in query['datapoint']['restricts']
+        # Single-farm mode leaves the filters untouched
+        assert scope_filters_to_farm(None, None) is None
@@ -6,16 +6,23 @@ Simple tests for core vector search functionality.
 import json
 import sys
 import os
+from unittest.mock import patch
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from tools import vector_search_tool
 from tools.vector_search_tool import search_farm_data
+from utils.lexical_index import get_lexical_index
 
 
-def test_basic_search():
+def test_basic_search(tmp_path):
     """Test basic vector search works"""
     query = "high yield maize plots"
-    result = search_farm_data(query, max_results=3)
+    # The lexical half of the search builds its index under tmp_path, not generated_data
+    index_path = str(tmp_path / "lexical_index.json")
+    with patch.object(vector_search_tool, 'get_lexical_index',
+                      side_effect=lambda: get_lexical_index(index_path=index_path)):
+        result = search_farm_data(query, max_results=3)
     result_dict = json.loads(result)
     
     # Check response structure
@@ -0,0 +1,170 @@
+"""
+Tests for the trained yield model: persisted artifacts round-trip, batch
+inference covers every plot x crop and the planner tools surface predictions
+"""
+
+import os
+import sys
+import json
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import farm_data_store, yield_model
+from utils.farm_data_store import FarmPartitionRegistry, farm_partition, get_farm_data_store, partition_path
+from utils.yield_model import (
+    YieldModel,
+    farm_models_dir,
+    get_yield_model,
+    predict_yields,
+    reset_yield_model,
+    scoring_frame,
+    train_yield_model,
+    training_frame
+)
+
+from tools.planner_tool import get_crop_recommendation, get_profitability_forecast
+
+
+@pytest.fixture
+def models_dir(tmp_path):
+    with patch.object(yield_model, 'MODELS_DIR', str(tmp_path)):
+        reset_yield_model()
+        yield str(tmp_path)
+    reset_yield_model()
+
+
+@pytest.fixture
+def trained_model(models_dir):
+    store = get_farm_data_store()
+    model = train_yield_model(store.records, store.version)
+    model.save(models_dir)
+    return model
+
+
+class TestYieldModel:
+    def test_training_frame_tracks_previous_crop(self):
+        frame = training_frame([
+            {"plot_id": "plot_A_2024_S1", "current_crop": "Maize", "yield_tons_per_ha": 2.0},
+            {"plot_id": "plot_A_2024_S2", "current_crop": "Beans", "yield_tons_per_ha": 0.8},
+            {"plot_id": "plot_B_2024_S1", "current_crop": "Potatoes", "yield_tons_per_ha": 9.0},
+        ])
+        assert list(frame['previous_crop'].fillna('')) == ['', 'Maize', '']
+
+    def test_artifact_round_trip(self, models_dir):
+        store = get_farm_data_store()
+        model = train_yield_model(store.records, store.version)
+        model.save(models_dir)
+        loaded = YieldModel.load(models_dir)
+        assert loaded.version == model.version
+        assert loaded.manifest['data_version'] == store.version
+        frame = scoring_frame(store.records)
+        np.testing.assert_allclose(loaded.predict(frame), model.predict(frame))
+
+    def test_load_without_artifact(self, tmp_path):
+        assert YieldModel.load(str(tmp_path / "missing")) is None
+
+    def test_no_artifact_is_never_trained(self, models_dir):
+        assert get_yield_model() is None
+        assert predict_yields() is None
+        assert not os.listdir(models_dir)
+
+    def test_model_loaded_once_from_artifact(self, trained_model):
+        model = get_yield_model()
+        assert model.version == trained_model.version
+        assert get_yield_model() is model
+        reset_yield_model()
+        reloaded = get_yield_model()
+        assert reloaded is not model and reloaded.version == model.version
+
+    def test_model_reloaded_for_new_data_version(self, trained_model, tmp_path):
+        path = str(tmp_path / "merged.json")
+        with open(get_farm_data_store().path) as f:
+            records = json.load(f)
+        with open(path, 'w') as f:
+            json.dump(records, f)
+        store = get_farm_data_store(path)
+        with patch.object(yield_model, 'get_farm_data_store', return_value=store):
+            model = get_yield_model()
+            with open(path, 'w') as f:
+                json.dump(records[:-1], f)
+            store.refresh(force=True)
+            assert get_yield_model() is not model
+
+    def test_models_are_kept_per_farm(self, models_dir, tmp_path):
+        farms_dir = str(tmp_path / "partitions")
+        path = partition_path("farm-a", farms_dir)
+        os.makedirs(os.path.dirname(path))
+        with open(get_farm_data_store().path) as f:
+            records = json.load(f)
+        with open(path, 'w') as f:
+            json.dump(records, f)
+
+        with patch.object(farm_data_store, '_partitions', FarmPartitionRegistry(farms_dir)):
+            with farm_partition("farm-a"):
+                store = get_farm_data_store()
+                assert get_yield_model() is None
+                train_yield_model(store.records, store.version).save(farm_models_dir("farm-a"))
+                assert get_yield_model() is not None
+            # The single-farm data has no artifact of its own
+            assert get_yield_model() is None
+        assert farm_models_dir("farm-a") == os.path.join(models_dir, "farms", "farm-a")
+
+    def test_batch_scores_every_plot_and_crop(self, trained_model):
+        store = get_farm_data_store()
+        predictions = predict_yields()
+        plots = {r.base_plot_id for r in store.farm_records if r.base_plot_id}
+        crops = {r.crop for r in store.farm_records if r.crop}
+        assert len(predictions) == len(plots) * len(crops)
+        assert set(zip(predictions['plot'], predictions['crop'])) == {(p, c) for p in plots for c in crops}
+        assert (predictions['predicted_yield_tons_per_ha'] > 0).all()
+        assert predict_yields() is predictions
+
+    def test_explicit_season_and_crops(self, trained_model):
+        predictions = predict_yields(crops=["Maize"], season="S1")
+        assert set(predictions['crop']) == {"Maize"}
+        assert set(predictions['season']) == {"S1"}
+
+    def test_too_few_records(self):
+        with pytest.raises(ValueError):
+            train_yield_model([{"plot_id": "plot_A_2024_S1", "current_crop": "Maize", "yield_tons_per_ha": 2.0}])
+
+
+class TestPlannerTools:
+    def test_recommendations_include_predicted_yield(self, trained_model):
+        result = json.loads(get_crop_recommendation())
+        assert result['yield_model']['version'] == get_yield_model().version
+        for recommendation in result['recommendations']:
+            assert recommendation['predicted_yield_tons_per_ha'] > 0
+
+    def test_forecast_includes_yield_model(self, trained_model):
+        result = json.loads(get_profitability_forecast("potatoes", 1.0))
+        block = result['yield_model']
+        predictions = predict_yields()
+        expected = predictions[predictions['crop'] == "Potatoes"]['predicted_yield_tons_per_ha'].mean()
+        assert block['predicted_yield_tons_per_ha'] == round(float(expected), 2)
+        assert block['historical_mean_yield_tons_per_ha'] > 0
+
+    def test_historical_means_without_artifact(self, models_dir, tmp_path):
+        """A new farm with too few yields to train on is still answered"""
+        farms_dir = str(tmp_path / "partitions")
+        path = partition_path("farm-new", farms_dir)
+        os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            json.dump([{"plot_id": f"plot_A_{year}_S1", "plot_name": "North Field", "current_crop": "Maize",
+                        "yield_tonnes_per_ha": 2.0 + year - 2021, "revenue_kes": 100000, "total_cost_kes": 60000,
+                        "profit_kes": 40000, "profit_margin_percent": 40.0, "area_hectares": 1.0}
+                       for year in (2021, 2022, 2023, 2024)], f)
+
+        with patch.object(farm_data_store, '_partitions', FarmPartitionRegistry(farms_dir)), \
+             farm_partition("farm-new"):
+            recommendation = json.loads(get_crop_recommendation())
+            forecast = json.loads(get_profitability_forecast("Maize", 1.0))
+
+        assert recommendation['yield_model']['model'] == "historical_mean"
+        assert recommendation['recommendations'][0]['predicted_yield_tons_per_ha'] == 3.5
+        assert forecast['yield_model']['predicted_yield_tons_per_ha'] == 3.5
+        assert not os.path.exists(farm_models_dir("farm-new"))
@@ -6,10 +6,19 @@ Provides satellite imagery, NDVI analysis, and soil data for agricultural insigh
 import os
 import ee
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional, Tuple
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 
+from utils.farm_data_store import get_farm_data_store
+from utils.imagery_cache import cache_key, geometry_hash, get_imagery_cache
+from utils.ndvi_series import get_ndvi_series_store
+from utils.soil_cache import get_soil_cache
+from utils.thumbnail_store import digest_from_url, get_thumbnail_store, thumbnail_key
+
 # Load environment variables
 load_dotenv()
 
@@ -19,16 +28,42 @@ SERVICE_ACCOUNT_PATH = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
 if not SERVICE_ACCOUNT_PATH:
     raise ValueError("Missing required environment variable: GOOGLE_APPLICATION_CREDENTIALS")
 
+# Thumbnail URL requests run on this pool so one analysis fetches its images concurrently
+_thumbnail_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="ee-thumbnail")
+
+# Seconds before a failed initialisation is attempted again (calls in between fail fast)
+INIT_RETRY_SECONDS = float(os.getenv("EARTH_ENGINE_INIT_RETRY_SECONDS", "30"))
+
 class EarthEngineError(Exception):
     """Custom exception for Earth Engine errors"""
     pass
 
-class EarthEngineTool:
-    def __init__(self):
-        self._initialize_earth_engine()
-    
-    def _initialize_earth_engine(self):
-        """Initialize Earth Engine with service account"""
+# Process-wide Earth Engine session: credentials are loaded and ee.Initialize
+# runs once, on the first satellite call, under a lock
+_ee_lock = threading.Lock()
+_ee_state: Dict[str, Any] = {
+    'status': 'not_initialized',
+    'service_account': None,
+    'initialized_at': None,
+    'init_ms': None,
+    'attempts': 0,
+    'last_error': None,
+    'last_failure': None
+}
+
+def initialize_earth_engine():
+    """Initialise Earth Engine once per process; raises EarthEngineError while it is unavailable"""
+    if _ee_state['status'] == 'ready':
+        return
+    with _ee_lock:
+        if _ee_state['status'] == 'ready':
+            return
+        if (_ee_state['status'] == 'failed'
+                and time.monotonic() - _ee_state['last_failure'] < INIT_RETRY_SECONDS):
+            raise EarthEngineError(f"Failed to initialize Earth Engine: {_ee_state['last_error']}")
+        
+        _ee_state['attempts'] += 1
+        start = time.perf_counter()
         try:
             credentials = ee.ServiceAccountCredentials(
                 email=None,
@@ -36,7 +71,46 @@ class EarthEngineTool:
             )
             ee.Initialize(credentials)
         except Exception as e:
+            _ee_state.update(status='failed', last_error=str(e), last_failure=time.monotonic())
             raise EarthEngineError(f"Failed to initialize Earth Engine: {e}")
+        
+        _ee_state.update(
+            status='ready',
+            service_account=getattr(credentials, 'service_account_email', None),
+            initialized_at=datetime.now().isoformat(),
+            init_ms=round((time.perf_counter() - start) * 1000, 1),
+            last_error=None,
+            last_failure=None
+        )
+
+def get_earth_engine_health() -> Dict[str, Any]:
+    """Earth Engine session state for health checks (never triggers initialisation)"""
+    with _ee_lock:
+        health = {key: value for key, value in _ee_state.items() if key != 'last_failure'}
+    health['credentials_file_present'] = os.path.isfile(SERVICE_ACCOUNT_PATH)
+    return health
+
+def reset_earth_engine():
+    """Forget the session so the next call initialises again (e.g. after rotating credentials)"""
+    global _tool
+    with _ee_lock:
+        _ee_state.update(status='not_initialized', service_account=None, initialized_at=None,
+                         init_ms=None, last_error=None, last_failure=None)
+        _tool = None
+
+_tool: Optional['EarthEngineTool'] = None
+
+def get_earth_engine_tool() -> 'EarthEngineTool':
+    """The shared tool, initialising Earth Engine on first use"""
+    global _tool
+    initialize_earth_engine()
+    if _tool is None:
+        _tool = EarthEngineTool()
+    return _tool
+
+class EarthEngineTool:
+    def __init__(self):
+        initialize_earth_engine()
     
     def _create_geometry(self, coordinates: List[List[float]]) -> ee.Geometry:
         """Create Earth Engine geometry from coordinates"""
@@ -47,29 +121,16 @@ class EarthEngineTool:
             # Polygon
             return ee.Geometry.Polygon(coordinates)
     
-    def _get_best_image(self, geometry: ee.Geometry, start_date: str, end_date: str, 
-                       max_cloud_cover: int = 20) -> Optional[ee.Image]:
-        """Get the best available satellite image for the area and time period"""
-        try:
-            # Use the newer Sentinel-2 Level-2A collection (not deprecated)
-            collection = (ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED')
-                         .filterBounds(geometry)
-                         .filterDate(start_date, end_date)
-                         .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', max_cloud_cover))
-                         .sort('CLOUDY_PIXEL_PERCENTAGE'))
-            
-            # Get the image with least cloud cover
-            best_image = collection.first()
-            
-            # Check if we found any images
-            image_count = collection.size().getInfo()
-            if image_count == 0:
-                return None
-            
-            return best_image
-            
-        except Exception as e:
-            raise EarthEngineError(f"Failed to get satellite image: {e}")
+    def _best_image(self, geometry: ee.Geometry, start_date: str, end_date: str,
+                    max_cloud_cover: int = 20) -> Tuple[ee.ImageCollection, ee.Image]:
+        """Qualifying images (least cloudy first) and the best one for the area and period (unevaluated)"""
+        # Use the newer Sentinel-2 Level-2A collection (not deprecated)
+        collection = (ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED')
+                     .filterBounds(geometry)
+                     .filterDate(start_date, end_date)
+                     .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', max_cloud_cover))
+                     .sort('CLOUDY_PIXEL_PERCENTAGE'))
+        return collection, ee.Image(collection.first())
     
     def _calculate_ndvi(self, image: ee.Image) -> ee.Image:
         """Calculate NDVI from Sentinel-2 image"""
@@ -78,30 +139,185 @@ class EarthEngineTool:
         ndvi = image.normalizedDifference(['B8', 'B4']).rename('NDVI')
         return ndvi
     
-    def _get_ndvi_stats(self, ndvi_image: ee.Image, geometry: ee.Geometry) -> Dict[str, float]:
-        """Get NDVI statistics for the given area"""
-        try:
-            stats = ndvi_image.reduceRegion(
-                reducer=ee.Reducer.mean().combine(
-                    reducer2=ee.Reducer.minMax().combine(
-                        reducer2=ee.Reducer.stdDev(),
-                        sharedInputs=True
-                    ),
+    def _ndvi_stats_expression(self, ndvi_image: ee.Image, geometry: ee.Geometry) -> ee.Dictionary:
+        """NDVI mean, min, max and standard deviation over the area (unevaluated)"""
+        return ndvi_image.reduceRegion(
+            reducer=ee.Reducer.mean().combine(
+                reducer2=ee.Reducer.minMax().combine(
+                    reducer2=ee.Reducer.stdDev(),
                     sharedInputs=True
                 ),
+                sharedInputs=True
+            ),
+            geometry=geometry,
+            scale=10,  # 10m resolution
+            maxPixels=1e9
+        )
+    
+    def _image_summary_expression(self, collection: ee.ImageCollection, image: ee.Image,
+                                  ndvi_image: ee.Image, geometry: ee.Geometry) -> ee.ComputedObject:
+        """Id, date, cloud cover and NDVI statistics of the image, or null when no image matched"""
+        summary = ee.Dictionary({
+            'image_id': image.id(),
+            'time_start': image.get('system:time_start'),
+            'latest_time': collection.aggregate_max('system:time_start'),
+            'cloud_cover': image.get('CLOUDY_PIXEL_PERCENTAGE'),
+            'ndvi': self._ndvi_stats_expression(ndvi_image, geometry)
+        })
+        return ee.Algorithms.If(collection.size().gt(0), summary, None)
+    
+    def _probe_expression(self, collection: ee.ImageCollection, image: ee.Image) -> ee.ComputedObject:
+        """Metadata only: the best image's id and the newest acquisition time, or null"""
+        probe = ee.Dictionary({
+            'image_id': image.id(),
+            'latest_time': collection.aggregate_max('system:time_start')
+        })
+        return ee.Algorithms.If(collection.size().gt(0), probe, None)
+    
+    def _plot_features(self, plots: List[Dict[str, Any]]) -> ee.FeatureCollection:
+        """One feature per plot polygon, tagged with its plot_id"""
+        return ee.FeatureCollection([
+            ee.Feature(self._create_geometry(plot['coordinates']), {'plot_id': plot['plot_id']})
+            for plot in plots
+        ])
+    
+    def _plot_ndvi_expression(self, ndvi_image: ee.Image, features: ee.FeatureCollection) -> ee.List:
+        """[plot_id, mean, min, max, stdDev] rows for every plot from one reduceRegions (unevaluated)"""
+        reduced = ndvi_image.reduceRegions(
+            collection=features,
+            reducer=ee.Reducer.mean().combine(
+                reducer2=ee.Reducer.minMax().combine(
+                    reducer2=ee.Reducer.stdDev(),
+                    sharedInputs=True
+                ),
+                sharedInputs=True
+            ),
+            scale=10,  # 10m resolution
+            tileScale=2
+        )
+        # Only the statistics columns come back, not the plot geometries
+        return reduced.reduceColumns(
+            ee.Reducer.toList(len(PLOT_NDVI_COLUMNS)), PLOT_NDVI_COLUMNS
+        ).get('list')
+    
+    def _ndvi_series_expression(self, geometry: ee.Geometry, start_ms: int, end_ms: int) -> ee.List:
+        """[time_ms, mean NDVI, cloud cover] per acquisition in [start_ms, end_ms) (unevaluated)"""
+        collection = (ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED')
+                     .filterBounds(geometry)
+                     .filterDate(start_ms, end_ms)
+                     .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 30)))
+        
+        def calculate_mean_ndvi(image):
+            mean_ndvi = self._calculate_ndvi(image).reduceRegion(
+                reducer=ee.Reducer.mean(),
                 geometry=geometry,
-                scale=10,  # 10m resolution
+                scale=10,
                 maxPixels=1e9
-            ).getInfo()
-            
-            return {
-                'mean': stats.get('NDVI_mean', 0),
-                'min': stats.get('NDVI_min', 0),
-                'max': stats.get('NDVI_max', 0),
-                'std_dev': stats.get('NDVI_stdDev', 0)
-            }
+            ).get('NDVI')
+            return ee.Feature(None, {
+                'date': image.date().millis(),
+                'ndvi': mean_ndvi,
+                'cloud_cover': image.get('CLOUDY_PIXEL_PERCENTAGE')
+            })
+        
+        # Only the three columns come back, not every feature's metadata
+        features = collection.map(calculate_mean_ndvi).filter(ee.Filter.notNull(['ndvi']))
+        return features.reduceColumns(
+            ee.Reducer.toList(3), ['date', 'ndvi', 'cloud_cover']
+        ).get('list')
+    
+    def _composite_series_expression(self, geometry: ee.Geometry, start_ms: int, end_ms: int,
+                                     days: int, periods: int) -> Dict[str, Any]:
+        """Median NDVI composite per period of `days`, as parallel arrays (unevaluated)
+        
+        The payload grows with the number of periods, not the number of images.
+        """
+        collection = (ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED')
+                     .filterBounds(geometry)
+                     .filterDate(start_ms, end_ms)
+                     .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 30)))
+        start = ee.Date(start_ms)
+        
+        def composite(offset):
+            period_start = start.advance(ee.Number(offset).multiply(days), 'day')
+            images = collection.filterDate(period_start, period_start.advance(days, 'day'))
+            mean_ndvi = images.map(self._calculate_ndvi).median().reduceRegion(
+                reducer=ee.Reducer.mean(),
+                geometry=geometry,
+                scale=10,
+                maxPixels=1e9
+            ).get('NDVI')
+            # Periods without images have no 'ndvi' and are dropped below
+            return ee.Algorithms.If(images.size().gt(0), ee.Feature(None, {
+                'date': period_start.millis(),
+                'ndvi': mean_ndvi,
+                'cloud_fraction': images.aggregate_mean('CLOUDY_PIXEL_PERCENTAGE').divide(100),
+                'images': images.size()
+            }), ee.Feature(None, {'date': period_start.millis()}))
+        
+        composites = ee.FeatureCollection(
+            ee.List.sequence(0, periods - 1).map(composite)
+        ).filter(ee.Filter.notNull(['ndvi']))
+        return {
+            'dates': composites.aggregate_array('date'),
+            'ndvi': composites.aggregate_array('ndvi'),
+            'cloud_fraction': composites.aggregate_array('cloud_fraction'),
+            'images': composites.aggregate_array('images')
+        }
+    
+    def _evaluate(self, expressions: Dict[str, Any]) -> Dict[str, Any]:
+        """Evaluate every expression in one server round trip, returning only those values"""
+        try:
+            return ee.Dictionary(expressions).getInfo()
         except Exception as e:
-            raise EarthEngineError(f"Failed to calculate NDVI statistics: {e}")
+            raise EarthEngineError(f"Failed to evaluate Earth Engine request: {e}")
+    
+    def _ndvi_stats(self, stats: Optional[Dict[str, Any]]) -> Dict[str, float]:
+        """NDVI statistics from an evaluated reduction (0 where the area had no valid pixels)"""
+        stats = stats or {}
+        return {
+            'mean': stats.get('NDVI_mean') or 0,
+            'min': stats.get('NDVI_min') or 0,
+            'max': stats.get('NDVI_max') or 0,
+            'std_dev': stats.get('NDVI_stdDev') or 0
+        }
+    
+    def _thumbnail_urls(self, images: Dict[str, Tuple[ee.Image, Dict[str, Any]]],
+                        geometry: ee.Geometry, keys: Optional[Dict[str, str]] = None) -> Dict[str, Optional[str]]:
+        """
+        Thumbnail URL per name for (image, visualisation) pairs, requested concurrently.
+        Names with a render key are served from the local thumbnail store, rendered by
+        Earth Engine only the first time.
+        """
+        # Add buffer around geometry to show surrounding context (500m buffer)
+        bounds = geometry.buffer(500).bounds()
+        
+        def thumbnail(name, image, vis_params):
+            key = (keys or {}).get(name)
+            store = get_thumbnail_store() if key else None
+            if store is not None:
+                digest = store.lookup(key)
+                if digest is not None:
+                    return _imagery_url(digest)
+            try:
+                url = image.visualize(**vis_params).getThumbURL({
+                    'region': bounds,
+                    'dimensions': 512,
+                    'format': 'png'
+                })
+            except Exception:
+                return None
+            if store is None:
+                return url
+            try:
+                return _imagery_url(store.fetch(key, url))
+            except Exception:
+                # Fall back to the (expiring) Earth Engine link
+                return url
+        
+        futures = {name: _thumbnail_pool.submit(thumbnail, name, image, vis_params)
+                   for name, (image, vis_params) in images.items()}
+        return {name: future.result() for name, future in futures.items()}
     
     def _interpret_ndvi(self, mean_ndvi: float) -> Dict[str, str]:
         """Interpret NDVI values for agricultural context"""
@@ -132,42 +348,62 @@ class EarthEngineTool:
             'recommendation': recommendation
         }
     
+    def _soil_image(self) -> ee.Image:
+        """OpenLandMap soil pH ('b0') and texture class ('b0_1') bands"""
+        soil_ph = ee.Image(SOIL_PH_DATASET).select('b0')
+        soil_texture = ee.Image(SOIL_TEXTURE_DATASET).select('b0')
+        return soil_ph.addBands(soil_texture)
+    
+    def _soil_expression(self, geometry: ee.Geometry) -> ee.Dictionary:
+        """Mean soil pH and texture class over the area (unevaluated)"""
+        return self._soil_image().reduceRegion(
+            reducer=ee.Reducer.mean(),
+            geometry=geometry,
+            scale=250,  # 250m resolution for soil data
+            maxPixels=1e9
+        )
+    
+    def _plot_soil_expression(self, features: ee.FeatureCollection) -> ee.List:
+        """[plot_id, pH, texture class, area m2] rows for every plot from one reduceRegions (unevaluated)"""
+        with_area = features.map(lambda feature: feature.set('area_m2', feature.geometry().area(1)))
+        reduced = self._soil_image().reduceRegions(
+            collection=with_area,
+            reducer=ee.Reducer.mean(),
+            scale=250,
+            tileScale=2
+        )
+        return reduced.reduceColumns(
+            ee.Reducer.toList(len(PLOT_SOIL_COLUMNS)), PLOT_SOIL_COLUMNS
+        ).get('list')
+    
+    def _soil_properties(self, soil_stats: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Interpreted soil properties from evaluated soil statistics"""
+        soil_stats = soil_stats or {}
+        ph_value = (soil_stats.get('b0') or 70) / 10  # Convert to pH scale
+        texture_class = soil_stats.get('b0_1') or 0
+        
+        # Interpret texture class (simplified)
+        texture_map = {
+            1: "Clay", 2: "Silty Clay", 3: "Sandy Clay",
+            4: "Clay Loam", 5: "Silty Clay Loam", 6: "Sandy Clay Loam",
+            7: "Loam", 8: "Silty Loam", 9: "Sandy Loam",
+            10: "Silt", 11: "Loamy Sand", 12: "Sand"
+        }
+        
+        texture_name = texture_map.get(int(texture_class), "Unknown")
+        
+        return {
+            'ph': round(ph_value, 1),
+            'texture_class': int(texture_class),
+            'texture_name': texture_name,
+            'ph_interpretation': self._interpret_ph(ph_value),
+            'texture_suitability': self._interpret_texture(texture_name)
+        }
+    
     def _get_soil_data(self, geometry: ee.Geometry) -> Dict[str, Any]:
         """Get soil information for the area"""
         try:
-            # OpenLandMap soil datasets
-            soil_ph = ee.Image('OpenLandMap/SOL/SOL_PH-H2O_USDA-4C1A2A_M/v02').select('b0')
-            soil_texture = ee.Image('OpenLandMap/SOL/SOL_TEXTURE-CLASS_USDA-TT_M/v02').select('b0')
-            
-            # Get soil statistics
-            soil_stats = soil_ph.addBands(soil_texture).reduceRegion(
-                reducer=ee.Reducer.mean(),
-                geometry=geometry,
-                scale=250,  # 250m resolution for soil data
-                maxPixels=1e9
-            ).getInfo()
-            
-            ph_value = soil_stats.get('b0', 70) / 10  # Convert to pH scale
-            texture_class = soil_stats.get('b0_1', 0)
-            
-            # Interpret texture class (simplified)
-            texture_map = {
-                1: "Clay", 2: "Silty Clay", 3: "Sandy Clay",
-                4: "Clay Loam", 5: "Silty Clay Loam", 6: "Sandy Clay Loam",
-                7: "Loam", 8: "Silty Loam", 9: "Sandy Loam",
-                10: "Silt", 11: "Loamy Sand", 12: "Sand"
-            }
-            
-            texture_name = texture_map.get(int(texture_class), "Unknown")
-            
-            return {
-                'ph': round(ph_value, 1),
-                'texture_class': int(texture_class),
-                'texture_name': texture_name,
-                'ph_interpretation': self._interpret_ph(ph_value),
-                'texture_suitability': self._interpret_texture(texture_name)
-            }
-            
+            return self._soil_properties(self._soil_expression(geometry).getInfo())
         except Exception as e:
             return {
                 'error': f"Failed to get soil data: {e}",
@@ -199,6 +435,172 @@ class EarthEngineTool:
         }
         return texture_advice.get(texture, "Moderate suitability for agriculture")
 
+# Static OpenLandMap soil layers; soil cache entries are keyed by these ids,
+# so a new dataset release invalidates them
+SOIL_PH_DATASET = 'OpenLandMap/SOL/SOL_PH-H2O_USDA-4C1A2A_M/v02'
+SOIL_TEXTURE_DATASET = 'OpenLandMap/SOL/SOL_TEXTURE-CLASS_USDA-TT_M/v02'
+SOIL_DATASET_VERSION = f"{SOIL_PH_DATASET}|{SOIL_TEXTURE_DATASET}"
+
+# Imagery thumbnails (RGB true colour; NDVI from red = stressed to green = healthy)
+RGB_VIS_PARAMS = {
+    'bands': ['B4', 'B3', 'B2'],
+    'min': 0,
+    'max': 3000,
+    'gamma': 1.4
+}
+NDVI_VIS_PARAMS = {
+    'min': 0,
+    'max': 1,
+    'palette': ['red', 'yellow', 'green']
+}
+
+# Most composite periods returned by one time series (longer windows get wider periods)
+MAX_COMPOSITE_PERIODS = 80
+
+# Columns of the per-plot NDVI table returned by reduceRegions
+PLOT_NDVI_COLUMNS = ['plot_id', 'mean', 'min', 'max', 'stdDev']
+
+# Columns of the per-plot soil table returned by reduceRegions
+PLOT_SOIL_COLUMNS = ['plot_id', 'b0', 'b0_1', 'area_m2']
+
+# Hours an Earth Engine thumbnail URL is served from the cache before it is regenerated
+# (locally stored thumbnails do not expire)
+THUMBNAIL_TTL_HOURS = 2
+
+def _imagery_url(digest: str) -> str:
+    """Public URL of a locally stored thumbnail"""
+    base_url = os.environ.get('API_BASE_URL', 'https://bloomapi-643988926049.europe-west1.run.app')
+    return f"{base_url}/api/imagery/{digest}.png"
+
+def _imagery_stale(imagery: Optional[Dict[str, Optional[str]]], age_seconds: float) -> bool:
+    """Whether cached thumbnail links must be regenerated (expired Earth Engine URLs or evicted files)"""
+    for url in (imagery or {}).values():
+        if url is None:
+            continue
+        digest = digest_from_url(url)
+        if digest is not None:
+            if not get_thumbnail_store().has(digest):
+                return True
+        elif age_seconds > THUMBNAIL_TTL_HOURS * 3600:
+            return True
+    return False
+
+def _crop_health_thumbnails(tool: EarthEngineTool, image: ee.Image, ndvi_image: ee.Image, geometry: ee.Geometry,
+                            image_id: Optional[str] = None,
+                            coordinates: Optional[List[List[float]]] = None) -> Dict[str, Optional[str]]:
+    keys = None
+    if image_id and coordinates:
+        keys = {
+            'rgb': thumbnail_key(image_id, 'rgb', RGB_VIS_PARAMS, coordinates),
+            'ndvi': thumbnail_key(image_id, 'ndvi', NDVI_VIS_PARAMS, coordinates)
+        }
+    thumbnails = tool._thumbnail_urls({
+        'rgb': (image, RGB_VIS_PARAMS),
+        'ndvi': (ndvi_image, NDVI_VIS_PARAMS)
+    }, geometry, keys)
+    return {
+        "rgb_image_url": thumbnails['rgb'],
+        "ndvi_image_url": thumbnails['ndvi']
+    }
+
+def _compute_crop_health(tool: EarthEngineTool, coordinates: List[List[float]], geometry: ee.Geometry,
+                         start_str: str, end_str: str) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Crop health result and the summary of the image it was computed from (None without images)"""
+    # Best image, its metadata and NDVI statistics are evaluated in one round trip
+    collection, image = tool._best_image(geometry, start_str, end_str)
+    ndvi_image = tool._calculate_ndvi(image)
+    summary = tool._evaluate({
+        'image': tool._image_summary_expression(collection, image, ndvi_image, geometry)
+    })['image']
+    
+    if summary is None:
+        return {
+            "error": "No suitable satellite images found for the specified area and time period",
+            "coordinates": coordinates,
+            "search_period": f"{start_str} to {end_str}"
+        }, None
+    
+    image_date = summary.get('time_start')
+    cloud_cover = summary.get('cloud_cover') or 0
+    ndvi_stats = tool._ndvi_stats(summary.get('ndvi'))
+    
+    # Interpret NDVI
+    interpretation = tool._interpret_ndvi(ndvi_stats['mean'])
+    
+    # Format image date
+    if image_date:
+        image_date_readable = datetime.fromtimestamp(image_date / 1000).strftime('%Y-%m-%d')
+    else:
+        image_date_readable = "Unknown"
+    
+    result = {
+        "analysis_type": "satellite_crop_health",
+        "coordinates": coordinates,
+        "image_info": {
+            "date": image_date_readable,
+            "cloud_cover_percent": round(cloud_cover, 1),
+            "satellite": "Sentinel-2",
+            "image_id": summary.get('image_id')
+        },
+        "ndvi_analysis": {
+            "mean_ndvi": round(ndvi_stats['mean'], 3),
+            "min_ndvi": round(ndvi_stats['min'], 3),
+            "max_ndvi": round(ndvi_stats['max'], 3),
+            "std_deviation": round(ndvi_stats['std_dev'], 3)
+        },
+        "crop_health": interpretation,
+        "imagery": _crop_health_thumbnails(tool, image, ndvi_image, geometry,
+                                           summary.get('image_id'), coordinates),
+        "analysis_timestamp": datetime.now().isoformat()
+    }
+    return result, summary
+
+def _cached_analysis(tool: EarthEngineTool, analysis: str, coordinates: List[List[float]], geometry: ee.Geometry,
+                     start_date: datetime, start_str: str, end_str: str, compute, refresh=None,
+                     **window) -> Dict[str, Any]:
+    """
+    Serve an analysis from the imagery cache while no newer qualifying image can
+    exist, revalidate it with a metadata-only probe after that, and recompute it
+    (compute() -> (result, image summary or None)) only when the best image changed.
+    """
+    cache = get_imagery_cache()
+    key = cache_key(analysis, coordinates, **window)
+    entry = cache.get(key)
+    now = time.time()
+    window_start_ms = int(start_date.timestamp() * 1000)
+    
+    status = None
+    if entry is not None:
+        if cache.is_fresh(entry, window_start_ms, now):
+            status = 'hits'
+        else:
+            collection, image = tool._best_image(geometry, start_str, end_str)
+            probe = tool._evaluate({'probe': tool._probe_expression(collection, image)})['probe']
+            if (probe or {}).get('image_id') == entry['image_id']:
+                status = 'revalidated'
+                cache.revalidate(key, (probe or {}).get('latest_time'), now)
+    
+    if status is None:
+        status = 'misses'
+        result, summary = compute()
+        if summary is None:
+            cache.put(key, result, now=now)
+        else:
+            cache.put(key, result, summary.get('image_id'), summary.get('time_start'),
+                      summary.get('latest_time'), now=now)
+    else:
+        result = entry['result']
+        if (refresh is not None and entry['image_id'] is not None
+                and _imagery_stale(result.get('imagery'), now - entry['created_at'])):
+            result = refresh(result, entry['image_id'])
+            cache.revalidate(key, entry['latest_time'], now, result=result)
+    
+    cache.record(status)
+    return dict(result, cache={
+        "status": {'hits': 'hit', 'revalidated': 'revalidated', 'misses': 'miss'}[status],
+        "image_id": entry['image_id'] if status != 'misses' else (result.get('image_info') or {}).get('image_id')
+    })
+
 def get_satellite_crop_health(coordinates: List[List[float]], days_back: int = 30) -> str:
     """
     Get crop health analysis using satellite NDVI data.
@@ -210,9 +612,9 @@ def get_satellite_crop_health(coordinates: List[List[float]], days_back: int = 3
     Returns:
         JSON string with crop health analysis
     """
-    tool = EarthEngineTool()
-    
     try:
+        tool = get_earth_engine_tool()
+        
         # Create geometry
         geometry = tool._create_geometry(coordinates)
         
@@ -223,100 +625,163 @@ def get_satellite_crop_health(coordinates: List[List[float]], days_back: int = 3
         start_str = start_date.strftime('%Y-%m-%d')
         end_str = end_date.strftime('%Y-%m-%d')
         
-        # Get best available image
-        image = tool._get_best_image(geometry, start_str, end_str)
+        def compute():
+            return _compute_crop_health(tool, coordinates, geometry, start_str, end_str)
         
-        if image is None:
-            return json.dumps({
-                "error": "No suitable satellite images found for the specified area and time period",
-                "coordinates": coordinates,
-                "search_period": f"{start_str} to {end_str}"
-            })
+        def refresh(result, image_id):
+            # Thumbnail URLs expire; regenerate them for the cached image without recomputing NDVI
+            image = ee.Image(image_id)
+            result['imagery'] = _crop_health_thumbnails(tool, image, tool._calculate_ndvi(image), geometry,
+                                                        image_id, coordinates)
+            return result
         
-        # Get image metadata
-        image_info = image.getInfo()
-        image_properties = image_info.get('properties', {})
-        image_date = image_properties.get('system:time_start')
-        cloud_cover = image_properties.get('CLOUDY_PIXEL_PERCENTAGE', 0)
+        result = _cached_analysis(tool, 'satellite_crop_health', coordinates, geometry, start_date,
+                                  start_str, end_str, compute, refresh, days_back=days_back)
+        return json.dumps(result, indent=2)
         
-        # Calculate NDVI
-        ndvi_image = tool._calculate_ndvi(image)
-        ndvi_stats = tool._get_ndvi_stats(ndvi_image, geometry)
+    except EarthEngineError as e:
+        return json.dumps({"error": str(e), "coordinates": coordinates})
+    except Exception as e:
+        return json.dumps({"error": f"Unexpected error: {e}", "coordinates": coordinates})
+
+def _farm_plots(records: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """Plot polygons of the current farm (plot_base_information.csv via the merged records)"""
+    plots = {}
+    for record in get_farm_data_store().records if records is None else records:
+        plot_id = record.get('base_plot_id')
+        if not plot_id or plot_id in plots:
+            continue
+        try:
+            coordinates = json.loads(record.get('coordinates_geojson') or '[]')
+        except (TypeError, ValueError):
+            coordinates = []
+        plots[plot_id] = {
+            'plot_id': plot_id,
+            'plot_name': record.get('plot_name'),
+            'area_hectares': record.get('area_hectares'),
+            'coordinates': coordinates
+        }
+    return [plots[plot_id] for plot_id in sorted(plots)]
+
+def get_farm_crop_health(days_back: int = 30) -> str:
+    """
+    Get crop health for every plot on the farm from satellite NDVI in one request.
+    
+    Args:
+        days_back: Number of days back to search for images
+    
+    Returns:
+        JSON string with NDVI statistics and health status per plot
+    """
+    try:
+        tool = get_earth_engine_tool()
         
-        # Interpret NDVI
-        interpretation = tool._interpret_ndvi(ndvi_stats['mean'])
+        plots = _farm_plots()
+        mapped = [plot for plot in plots if len(plot['coordinates']) >= 3]
+        unmapped = [plot['plot_id'] for plot in plots if len(plot['coordinates']) < 3]
+        if not mapped:
+            return json.dumps({"error": "No plot boundaries found for this farm", "plots_without_boundaries": unmapped})
         
-        # Format image date
-        if image_date:
-            image_date_readable = datetime.fromtimestamp(image_date / 1000).strftime('%Y-%m-%d')
-        else:
-            image_date_readable = "Unknown"
-        
-        # Generate visualization URLs
-        # RGB True Color visualization
-        rgb_vis_params = {
-            'bands': ['B4', 'B3', 'B2'],
-            'min': 0,
-            'max': 3000,
-            'gamma': 1.4
-        }
+        features = tool._plot_features(mapped)
+        region = features.geometry()
         
-        # NDVI visualization (green = healthy, red = stressed)
-        ndvi_vis_params = {
-            'min': 0,
-            'max': 1,
-            'palette': ['red', 'yellow', 'green']
-        }
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=days_back)
+        start_str = start_date.strftime('%Y-%m-%d')
+        end_str = end_date.strftime('%Y-%m-%d')
         
-        try:
-            # Get thumbnail URLs with better zoom level
-            # Add buffer around geometry to show surrounding context (500m buffer)
-            buffered_geometry = geometry.buffer(500)  # 500 meters buffer
-            bounds = buffered_geometry.bounds()
-            
-            rgb_thumb_url = image.visualize(**rgb_vis_params).getThumbURL({
-                'region': bounds,
-                'dimensions': 512,
-                'format': 'png'
+        def compute():
+            # One shared acquisition for the whole farm: the least cloudy pass, mosaicked
+            # across tiles, reduced over every plot polygon in a single reduceRegions
+            collection, best = tool._best_image(region, start_str, end_str)
+            same_pass = collection.filterDate(best.date(), best.date().advance(1, 'day')).mosaic()
+            summary = ee.Dictionary({
+                'image_id': best.id(),
+                'time_start': best.get('system:time_start'),
+                'latest_time': collection.aggregate_max('system:time_start'),
+                'cloud_cover': best.get('CLOUDY_PIXEL_PERCENTAGE'),
+                'plots': tool._plot_ndvi_expression(tool._calculate_ndvi(same_pass), features)
             })
+            summary = tool._evaluate({
+                'image': ee.Algorithms.If(collection.size().gt(0), summary, None)
+            })['image']
             
-            ndvi_thumb_url = ndvi_image.visualize(**ndvi_vis_params).getThumbURL({
-                'region': bounds,
-                'dimensions': 512,
-                'format': 'png'
-            })
-        except Exception as e:
-            rgb_thumb_url = None
-            ndvi_thumb_url = None
-        
-        result = {
-            "analysis_type": "satellite_crop_health",
-            "coordinates": coordinates,
-            "image_info": {
-                "date": image_date_readable,
-                "cloud_cover_percent": round(cloud_cover, 1),
-                "satellite": "Sentinel-2"
-            },
-            "ndvi_analysis": {
-                "mean_ndvi": round(ndvi_stats['mean'], 3),
-                "min_ndvi": round(ndvi_stats['min'], 3),
-                "max_ndvi": round(ndvi_stats['max'], 3),
-                "std_deviation": round(ndvi_stats['std_dev'], 3)
-            },
-            "crop_health": interpretation,
-            "imagery": {
-                "rgb_image_url": rgb_thumb_url,
-                "ndvi_image_url": ndvi_thumb_url
-            },
-            "analysis_timestamp": datetime.now().isoformat()
-        }
+            if summary is None:
+                return {
+                    "error": "No suitable satellite images found for the farm and time period",
+                    "search_period": f"{start_str} to {end_str}"
+                }, None
+            return _farm_crop_health_result(tool, mapped, unmapped, summary, start_str, end_str), summary
         
+        coordinates = [point for plot in mapped for point in plot['coordinates']]
+        result = _cached_analysis(tool, 'farm_crop_health', coordinates, region, start_date, start_str, end_str,
+                                  compute, days_back=days_back, plots=[plot['plot_id'] for plot in mapped])
         return json.dumps(result, indent=2)
         
     except EarthEngineError as e:
-        return json.dumps({"error": str(e), "coordinates": coordinates})
+        return json.dumps({"error": str(e)})
     except Exception as e:
-        return json.dumps({"error": f"Unexpected error: {e}", "coordinates": coordinates})
+        return json.dumps({"error": f"Unexpected error: {e}"})
+
+def _farm_crop_health_result(tool: EarthEngineTool, plots: List[Dict[str, Any]], unmapped: List[str],
+                             summary: Dict[str, Any], start_str: str, end_str: str) -> Dict[str, Any]:
+    stats = {row[0]: row[1:] for row in summary.get('plots') or []}
+    
+    plot_results = []
+    for plot in plots:
+        row = stats.get(plot['plot_id'])
+        if not row or row[0] is None:
+            # Fully masked (e.g. cloud or no coverage in the shared pass)
+            plot_results.append({"plot_id": plot['plot_id'], "plot_name": plot['plot_name'],
+                                 "area_hectares": plot['area_hectares'], "ndvi_analysis": None,
+                                 "crop_health": None})
+            continue
+        mean, minimum, maximum, std_dev = (value or 0 for value in row)
+        plot_results.append({
+            "plot_id": plot['plot_id'],
+            "plot_name": plot['plot_name'],
+            "area_hectares": plot['area_hectares'],
+            "ndvi_analysis": {
+                "mean_ndvi": round(mean, 3),
+                "min_ndvi": round(minimum, 3),
+                "max_ndvi": round(maximum, 3),
+                "std_deviation": round(std_dev, 3)
+            },
+            "crop_health": tool._interpret_ndvi(mean)
+        })
+    
+    analysed = [p for p in plot_results if p['ndvi_analysis']]
+    weights = [p['area_hectares'] or 0 for p in analysed]
+    if analysed and sum(weights) > 0:
+        farm_ndvi = sum(p['ndvi_analysis']['mean_ndvi'] * w for p, w in zip(analysed, weights)) / sum(weights)
+    elif analysed:
+        farm_ndvi = sum(p['ndvi_analysis']['mean_ndvi'] for p in analysed) / len(analysed)
+    else:
+        farm_ndvi = None
+    
+    image_date = summary.get('time_start')
+    return {
+        "analysis_type": "farm_crop_health",
+        "search_period": f"{start_str} to {end_str}",
+        "image_info": {
+            "date": datetime.fromtimestamp(image_date / 1000).strftime('%Y-%m-%d') if image_date else "Unknown",
+            "cloud_cover_percent": round(summary.get('cloud_cover') or 0, 1),
+            "satellite": "Sentinel-2",
+            "image_id": summary.get('image_id')
+        },
+        "plots": plot_results,
+        "farm_summary": {
+            "plots_analyzed": len(analysed),
+            "plots_without_data": [p['plot_id'] for p in plot_results if not p['ndvi_analysis']],
+            "plots_without_boundaries": unmapped,
+            # Area-weighted mean NDVI across the analysed plots
+            "farm_mean_ndvi": round(farm_ndvi, 3) if farm_ndvi is not None else None,
+            "farm_health": tool._interpret_ndvi(farm_ndvi)['health_status'] if farm_ndvi is not None else None,
+            "plots_needing_attention": [p['plot_name'] or p['plot_id'] for p in analysed
+                                        if p['ndvi_analysis']['mean_ndvi'] <= 0.3]
+        },
+        "analysis_timestamp": datetime.now().isoformat()
+    }
 
 def get_soil_analysis(coordinates: List[List[float]]) -> str:
     """
@@ -328,18 +793,24 @@ def get_soil_analysis(coordinates: List[List[float]]) -> str:
     Returns:
         JSON string with soil analysis
     """
-    tool = EarthEngineTool()
-    
     try:
+        tool = get_earth_engine_tool()
+        
         # Create geometry
         geometry = tool._create_geometry(coordinates)
         
-        # Get soil data
-        soil_data = tool._get_soil_data(geometry)
-        
-        # Calculate area
-        area_m2 = geometry.area().getInfo()
-        area_hectares = area_m2 / 10000
+        # Soil layers are static: statistics and area are fetched once per geometry
+        cache = get_soil_cache()
+        values = cache.get(coordinates, SOIL_DATASET_VERSION)
+        cached = values is not None
+        if not cached:
+            values = tool._evaluate({
+                'soil': tool._soil_expression(geometry),
+                'area_m2': geometry.area(maxError=1)
+            })
+            cache.put(coordinates, SOIL_DATASET_VERSION, values)
+        soil_data = tool._soil_properties(values['soil'])
+        area_hectares = values['area_m2'] / 10000
         
         result = {
             "analysis_type": "soil_analysis",
@@ -351,6 +822,7 @@ def get_soil_analysis(coordinates: List[List[float]]) -> str:
                 "texture_suitability": soil_data.get('texture_suitability', 'Unknown'),
                 "general_advice": "Consider soil testing for detailed nutrient analysis"
             },
+            "cache": {"status": "hit" if cached else "miss"},
             "analysis_timestamp": datetime.now().isoformat()
         }
         
@@ -361,6 +833,100 @@ def get_soil_analysis(coordinates: List[List[float]]) -> str:
     except Exception as e:
         return json.dumps({"error": f"Unexpected error: {e}", "coordinates": coordinates})
 
+def _farm_soil(tool: EarthEngineTool, plots: List[Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, Any]], int]:
+    """Soil values per plot id from the soil cache, fetching every missing plot in one reduceRegions"""
+    cache = get_soil_cache()
+    soil = {}
+    missing = []
+    for plot in plots:
+        values = cache.get(plot['coordinates'], SOIL_DATASET_VERSION)
+        if values is None:
+            missing.append(plot)
+        else:
+            soil[plot['plot_id']] = values
+    
+    if missing:
+        coordinates = {plot['plot_id']: plot['coordinates'] for plot in missing}
+        rows = tool._evaluate({
+            'plots': tool._plot_soil_expression(tool._plot_features(missing))
+        })['plots'] or []
+        for plot_id, ph, texture_class, area_m2 in rows:
+            values = {'soil': {'b0': ph, 'b0_1': texture_class}, 'area_m2': area_m2}
+            cache.put(coordinates[plot_id], SOIL_DATASET_VERSION, values)
+            soil[plot_id] = values
+    return soil, len(missing)
+
+def prefetch_soil_properties(records: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Populate the soil cache for every plot with a boundary (called at ingest time).
+    
+    Args:
+        records: Merged farm records (defaults to the current farm data store)
+    
+    Returns:
+        Counts of plots found, already cached and fetched
+    """
+    plots = [plot for plot in _farm_plots(records) if len(plot['coordinates']) >= 3]
+    if not plots:
+        return {"plots": 0, "cached": 0, "fetched": 0}
+    soil, fetched = _farm_soil(get_earth_engine_tool(), plots)
+    return {"plots": len(plots), "cached": len(plots) - fetched, "fetched": fetched,
+            "missing": [plot['plot_id'] for plot in plots if plot['plot_id'] not in soil]}
+
+def get_farm_soil_analysis() -> str:
+    """
+    Get soil properties for every plot on the farm.
+    
+    Returns:
+        JSON string with soil pH and texture per plot
+    """
+    try:
+        tool = get_earth_engine_tool()
+        
+        plots = _farm_plots()
+        mapped = [plot for plot in plots if len(plot['coordinates']) >= 3]
+        if not mapped:
+            return json.dumps({"error": "No plot boundaries found for this farm"})
+        
+        soil, fetched = _farm_soil(tool, mapped)
+        
+        plot_results = []
+        for plot in mapped:
+            values = soil.get(plot['plot_id'])
+            soil_data = tool._soil_properties(values['soil']) if values else None
+            area_m2 = (values or {}).get('area_m2')
+            plot_results.append({
+                "plot_id": plot['plot_id'],
+                "plot_name": plot['plot_name'],
+                "area_hectares": round(area_m2 / 10000, 2) if area_m2 else plot['area_hectares'],
+                "soil_properties": soil_data
+            })
+        
+        analysed = [p['soil_properties'] for p in plot_results if p['soil_properties']]
+        textures = {}
+        for soil_data in analysed:
+            textures[soil_data['texture_name']] = textures.get(soil_data['texture_name'], 0) + 1
+        
+        result = {
+            "analysis_type": "farm_soil_analysis",
+            "plots": plot_results,
+            "farm_summary": {
+                "plots_analyzed": len(analysed),
+                "plots_without_data": [p['plot_id'] for p in plot_results if not p['soil_properties']],
+                "plots_without_boundaries": [plot['plot_id'] for plot in plots if len(plot['coordinates']) < 3],
+                "mean_ph": round(sum(s['ph'] for s in analysed) / len(analysed), 1) if analysed else None,
+                "texture_counts": textures
+            },
+            "cache": {"cached_plots": len(mapped) - fetched, "fetched_plots": fetched},
+            "analysis_timestamp": datetime.now().isoformat()
+        }
+        return json.dumps(result, indent=2)
+        
+    except EarthEngineError as e:
+        return json.dumps({"error": str(e)})
+    except Exception as e:
+        return json.dumps({"error": f"Unexpected error: {e}"})
+
 def get_soil_moisture_map(coordinates: List[List[float]], include_soil_properties: bool = True) -> str:
     """
     Get soil moisture analysis and mapping data for agricultural planning.
@@ -372,17 +938,12 @@ def get_soil_moisture_map(coordinates: List[List[float]], include_soil_propertie
     Returns:
         JSON string with soil moisture and properties
     """
-    tool = EarthEngineTool()
-    
     try:
+        tool = get_earth_engine_tool()
+        
         # Create geometry
         geometry = tool._create_geometry(coordinates)
         
-        # Get soil properties if requested
-        soil_properties = None
-        if include_soil_properties:
-            soil_properties = tool._get_soil_data(geometry)
-        
         # Get NDVI as a proxy for vegetation water stress
         # (Real soil moisture would require SMAP/SMOS datasets with authentication)
         end_date = datetime.now()
@@ -391,74 +952,94 @@ def get_soil_moisture_map(coordinates: List[List[float]], include_soil_propertie
         start_str = start_date.strftime('%Y-%m-%d')
         end_str = end_date.strftime('%Y-%m-%d')
         
-        # Get recent image for vegetation analysis
-        image = tool._get_best_image(geometry, start_str, end_str)
-        
-        moisture_status = "Unknown"
-        moisture_level = 0.5  # Default medium
-        recommendation = "Monitor soil conditions"
-        
-        if image:
-            # Calculate NDVI as indicator of plant water stress
-            ndvi_image = tool._calculate_ndvi(image)
-            ndvi_stats = tool._get_ndvi_stats(ndvi_image, geometry)
-            mean_ndvi = ndvi_stats['mean']
+        def compute():
+            # Recent image summary, plus area and soil statistics unless the soil cache has them,
+            # in one round trip
+            soil_cache = get_soil_cache()
+            static = soil_cache.get(coordinates, SOIL_DATASET_VERSION)
+            collection, image = tool._best_image(geometry, start_str, end_str)
+            expressions = {
+                'image': tool._image_summary_expression(collection, image, tool._calculate_ndvi(image), geometry)
+            }
+            if static is None:
+                expressions['area_m2'] = geometry.area(maxError=1)
+                if include_soil_properties:
+                    expressions['soil'] = tool._soil_expression(geometry)
+            values = tool._evaluate(expressions)
+            if static is not None:
+                values.update(static)
+            elif include_soil_properties:
+                soil_cache.put(coordinates, SOIL_DATASET_VERSION,
+                               {'soil': values['soil'], 'area_m2': values['area_m2']})
+            
+            soil_properties = tool._soil_properties(values['soil']) if include_soil_properties else None
+            summary = values['image']
             
-            # Interpret moisture based on NDVI and soil properties
-            # High NDVI = good moisture, Low NDVI = potential water stress
-            if mean_ndvi > 0.6:
-                moisture_status = "Good"
-                moisture_level = 0.75
-                recommendation = "Soil moisture appears adequate. Continue monitoring."
-            elif mean_ndvi > 0.4:
-                moisture_status = "Moderate"
-                moisture_level = 0.5
-                recommendation = "Consider irrigation if no rain expected in next 3-5 days."
-            elif mean_ndvi > 0.2:
-                moisture_status = "Low"
-                moisture_level = 0.3
-                recommendation = "Irrigation recommended. Check soil moisture levels."
+            moisture_status = "Unknown"
+            moisture_level = 0.5  # Default medium
+            recommendation = "Monitor soil conditions"
+            
+            if summary:
+                # NDVI as indicator of plant water stress
+                mean_ndvi = tool._ndvi_stats(summary.get('ndvi'))['mean']
+            
+                # Interpret moisture based on NDVI and soil properties
+                # High NDVI = good moisture, Low NDVI = potential water stress
+                if mean_ndvi > 0.6:
+                    moisture_status = "Good"
+                    moisture_level = 0.75
+                    recommendation = "Soil moisture appears adequate. Continue monitoring."
+                elif mean_ndvi > 0.4:
+                    moisture_status = "Moderate"
+                    moisture_level = 0.5
+                    recommendation = "Consider irrigation if no rain expected in next 3-5 days."
+                elif mean_ndvi > 0.2:
+                    moisture_status = "Low"
+                    moisture_level = 0.3
+                    recommendation = "Irrigation recommended. Check soil moisture levels."
+                else:
+                    moisture_status = "Very Low"
+                    moisture_level = 0.15
+                    recommendation = "Urgent irrigation needed. Crops may be water-stressed."
+            
+                image_date = datetime.fromtimestamp(
+                    (summary.get('time_start') or 0) / 1000
+                ).strftime('%Y-%m-%d')
             else:
-                moisture_status = "Very Low"
-                moisture_level = 0.15
-                recommendation = "Urgent irrigation needed. Crops may be water-stressed."
+                image_date = "No recent data"
             
-            image_date = datetime.fromtimestamp(
-                image.getInfo()['properties'].get('system:time_start', 0) / 1000
-            ).strftime('%Y-%m-%d')
-        else:
-            image_date = "No recent data"
-        
-        # Calculate area
-        area_m2 = geometry.area().getInfo()
-        area_hectares = area_m2 / 10000
-        
-        # Create moisture map data (simplified - one value per area)
-        moisture_map = {
-            "coordinates": coordinates,
-            "moisture_level": moisture_level,
-            "moisture_status": moisture_status,
-            "color": _get_moisture_color(moisture_level),
-            "area_hectares": round(area_hectares, 2)
-        }
-        
-        result = {
-            "analysis_type": "soil_moisture_map",
-            "coordinates": coordinates,
-            "area_hectares": round(area_hectares, 2),
-            "moisture_analysis": {
-                "status": moisture_status,
-                "level": moisture_level,
-                "recommendation": recommendation,
-                "analysis_date": image_date,
-                "method": "NDVI-based estimation"
-            },
-            "soil_properties": soil_properties,
-            "moisture_map": moisture_map,
-            "irrigation_priority": "High" if moisture_level < 0.4 else "Medium" if moisture_level < 0.6 else "Low",
-            "analysis_timestamp": datetime.now().isoformat()
-        }
+            area_hectares = values['area_m2'] / 10000
+            
+            # Create moisture map data (simplified - one value per area)
+            moisture_map = {
+                "coordinates": coordinates,
+                "moisture_level": moisture_level,
+                "moisture_status": moisture_status,
+                "color": _get_moisture_color(moisture_level),
+                "area_hectares": round(area_hectares, 2)
+            }
+            
+            result = {
+                "analysis_type": "soil_moisture_map",
+                "coordinates": coordinates,
+                "area_hectares": round(area_hectares, 2),
+                "moisture_analysis": {
+                    "status": moisture_status,
+                    "level": moisture_level,
+                    "recommendation": recommendation,
+                    "analysis_date": image_date,
+                    "method": "NDVI-based estimation"
+                },
+                "soil_properties": soil_properties,
+                "moisture_map": moisture_map,
+                "irrigation_priority": "High" if moisture_level < 0.4 else "Medium" if moisture_level < 0.6 else "Low",
+                "analysis_timestamp": datetime.now().isoformat()
+            }
+            
+            return result, summary
         
+        result = _cached_analysis(tool, 'soil_moisture_map', coordinates, geometry, start_date, start_str, end_str,
+                                  compute, days=16, include_soil_properties=include_soil_properties)
         return json.dumps(result, indent=2)
         
     except EarthEngineError as e:
@@ -477,20 +1058,23 @@ def _get_moisture_color(level: float) -> str:
     else:
         return "#ef4444"  # Red - very low
 
-def get_crop_monitoring_time_series(coordinates: List[List[float]], months_back: int = 6) -> str:
+def get_crop_monitoring_time_series(coordinates: List[List[float]], months_back: int = 6,
+                                    composite_days: int = 0) -> str:
     """
     Get time series analysis of crop health over multiple months.
     
     Args:
         coordinates: List of coordinate pairs [[lon, lat], ...] defining the area
         months_back: Number of months back to analyze
+        composite_days: 0 for every acquisition; 7 or 10 for median composites of that many
+            days computed server-side (use for long windows, e.g. 24 months)
     
     Returns:
         JSON string with time series crop health analysis
     """
-    tool = EarthEngineTool()
-    
     try:
+        tool = get_earth_engine_tool()
+        
         # Create geometry
         geometry = tool._create_geometry(coordinates)
         
@@ -500,86 +1084,61 @@ def get_crop_monitoring_time_series(coordinates: List[List[float]], months_back:
         
         start_str = start_date.strftime('%Y-%m-%d')
         end_str = end_date.strftime('%Y-%m-%d')
+        start_ms = int(start_date.timestamp() * 1000)
+        end_ms = int(end_date.timestamp() * 1000)
         
-        # Get image collection
-        collection = (ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED')
-                     .filterBounds(geometry)
-                     .filterDate(start_str, end_str)
-                     .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 30))
-                     .sort('system:time_start'))
+        if composite_days > 0:
+            return json.dumps(_composite_time_series(tool, coordinates, geometry, start_date, end_date,
+                                                     composite_days), indent=2)
         
-        # Get collection size
-        collection_size = collection.size().getInfo()
+        # Only acquisitions outside what the local store already holds are fetched
+        store = get_ndvi_series_store()
+        series = f"ndvi:{geometry_hash(coordinates)}"
+        ranges = store.missing_ranges(series, start_ms, end_ms)
+        fetched = tool._evaluate({
+            str(index): tool._ndvi_series_expression(geometry, range_start, range_end)
+            for index, (range_start, range_end) in enumerate(ranges)
+        }) if ranges else {}
+        new_images = 0
+        for index, (range_start, range_end) in enumerate(ranges):
+            rows = [row for row in fetched.get(str(index)) or [] if row[0] and row[1] is not None]
+            new_images += store.append(series, rows, range_start, range_end)
         
-        if collection_size == 0:
+        processed_data = []
+        for observation in store.observations(series, start_ms, end_ms):
+            ndvi_value = observation['ndvi']
+            cloud_cover = observation['cloud_cover']
+            processed_data.append({
+                # UTC, like the store's week and month rollup buckets
+                'date': datetime.fromtimestamp(observation['time_ms'] / 1000, tz=timezone.utc).strftime('%Y-%m-%d'),
+                'ndvi': round(ndvi_value, 3),
+                'cloud_cover': round(cloud_cover, 1) if cloud_cover else None,
+                'health_status': tool._interpret_ndvi(ndvi_value)['health_status']
+            })
+        
+        if not processed_data:
             return json.dumps({
                 "error": "No suitable satellite images found for the specified area and time period",
                 "coordinates": coordinates,
                 "time_period": f"{start_str} to {end_str}"
             })
         
-        # Calculate NDVI for each image and get mean values
-        def calculate_mean_ndvi(image):
-            ndvi = tool._calculate_ndvi(image)
-            mean_ndvi = ndvi.reduceRegion(
-                reducer=ee.Reducer.mean(),
-                geometry=geometry,
-                scale=10,
-                maxPixels=1e9
-            ).get('NDVI')
-            
-            return ee.Feature(None, {
-                'date': image.date().millis(),
-                'ndvi': mean_ndvi,
-                'cloud_cover': image.get('CLOUDY_PIXEL_PERCENTAGE')
-            })
-        
-        # Map over collection and get results
-        features = collection.map(calculate_mean_ndvi)
-        feature_list = features.getInfo()
-        
-        # Process time series data
-        processed_data = []
-        for feature in feature_list['features']:
-            props = feature['properties']
-            date_ms = props.get('date')
-            ndvi_value = props.get('ndvi')
-            cloud_cover = props.get('cloud_cover')
-            
-            if date_ms and ndvi_value is not None:
-                date_readable = datetime.fromtimestamp(date_ms / 1000).strftime('%Y-%m-%d')
-                processed_data.append({
-                    'date': date_readable,
-                    'ndvi': round(ndvi_value, 3),
-                    'cloud_cover': round(cloud_cover, 1) if cloud_cover else None,
-                    'health_status': tool._interpret_ndvi(ndvi_value)['health_status']
-                })
-        
-        # Sort by date
-        processed_data.sort(key=lambda x: x['date'])
-        
-        # Calculate trends
-        if len(processed_data) >= 2:
-            recent_ndvi = processed_data[-1]['ndvi']
-            older_ndvi = processed_data[0]['ndvi']
-            change = recent_ndvi - older_ndvi
-            trend = "Improving" if change > 0.05 else "Declining" if change < -0.05 else "Stable"
-        else:
-            trend = "Insufficient data"
-            change = 0
-        
         result = {
             "analysis_type": "crop_monitoring_time_series",
             "coordinates": coordinates,
             "time_period": f"{start_str} to {end_str}",
             "data_points": len(processed_data),
             "time_series_data": processed_data,
-            "trend_analysis": {
-                "overall_trend": trend,
-                "ndvi_change": round(change, 3) if len(processed_data) >= 2 else None,
-                "latest_ndvi": processed_data[-1]['ndvi'] if processed_data else None,
-                "latest_health": processed_data[-1]['health_status'] if processed_data else None,
-                "earliest_ndvi": processed_data[0]['ndvi'] if processed_data else None
+            "trend_analysis": _ndvi_trend(processed_data),
+            "weekly_ndvi": store.rollups(series, 'week', start_ms, end_ms),
+            "monthly_ndvi": store.rollups(series, 'month', start_ms, end_ms),
+            "series_store": {
+                "new_images": new_images,
+                "fetched_ranges": [
+                    f"{datetime.fromtimestamp(range_start / 1000, tz=timezone.utc).strftime('%Y-%m-%d')} to "
+                    f"{datetime.fromtimestamp(range_end / 1000, tz=timezone.utc).strftime('%Y-%m-%d')}"
+                    for range_start, range_end in ranges
+                ]
             },
             "analysis_timestamp": datetime.now().isoformat()
         }
@@ -591,10 +1150,74 @@ def get_crop_monitoring_time_series(coordinates: List[List[float]], months_back:
     except Exception as e:
         return json.dumps({"error": f"Unexpected error: {e}", "coordinates": coordinates})
 
+def _ndvi_trend(processed_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Overall trend from the first to the latest point of a series"""
+    if len(processed_data) >= 2:
+        recent_ndvi = processed_data[-1]['ndvi']
+        older_ndvi = processed_data[0]['ndvi']
+        change = recent_ndvi - older_ndvi
+        trend = "Improving" if change > 0.05 else "Declining" if change < -0.05 else "Stable"
+    else:
+        trend = "Insufficient data"
+        change = 0
+    
+    return {
+        "overall_trend": trend,
+        "ndvi_change": round(change, 3) if len(processed_data) >= 2 else None,
+        "latest_ndvi": processed_data[-1]['ndvi'] if processed_data else None,
+        "latest_health": processed_data[-1]['health_status'] if processed_data else None,
+        "earliest_ndvi": processed_data[0]['ndvi'] if processed_data else None
+    }
+
+def _composite_time_series(tool: EarthEngineTool, coordinates: List[List[float]], geometry: ee.Geometry,
+                           start_date: datetime, end_date: datetime, composite_days: int) -> Dict[str, Any]:
+    """Time series of median composites, returned as parallel arrays (one entry per period)"""
+    start_str = start_date.strftime('%Y-%m-%d')
+    end_str = end_date.strftime('%Y-%m-%d')
+    window_days = (end_date - start_date).days
+    # Widen the periods on very long windows so the response size stays bounded
+    composite_days = max(composite_days, -(-window_days // MAX_COMPOSITE_PERIODS))
+    periods = max(1, -(-window_days // composite_days))
+    arrays = tool._evaluate(tool._composite_series_expression(
+        geometry, int(start_date.timestamp() * 1000), int(end_date.timestamp() * 1000), composite_days, periods))
+    
+    processed_data = []
+    for date_ms, ndvi_value, cloud_fraction, images in zip(
+            arrays.get('dates') or [], arrays.get('ndvi') or [],
+            arrays.get('cloud_fraction') or [], arrays.get('images') or []):
+        processed_data.append({
+            'date': datetime.fromtimestamp(date_ms / 1000).strftime('%Y-%m-%d'),
+            'ndvi': round(ndvi_value, 3),
+            'cloud_fraction': round(cloud_fraction, 3) if cloud_fraction is not None else None,
+            'images': images,
+            'health_status': tool._interpret_ndvi(ndvi_value)['health_status']
+        })
+    
+    if not processed_data:
+        return {
+            "error": "No suitable satellite images found for the specified area and time period",
+            "coordinates": coordinates,
+            "time_period": f"{start_str} to {end_str}"
+        }
+    
+    return {
+        "analysis_type": "crop_monitoring_time_series",
+        "coordinates": coordinates,
+        "time_period": f"{start_str} to {end_str}",
+        "composite": {"days": composite_days, "reducer": "median", "periods": periods},
+        "data_points": len(processed_data),
+        "time_series_data": processed_data,
+        "trend_analysis": _ndvi_trend(processed_data),
+        "analysis_timestamp": datetime.now().isoformat()
+    }
+
 # Export the main functions for use by agents
 __all__ = [
     'get_satellite_crop_health',
+    'get_farm_crop_health',
     'get_soil_analysis',
+    'get_farm_soil_analysis',
     'get_crop_monitoring_time_series',
-    'get_soil_moisture_map'
+    'get_soil_moisture_map',
+    'get_earth_engine_health'
 ]
\ No newline at end of file
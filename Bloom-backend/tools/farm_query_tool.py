@@ -0,0 +1,51 @@
+"""
+Farm Query Tool for Bloom Agents
+Answers ad-hoc questions over the farm records (filter, group, aggregate,
+sort) in a single call, running the spec on the columnar query engine.
+"""
+
+import json
+from typing import Any, Dict, Union
+
+from utils.farm_query_engine import QUERY_SPEC_SCHEMA, get_query_engine
+
+def query_farm_data(spec: str) -> str:
+    """
+    Query the farm records with a declarative spec and get a compact table back.
+    Use this for questions the other data tools do not answer directly.
+
+    Args:
+        spec: JSON query spec, for example
+            {"filters": {"crop": "Maize", "year": {"gte": 2023}},
+             "group_by": ["plot_name"],
+             "metrics": ["count", "yield_tons_per_ha:mean", "revenue_kes:sum"],
+             "sort": ["-revenue_kes_sum"], "limit": 10}
+            Filters take a value, a list of values, or {operator: value}
+            (eq, ne, gt, gte, lt, lte, in, contains). Metrics are 'count' or
+            '<numeric column>:<count|sum|mean|min|max|std>'. Without metrics,
+            matching rows are returned (optionally only "columns").
+            String columns: plot_id, base_plot_id, plot_name, crop, stage, season.
+            Numeric columns: year, yield_tons_per_ha, revenue_kes, cost_kes, profit_kes,
+            profit_margin_percent, price_per_kg, area_hectares.
+
+    Returns:
+        JSON string with "columns" and "rows" (one list per row), or an error with the spec schema
+    """
+    try:
+        parsed: Union[Dict[str, Any], Any] = json.loads(spec) if isinstance(spec, str) else spec
+    except json.JSONDecodeError as e:
+        return json.dumps({"error": f"Spec is not valid JSON: {e}", "schema": QUERY_SPEC_SCHEMA})
+
+    try:
+        result = get_query_engine().query(parsed)
+    except ValueError as e:
+        return json.dumps({"error": f"Invalid query spec: {e}", "schema": QUERY_SPEC_SCHEMA})
+
+    result["analysis_type"] = "farm_query"
+    return json.dumps(result)
+
+
+# Export the main functions for use by agents
+__all__ = [
+    'query_farm_data'
+]
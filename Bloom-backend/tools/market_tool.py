@@ -4,26 +4,24 @@ Provides price tracking, expense analysis, inventory status, and sell timing.
 """
 
 import json
-import os
-from typing import Dict, List, Any, Optional
+from typing import List, Optional
 from collections import defaultdict
 from datetime import datetime
 
-# Path to the JSON data file
-JSON_DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'generated_data', 'merged_farm_data.json')
+from utils.farm_data_store import get_farm_data_store
+from utils.farm_records import FarmRecord
+from utils.farm_aggregates import get_farm_aggregates
+from utils.expense_ledger import get_expense_ledger
+from utils.price_analytics import get_price_analytics
 
-def _load_farm_data() -> List[Dict]:
-    """Load farm data from JSON file"""
-    try:
-        with open(JSON_DATA_PATH, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Error loading farm data: {e}")
-        return []
+def _load_farm_records(crop: Optional[str] = None) -> List[FarmRecord]:
+    """Typed farm records from the shared data store, optionally narrowed to one crop via its index"""
+    return get_farm_data_store().find_records(crop=crop)
 
 def get_price_chart(crop: Optional[str] = None) -> str:
     """
-    Get historical price trends for crops.
+    Get historical price trends for crops, with moving averages, seasonal
+    indices, volatility and a short-horizon price forecast per crop.
     
     Args:
         crop: Optional crop type to filter by
@@ -31,132 +29,51 @@ def get_price_chart(crop: Optional[str] = None) -> str:
     Returns:
         JSON string with price history data
     """
-    data = _load_farm_data()
-    
-    # Gather price data
-    price_data = defaultdict(list)
-    
-    for record in data:
-        record_crop = record.get('current_crop') or record.get('crop')
-        price = record.get('selling_price_kes_per_kg') or record.get('selling_price_kes_per_kg_profit')
-        plot_id = record.get('plot_id', '')
-        
-        if record_crop and price and plot_id:
-            parts = plot_id.split('_')
-            if len(parts) >= 4:
-                year = parts[2]
-                season = parts[3]
-                
-                # Filter by crop if specified
-                if crop and record_crop.lower() != crop.lower():
-                    continue
-                
-                price_data[record_crop].append({
-                    'year': year,
-                    'season': season,
-                    'period': f"{year} {season}",
-                    'price_per_kg': price
-                })
-    
-    # Sort by period
-    for crop_name in price_data:
-        price_data[crop_name].sort(key=lambda x: (x['year'], x['season']))
-    
-    # Calculate trends
-    trends = {}
-    for crop_name, prices in price_data.items():
-        if len(prices) >= 2:
-            first_price = prices[0]['price_per_kg']
-            last_price = prices[-1]['price_per_kg']
-            change = ((last_price - first_price) / first_price * 100) if first_price > 0 else 0
-            trend = 'Increasing' if change > 5 else 'Decreasing' if change < -5 else 'Stable'
-        else:
-            change = 0
-            trend = 'Insufficient data'
-        
-        trends[crop_name] = {
-            'trend': trend,
-            'change_percent': round(change, 1),
-            'current_price': prices[-1]['price_per_kg'] if prices else 0,
-            'avg_price': round(sum(p['price_per_kg'] for p in prices) / len(prices), 2) if prices else 0
-        }
+    # Served from the aggregates and models materialised for the current data version
+    price_data, trends = get_farm_aggregates().price_chart(crop)
     
     result = {
         "analysis_type": "price_chart",
         "crop_filter": crop,
-        "price_data": dict(price_data),
+        "price_data": price_data,
         "trends": trends,
+        "analytics": get_price_analytics().analytics(crop),
         "analysis_timestamp": datetime.now().isoformat()
     }
     
     return json.dumps(result, indent=2)
 
-def get_expense_tracker() -> str:
+def get_expense_tracker(start_date: Optional[str] = None, end_date: Optional[str] = None) -> str:
     """
-    Get expense breakdown by category over time.
+    Get expense breakdown by category over time from the transaction ledger.
+    
+    Args:
+        start_date: Optional first day to include (YYYY-MM-DD)
+        end_date: Optional last day to include (YYYY-MM-DD)
     
     Returns:
         JSON string with expense tracking data
     """
-    data = _load_farm_data()
+    for value in (start_date, end_date):
+        if value:
+            try:
+                datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                return json.dumps({"error": f"Invalid date '{value}', expected YYYY-MM-DD"})
     
-    # Aggregate expenses by category
-    total_expenses = {
-        'fertilizer': 0,
-        'seeds': 0,
-        'labor': 0,
-        'pesticide': 0,
-        'fuel': 0,
-        'maintenance': 0,
-        'transport': 0
-    }
-    
-    # Also track by period
-    period_expenses = defaultdict(lambda: defaultdict(float))
-    
-    for record in data:
-        plot_id = record.get('plot_id', '')
-        
-        # Aggregate totals
-        total_expenses['fertilizer'] += record.get('fertilizer_cost_kes', 0)
-        total_expenses['seeds'] += record.get('seeds_cost_kes', 0)
-        total_expenses['labor'] += record.get('labor_cost_kes', 0)
-        total_expenses['pesticide'] += record.get('pesticide_cost_kes', 0)
-        total_expenses['fuel'] += record.get('fuel_cost_kes', 0)
-        total_expenses['maintenance'] += record.get('maintenance_cost_kes', 0)
-        total_expenses['transport'] += record.get('transport_cost_kes', 0)
-        
-        # Track by period
-        if plot_id:
-            parts = plot_id.split('_')
-            if len(parts) >= 4:
-                period = f"{parts[2]} {parts[3]}"
-                period_expenses[period]['fertilizer'] += record.get('fertilizer_cost_kes', 0)
-                period_expenses[period]['seeds'] += record.get('seeds_cost_kes', 0)
-                period_expenses[period]['labor'] += record.get('labor_cost_kes', 0)
-                period_expenses[period]['pesticide'] += record.get('pesticide_cost_kes', 0)
-                period_expenses[period]['fuel'] += record.get('fuel_cost_kes', 0)
-    
-    # Calculate percentages
-    total = sum(total_expenses.values())
-    expense_breakdown = []
-    for category, amount in total_expenses.items():
-        if amount > 0:
-            expense_breakdown.append({
-                'category': category.capitalize(),
-                'amount': amount,
-                'percentage': round((amount / total * 100), 1) if total > 0 else 0
-            })
-    
-    # Sort by amount
-    expense_breakdown.sort(key=lambda x: x['amount'], reverse=True)
+    # Rollups and date-range totals from the ledger's sorted date index
+    expenses = get_expense_ledger().summary(start_date, end_date)
     
     result = {
         "analysis_type": "expense_tracker",
-        "total_expenses": total,
-        "expense_breakdown": expense_breakdown,
-        "period_expenses": dict(period_expenses),
-        "top_expense": expense_breakdown[0]['category'] if expense_breakdown else None,
+        "date_range": {"start": start_date, "end": end_date},
+        "total_expenses": expenses['total_expenses'],
+        "transaction_count": expenses['transaction_count'],
+        "expense_breakdown": expenses['expense_breakdown'],
+        "period_expenses": expenses['period_expenses'],
+        "monthly_expenses": expenses['monthly_expenses'],
+        "plot_expenses": expenses['plot_expenses'],
+        "top_expense": expenses['top_expense'],
         "analysis_timestamp": datetime.now().isoformat()
     }
     
@@ -169,20 +86,16 @@ def get_inventory_status() -> str:
     Returns:
         JSON string with inventory data
     """
-    data = _load_farm_data()
+    data = _load_farm_records()
     
     # Aggregate inventory
     inventory = defaultdict(lambda: {'stock_kg': 0, 'value_kes': 0})
     
     for record in data:
-        crop = record.get('crop_type_inv')
-        stock = record.get('current_stock_kg_inv')
-        value = record.get('estimated_value_kes')
-        
-        if crop and stock:
-            inventory[crop]['stock_kg'] += stock
-            if value:
-                inventory[crop]['value_kes'] += value
+        if record.inventory_crop and record.stock_kg:
+            inventory[record.inventory_crop]['stock_kg'] += record.stock_kg
+            if record.stock_value_kes:
+                inventory[record.inventory_crop]['value_kes'] += record.stock_value_kes
     
     # Format inventory list
     inventory_list = []
@@ -220,27 +133,13 @@ def get_sell_timing_recommendation(crop: str) -> str:
     Returns:
         JSON string with sell timing recommendation
     """
-    data = _load_farm_data()
+    price_data, _ = get_farm_aggregates().price_chart(crop)
     
     # Gather price data for this crop
-    price_history = []
-    
-    for record in data:
-        record_crop = record.get('current_crop') or record.get('crop')
-        price = record.get('selling_price_kes_per_kg') or record.get('selling_price_kes_per_kg_profit')
-        plot_id = record.get('plot_id', '')
-        
-        if record_crop and record_crop.lower() == crop.lower() and price and plot_id:
-            parts = plot_id.split('_')
-            if len(parts) >= 4:
-                year = parts[2]
-                season = parts[3]
-                price_history.append({
-                    'year': year,
-                    'season': season,
-                    'period': f"{year} {season}",
-                    'price': price
-                })
+    price_history = [
+        {'year': entry['year'], 'season': entry['season'], 'period': entry['period'], 'price': entry['price_per_kg']}
+        for series in price_data.values() for entry in series
+    ]
     
     if not price_history:
         return json.dumps({"error": f"No price history found for {crop}"})
@@ -276,6 +175,17 @@ def get_sell_timing_recommendation(crop: str) -> str:
         recommendation = f"Consider waiting - prices typically peak in {best_season}"
         timing = "Wait"
     
+    # Next-season forecast from the crop's fitted Holt-Winters model
+    analytics = next(iter(get_price_analytics().analytics(crop).values()), None)
+    forecast = analytics['forecast'] if analytics else []
+    expected_change = None
+    if forecast and current_price:
+        expected_change = round((forecast[0]['price'] - current_price) / current_price * 100, 1)
+        if expected_change > 5:
+            recommendation += f". Prices are forecast to rise about {expected_change}% by {forecast[0]['period']}"
+        elif expected_change < -5:
+            recommendation += f". Prices are forecast to fall about {abs(expected_change)}% by {forecast[0]['period']}"
+    
     result = {
         "analysis_type": "sell_timing_recommendation",
         "crop": crop,
@@ -286,6 +196,10 @@ def get_sell_timing_recommendation(crop: str) -> str:
         "timing": timing,
         "price_history": price_history,
         "season_averages": {k: round(v, 2) for k, v in season_averages.items()},
+        "forecast": forecast,
+        "expected_change_percent": expected_change,
+        "volatility_percent": analytics['volatility_percent'] if analytics else None,
+        "seasonal_index": analytics['seasonal_index'] if analytics else {},
         "analysis_timestamp": datetime.now().isoformat()
     }
     
@@ -5,21 +5,61 @@ Provides crop planning, budgeting, rotation, and profitability forecasting.
 
 import json
 import os
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from collections import defaultdict
 from datetime import datetime
 
-# Path to the JSON data file
-JSON_DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'generated_data', 'merged_farm_data.json')
+from utils.farm_data_store import get_farm_data_store
+from utils.farm_records import FarmRecord
+from utils.farm_aggregates import get_farm_aggregates
+from utils.scenario_engine import get_scenario_model
+from utils.rotation_optimizer import build_rotation_problem, optimize_rotation
+from utils.yield_model import get_yield_model, predict_yields
 
-def _load_farm_data() -> List[Dict]:
-    """Load farm data from JSON file"""
+def _load_farm_records(crop: Optional[str] = None, plot_name: Optional[str] = None) -> List[FarmRecord]:
+    """Typed farm records from the shared data store, optionally narrowed via its indexes"""
+    return get_farm_data_store().find_records(crop=crop, plot_name=plot_name)
+
+def _historical_yields(plot_name: Optional[str] = None) -> Dict[str, float]:
+    """Mean historical yield (t/ha) per lowercased crop over the plot's or every plot's records"""
+    yields = defaultdict(list)
+    for record in _load_farm_records(plot_name=plot_name):
+        if record.crop and record.yield_tons_per_ha:
+            yields[record.crop.lower()].append(record.yield_tons_per_ha)
+    return {crop: round(sum(values) / len(values), 2) for crop, values in yields.items()}
+
+def _predicted_yields(plot_name: Optional[str] = None) -> Tuple[Dict[str, float], Dict[str, Any]]:
+    """
+    Next-season yield (t/ha) per lowercased crop, averaged over the plot's or every plot,
+    and the yield_model block describing where it came from. Falls back to the
+    historical per-crop means when the farm has no trained model artifact.
+    """
     try:
-        with open(JSON_DATA_PATH, 'r') as f:
-            return json.load(f)
+        model = get_yield_model()
+        predictions = predict_yields() if model is not None else None
     except Exception as e:
-        print(f"Error loading farm data: {e}")
-        return []
+        print(f"Error predicting yields: {e}")
+        model, predictions = None, None
+
+    if predictions is None:
+        return _historical_yields(plot_name), {
+            "version": None,
+            "model": "historical_mean",
+            "note": "No trained yield model for this farm (setup/train_yield_model.py); using historical means"
+        }
+
+    if plot_name:
+        plots = {record.base_plot_id for record in _load_farm_records(plot_name=plot_name)}
+        predictions = predictions[predictions['plot'].isin(plots)]
+    means = predictions.groupby('crop')['predicted_yield_tons_per_ha'].mean()
+    manifest = model.manifest
+    return {crop.lower(): round(float(value), 2) for crop, value in means.items()}, {
+        "version": manifest['version'],
+        "model": manifest['model'],
+        "cv_mae_tons_per_ha": manifest['cv_mae_tons_per_ha'],
+        "baseline_mae_tons_per_ha": manifest['baseline_mae_tons_per_ha'],
+        "trained_on_current_data": manifest.get('data_version') == get_farm_data_store().version
+    }
 
 def get_crop_recommendation(plot_name: Optional[str] = None) -> str:
     """
@@ -31,127 +71,110 @@ def get_crop_recommendation(plot_name: Optional[str] = None) -> str:
     Returns:
         JSON string with crop recommendations ranked by suitability
     """
-    data = _load_farm_data()
+    # Served from the aggregates materialised for the current data version
+    recommendations = get_farm_aggregates().crop_recommendations
     
-    # Analyze crop profitability
-    crop_analysis = defaultdict(lambda: {
-        'profit_margins': [],
-        'yields': [],
-        'revenues': [],
-        'success_count': 0
-    })
-    
-    for record in data:
-        crop = record.get('current_crop') or record.get('crop')
-        margin = record.get('profit_margin_percent')
-        yield_val = record.get('yield_tonnes_per_ha') or record.get('yield_tonnes_per_ha_profit')
-        revenue = record.get('revenue_kes') or record.get('revenue_kes_profit')
-        
-        if crop and margin:
-            crop_analysis[crop]['profit_margins'].append(margin)
-            crop_analysis[crop]['success_count'] += 1
-            if yield_val:
-                crop_analysis[crop]['yields'].append(yield_val)
-            if revenue:
-                crop_analysis[crop]['revenues'].append(revenue)
-    
-    # Calculate averages and rank
-    recommendations = []
-    for crop, stats in crop_analysis.items():
-        margins = stats['profit_margins']
-        yields = stats['yields']
-        revenues = stats['revenues']
-        
-        avg_margin = sum(margins) / len(margins) if margins else 0
-        avg_yield = sum(yields) / len(yields) if yields else 0
-        avg_revenue = sum(revenues) / len(revenues) if revenues else 0
-        
-        # Simple scoring: weighted by margin and success rate
-        score = (avg_margin * 0.6) + (stats['success_count'] * 5)
-        
-        recommendations.append({
-            'crop': crop,
-            'score': round(score, 1),
-            'avg_profit_margin': round(avg_margin, 1),
-            'avg_yield_tons_per_ha': round(avg_yield, 2),
-            'avg_revenue_kes': round(avg_revenue, 2),
-            'success_rate': stats['success_count'],
-            'recommendation': _get_recommendation_text(avg_margin)
-        })
-    
-    # Sort by score
-    recommendations.sort(key=lambda x: x['score'], reverse=True)
+    # Next-season yield from the trained model, next to the historical mean
+    predicted, yield_model = _predicted_yields(plot_name)
+    recommendations = [dict(rec, predicted_yield_tons_per_ha=predicted.get(rec['crop'].lower()))
+                       for rec in recommendations]
     
     result = {
         "analysis_type": "crop_recommendation",
         "plot_name": plot_name,
         "recommendations": recommendations,
         "top_crop": recommendations[0]['crop'] if recommendations else None,
+        "yield_model": yield_model,
         "analysis_timestamp": datetime.now().isoformat()
     }
     
     return json.dumps(result, indent=2)
 
-def _get_recommendation_text(margin: float) -> str:
-    """Get recommendation text based on profit margin"""
-    if margin > 70:
-        return "Highly Profitable - Strongly Recommended"
-    elif margin > 50:
-        return "Very Profitable - Recommended"
-    elif margin > 40:
-        return "Profitable - Good Choice"
-    else:
-        return "Moderate Returns - Consider Alternatives"
-
-def get_profitability_forecast(crop: str, area_hectares: float = 1.0) -> str:
+def get_profitability_forecast(crop: str, area_hectares: float = 1.0, price_change_percent: float = 0.0,
+                               yield_change_percent: float = 0.0) -> str:
     """
-    Forecast profitability for a crop based on historical data.
+    Forecast profitability for a crop based on historical data, with a Monte Carlo
+    simulation of seasons (profit percentiles, probability of loss) and a
+    sensitivity grid over price, yield and area.
     
     Args:
         crop: Crop type to forecast
         area_hectares: Area to plant in hectares
+        price_change_percent: Optional price shock for the scenario (e.g. -20 for prices 20% lower)
+        yield_change_percent: Optional yield shock for the scenario (e.g. -15 for a poor harvest)
     
     Returns:
         JSON string with profitability forecast
     """
-    data = _load_farm_data()
+    if area_hectares <= 0:
+        return json.dumps({"error": "area_hectares must be positive"})
+    price_factor = 1 + price_change_percent / 100
+    yield_factor = 1 + yield_change_percent / 100
+    if price_factor < 0 or yield_factor < 0:
+        return json.dumps({"error": "Price and yield changes cannot be below -100%"})
+    
+    data = _load_farm_records(crop)
     
     # Gather historical data for this crop
     crop_data = []
     for record in data:
-        record_crop = record.get('current_crop') or record.get('crop')
-        if record_crop and record_crop.lower() == crop.lower():
-            profit = record.get('profit_kes')
-            revenue = record.get('revenue_kes') or record.get('revenue_kes_profit')
-            cost = record.get('total_cost_kes') or record.get('total_cost_kes_profit')
-            margin = record.get('profit_margin_percent')
-            area = record.get('area_hectares') or record.get('area_hectares_fin')
-            
-            if profit and revenue and cost and area:
-                crop_data.append({
-                    'profit': profit,
-                    'revenue': revenue,
-                    'cost': cost,
-                    'margin': margin,
-                    'area': area,
-                    'profit_per_ha': profit / area,
-                    'revenue_per_ha': revenue / area,
-                    'cost_per_ha': cost / area
-                })
+        profit = record.profit_kes
+        revenue = record.revenue_kes
+        cost = record.cost_kes
+        area = record.area_hectares
+        
+        if profit and revenue and cost and area:
+            crop_data.append({
+                'profit': profit,
+                'revenue': revenue,
+                'cost': cost,
+                'margin': record.profit_margin_percent,
+                'area': area,
+                'profit_per_ha': profit / area,
+                'revenue_per_ha': revenue / area,
+                'cost_per_ha': cost / area
+            })
     
     if not crop_data:
         return json.dumps({"error": f"No historical data found for {crop}"})
     
+    yields = [record.yield_tons_per_ha for record in data if record.yield_tons_per_ha]
+    
     # Calculate averages
     avg_profit_per_ha = sum(d['profit_per_ha'] for d in crop_data) / len(crop_data)
     avg_revenue_per_ha = sum(d['revenue_per_ha'] for d in crop_data) / len(crop_data)
     avg_cost_per_ha = sum(d['cost_per_ha'] for d in crop_data) / len(crop_data)
     avg_margin = sum(d['margin'] for d in crop_data) / len(crop_data)
     
-    # Forecast for specified area
-    forecast_revenue = avg_revenue_per_ha * area_hectares
+    # Forecast for specified area; price and yield shocks scale revenue, costs are unchanged
+    baseline_revenue = avg_revenue_per_ha * area_hectares
+    baseline_profit = avg_profit_per_ha * area_hectares
+    forecast_revenue = baseline_revenue * price_factor * yield_factor
     forecast_cost = avg_cost_per_ha * area_hectares
-    forecast_profit = avg_profit_per_ha * area_hectares
+    forecast_profit = baseline_profit + forecast_revenue - baseline_revenue
+    if forecast_revenue == baseline_revenue:
+        forecast_margin = avg_margin
+    else:
+        forecast_margin = forecast_profit / forecast_revenue * 100 if forecast_revenue else None
+    
+    predicted, yield_model = _predicted_yields()
+    
+    # Simulated seasons are materialised per crop and data version; scenarios rescale them
+    model = get_scenario_model(crop)
+    simulation = model.simulate(area_hectares, price_factor, yield_factor) if model else None
+    sensitivity = model.sensitivity(areas=sorted({0.5, 1.0, 2.0, 5.0, float(area_hectares)})) if model else None
+    
+    # Confidence reflects both the history available and the spread of simulated outcomes
+    if simulation:
+        percentiles = simulation['profit_percentiles_kes']
+        spread = (percentiles['p90'] - percentiles['p10']) / abs(percentiles['p50']) if percentiles['p50'] else float('inf')
+        confidence = "High" if spread < 0.75 else "Medium" if spread < 1.5 else "Low"
+    else:
+        confidence = "Low"
+    if len(crop_data) < 3:
+        confidence = "Low"
+    elif len(crop_data) < 5 and confidence == "High":
+        confidence = "Medium"
     
     result = {
         "analysis_type": "profitability_forecast",
@@ -161,7 +184,7 @@ def get_profitability_forecast(crop: str, area_hectares: float = 1.0) -> str:
             "expected_revenue_kes": round(forecast_revenue, 2),
             "expected_cost_kes": round(forecast_cost, 2),
             "expected_profit_kes": round(forecast_profit, 2),
-            "expected_margin_percent": round(avg_margin, 1)
+            "expected_margin_percent": round(forecast_margin, 1) if forecast_margin is not None else None
         },
         "historical_averages": {
             "profit_per_ha": round(avg_profit_per_ha, 2),
@@ -169,51 +192,82 @@ def get_profitability_forecast(crop: str, area_hectares: float = 1.0) -> str:
             "cost_per_ha": round(avg_cost_per_ha, 2),
             "margin_percent": round(avg_margin, 1)
         },
+        "scenario": {
+            "price_change_percent": price_change_percent,
+            "yield_change_percent": yield_change_percent,
+            "baseline_profit_kes": round(baseline_profit, 2)
+        },
+        "simulation": simulation,
+        "sensitivity": sensitivity,
+        "yield_model": dict(yield_model, predicted_yield_tons_per_ha=predicted.get(crop.lower()),
+                            historical_mean_yield_tons_per_ha=round(sum(yields) / len(yields), 2) if yields else None),
         "data_points": len(crop_data),
-        "confidence": "High" if len(crop_data) >= 5 else "Medium" if len(crop_data) >= 3 else "Low",
+        "confidence": confidence,
         "analysis_timestamp": datetime.now().isoformat()
     }
     
     return json.dumps(result, indent=2)
 
-def get_rotation_plan(plot_name: Optional[str] = None) -> str:
+def get_rotation_plan(plot_name: Optional[str] = None, seasons_ahead: int = 4,
+                      budget_per_season_kes: Optional[float] = None,
+                      max_crop_share_percent: Optional[float] = None) -> str:
     """
-    Get crop rotation plan based on historical patterns.
+    Get crop rotation plan: the rotation history of each plot and a whole-farm plan
+    for the coming seasons that maximises expected profit with no crop repeated
+    back to back and a legume (or fallow) break in every three seasons.
     
     Args:
         plot_name: Optional plot name to get specific rotation plan
+        seasons_ahead: Number of future seasons to plan (1-8)
+        budget_per_season_kes: Optional limit on input spend across the farm per season
+        max_crop_share_percent: Optional limit on the share of farm area under any one crop per season
     
     Returns:
         JSON string with rotation recommendations
     """
-    data = _load_farm_data()
+    if not 1 <= seasons_ahead <= 8:
+        return json.dumps({"error": "seasons_ahead must be between 1 and 8"})
+    
+    # Filter by plot if specified
+    data = _load_farm_records(plot_name=plot_name)
     
     # Gather rotation history by plot
     plot_rotations = defaultdict(list)
     
     for record in data:
-        plot_id = record.get('plot_id', '')
-        if not plot_id:
-            continue
-        
-        parts = plot_id.split('_')
-        if len(parts) >= 4:
-            plot = record.get('plot_name', 'Unknown')
-            year = parts[2]
-            season = parts[3]
-            crop = record.get('current_crop') or record.get('crop')
-            
-            if crop:
-                plot_rotations[plot].append({
-                    'year': year,
-                    'season': season,
-                    'crop': crop,
-                    'period': f"{year} {season}"
-                })
+        if record.crop and record.period:
+            plot_rotations[record.plot_name or 'Unknown'].append({
+                'year': record.year,
+                'season': record.season,
+                'crop': record.crop,
+                'period': record.period
+            })
     
-    # Filter by plot if specified
-    if plot_name:
-        plot_rotations = {k: v for k, v in plot_rotations.items() if k.lower() == plot_name.lower()}
+    # Whole-farm plan: limits on budget and crop area are shared by every plot
+    optimization, planned, periods = None, {}, []
+    if data:
+        try:
+            farm_records = get_farm_data_store().farm_records
+            problem = build_rotation_problem(farm_records, seasons_ahead, budget_per_season_kes, max_crop_share_percent)
+        except ValueError:
+            problem = None
+        if problem:
+            optimization = optimize_rotation(problem)
+            periods = problem.periods
+            for plot in problem.plots:
+                crops = optimization['plan'][plot['plot_id']]
+                planned[plot['plot_name']] = [{
+                    'period': period,
+                    'crop': crop,
+                    'expected_profit_kes': round(plot['area_hectares'] * problem.profit[t][crop], 2)
+                } for t, (period, crop) in enumerate(zip(periods, crops))]
+            optimization = {key: value for key, value in optimization.items() if key != 'plan'}
+            optimization['constraints'] = {
+                'no_repeat': True,
+                'legume_break_window': problem.memory + 1,
+                'budget_per_season_kes': budget_per_season_kes,
+                'max_crop_share_percent': max_crop_share_percent
+            }
     
     # Sort rotations and suggest next crop
     rotation_plans = {}
@@ -224,16 +278,22 @@ def get_rotation_plan(plot_name: Optional[str] = None) -> str:
         crop_sequence = [r['crop'] for r in rotations]
         last_crop = crop_sequence[-1] if crop_sequence else None
         
-        # Simple rotation logic: avoid repeating same crop
-        all_crops = ['Maize', 'Beans', 'Potatoes']
-        suggested_next = [c for c in all_crops if c != last_crop][0] if last_crop else 'Maize'
+        plan = planned.get(plot)
+        if plan:
+            suggested_next = plan[0]['crop']
+        else:
+            # No economics for this plot: avoid repeating the same crop
+            all_crops = ['Maize', 'Beans', 'Potatoes']
+            suggested_next = [c for c in all_crops if c != last_crop][0] if last_crop else 'Maize'
         
         rotation_plans[plot] = {
             'historical_sequence': crop_sequence,
             'last_crop': last_crop,
             'suggested_next_crop': suggested_next,
             'rotation_pattern': ' → '.join(crop_sequence[-4:]) if len(crop_sequence) >= 4 else ' → '.join(crop_sequence),
-            'total_seasons': len(rotations)
+            'total_seasons': len(rotations),
+            'optimized_plan': plan or [],
+            'planned_profit_kes': round(sum(p['expected_profit_kes'] for p in plan), 2) if plan else None
         }
     
     result = {
@@ -241,6 +301,8 @@ def get_rotation_plan(plot_name: Optional[str] = None) -> str:
         "plot_name": plot_name,
         "plots_analyzed": len(rotation_plans),
         "rotation_plans": rotation_plans,
+        "planning_periods": periods,
+        "optimization": optimization,
         "analysis_timestamp": datetime.now().isoformat()
     }
     
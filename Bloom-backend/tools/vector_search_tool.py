@@ -1,25 +1,34 @@
 """
 Vector Search Tool for Bloom Agents
 Provides semantic search over farm data using the deployed Vector Search endpoint.
-Falls back to JSON file queries when vector search is unavailable.
+Structured analytics (yields, crop comparisons, plot analysis) run on the exact
+columnar query engine over the merged farm records instead.
 """
 
 import json
 import os
 import requests
 import subprocess
-from typing import Dict, List, Any, Optional
-from collections import defaultdict
+from typing import Dict, List, Any, Optional, Tuple
 from google import genai
 from google.genai import types
 from dotenv import load_dotenv
+from utils.farm_data_store import get_farm_data_store, get_current_farmer
+from utils.farm_aggregates import get_farm_aggregates
+from utils.farm_query_engine import FarmQueryEngine, get_query_engine
+from utils.lexical_index import get_lexical_index, reciprocal_rank_fusion
+from utils.embeddings import (
+    EMBEDDING_MODEL,
+    EMBEDDING_TASK_TYPE,
+    FULL_EMBEDDING_DIMENSION,
+    get_embedding_dimension,
+    normalize_embedding,
+    read_latest_index_metadata
+)
 
 # Load environment variables
 load_dotenv()
 
-# Path to the JSON data file (fallback)
-JSON_DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'generated_data', 'merged_farm_data.json')
-
 # Vector Search endpoint configuration from environment variables
 API_ENDPOINT = os.getenv("VECTOR_SEARCH_API_ENDPOINT")
 INDEX_ENDPOINT = os.getenv("VECTOR_SEARCH_INDEX_ENDPOINT")
@@ -40,22 +49,110 @@ missing_vars = [var for var, value in required_vars.items() if not value]
 if missing_vars:
     raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
 
+# Query embeddings must have the same dimensionality as the indexed datapoints
+EMBEDDING_DIMENSION = get_embedding_dimension()
+_index_metadata = read_latest_index_metadata()
+if _index_metadata and _index_metadata.get('dimension') != EMBEDDING_DIMENSION:
+    print(f"Warning: EMBEDDING_DIMENSION={EMBEDDING_DIMENSION} but the latest embeddings export "
+          f"has dimension {_index_metadata.get('dimension')}")
+
+def build_search_filters(crop_type: Optional[str] = None, plot_name: Optional[str] = None,
+                         min_yield: Optional[float] = None) -> Optional[Dict[str, List[Dict]]]:
+    """
+    Translate tool filters into Vector Search token and numeric restricts.
+    
+    Args:
+        crop_type: Only match datapoints whose crop token equals this crop
+        plot_name: Only match datapoints whose plot_name token equals this plot
+        min_yield: Only match datapoints with a yield of at least this value
+    
+    Returns:
+        Dict with 'restricts' and 'numericRestricts' lists in findNeighbors format,
+        or None when no filters are set
+    """
+    restricts = []
+    for namespace, value in (('crop', crop_type), ('plot_name', plot_name)):
+        if value:
+            # Tokens match exactly, so allow the common capitalisations of the value
+            tokens = list(dict.fromkeys([value.strip(), value.strip().title()]))
+            restricts.append({"namespace": namespace, "allowList": tokens})
+    
+    numeric_restricts = []
+    if min_yield is not None:
+        numeric_restricts.append({
+            "namespace": "yield",
+            "valueFloat": float(min_yield),
+            "op": "GREATER_EQUAL"
+        })
+    
+    if not restricts and not numeric_restricts:
+        return None
+    
+    return {"restricts": restricts, "numericRestricts": numeric_restricts}
+
+def scope_filters_to_farm(filters: Optional[Dict[str, List[Dict]]],
+                          farmer_id: Optional[str]) -> Optional[Dict[str, List[Dict]]]:
+    """Add a farmer_id restrict so a shared multi-farm index only returns that farm's datapoints"""
+    if not farmer_id:
+        return filters
+    
+    scoped = {
+        "restricts": list((filters or {}).get('restricts', [])),
+        "numericRestricts": list((filters or {}).get('numericRestricts', []))
+    }
+    if not any(r.get('namespace') == 'farmer_id' for r in scoped['restricts']):
+        scoped['restricts'].append({"namespace": "farmer_id", "allowList": [farmer_id]})
+    return scoped
+
+def matches_search_filters(metadata: Dict[str, Any], filters: Optional[Dict[str, List[Dict]]]) -> bool:
+    """
+    Evaluate search filters against a datapoint's metadata.
+    Used to pre-filter local indexes with the same semantics as Vector Search restricts.
+    """
+    if not filters:
+        return True
+    
+    for restrict in filters.get('restricts', []):
+        value = metadata.get(restrict['namespace'])
+        allow_list = restrict.get('allowList', [])
+        if allow_list and (value is None or str(value) not in allow_list):
+            return False
+        if value is not None and str(value) in restrict.get('denyList', []):
+            return False
+    
+    for restrict in filters.get('numericRestricts', []):
+        try:
+            value = float(metadata.get(restrict['namespace']))
+        except (TypeError, ValueError):
+            return False
+        if value != value:  # NaN never matches
+            return False
+        
+        target = restrict['valueFloat']
+        op = restrict.get('op', 'EQUAL')
+        if op == 'GREATER_EQUAL' and not value >= target:
+            return False
+        if op == 'GREATER' and not value > target:
+            return False
+        if op == 'LESS_EQUAL' and not value <= target:
+            return False
+        if op == 'LESS' and not value < target:
+            return False
+        if op == 'EQUAL' and value != target:
+            return False
+        if op == 'NOT_EQUAL' and value == target:
+            return False
+    
+    return True
+
 class VectorSearchTool:
     def __init__(self):
         self.client = None
         self._setup_gemini_client()
-        self._json_data = None
     
     def _load_json_data(self) -> List[Dict]:
-        """Load farm data from JSON file (fallback method)"""
-        if self._json_data is None:
-            try:
-                with open(JSON_DATA_PATH, 'r') as f:
-                    self._json_data = json.load(f)
-            except Exception as e:
-                print(f"Error loading JSON data: {e}")
-                self._json_data = []
-        return self._json_data
+        """Farm records from the shared data store (fallback method)"""
+        return get_farm_data_store().records
     
     def _setup_gemini_client(self):
         """Initialize Gemini client for embeddings"""
@@ -80,22 +177,38 @@ class VectorSearchTool:
     
     def _create_embedding(self, text: str) -> Optional[List[float]]:
         """Create embedding for search query"""
-        if not self.client:
+        embeddings = self._create_embeddings([text])
+        return embeddings[0] if embeddings else None
+    
+    def _create_embeddings(self, texts: List[str]) -> Optional[List[List[float]]]:
+        """Create embeddings for several search queries in a single request"""
+        if not self.client or not texts:
             return None
         
         try:
             result = self.client.models.embed_content(
-                model="gemini-embedding-001",
-                contents=text,
-                config=types.EmbedContentConfig(task_type="SEMANTIC_SIMILARITY")
+                model=EMBEDDING_MODEL,
+                contents=texts,
+                config=types.EmbedContentConfig(
+                    task_type=EMBEDDING_TASK_TYPE,
+                    output_dimensionality=EMBEDDING_DIMENSION
+                )
             )
-            return result.embeddings[0].values
+            if EMBEDDING_DIMENSION < FULL_EMBEDDING_DIMENSION:
+                return [normalize_embedding(embedding.values) for embedding in result.embeddings]
+            return [embedding.values for embedding in result.embeddings]
         except Exception as e:
             print(f"Error creating embedding: {e}")
             return None
     
-    def _query_vector_search(self, embedding: List[float], num_results: int = 10) -> Optional[Dict]:
-        """Query the Vector Search endpoint"""
+    def _query_vector_search(self, embedding: List[float], num_results: int = 10,
+                             filters: Optional[Dict[str, List[Dict]]] = None) -> Optional[Dict]:
+        """Query the Vector Search endpoint, optionally restricted by search filters"""
+        return self._query_vector_search_batch([embedding], num_results, [filters])
+    
+    def _query_vector_search_batch(self, embeddings: List[List[float]], num_results: int = 10,
+                                   query_filters: Optional[List[Optional[Dict]]] = None) -> Optional[Dict]:
+        """Query the Vector Search endpoint with several embeddings in one findNeighbors request"""
         access_token = self._get_access_token()
         if not access_token:
             return None
@@ -106,14 +219,27 @@ class VectorSearchTool:
             "Content-Type": "application/json"
         }
         
+        queries = []
+        for i, embedding in enumerate(embeddings):
+            datapoint = {"featureVector": embedding}
+            
+            # Push filters down as restricts so the index only returns matching datapoints
+            filters = query_filters[i] if query_filters and i < len(query_filters) else None
+            filters = scope_filters_to_farm(filters, get_current_farmer())
+            if filters:
+                if filters.get('restricts'):
+                    datapoint["restricts"] = filters['restricts']
+                if filters.get('numericRestricts'):
+                    datapoint["numericRestricts"] = filters['numericRestricts']
+            
+            queries.append({
+                "datapoint": datapoint,
+                "neighborCount": num_results
+            })
+        
         payload = {
             "deployedIndexId": DEPLOYED_INDEX_ID,
-            "queries": [{
-                "datapoint": {
-                    "featureVector": embedding
-                },
-                "neighborCount": num_results
-            }],
+            "queries": queries,
             "returnFullDatapoint": True
         }
         
@@ -130,7 +256,19 @@ class VectorSearchTool:
         if not search_results or 'nearestNeighbors' not in search_results:
             return []
         
-        neighbors = search_results['nearestNeighbors'][0]['neighbors']
+        return self._format_neighbors(search_results['nearestNeighbors'][0].get('neighbors', []))
+    
+    def _format_batch_results(self, search_results: Dict, num_queries: int) -> List[List[Dict[str, Any]]]:
+        """Format a multi-query search response into one result list per query"""
+        nearest = (search_results or {}).get('nearestNeighbors', [])
+        batch_results = [self._format_neighbors(entry.get('neighbors', [])) for entry in nearest]
+        
+        # Queries with no neighbours can be omitted from the response; keep one list per query
+        batch_results.extend([] for _ in range(num_queries - len(batch_results)))
+        return batch_results[:num_queries]
+    
+    def _format_neighbors(self, neighbors: List[Dict]) -> List[Dict[str, Any]]:
+        """Convert raw findNeighbors neighbours into result dictionaries"""
         formatted_results = []
         
         for neighbor in neighbors:
@@ -162,50 +300,146 @@ class VectorSearchTool:
             formatted_results.append(result)
         
         return formatted_results
+    
+    def search_batch(self, queries: List[str], num_results: int = 10,
+                     query_filters: Optional[List[Optional[Dict]]] = None) -> Optional[List[List[Dict[str, Any]]]]:
+        """
+        Search several queries with one embedding call and one findNeighbors request.
+        
+        Args:
+            queries: Natural language queries to search for
+            num_results: Maximum number of neighbours per query
+            query_filters: Optional search filters (see build_search_filters) for each query
+        
+        Returns:
+            One list of formatted results per query (in query order), or None on failure
+        """
+        if not queries:
+            return []
+        
+        embeddings = self._create_embeddings(queries)
+        if not embeddings:
+            return None
+        
+        search_results = self._query_vector_search_batch(embeddings, num_results, query_filters)
+        if not search_results:
+            return None
+        
+        return self._format_batch_results(search_results, len(queries))
 
-def search_farm_data(query: str, max_results: int = 5) -> str:
+def search_farm_data(query: str, max_results: int = 5, crop_type: Optional[str] = None,
+                     plot_name: Optional[str] = None) -> str:
     """
-    Search farm data using semantic vector search.
+    Search farm data using hybrid lexical (BM25) and semantic vector search.
     
     Args:
-        query: Natural language query about farm data
+        query: Natural language query about farm data (plot ids, dates and stages match exactly)
         max_results: Maximum number of results to return
+        crop_type: Optional crop to restrict results to (e.g., 'Maize')
+        plot_name: Optional plot name to restrict results to (e.g., 'North Field')
     
     Returns:
         JSON string with search results and analysis
     """
-    tool = VectorSearchTool()
+    filters = build_search_filters(crop_type=crop_type, plot_name=plot_name)
     
-    # Create embedding for the query
-    embedding = tool._create_embedding(query)
-    if not embedding:
-        return json.dumps({
-            "error": "Failed to create embedding for query",
-            "query": query,
-            "results": []
-        })
+    # Retrieve more candidates than needed from each ranker before fusing
+    candidates = max(max_results * 2, 10)
+    lexical_results = _lexical_search(query, candidates, filters)
+    vector_results, vector_error = _vector_search(query, candidates, filters)
     
-    # Search vector index
-    search_results = tool._query_vector_search(embedding, max_results)
-    if not search_results:
+    if vector_error and not lexical_results:
         return json.dumps({
-            "error": "Vector search failed",
+            "error": vector_error,
             "query": query,
             "results": []
         })
     
-    # Format results
-    formatted_results = tool._format_results(search_results, query)
+    formatted_results = _fuse_results(vector_results, lexical_results, max_results)
     
     # Analyze results for insights
     analysis = _analyze_results(formatted_results, query)
     
-    return json.dumps({
+    response = {
         "query": query,
+        "search_mode": "hybrid" if not vector_error else "lexical",
         "results_count": len(formatted_results),
         "results": formatted_results,
         "analysis": analysis
-    }, indent=2)
+    }
+    if vector_error:
+        response["vector_search_error"] = vector_error
+    
+    return json.dumps(response, indent=2)
+
+def _vector_search(query: str, num_results: int,
+                   filters: Optional[Dict] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Semantic search through the Vector Search endpoint; returns (results, error)"""
+    tool = VectorSearchTool()
+    
+    embedding = tool._create_embedding(query)
+    if not embedding:
+        return [], "Failed to create embedding for query"
+    
+    search_results = tool._query_vector_search(embedding, num_results, filters)
+    if not search_results:
+        return [], "Vector search failed"
+    
+    return tool._format_results(search_results, query), None
+
+def _lexical_search(query: str, num_results: int, filters: Optional[Dict] = None) -> List[Dict[str, Any]]:
+    """BM25 search over the same record text that is embedded, pre-filtered like Vector Search restricts"""
+    try:
+        index = get_lexical_index()
+    except Exception as e:
+        print(f"Lexical index unavailable: {e}")
+        return []
+    
+    doc_filter = (lambda metadata: matches_search_filters(metadata, filters)) if filters else None
+    results = []
+    for hit in index.search(query, num_results, doc_filter):
+        metadata = hit['metadata']
+        results.append({
+            'plot_id': hit['id'],
+            'lexical_score': hit['score'],
+            'plot_name': metadata.get('plot_name', 'Unknown'),
+            'crop': metadata.get('crop', 'Unknown'),
+            'stage': metadata.get('stage', 'Unknown'),
+            'yield_tons_per_ha': _to_float(metadata.get('yield')),
+            'revenue_kes': _to_float(metadata.get('revenue')),
+            'area_hectares': _to_float(metadata.get('area')),
+            'full_description': metadata.get('text', '')
+        })
+    return results
+
+def _fuse_results(vector_results: List[Dict[str, Any]], lexical_results: List[Dict[str, Any]],
+                  max_results: int) -> List[Dict[str, Any]]:
+    """Merge vector and lexical rankings with reciprocal-rank fusion"""
+    by_id = {}
+    for result in lexical_results:
+        by_id.setdefault(result['plot_id'], dict(result, similarity_score=None))
+    for result in vector_results:
+        merged = by_id.setdefault(result['plot_id'], dict(result, lexical_score=None))
+        merged['similarity_score'] = result['similarity_score']
+    
+    fused = reciprocal_rank_fusion([
+        [r['plot_id'] for r in vector_results],
+        [r['plot_id'] for r in lexical_results]
+    ])
+    
+    formatted_results = []
+    for plot_id, score in fused[:max_results]:
+        result = by_id[plot_id]
+        result['fusion_score'] = round(score, 5)
+        formatted_results.append(result)
+    return formatted_results
+
+def _to_float(value: Any) -> float:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return number if number == number else 0.0
 
 def get_historical_yields(crop_type: Optional[str] = None, plot_name: Optional[str] = None, min_yield: Optional[float] = None) -> str:
     """
@@ -219,7 +453,7 @@ def get_historical_yields(crop_type: Optional[str] = None, plot_name: Optional[s
     Returns:
         JSON string with historical yield analysis
     """
-    # Build query based on filters
+    # Describe the query for the response
     query_parts = ["historical yields"]
     
     if crop_type:
@@ -231,46 +465,29 @@ def get_historical_yields(crop_type: Optional[str] = None, plot_name: Optional[s
     
     query = " ".join(query_parts)
     
-    # Search with larger result set for historical analysis
-    tool = VectorSearchTool()
-    embedding = tool._create_embedding(query)
-    if not embedding:
-        return json.dumps({"error": "Failed to create embedding", "results": []})
-    
-    search_results = tool._query_vector_search(embedding, 20)  # Get more results for analysis
-    if not search_results:
-        return json.dumps({"error": "Vector search failed", "results": []})
-    
-    formatted_results = tool._format_results(search_results, query)
-    
-    # Apply additional filters
-    filtered_results = []
-    for result in formatted_results:
-        if crop_type and result['crop'].lower() != crop_type.lower():
-            continue
-        if plot_name and plot_name.lower() not in result['plot_name'].lower():
-            continue
-        if min_yield and result['yield_tons_per_ha'] < min_yield:
-            continue
-        filtered_results.append(result)
+    # Exact statistics over every matching record
+    engine = get_query_engine()
+    rows = engine.select(crop=crop_type, plot_name=plot_name, min_yield=min_yield)
     
-    # Calculate yield statistics
-    yields = [r['yield_tons_per_ha'] for r in filtered_results if r['yield_tons_per_ha'] > 0]
-    revenues = [r['revenue_kes'] for r in filtered_results if r['revenue_kes'] > 0]
+    yield_stats = engine.summarize(rows['yield_tons_per_ha'])
+    revenue_stats = engine.summarize(rows['revenue_kes'])
     
     stats = {}
-    if yields:
+    if yield_stats['count']:
         stats = {
-            "avg_yield": round(sum(yields) / len(yields), 2),
-            "max_yield": max(yields),
-            "min_yield": min(yields),
-            "total_records": len(filtered_results)
+            "avg_yield": round(yield_stats['mean'], 2),
+            "max_yield": yield_stats['max'],
+            "min_yield": yield_stats['min'],
+            "total_records": len(rows)
         }
     
-    if revenues:
-        stats["avg_revenue"] = round(sum(revenues) / len(revenues), 2)
-        stats["max_revenue"] = max(revenues)
-        stats["total_revenue"] = sum(revenues)
+    if revenue_stats['count']:
+        stats["avg_revenue"] = round(revenue_stats['mean'], 2)
+        stats["max_revenue"] = revenue_stats['max']
+        stats["total_revenue"] = revenue_stats['sum']
+    
+    # Most recent seasons first
+    latest = rows.sort_values(['year', 'season'], ascending=False).head(10)
     
     return json.dumps({
         "query": query,
@@ -280,8 +497,8 @@ def get_historical_yields(crop_type: Optional[str] = None, plot_name: Optional[s
             "min_yield": min_yield
         },
         "statistics": stats,
-        "results": filtered_results[:10],  # Return top 10 results
-        "total_matching_records": len(filtered_results)
+        "results": _format_rows(engine, latest),  # Return top 10 results
+        "total_matching_records": len(rows)
     }, indent=2)
 
 def get_crop_performance_comparison(crops: Optional[List[str]] = None) -> str:
@@ -297,33 +514,29 @@ def get_crop_performance_comparison(crops: Optional[List[str]] = None) -> str:
     if not crops:
         crops = ["Maize", "Potatoes", "Beans"]
     
-    tool = VectorSearchTool()
+    engine = get_query_engine()
     comparison_data = {}
     
     for crop in crops:
-        query = f"performance data for {crop} crops with yields and revenue"
-        embedding = tool._create_embedding(query)
+        crop_rows = engine.select(crop=crop)
+        if crop_rows.empty:
+            continue
+        
+        yield_stats = engine.summarize(crop_rows['yield_tons_per_ha'])
+        revenue_stats = engine.summarize(crop_rows['revenue_kes'])
+        
+        # Revenue per hectare over the records that report revenue
+        earning = crop_rows[crop_rows['revenue_kes'] > 0]
+        earning_area = engine.summarize(earning['area_hectares'])
         
-        if embedding:
-            search_results = tool._query_vector_search(embedding, 15)
-            if search_results:
-                formatted_results = tool._format_results(search_results, query)
-                
-                # Filter for this specific crop
-                crop_results = [r for r in formatted_results if r['crop'].lower() == crop.lower()]
-                
-                if crop_results:
-                    yields = [r['yield_tons_per_ha'] for r in crop_results if r['yield_tons_per_ha'] > 0]
-                    revenues = [r['revenue_kes'] for r in crop_results if r['revenue_kes'] > 0]
-                    
-                    comparison_data[crop] = {
-                        "records_count": len(crop_results),
-                        "avg_yield": round(sum(yields) / len(yields), 2) if yields else 0,
-                        "max_yield": max(yields) if yields else 0,
-                        "avg_revenue": round(sum(revenues) / len(revenues), 2) if revenues else 0,
-                        "max_revenue": max(revenues) if revenues else 0,
-                        "revenue_per_hectare": round(sum(revenues) / sum([r['area_hectares'] for r in crop_results if r['area_hectares'] > 0]), 2) if revenues else 0
-                    }
+        comparison_data[crop] = {
+            "records_count": len(crop_rows),
+            "avg_yield": round(yield_stats['mean'], 2) if yield_stats['count'] else 0,
+            "max_yield": yield_stats['max'] if yield_stats['count'] else 0,
+            "avg_revenue": round(revenue_stats['mean'], 2) if revenue_stats['count'] else 0,
+            "max_revenue": revenue_stats['max'] if revenue_stats['count'] else 0,
+            "revenue_per_hectare": round(revenue_stats['sum'] / earning_area['sum'], 2) if revenue_stats['count'] and earning_area['count'] else 0
+        }
     
     # Determine best performing crop
     best_crop = None
@@ -357,51 +570,30 @@ def get_plot_analysis(plot_name: Optional[str] = None) -> str:
     else:
         query = f"detailed analysis for {plot_name} plot with all seasons and crops"
     
-    tool = VectorSearchTool()
-    embedding = tool._create_embedding(query)
-    
-    if not embedding:
-        return json.dumps({"error": "Failed to create embedding", "results": []})
-    
-    search_results = tool._query_vector_search(embedding, 20)
-    if not search_results:
-        return json.dumps({"error": "Vector search failed", "results": []})
-    
-    formatted_results = tool._format_results(search_results, query)
-    
-    # Filter by plot name if specified
-    if plot_name:
-        formatted_results = [r for r in formatted_results if plot_name.lower() in r['plot_name'].lower()]
+    engine = get_query_engine()
+    rows = engine.select(plot_name=plot_name).sort_values(['year', 'season'])
     
     # Group by plot
     plots_data = {}
-    for result in formatted_results:
-        plot = result['plot_name']
-        if plot not in plots_data:
-            plots_data[plot] = {
-                "seasons": [],
-                "crops_grown": set(),
-                "total_revenue": 0,
-                "avg_yield": 0,
-                "area_hectares": result['area_hectares']
-            }
+    for plot, plot_rows in rows.groupby('plot_name', sort=True):
+        yield_stats = engine.summarize(plot_rows['yield_tons_per_ha'])
+        revenue_stats = engine.summarize(plot_rows['revenue_kes'])
+        seasons = _format_rows(engine, plot_rows)
         
-        plots_data[plot]["seasons"].append({
-            "plot_id": result['plot_id'],
-            "crop": result['crop'],
-            "stage": result['stage'],
-            "yield": result['yield_tons_per_ha'],
-            "revenue": result['revenue_kes']
-        })
-        plots_data[plot]["crops_grown"].add(result['crop'])
-        plots_data[plot]["total_revenue"] += result['revenue_kes']
-    
-    # Calculate averages and convert sets to lists
-    for plot, data in plots_data.items():
-        yields = [s['yield'] for s in data['seasons'] if s['yield'] > 0]
-        data['avg_yield'] = round(sum(yields) / len(yields), 2) if yields else 0
-        data['crops_grown'] = list(data['crops_grown'])
-        data['seasons_count'] = len(data['seasons'])
+        plots_data[plot] = {
+            "seasons": [{
+                "plot_id": season['plot_id'],
+                "crop": season['crop'],
+                "stage": season['stage'],
+                "yield": season['yield_tons_per_ha'],
+                "revenue": season['revenue_kes']
+            } for season in seasons],
+            "crops_grown": sorted(plot_rows['crop'].dropna().unique().tolist()),
+            "total_revenue": revenue_stats.get('sum', 0),
+            "avg_yield": round(yield_stats['mean'], 2) if yield_stats['count'] else 0,
+            "area_hectares": seasons[0]['area_hectares'] if seasons else 0,
+            "seasons_count": len(seasons)
+        }
     
     return json.dumps({
         "query": query,
@@ -410,14 +602,29 @@ def get_plot_analysis(plot_name: Optional[str] = None) -> str:
         "plots_data": plots_data
     }, indent=2)
 
+def _format_rows(engine: FarmQueryEngine, rows) -> List[Dict[str, Any]]:
+    """Format query engine rows as tool results"""
+    return [{
+        'plot_id': row['plot_id'],
+        'plot_name': row['plot_name'] or 'Unknown',
+        'year': row['year'],
+        'season': row['season'],
+        'crop': row['crop'] or 'Unknown',
+        'stage': row['stage'] or 'Unknown',
+        'yield_tons_per_ha': row['yield_tons_per_ha'] or 0,
+        'revenue_kes': row['revenue_kes'] or 0,
+        'area_hectares': row['area_hectares'] or 0
+    } for row in engine.to_records(rows)]
+
 def _analyze_results(results: List[Dict], query: str) -> Dict[str, Any]:
     """Analyze search results to provide insights"""
     if not results:
         return {"message": "No results found"}
     
+    similarities = [r['similarity_score'] for r in results if r.get('similarity_score') is not None]
     analysis = {
         "total_results": len(results),
-        "avg_similarity": round(sum(r['similarity_score'] for r in results) / len(results), 3),
+        "avg_similarity": round(sum(similarities) / len(similarities), 3) if similarities else None,
         "crops_found": list(set(r['crop'] for r in results)),
         "plots_found": list(set(r['plot_name'] for r in results)),
         "stages_found": list(set(r['stage'] for r in results))
@@ -455,75 +662,8 @@ def get_growth_tracker_data(plot_name: Optional[str] = None, crop_type: Optional
     Returns:
         JSON string with growth tracking data
     """
-    tool = VectorSearchTool()
-    data = tool._load_json_data()
-    
-    # Group data by plot and time
-    growth_data = defaultdict(list)
-    
-    for record in data:
-        # Apply filters
-        if plot_name and record.get('plot_name', '').lower() != plot_name.lower():
-            continue
-        if crop_type and (record.get('current_crop', '').lower() != crop_type.lower() and 
-                         record.get('crop', '').lower() != crop_type.lower()):
-            continue
-        
-        plot_id = record.get('plot_id', '')
-        if not plot_id:
-            continue
-        
-        # Extract temporal info from plot_id (format: plot_X_YYYY_SN)
-        parts = plot_id.split('_')
-        if len(parts) >= 4:
-            plot = record.get('plot_name', 'Unknown')
-            year = parts[2]
-            season = parts[3]
-            
-            growth_data[plot].append({
-                'plot_id': plot_id,
-                'plot_name': plot,
-                'year': year,
-                'season': season,
-                'period': f"{year} {season}",
-                'crop': record.get('current_crop') or record.get('crop'),
-                'yield_tons_per_ha': record.get('yield_tonnes_per_ha') or record.get('yield_tonnes_per_ha_profit'),
-                'revenue_kes': record.get('revenue_kes') or record.get('revenue_kes_profit'),
-                'profit_kes': record.get('profit_kes'),
-                'profit_margin': record.get('profit_margin_percent'),
-                'crop_stage': record.get('crop_stage'),
-                'planting_date': record.get('planting_date'),
-                'expected_harvest': record.get('expected_harvest'),
-                'area_hectares': record.get('area_hectares') or record.get('area_hectares_fin')
-            })
-    
-    # Sort each plot's data by year and season
-    for plot in growth_data:
-        growth_data[plot].sort(key=lambda x: (x['year'], x['season']))
-    
-    # Calculate trends for each plot
-    plot_summaries = {}
-    for plot, records in growth_data.items():
-        if len(records) < 2:
-            continue
-        
-        yields = [r['yield_tons_per_ha'] for r in records if r['yield_tons_per_ha']]
-        revenues = [r['revenue_kes'] for r in records if r['revenue_kes']]
-        
-        if yields:
-            first_yield = yields[0]
-            last_yield = yields[-1]
-            yield_change = ((last_yield - first_yield) / first_yield * 100) if first_yield > 0 else 0
-            
-            plot_summaries[plot] = {
-                'total_seasons': len(records),
-                'crops_grown': list(set(r['crop'] for r in records if r['crop'])),
-                'avg_yield': round(sum(yields) / len(yields), 2),
-                'yield_trend': 'Improving' if yield_change > 5 else 'Declining' if yield_change < -5 else 'Stable',
-                'yield_change_percent': round(yield_change, 1),
-                'avg_revenue': round(sum(revenues) / len(revenues), 2) if revenues else 0,
-                'time_series': records
-            }
+    # Served from the aggregates materialised for the current data version
+    plot_summaries = get_farm_aggregates().growth(plot_name=plot_name, crop=crop_type)
     
     return json.dumps({
         "analysis_type": "growth_tracker",
@@ -542,37 +682,37 @@ def get_farm_coordinates() -> str:
     Returns:
         JSON string with plot coordinates and metadata
     """
-    plots = {
-        "plot_A": {
-            "plot_name": "North Field",
-            "area_hectares": 2.5,
-            "coordinates": [[35.9325, -0.3695], [35.9338, -0.3695], [35.9338, -0.3705], [35.9325, -0.3705], [35.9325, -0.3695]]
-        },
-        "plot_B": {
-            "plot_name": "East Ridge",
-            "area_hectares": 2.0,
-            "coordinates": [[35.9339, -0.3706], [35.9350, -0.3706], [35.9350, -0.3715], [35.9339, -0.3715], [35.9339, -0.3706]]
-        },
-        "plot_C": {
-            "plot_name": "West Valley",
-            "area_hectares": 1.5,
-            "coordinates": [[35.9310, -0.3696], [35.9324, -0.3696], [35.9324, -0.3704], [35.9310, -0.3704], [35.9310, -0.3696]]
-        },
-        "plot_D": {
-            "plot_name": "South Slope",
-            "area_hectares": 1.0,
-            "coordinates": [[35.9326, -0.3716], [35.9337, -0.3716], [35.9337, -0.3724], [35.9326, -0.3724], [35.9326, -0.3716]]
+    # Plot polygons come from plot_base_information.csv via the current farm's merged records
+    records = get_farm_data_store().records
+    if not records:
+        return json.dumps({"error": "No farm data available for this farm", "plots": {}})
+    
+    plots = {}
+    for record in sorted(records, key=lambda r: str(r.get('base_plot_id') or '')):
+        base_plot_id = record.get('base_plot_id')
+        if not base_plot_id or base_plot_id in plots:
+            continue
+        
+        try:
+            coordinates = json.loads(record.get('coordinates_geojson') or '[]')
+        except (TypeError, ValueError):
+            coordinates = []
+        
+        plots[base_plot_id] = {
+            "plot_name": record.get('plot_name'),
+            "area_hectares": record.get('area_hectares'),
+            "coordinates": coordinates
         }
-    }
     
+    farm = records[0]
     farm_info = {
-        "farm_name": "Njoro Agri-Hub",
+        "farm_name": farm.get('farm_farm_name'),
         "farm_center": {
-            "latitude": -0.37,
-            "longitude": 35.932
+            "latitude": farm.get('farm_latitude'),
+            "longitude": farm.get('farm_longitude')
         },
-        "county": "Nakuru County",
-        "total_area_hectares": 7.0,
+        "county": farm.get('farm_county'),
+        "total_area_hectares": farm.get('farm_total_area_hectares'),
         "plots": plots
     }
     
@@ -10,6 +10,30 @@ from .json_parser import (
     clean_json_string,
     validate_json_structure
 )
+from .columnar_snapshot import ColumnarSnapshot, write_snapshot
+from .farm_data_store import (
+    FarmDataStore,
+    FarmPartitionRegistry,
+    get_farm_data_store,
+    farm_partition,
+    get_current_farmer,
+    set_current_farmer
+)
+from .farm_records import FarmRecord, build_farm_records
+from .farm_aggregates import FarmAggregates, get_farm_aggregates
+from .farm_query_engine import FarmQueryEngine, get_query_engine
+from .expense_ledger import ExpenseLedger, get_expense_ledger
+from .price_analytics import PriceAnalytics, get_price_analytics
+from .scenario_engine import ScenarioModel, get_scenario_model
+from .rotation_optimizer import RotationProblem, build_rotation_problem, optimize_rotation
+from .yield_model import YieldModel, get_yield_model, predict_yields, train_yield_model
+from .imagery_cache import ImageryCache, get_imagery_cache
+from .ndvi_series import NdviSeriesStore, get_ndvi_series_store
+from .thumbnail_store import ThumbnailStore, get_thumbnail_store
+from .soil_cache import SoilCache, get_soil_cache
+from .farm_merge import load_source_frames, merge_farm_data
+from .incremental_ingest import IngestWatcher, ingest_sources
+from .lexical_index import BM25Index, build_lexical_index, get_lexical_index, reciprocal_rank_fusion
 
 __all__ = [
     'safe_json_loads',
@@ -17,5 +41,48 @@ __all__ = [
     'extract_widget_data',
     'extract_citations',
     'clean_json_string',
-    'validate_json_structure'
+    'validate_json_structure',
+    'ColumnarSnapshot',
+    'write_snapshot',
+    'FarmDataStore',
+    'FarmPartitionRegistry',
+    'get_farm_data_store',
+    'farm_partition',
+    'get_current_farmer',
+    'set_current_farmer',
+    'FarmRecord',
+    'build_farm_records',
+    'FarmAggregates',
+    'get_farm_aggregates',
+    'FarmQueryEngine',
+    'get_query_engine',
+    'ExpenseLedger',
+    'get_expense_ledger',
+    'PriceAnalytics',
+    'get_price_analytics',
+    'ScenarioModel',
+    'get_scenario_model',
+    'RotationProblem',
+    'build_rotation_problem',
+    'optimize_rotation',
+    'YieldModel',
+    'train_yield_model',
+    'get_yield_model',
+    'predict_yields',
+    'ImageryCache',
+    'get_imagery_cache',
+    'NdviSeriesStore',
+    'get_ndvi_series_store',
+    'ThumbnailStore',
+    'get_thumbnail_store',
+    'SoilCache',
+    'get_soil_cache',
+    'load_source_frames',
+    'merge_farm_data',
+    'IngestWatcher',
+    'ingest_sources',
+    'BM25Index',
+    'build_lexical_index',
+    'get_lexical_index',
+    'reciprocal_rank_fusion'
 ]
@@ -0,0 +1,295 @@
+"""
+Versioned columnar snapshot of the merged farm records.
+The data processing pipeline writes one .npy file per column (numbers as
+int64/float64, strings dictionary-encoded as int32 codes into a shared
+strings table) plus a manifest with a content hash. Readers memory-map the
+column files instead of parsing merged_farm_data.json. The manifest also
+records the size and mtime of the JSON it was written from, so readers can
+tell the snapshot is current without reading or hashing the JSON.
+
+Layout:
+    generated_data/snapshot/manifest.json          current version pointer
+    generated_data/snapshot/<version>/manifest.json
+    generated_data/snapshot/<version>/strings.json
+    generated_data/snapshot/<version>/<column index>.npy
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOT_DIR = os.path.join(os.path.dirname(__file__), '..', 'generated_data', 'snapshot')
+MANIFEST_NAME = 'manifest.json'
+STRINGS_NAME = 'strings.json'
+
+# Number of previous versions kept next to the current one
+KEEP_VERSIONS = 2
+
+
+def _is_missing(value: Any) -> bool:
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def _column_kind(values: List[Any]) -> str:
+    """Storage kind for a column: int, float, str or json (anything else, e.g. mixed types)"""
+    present = [v for v in values if not _is_missing(v)]
+    if not present:
+        return 'str'
+    if any(isinstance(v, bool) for v in present):
+        return 'json'
+    if all(isinstance(v, (int, np.integer)) for v in present):
+        # Missing values need NaN, which only a float column can hold
+        return 'int' if len(present) == len(values) else 'float'
+    if all(isinstance(v, (int, float, np.integer, np.floating)) for v in present):
+        return 'float'
+    if all(isinstance(v, str) for v in present):
+        return 'str'
+    return 'json'
+
+
+def _encode_strings(values: List[Any], kind: str, table: List[str], lookup: Dict[str, int]) -> np.ndarray:
+    """Dictionary-encode a string/json column into int32 codes (-1 = missing)"""
+    codes = np.empty(len(values), dtype=np.int32)
+    for i, value in enumerate(values):
+        if _is_missing(value):
+            codes[i] = -1
+            continue
+        text = value if kind == 'str' else json.dumps(value)
+        code = lookup.get(text)
+        if code is None:
+            code = lookup[text] = len(table)
+            table.append(text)
+        codes[i] = code
+    return codes
+
+
+def _hash_files(paths: List[str]) -> str:
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _source_stat(path: str) -> Dict[str, int]:
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def write_snapshot(records: List[Dict[str, Any]], snapshot_dir: str = SNAPSHOT_DIR,
+                   source_hash: Optional[str] = None, source_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Write records as a new snapshot version and make it current.
+
+    Args:
+        records: Merged farm records (every record is expected to carry the same keys)
+        snapshot_dir: Root snapshot directory
+        source_hash: SHA-256 of the JSON file written alongside, if any
+        source_path: The JSON file written alongside; its hash (unless given), size
+            and mtime are recorded in the manifest
+
+    Returns:
+        The manifest of the written version
+    """
+    source_stat = None
+    if source_path is not None:
+        source_hash = source_hash or _hash_files([source_path])
+        source_stat = _source_stat(source_path)
+
+    columns: List[str] = []
+    for record in records:
+        for key in record:
+            if key not in columns:
+                columns.append(key)
+
+    os.makedirs(snapshot_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.staging-', dir=snapshot_dir)
+
+    table: List[str] = []
+    lookup: Dict[str, int] = {}
+    column_entries = []
+    files = []
+    for position, name in enumerate(columns):
+        values = [record.get(name) for record in records]
+        kind = _column_kind(values)
+        if kind == 'int':
+            array = np.asarray(values, dtype=np.int64)
+        elif kind == 'float':
+            array = np.asarray([np.nan if _is_missing(v) else v for v in values], dtype=np.float64)
+        else:
+            array = _encode_strings(values, kind, table, lookup)
+
+        filename = f"{position}.npy"
+        path = os.path.join(staging, filename)
+        np.save(path, array, allow_pickle=False)
+        files.append(path)
+        column_entries.append({'name': name, 'kind': kind, 'file': filename, 'dtype': str(array.dtype)})
+
+    strings_path = os.path.join(staging, STRINGS_NAME)
+    with open(strings_path, 'w') as f:
+        json.dump(table, f)
+    files.append(strings_path)
+
+    content_hash = _hash_files(files)
+    version = content_hash[:16]
+    manifest = {
+        'format_version': SNAPSHOT_FORMAT_VERSION,
+        'version': version,
+        'content_hash': content_hash,
+        'source_hash': source_hash,
+        'record_count': len(records),
+        'columns': column_entries
+    }
+    with open(os.path.join(staging, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    version_dir = os.path.join(snapshot_dir, version)
+    if os.path.isdir(version_dir):
+        shutil.rmtree(staging)
+    else:
+        os.replace(staging, version_dir)
+
+    # Point the top-level manifest at the new version atomically
+    pointer = dict(manifest, path=version, source_hash=source_hash, source_stat=source_stat)
+    tmp_pointer = os.path.join(snapshot_dir, f".{MANIFEST_NAME}.tmp")
+    with open(tmp_pointer, 'w') as f:
+        json.dump(pointer, f, indent=2)
+    os.replace(tmp_pointer, os.path.join(snapshot_dir, MANIFEST_NAME))
+
+    _prune_versions(snapshot_dir, version)
+    return manifest
+
+
+def _prune_versions(snapshot_dir: str, current: str):
+    versions = [
+        entry for entry in os.listdir(snapshot_dir)
+        if entry != current and os.path.isfile(os.path.join(snapshot_dir, entry, MANIFEST_NAME))
+    ]
+    versions.sort(key=lambda entry: os.path.getmtime(os.path.join(snapshot_dir, entry)), reverse=True)
+    for entry in versions[KEEP_VERSIONS:]:
+        shutil.rmtree(os.path.join(snapshot_dir, entry), ignore_errors=True)
+
+
+def read_manifest(snapshot_dir: str = SNAPSHOT_DIR) -> Optional[Dict[str, Any]]:
+    """Manifest of the current snapshot version, or None when no snapshot exists"""
+    path = os.path.join(snapshot_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def matches_source(manifest: Optional[Dict[str, Any]], source_path: str) -> bool:
+    """True when the snapshot was written from the source file as it is now (same size and mtime)"""
+    if not manifest or not manifest.get('source_stat') or not manifest.get('source_hash'):
+        return False
+    try:
+        return manifest['source_stat'] == _source_stat(source_path)
+    except OSError:
+        return False
+
+
+class ColumnarSnapshot:
+    """Memory-mapped view of one snapshot version"""
+
+    def __init__(self, version_dir: str, manifest: Dict[str, Any], mmap: bool = True):
+        if manifest.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format: {manifest.get('format_version')}")
+        self.version_dir = version_dir
+        self.manifest = manifest
+        self.version = manifest['version']
+        self.record_count = manifest['record_count']
+        self.source_hash = manifest.get('source_hash')
+
+        with open(os.path.join(version_dir, STRINGS_NAME), 'r') as f:
+            self.strings: List[str] = json.load(f)
+
+        mmap_mode = 'r' if mmap else None
+        self.kinds: Dict[str, str] = {}
+        self.arrays: Dict[str, np.ndarray] = {}
+        for entry in manifest['columns']:
+            self.kinds[entry['name']] = entry['kind']
+            self.arrays[entry['name']] = np.load(os.path.join(version_dir, entry['file']),
+                                                 mmap_mode=mmap_mode, allow_pickle=False)
+
+    @classmethod
+    def load(cls, snapshot_dir: str = SNAPSHOT_DIR, mmap: bool = True,
+             verify: bool = False) -> 'ColumnarSnapshot':
+        """Open the current snapshot version (optionally re-checking its content hash)"""
+        pointer = read_manifest(snapshot_dir)
+        if pointer is None:
+            raise FileNotFoundError(f"No snapshot manifest in {snapshot_dir}")
+        version_dir = os.path.join(snapshot_dir, pointer['path'])
+        with open(os.path.join(version_dir, MANIFEST_NAME), 'r') as f:
+            manifest = json.load(f)
+
+        if verify:
+            files = [os.path.join(version_dir, entry['file']) for entry in manifest['columns']]
+            files.append(os.path.join(version_dir, STRINGS_NAME))
+            if _hash_files(files) != manifest['content_hash']:
+                raise ValueError(f"Snapshot {manifest['version']} does not match its content hash")
+
+        snapshot = cls(version_dir, manifest, mmap=mmap)
+        # An unchanged version can be re-pointed from another JSON; the pointer is authoritative
+        snapshot.source_hash = pointer.get('source_hash')
+        return snapshot
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.arrays)
+
+    def column(self, name: str) -> List[Any]:
+        """Decoded Python values of one column (None for missing)"""
+        kind = self.kinds[name]
+        array = self.arrays[name]
+        if kind == 'int':
+            return array.tolist()
+        if kind == 'float':
+            return [None if v != v else v for v in array.tolist()]
+
+        strings = self.strings
+        if kind == 'str':
+            return [strings[code] if code >= 0 else None for code in array.tolist()]
+        return [json.loads(strings[code]) if code >= 0 else None for code in array.tolist()]
+
+    def decode(self, names: List[str]) -> Dict[str, List[Any]]:
+        """Decoded values of the given columns that exist in this snapshot"""
+        return {name: self.column(name) for name in names if name in self.arrays}
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Rebuild the merged record dicts (column-at-a-time decode, then one zip)"""
+        names = self.columns
+        decoded = [self.column(name) for name in names]
+        return [dict(zip(names, row)) for row in zip(*decoded)] if names else [{} for _ in range(self.record_count)]
+
+
+def load_snapshot(snapshot_dir: str = SNAPSHOT_DIR,
+                  source_hash: Optional[str] = None) -> Optional[ColumnarSnapshot]:
+    """
+    The current snapshot, or None when there is no usable snapshot.
+    When source_hash is given the snapshot is only used if it was written from that JSON content.
+    """
+    try:
+        manifest = read_manifest(snapshot_dir)
+        if manifest is None:
+            return None
+        if source_hash is not None and manifest.get('source_hash') != source_hash:
+            return None
+        return ColumnarSnapshot.load(snapshot_dir)
+    except Exception as e:
+        print(f"Error loading columnar snapshot: {e}")
+        return None
+
+
+def load_snapshot_records(snapshot_dir: str = SNAPSHOT_DIR,
+                          source_hash: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+    """Records from the current snapshot (see load_snapshot), or None"""
+    snapshot = load_snapshot(snapshot_dir, source_hash)
+    return snapshot.to_records() if snapshot is not None else None
@@ -0,0 +1,85 @@
+"""
+Embedding configuration shared by the ingestion pipeline and the query path.
+gemini-embedding-001 is trained with Matryoshka representation learning, so a
+reduced output dimensionality keeps the leading components of the full vector;
+reduced vectors must be re-normalised before dot-product search.
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Sequence
+
+import numpy as np
+
+EMBEDDING_MODEL = "gemini-embedding-001"
+EMBEDDING_TASK_TYPE = "SEMANTIC_SIMILARITY"
+FULL_EMBEDDING_DIMENSION = 3072
+MIN_EMBEDDING_DIMENSION = 128
+
+EMBEDDINGS_DIR = os.path.join(os.path.dirname(__file__), '..', 'embeddings')
+
+
+def get_embedding_dimension() -> int:
+    """Output dimensionality from EMBEDDING_DIMENSION (defaults to the full model size)"""
+    value = os.getenv("EMBEDDING_DIMENSION")
+    if not value:
+        return FULL_EMBEDDING_DIMENSION
+
+    dimension = int(value)
+    if not MIN_EMBEDDING_DIMENSION <= dimension <= FULL_EMBEDDING_DIMENSION:
+        raise ValueError(
+            f"EMBEDDING_DIMENSION must be between {MIN_EMBEDDING_DIMENSION} and {FULL_EMBEDDING_DIMENSION}, got {dimension}"
+        )
+    return dimension
+
+
+def normalize_embedding(values: Sequence[float]) -> List[float]:
+    """Scale a vector to unit length (reduced-dimension outputs are not normalised by the API)"""
+    vector = np.asarray(values, dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    if norm == 0:
+        return vector.tolist()
+    return (vector / norm).tolist()
+
+
+def truncate_embeddings(matrix: np.ndarray, dimension: int) -> np.ndarray:
+    """Keep the leading components of each row and re-normalise (simulates a reduced output size)"""
+    truncated = np.asarray(matrix, dtype=np.float32)[:, :dimension]
+    norms = np.linalg.norm(truncated, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return truncated / norms
+
+
+def metadata_path_for(embeddings_file: str) -> str:
+    """Path of the metadata file written next to an embeddings file"""
+    root, _ = os.path.splitext(embeddings_file)
+    return f"{root}.meta.json"
+
+
+def write_index_metadata(embeddings_file: str, dimension: int, record_count: int) -> str:
+    """Record the model, dimension and size of an embeddings export"""
+    metadata = {
+        "model": EMBEDDING_MODEL,
+        "task_type": EMBEDDING_TASK_TYPE,
+        "dimension": dimension,
+        "normalized": True,
+        "record_count": record_count,
+        "embeddings_file": os.path.basename(embeddings_file),
+        "created_at": datetime.now().isoformat()
+    }
+    path = metadata_path_for(embeddings_file)
+    with open(path, 'w') as f:
+        json.dump(metadata, f, indent=2)
+    return path
+
+
+def read_latest_index_metadata(embeddings_dir: str = EMBEDDINGS_DIR) -> Optional[Dict[str, Any]]:
+    """Metadata of the most recent embeddings export, if any"""
+    if not os.path.isdir(embeddings_dir):
+        return None
+    candidates = sorted(name for name in os.listdir(embeddings_dir) if name.endswith('.meta.json'))
+    if not candidates:
+        return None
+    with open(os.path.join(embeddings_dir, candidates[-1]), 'r') as f:
+        return json.load(f)
@@ -0,0 +1,294 @@
+"""
+Expense engine over the transaction ledger (financial_history.csv).
+The ledger is streamed in chunks into per-category, per-plot, per-season and
+per-month rollups, and its transactions are kept in a date-sorted columnar
+index with prefix sums. Date-range totals then take two binary searches per
+category instead of a scan, and listing a range costs only its output size.
+"""
+
+import os
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import date
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .farm_data_store import MAX_LOADED_PARTITIONS, get_current_farmer, get_partition_registry, partition_path
+from .farm_merge import CSV_FILES, DATA_DIR
+
+LEDGER_FILE = CSV_FILES['financial_history']
+LEDGER_COLUMNS = ['transaction_id', 'date', 'category', 'description', 'cost_kes', 'related_plot_id']
+
+# Rows parsed per chunk while streaming the ledger
+DEFAULT_CHUNK_SIZE = 50000
+
+EPOCH = np.datetime64('1970-01-01', 'D')
+
+
+def ledger_path(farmer_id: Optional[str] = None) -> str:
+    """Ledger of the given (or current) farm; the shared data directory in single-farm mode"""
+    farmer_id = farmer_id or get_current_farmer()
+    if farmer_id:
+        farm_dir = os.path.dirname(partition_path(farmer_id, get_partition_registry().farms_dir))
+        return os.path.join(farm_dir, LEDGER_FILE)
+    return os.path.join(DATA_DIR, LEDGER_FILE)
+
+
+def to_day(value: Any) -> int:
+    """Days since 1970-01-01 for an ISO date string or date"""
+    return int((np.datetime64(str(value), 'D') - EPOCH).astype(np.int64))
+
+
+def _from_day(day: int) -> str:
+    return str(EPOCH + np.timedelta64(int(day), 'D'))
+
+
+def _money(value: float) -> float:
+    return round(float(value), 2)
+
+
+class ExpenseLedger:
+    """Streaming rollups and a date-sorted index over one ledger file"""
+
+    def __init__(self):
+        self.categories: List[str] = []
+        self.plots: List[str] = []
+        self.category_totals: Dict[str, float] = defaultdict(float)
+        self.category_counts: Dict[str, int] = defaultdict(int)
+        self.plot_totals: Dict[str, float] = defaultdict(float)
+        # period ("2024 S1") or month ("2024-03") -> category -> amount
+        self.season_totals: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self.month_totals: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self.skipped_rows = 0
+
+        # Date index (sorted by day) and its prefix sums
+        self.days = np.empty(0, dtype=np.int64)
+        self.costs = np.empty(0, dtype=np.float64)
+        self.category_codes = np.empty(0, dtype=np.int32)
+        self.plot_codes = np.empty(0, dtype=np.int32)
+        self.transaction_ids = np.empty(0, dtype=object)
+        self.descriptions = np.empty(0, dtype=object)
+        self.cumulative = np.zeros(1, dtype=np.float64)
+        self._category_index: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+        self._category_lookup: Dict[str, int] = {}
+        self._plot_lookup: Dict[str, int] = {}
+        self._chunks: List[Dict[str, np.ndarray]] = []
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    @classmethod
+    def from_csv(cls, path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> 'ExpenseLedger':
+        """Stream a ledger CSV; only one chunk of raw rows is parsed at a time"""
+        ledger = cls()
+        if os.path.exists(path):
+            reader = pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False,
+                                 usecols=lambda column: column in LEDGER_COLUMNS)
+            for chunk in reader:
+                ledger.add_chunk(chunk)
+        ledger.finalise()
+        return ledger
+
+    def _codes(self, values: pd.Series, lookup: Dict[str, int], names: List[str]) -> np.ndarray:
+        for value in values.unique():
+            if value not in lookup:
+                lookup[value] = len(names)
+                names.append(value)
+        return values.map(lookup).to_numpy(dtype=np.int32)
+
+    def add_chunk(self, chunk: pd.DataFrame):
+        """Fold one chunk of ledger rows into the rollups and the pending index arrays"""
+        dates = pd.to_datetime(chunk['date'], errors='coerce', format='ISO8601') if 'date' in chunk else None
+        costs = pd.to_numeric(chunk.get('cost_kes'), errors='coerce') if 'cost_kes' in chunk else None
+        if dates is None or costs is None:
+            self.skipped_rows += len(chunk)
+            return
+
+        valid = dates.notna().to_numpy() & costs.notna().to_numpy()
+        self.skipped_rows += int((~valid).sum())
+        chunk = chunk[valid]
+        dates, costs = dates[valid], costs[valid].astype(float)
+        if chunk.empty:
+            return
+
+        empty = pd.Series('', index=chunk.index)
+        categories = chunk.get('category', empty).str.strip().str.title().replace('', 'Other')
+        plots = chunk.get('related_plot_id', empty).str.strip()
+        months = dates.dt.strftime('%Y-%m')
+        periods = plots.str.extract(r'_(\d{4})_(S\d+)$')
+        periods = (periods[0] + ' ' + periods[1]).where(periods[0].notna())
+
+        frame = pd.DataFrame({'category': categories, 'plot': plots, 'month': months,
+                              'period': periods, 'cost': costs})
+        for category, group in frame.groupby('category')['cost']:
+            self.category_totals[category] += float(group.sum())
+            self.category_counts[category] += int(group.size)
+        for plot, total in frame[frame['plot'] != ''].groupby('plot')['cost'].sum().items():
+            self.plot_totals[plot] += float(total)
+        for (month, category), total in frame.groupby(['month', 'category'])['cost'].sum().items():
+            self.month_totals[month][category] += float(total)
+        for (period, category), total in frame.dropna(subset=['period']).groupby(['period', 'category'])['cost'].sum().items():
+            self.season_totals[period][category] += float(total)
+
+        self._chunks.append({
+            'days': (dates.to_numpy(dtype='datetime64[D]') - EPOCH).astype(np.int64),
+            'costs': costs.to_numpy(dtype=np.float64),
+            'category_codes': self._codes(categories, self._category_lookup, self.categories),
+            'plot_codes': self._codes(plots, self._plot_lookup, self.plots),
+            'transaction_ids': chunk.get('transaction_id', empty).to_numpy(dtype=object),
+            'descriptions': chunk.get('description', empty).to_numpy(dtype=object),
+        })
+
+    def finalise(self):
+        """Sort the streamed transactions by date and build the prefix sums"""
+        if self._chunks:
+            columns = {key: np.concatenate([c[key] for c in self._chunks]) for key in self._chunks[0]}
+            order = np.argsort(columns['days'], kind='stable')
+            for key, values in columns.items():
+                setattr(self, key, values[order])
+            self._chunks = []
+
+        self.cumulative = np.concatenate([[0.0], np.cumsum(self.costs)])
+        self._category_index = {}
+        for code in range(len(self.categories)):
+            positions = np.flatnonzero(self.category_codes == code)
+            self._category_index[code] = (self.days[positions],
+                                          np.concatenate([[0.0], np.cumsum(self.costs[positions])]))
+
+    def _bounds(self, days: np.ndarray, start: Optional[int], end: Optional[int]) -> Tuple[int, int]:
+        lo = 0 if start is None else int(np.searchsorted(days, start, side='left'))
+        hi = len(days) if end is None else int(np.searchsorted(days, end, side='right'))
+        return lo, max(lo, hi)
+
+    def range_summary(self, start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Any]:
+        """Total, count and per-category totals for an inclusive date range (O(categories * log n))"""
+        start_day = to_day(start) if start else None
+        end_day = to_day(end) if end else None
+
+        lo, hi = self._bounds(self.days, start_day, end_day)
+        by_category = {}
+        for code, (days, cumulative) in self._category_index.items():
+            c_lo, c_hi = self._bounds(days, start_day, end_day)
+            if c_hi > c_lo:
+                by_category[self.categories[code]] = {
+                    'amount': _money(cumulative[c_hi] - cumulative[c_lo]),
+                    'count': c_hi - c_lo
+                }
+        return {
+            'start': start,
+            'end': end,
+            'total': _money(self.cumulative[hi] - self.cumulative[lo]),
+            'count': hi - lo,
+            'by_category': by_category
+        }
+
+    def transactions(self, start: Optional[str] = None, end: Optional[str] = None,
+                     limit: Optional[int] = 100) -> List[Dict[str, Any]]:
+        """Transactions in an inclusive date range, oldest first (cost: the rows returned)"""
+        lo, hi = self._bounds(self.days, to_day(start) if start else None, to_day(end) if end else None)
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return [{
+            'transaction_id': self.transaction_ids[i],
+            'date': _from_day(self.days[i]),
+            'category': self.categories[self.category_codes[i]],
+            'description': self.descriptions[i],
+            'cost_kes': _money(self.costs[i]),
+            'plot_id': self.plots[self.plot_codes[i]] or None
+        } for i in range(lo, hi)]
+
+    def monthly_totals(self, start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Month -> category -> amount for a range. Whole months come from the rollup;
+        only the partial months at the range edges are computed from the date index.
+        """
+        start_month = start[:7] if start else None
+        end_month = end[:7] if end else None
+        months = {}
+        for month in sorted(self.month_totals):
+            if (start_month and month < start_month) or (end_month and month > end_month):
+                continue
+            if month in (start_month, end_month):
+                month_start = max(start, f"{month}-01") if start else f"{month}-01"
+                month_end = min(end, _month_end(month)) if end else _month_end(month)
+                by_category = self.range_summary(month_start, month_end)['by_category']
+                totals = {category: values['amount'] for category, values in by_category.items()}
+            else:
+                totals = {category: _money(amount) for category, amount in self.month_totals[month].items()}
+            if totals:
+                months[month] = {category.lower(): amount for category, amount in totals.items()}
+        return months
+
+    def summary(self, start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Any]:
+        """Expense tracker view: totals, category breakdown and period, month and plot series"""
+        if start or end:
+            ranged = self.range_summary(start, end)
+            totals = {category: values['amount'] for category, values in ranged['by_category'].items()}
+            total, count = ranged['total'], ranged['count']
+            period_expenses = None
+            plot_expenses = None
+        else:
+            totals = dict(self.category_totals)
+            total, count = sum(totals.values()), len(self)
+            period_expenses = {
+                period: {category.lower(): _money(amount) for category, amount in values.items()}
+                for period, values in sorted(self.season_totals.items())
+            }
+            plot_expenses = {plot: _money(amount) for plot, amount in sorted(self.plot_totals.items())}
+
+        expense_breakdown = []
+        for category, amount in totals.items():
+            if amount > 0:
+                expense_breakdown.append({
+                    'category': category,
+                    'amount': _money(amount),
+                    'percentage': round((amount / total * 100), 1) if total > 0 else 0
+                })
+        expense_breakdown.sort(key=lambda x: x['amount'], reverse=True)
+
+        return {
+            'total_expenses': _money(total),
+            'transaction_count': count,
+            'expense_breakdown': expense_breakdown,
+            'period_expenses': period_expenses,
+            'monthly_expenses': self.monthly_totals(start, end),
+            'plot_expenses': plot_expenses,
+            'top_expense': expense_breakdown[0]['category'] if expense_breakdown else None
+        }
+
+
+def _month_end(month: str) -> str:
+    year, number = int(month[:4]), int(month[5:7])
+    next_month = date(year + number // 12, number % 12 + 1, 1)
+    return str(np.datetime64(next_month.isoformat(), 'D') - np.timedelta64(1, 'D'))
+
+
+# ledger path -> (file stat, ledger); one entry per loaded farm
+_ledgers: 'OrderedDict[str, Tuple[Any, ExpenseLedger]]' = OrderedDict()
+_ledgers_lock = threading.Lock()
+
+def get_expense_ledger(path: Optional[str] = None) -> ExpenseLedger:
+    """Ledger for the given file (default: the current farm's), rebuilt when the file changes"""
+    path = os.path.abspath(path or ledger_path())
+    try:
+        stat = os.stat(path)
+        stat_key = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        stat_key = None
+
+    with _ledgers_lock:
+        cached = _ledgers.get(path)
+        if cached is not None and cached[0] == stat_key:
+            _ledgers.move_to_end(path)
+            return cached[1]
+
+    ledger = ExpenseLedger.from_csv(path)
+    with _ledgers_lock:
+        _ledgers[path] = (stat_key, ledger)
+        _ledgers.move_to_end(path)
+        while len(_ledgers) > MAX_LOADED_PARTITIONS:
+            _ledgers.popitem(last=False)
+    return ledger
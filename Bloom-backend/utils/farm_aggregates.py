@@ -0,0 +1,243 @@
+"""
+Materialised analytics over the farm records.
+Price trends, crop recommendation scores and growth summaries
+are pure functions of the dataset, so they are computed once per data version
+(when the shared store loads new data) and the market, planner and growth
+tracker tools serve them by key lookup.
+
+The compute_* functions are the live computations; FarmAggregates.build
+evaluates them for every crop and plot key.
+"""
+
+from collections import defaultdict
+from typing import Dict, List, Any, Optional, Tuple
+
+from .farm_data_store import FarmDataSnapshot, get_farm_data_store
+from .farm_records import FarmRecord
+
+def recommendation_text(margin: float) -> str:
+    """Get recommendation text based on profit margin"""
+    if margin > 70:
+        return "Highly Profitable - Strongly Recommended"
+    elif margin > 50:
+        return "Very Profitable - Recommended"
+    elif margin > 40:
+        return "Profitable - Good Choice"
+    else:
+        return "Moderate Returns - Consider Alternatives"
+
+
+def compute_price_chart(records: List[FarmRecord]) -> Tuple[Dict[str, List[Dict]], Dict[str, Dict]]:
+    """Price history per crop (sorted by period) and the trend of each series"""
+    price_data = defaultdict(list)
+    for record in records:
+        if record.crop and record.price_per_kg and record.period:
+            price_data[record.crop].append({
+                'year': str(record.year),
+                'season': record.season,
+                'period': record.period,
+                'price_per_kg': record.price_per_kg
+            })
+
+    # Sort by period
+    for crop_name in price_data:
+        price_data[crop_name].sort(key=lambda x: (x['year'], x['season']))
+
+    # Calculate trends
+    trends = {}
+    for crop_name, prices in price_data.items():
+        if len(prices) >= 2:
+            first_price = prices[0]['price_per_kg']
+            last_price = prices[-1]['price_per_kg']
+            change = ((last_price - first_price) / first_price * 100) if first_price > 0 else 0
+            trend = 'Increasing' if change > 5 else 'Decreasing' if change < -5 else 'Stable'
+        else:
+            change = 0
+            trend = 'Insufficient data'
+
+        trends[crop_name] = {
+            'trend': trend,
+            'change_percent': round(change, 1),
+            'current_price': prices[-1]['price_per_kg'] if prices else 0,
+            'avg_price': round(sum(p['price_per_kg'] for p in prices) / len(prices), 2) if prices else 0
+        }
+
+    return dict(price_data), trends
+
+
+def compute_crop_recommendations(records: List[FarmRecord]) -> List[Dict[str, Any]]:
+    """Crops ranked by a score weighted on profit margin and successful seasons"""
+    crop_analysis = defaultdict(lambda: {
+        'profit_margins': [],
+        'yields': [],
+        'revenues': [],
+        'success_count': 0
+    })
+
+    for record in records:
+        if record.crop and record.profit_margin_percent:
+            stats = crop_analysis[record.crop]
+            stats['profit_margins'].append(record.profit_margin_percent)
+            stats['success_count'] += 1
+            if record.yield_tons_per_ha:
+                stats['yields'].append(record.yield_tons_per_ha)
+            if record.revenue_kes:
+                stats['revenues'].append(record.revenue_kes)
+
+    # Calculate averages and rank
+    recommendations = []
+    for crop, stats in crop_analysis.items():
+        margins = stats['profit_margins']
+        yields = stats['yields']
+        revenues = stats['revenues']
+
+        avg_margin = sum(margins) / len(margins) if margins else 0
+        avg_yield = sum(yields) / len(yields) if yields else 0
+        avg_revenue = sum(revenues) / len(revenues) if revenues else 0
+
+        # Simple scoring: weighted by margin and success rate
+        score = (avg_margin * 0.6) + (stats['success_count'] * 5)
+
+        recommendations.append({
+            'crop': crop,
+            'score': round(score, 1),
+            'avg_profit_margin': round(avg_margin, 1),
+            'avg_yield_tons_per_ha': round(avg_yield, 2),
+            'avg_revenue_kes': round(avg_revenue, 2),
+            'success_rate': stats['success_count'],
+            'recommendation': recommendation_text(avg_margin)
+        })
+
+    # Sort by score
+    recommendations.sort(key=lambda x: x['score'], reverse=True)
+    return recommendations
+
+
+def compute_growth_summaries(records: List[FarmRecord]) -> Dict[str, Dict[str, Any]]:
+    """Yield and revenue progression per plot (plots with fewer than two seasons are skipped)"""
+    growth_data = defaultdict(list)
+    for record in records:
+        if not record.period:
+            continue
+
+        plot = record.plot_name or 'Unknown'
+        growth_data[plot].append({
+            'plot_id': record.plot_id,
+            'plot_name': plot,
+            'year': str(record.year),
+            'season': record.season,
+            'period': record.period,
+            'crop': record.crop,
+            'yield_tons_per_ha': record.yield_tons_per_ha,
+            'revenue_kes': record.revenue_kes,
+            'profit_kes': record.profit_kes,
+            'profit_margin': record.profit_margin_percent,
+            'crop_stage': record.stage,
+            'planting_date': record.planting_date,
+            'expected_harvest': record.expected_harvest,
+            'area_hectares': record.area_hectares
+        })
+
+    # Sort each plot's data by year and season
+    for plot in growth_data:
+        growth_data[plot].sort(key=lambda x: (x['year'], x['season']))
+
+    # Calculate trends for each plot
+    plot_summaries = {}
+    for plot, series in growth_data.items():
+        if len(series) < 2:
+            continue
+
+        yields = [r['yield_tons_per_ha'] for r in series if r['yield_tons_per_ha']]
+        revenues = [r['revenue_kes'] for r in series if r['revenue_kes']]
+
+        if yields:
+            first_yield = yields[0]
+            last_yield = yields[-1]
+            yield_change = ((last_yield - first_yield) / first_yield * 100) if first_yield > 0 else 0
+
+            plot_summaries[plot] = {
+                'total_seasons': len(series),
+                'crops_grown': sorted(set(r['crop'] for r in series if r['crop'])),
+                'avg_yield': round(sum(yields) / len(yields), 2),
+                'yield_trend': 'Improving' if yield_change > 5 else 'Declining' if yield_change < -5 else 'Stable',
+                'yield_change_percent': round(yield_change, 1),
+                'avg_revenue': round(sum(revenues) / len(revenues), 2) if revenues else 0,
+                'time_series': series
+            }
+
+    return plot_summaries
+
+
+def _key(value: Optional[str]) -> Optional[str]:
+    return value.lower() if value else None
+
+
+class FarmAggregates:
+    """Precomputed aggregates for one data version, served by key"""
+
+    def __init__(self, version: Optional[str] = None):
+        self.version = version
+        self.price_data: Dict[str, List[Dict]] = {}
+        self.price_trends: Dict[str, Dict] = {}
+        self.crop_names: Dict[str, List[str]] = {}
+        self.crop_recommendations: List[Dict[str, Any]] = []
+        # plot key -> {plot: summary}; (plot key, crop key) -> {plot: summary}
+        self.growth_by_plot: Dict[Optional[str], Dict[str, Dict]] = {}
+        self.growth_by_plot_crop: Dict[Tuple[Optional[str], str], Dict[str, Dict]] = {}
+
+    @classmethod
+    def build(cls, records: List[FarmRecord], version: Optional[str] = None) -> 'FarmAggregates':
+        """Materialise every aggregate for the given records"""
+        aggregates = cls(version)
+
+        aggregates.price_data, aggregates.price_trends = compute_price_chart(records)
+        crop_names = defaultdict(list)
+        for crop_name in aggregates.price_data:
+            crop_names[crop_name.lower()].append(crop_name)
+        aggregates.crop_names = dict(crop_names)
+
+        aggregates.crop_recommendations = compute_crop_recommendations(records)
+
+        by_plot = defaultdict(list)
+        by_plot_crop = defaultdict(list)
+        for record in records:
+            by_plot[_key(record.plot_name)].append(record)
+            if record.crop:
+                by_plot_crop[(_key(record.plot_name), record.crop.lower())].append(record)
+        aggregates.growth_by_plot = {key: compute_growth_summaries(group) for key, group in by_plot.items()}
+        aggregates.growth_by_plot_crop = {key: compute_growth_summaries(group) for key, group in by_plot_crop.items()}
+        return aggregates
+
+    def price_chart(self, crop: Optional[str] = None) -> Tuple[Dict[str, List[Dict]], Dict[str, Dict]]:
+        """Price history and trends, optionally for one crop"""
+        if not crop:
+            return self.price_data, self.price_trends
+        names = self.crop_names.get(crop.lower(), [])
+        return ({name: self.price_data[name] for name in names},
+                {name: self.price_trends[name] for name in names})
+
+    def growth(self, plot_name: Optional[str] = None, crop: Optional[str] = None) -> Dict[str, Dict]:
+        """Growth summaries per plot, optionally for one plot and/or crop"""
+        plot_key, crop_key = _key(plot_name), _key(crop)
+        if crop_key:
+            groups = [summaries for (plot, crop_name), summaries in self.growth_by_plot_crop.items()
+                      if crop_name == crop_key and (plot_key is None or plot == plot_key)]
+        elif plot_key:
+            groups = [self.growth_by_plot.get(plot_key, {})]
+        else:
+            groups = list(self.growth_by_plot.values())
+
+        plot_summaries = {}
+        for summaries in groups:
+            plot_summaries.update(summaries)
+        return plot_summaries
+
+
+def get_farm_aggregates(path: Optional[str] = None) -> FarmAggregates:
+    """Aggregates for the shared store's current data version (rebuilt when the data changes)"""
+    return get_farm_data_store(path).derived('aggregates', _build_aggregates, eager=True)
+
+
+def _build_aggregates(snapshot: FarmDataSnapshot) -> FarmAggregates:
+    return FarmAggregates.build(snapshot.farm_records, snapshot.version)
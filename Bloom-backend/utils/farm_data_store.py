@@ -0,0 +1,369 @@
+"""
+Process-wide store for the merged farm records.
+Loads generated_data/merged_farm_data.json once, indexes it by plot, crop and
+season, and swaps in a fresh snapshot only when the file's mtime and content
+hash change. Tools share the same read-only records instead of re-reading the
+file on every call.
+
+When the columnar snapshot's manifest was written from the JSON as it is now
+(same size and mtime), the memory-mapped columns are used without reading the
+JSON at all; record dicts are only rebuilt if a tool asks for them.
+
+With several farms the data is partitioned by farmer_id under
+generated_data/farms/<farmer_id>/. The farm of the current request is held
+in a context variable; its store is loaded on first use and kept in a
+bounded LRU, so a request only touches one farm's data.
+"""
+
+import contextvars
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict, OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Callable
+
+from .farm_records import FarmRecord, SOURCE_KEYS, build_farm_records, build_farm_records_from_columns
+from .columnar_snapshot import MANIFEST_NAME, ColumnarSnapshot, load_snapshot, matches_source, read_manifest
+
+# Path to the merged farm data produced by setup/data_processing.py
+JSON_DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'generated_data', 'merged_farm_data.json')
+
+# Seconds between file stat checks; calls in between use the current snapshot
+RELOAD_CHECK_INTERVAL = 1.0
+
+INDEX_FIELDS = ['plot_id', 'base_plot', 'plot_name', 'crop', 'year', 'season']
+
+# Per-farm partitions written by setup/data_processing.py --partitioned
+FARMS_DIR = os.path.join(os.path.dirname(__file__), '..', 'generated_data', 'farms')
+PARTITION_FILE = 'merged_farm_data.json'
+
+# Farm partitions kept in memory at once (least recently used are dropped)
+MAX_LOADED_PARTITIONS = int(os.getenv("FARM_PARTITION_CACHE_SIZE", "64"))
+
+FARMER_ID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]*$")
+
+
+class FarmDataSnapshot:
+    """Immutable view of one version of the merged records, their typed form and indexes"""
+
+    def __init__(self, records: Optional[List[Dict[str, Any]]] = None, version: Optional[str] = None,
+                 mtime: Optional[float] = None, columns: Optional[ColumnarSnapshot] = None):
+        self._records = records
+        # Memory-mapped columnar snapshot the records were loaded from, if any
+        self.columns = columns
+        if records is None and columns is not None:
+            self.farm_records: List[FarmRecord] = build_farm_records_from_columns(
+                columns.decode(SOURCE_KEYS), columns.record_count)
+        else:
+            self.farm_records = build_farm_records(records or [])
+        self.version = version
+        self.mtime = mtime
+        self.indexes: Dict[str, Dict[str, List[int]]] = {field: defaultdict(list) for field in INDEX_FIELDS}
+        self._derived: Dict[str, Any] = {}
+
+        for position, record in enumerate(self.farm_records):
+            keys = (record.plot_id, record.base_plot_id, record.plot_name, record.crop, record.year, record.season)
+            for field, value in zip(INDEX_FIELDS, keys):
+                if value is not None and value != '':
+                    self.indexes[field][str(value).lower()].append(position)
+
+        self.indexes = {field: dict(index) for field, index in self.indexes.items()}
+
+    @property
+    def records(self) -> List[Dict[str, Any]]:
+        """Merged record dicts (decoded from the columns on first use)"""
+        if self._records is None:
+            self._records = self.columns.to_records() if self.columns is not None else []
+        return self._records
+
+    def positions(self, **filters) -> Optional[List[int]]:
+        """Record positions matching every given index filter (None when no filter is set)"""
+        selected = None
+        for field, value in filters.items():
+            if field not in self.indexes:
+                raise ValueError(f"Unknown index '{field}', expected one of {INDEX_FIELDS}")
+            if value is None or value == '':
+                continue
+            matches = self.indexes[field].get(str(value).lower(), [])
+            selected = set(matches) if selected is None else selected & set(matches)
+        return None if selected is None else sorted(selected)
+
+
+class FarmDataStore:
+    """Shared, indexed, hot-reloading access to the merged farm records"""
+
+    def __init__(self, path: str = JSON_DATA_PATH, check_interval: float = RELOAD_CHECK_INTERVAL,
+                 snapshot_dir: Optional[str] = None):
+        self.path = path
+        # Columnar snapshot written next to the JSON by setup/data_processing.py
+        self.snapshot_dir = snapshot_dir or os.path.join(os.path.dirname(path), 'snapshot')
+        self.check_interval = check_interval
+        self._snapshot = FarmDataSnapshot([])
+        self._stat_key = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        # Derived structures rebuilt as soon as new data is loaded
+        self._eager_builders: Dict[str, Callable[[FarmDataSnapshot], Any]] = {}
+        self.refresh(force=True)
+
+    def _file_stat(self):
+        stats = []
+        for path in (self.path, os.path.join(self.snapshot_dir, MANIFEST_NAME)):
+            try:
+                stat = os.stat(path)
+                stats.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stats.append(None)
+        return tuple(stats)
+
+    def refresh(self, force: bool = False) -> bool:
+        """Reload the file if its mtime and content hash changed. Returns True on reload."""
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval:
+            return False
+
+        with self._lock:
+            self._last_check = now
+            stat_key = self._file_stat()
+            if not force and stat_key == self._stat_key:
+                return False
+
+            try:
+                raw = None
+                manifest = read_manifest(self.snapshot_dir)
+                if matches_source(manifest, self.path):
+                    # The snapshot was written from the JSON as it is now; skip reading and hashing it
+                    version = manifest['source_hash']
+                else:
+                    with open(self.path, 'rb') as f:
+                        raw = f.read()
+                    version = hashlib.sha256(raw).hexdigest()
+                if version == self._snapshot.version:
+                    self._stat_key = stat_key
+                    return False
+
+                # Prefer the memory-mapped columnar snapshot when it was written from this JSON
+                columns = load_snapshot(self.snapshot_dir, source_hash=version)
+                records = None
+                if columns is None:
+                    if raw is None:
+                        with open(self.path, 'rb') as f:
+                            raw = f.read()
+                    records = json.loads(raw)
+            except FileNotFoundError:
+                # Partition not written yet; checked again once the file appears
+                self._stat_key = stat_key
+                return False
+            except Exception as e:
+                # Keep serving the previous snapshot
+                print(f"Error loading farm data: {e}")
+                return False
+
+            # Build fully (including eager derived structures) before swapping so
+            # readers never see a partial snapshot
+            snapshot = FarmDataSnapshot(records, version=version, mtime=os.path.getmtime(self.path),
+                                        columns=columns)
+            for key, builder in self._eager_builders.items():
+                try:
+                    snapshot._derived[key] = builder(snapshot)
+                except Exception as e:
+                    print(f"Error building {key} for farm data: {e}")
+            self._snapshot = snapshot
+            self._stat_key = stat_key
+            return True
+
+    @property
+    def snapshot(self) -> FarmDataSnapshot:
+        """Current snapshot, reloading first if the file changed"""
+        self.refresh()
+        return self._snapshot
+
+    @property
+    def records(self) -> List[Dict[str, Any]]:
+        """All merged records (shared; do not mutate)"""
+        return self.snapshot.records
+
+    @property
+    def farm_records(self) -> List[FarmRecord]:
+        """All records in typed form, aligned with records"""
+        return self.snapshot.farm_records
+
+    @property
+    def version(self) -> Optional[str]:
+        """Content hash of the loaded file"""
+        return self.snapshot.version
+
+    def find(self, plot_id: Optional[str] = None, base_plot: Optional[str] = None,
+             plot_name: Optional[str] = None, crop: Optional[str] = None,
+             year: Optional[Any] = None, season: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Raw records matching all given fields exactly (case-insensitive) via the indexes"""
+        return self._select('records', plot_id=plot_id, base_plot=base_plot, plot_name=plot_name,
+                            crop=crop, year=year, season=season)
+
+    def find_records(self, plot_id: Optional[str] = None, base_plot: Optional[str] = None,
+                     plot_name: Optional[str] = None, crop: Optional[str] = None,
+                     year: Optional[Any] = None, season: Optional[str] = None) -> List[FarmRecord]:
+        """Typed records matching all given fields exactly (case-insensitive) via the indexes"""
+        return self._select('farm_records', plot_id=plot_id, base_plot=base_plot, plot_name=plot_name,
+                            crop=crop, year=year, season=season)
+
+    def _select(self, attribute: str, **filters) -> list:
+        snapshot = self.snapshot
+        rows = getattr(snapshot, attribute)
+        positions = snapshot.positions(**filters)
+        if positions is None:
+            return rows
+        return [rows[p] for p in positions]
+
+    def get(self, plot_id: str) -> Optional[Dict[str, Any]]:
+        """First record with the given plot_id"""
+        matches = self.find(plot_id=plot_id)
+        return matches[0] if matches else None
+
+    def values(self, field: str) -> List[str]:
+        """Distinct (lower-cased) keys of an index"""
+        return sorted(self.snapshot.indexes[field])
+
+    def derived(self, key: str, builder: Callable[[FarmDataSnapshot], Any], eager: bool = False) -> Any:
+        """
+        Cache a structure built from a snapshot; rebuilt once per data version.
+        Eager structures are rebuilt at reload time instead of on first use.
+        """
+        snapshot = self.snapshot
+        if key not in snapshot._derived:
+            with self._lock:
+                if eager:
+                    self._eager_builders[key] = builder
+                if key not in snapshot._derived:
+                    snapshot._derived[key] = builder(snapshot)
+        return snapshot._derived[key]
+
+
+_current_farmer: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('farmer_id', default=None)
+
+
+def get_current_farmer() -> Optional[str]:
+    """farmer_id of the current request (None in single-farm mode)"""
+    return _current_farmer.get()
+
+
+def set_current_farmer(farmer_id: Optional[str]) -> contextvars.Token:
+    """Scope the data layer to one farm; pass the token to reset_current_farmer when done"""
+    if farmer_id is not None:
+        validate_farmer_id(farmer_id)
+    return _current_farmer.set(farmer_id)
+
+
+def reset_current_farmer(token: contextvars.Token):
+    _current_farmer.reset(token)
+
+
+@contextmanager
+def farm_partition(farmer_id: Optional[str]):
+    """Run a block against one farm's partition"""
+    token = set_current_farmer(farmer_id)
+    try:
+        yield
+    finally:
+        reset_current_farmer(token)
+
+
+def validate_farmer_id(farmer_id: str) -> str:
+    """Reject ids that cannot be used as a partition directory name"""
+    if not FARMER_ID_PATTERN.match(farmer_id or '') or '..' in farmer_id:
+        raise ValueError(f"Invalid farmer_id: {farmer_id!r}")
+    return farmer_id
+
+
+def partition_path(farmer_id: str, farms_dir: str = FARMS_DIR) -> str:
+    """Merged data file of one farm's partition"""
+    return os.path.join(farms_dir, validate_farmer_id(farmer_id), PARTITION_FILE)
+
+
+class FarmPartitionRegistry:
+    """Lazily loaded per-farm stores, bounded by an LRU"""
+
+    def __init__(self, farms_dir: str = FARMS_DIR, max_partitions: int = MAX_LOADED_PARTITIONS,
+                 check_interval: float = RELOAD_CHECK_INTERVAL):
+        self.farms_dir = farms_dir
+        self.max_partitions = max(1, max_partitions)
+        self.check_interval = check_interval
+        self._stores: 'OrderedDict[str, FarmDataStore]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    def get(self, farmer_id: str) -> FarmDataStore:
+        """Store for one farm, loading its partition on first use"""
+        with self._lock:
+            store = self._stores.get(farmer_id)
+            if store is not None:
+                self._stores.move_to_end(farmer_id)
+                return store
+
+        # Load outside the lock so one slow partition does not block other farms
+        store = FarmDataStore(partition_path(farmer_id, self.farms_dir), check_interval=self.check_interval)
+        with self._lock:
+            existing = self._stores.get(farmer_id)
+            if existing is not None:
+                self._stores.move_to_end(farmer_id)
+                return existing
+            self._stores[farmer_id] = store
+            self.loads += 1
+            while len(self._stores) > self.max_partitions:
+                self._stores.popitem(last=False)
+                self.evictions += 1
+        return store
+
+    def loaded(self) -> List[str]:
+        """farmer_ids currently in memory, least recently used first"""
+        with self._lock:
+            return list(self._stores)
+
+    def evict(self, farmer_id: str):
+        with self._lock:
+            self._stores.pop(farmer_id, None)
+
+    def farmer_ids(self) -> List[str]:
+        """Every farm with a partition on disk"""
+        if not os.path.isdir(self.farms_dir):
+            return []
+        return sorted(name for name in os.listdir(self.farms_dir)
+                      if os.path.exists(os.path.join(self.farms_dir, name, PARTITION_FILE)))
+
+
+_partitions = FarmPartitionRegistry()
+
+
+def get_partition_registry() -> FarmPartitionRegistry:
+    return _partitions
+
+
+_stores: Dict[str, FarmDataStore] = {}
+_stores_lock = threading.Lock()
+
+def get_farm_data_store(path: Optional[str] = None, farmer_id: Optional[str] = None) -> FarmDataStore:
+    """
+    Process-wide store for the given data file, or for a farm's partition.
+    Without a path the farm comes from farmer_id or the current request; with
+    no farm set, the single-farm merged data file is used.
+    """
+    if path is None:
+        farmer_id = farmer_id or get_current_farmer()
+        if farmer_id is not None:
+            return _partitions.get(farmer_id)
+        path = JSON_DATA_PATH
+
+    key = os.path.abspath(path)
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(key)
+            if store is None:
+                store = FarmDataStore(path)
+                _stores[key] = store
+    return store
@@ -0,0 +1,263 @@
+"""
+Merge of the farm CSV exports into one record per plot season.
+Used by setup/data_processing.py for full rebuilds and by the incremental
+ingestion path, which re-runs the merge for the affected plot seasons only.
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, List, Any, Optional
+
+import pandas as pd
+
+from .columnar_snapshot import write_snapshot
+from .farm_data_store import FARMS_DIR, partition_path
+
+# Farm CSV exports (Bloom-backend/data)
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
+
+CSV_FILES = {
+    'plot_base_info': 'plot_base_information.csv',
+    'plot_details': 'plot_details_and_status.csv',
+    'crop_performance': 'crop_performance_summary.csv',
+    'farm_identity': 'farm_identity.csv',
+    'financial_history': 'financial_history.csv',
+    'financial_summary': 'financial_summary_by_season.csv',
+    'input_costs': 'input_costs_breakdown.csv',
+    'profitability': 'profitability_summary.csv',
+    'yields_inventory': 'yields_and_inventory.csv',
+    'current_inventory': 'current_inventory.csv',
+    'crop_rotation': 'crop_rotation_schedule.csv'
+}
+
+
+def load_source_frames(data_dir: str = DATA_DIR, verbose: bool = False) -> Dict[str, pd.DataFrame]:
+    """Read every farm CSV that exists in data_dir"""
+    dataframes = {}
+    for key, filename in CSV_FILES.items():
+        filepath = os.path.join(data_dir, filename)
+        if os.path.exists(filepath):
+            dataframes[key] = pd.read_csv(filepath)
+            if verbose:
+                print(f"Loaded {filename}: {len(dataframes[key])} rows, columns: {list(dataframes[key].columns)}")
+        else:
+            if verbose:
+                print(f"Warning: {filename} not found")
+    return dataframes
+
+
+def split_by_farmer(dataframes: Dict[str, pd.DataFrame]) -> Dict[str, Dict[str, pd.DataFrame]]:
+    """
+    Source frames for each farm in farm_identity.csv.
+    Tables with a farmer_id column are filtered to the farm's rows; tables without
+    one (e.g. regional crop performance) are shared by every farm.
+    """
+    if 'farm_identity' not in dataframes or 'farmer_id' not in dataframes['farm_identity'].columns:
+        raise ValueError("farm_identity.csv with a farmer_id column is required to partition farms")
+
+    farmer_ids = [str(f) for f in dataframes['farm_identity']['farmer_id'].drop_duplicates()]
+    if len(farmer_ids) > 1 and 'farmer_id' not in dataframes.get('plot_details', pd.DataFrame()).columns:
+        raise ValueError("plot_details_and_status.csv needs a farmer_id column to split several farms")
+
+    partitions = {}
+    for farmer_id in farmer_ids:
+        frames = {}
+        for key, frame in dataframes.items():
+            if 'farmer_id' in frame.columns:
+                frame = frame[frame['farmer_id'].astype(str) == farmer_id]
+                if key != 'farm_identity':
+                    frame = frame.drop(columns=['farmer_id'])
+                frame = frame.reset_index(drop=True)
+            frames[key] = frame
+        partitions[farmer_id] = frames
+    return partitions
+
+
+def merge_farm_data(dataframes: Dict[str, pd.DataFrame], plot_ids: Optional[List[str]] = None,
+                    verbose: bool = False, farmer_id: Optional[str] = None) -> pd.DataFrame:
+    """
+    Merge the farm CSVs onto the plot season rows of plot_details_and_status.csv.
+
+    Args:
+        dataframes: Source frames keyed like CSV_FILES
+        plot_ids: Only merge these plot seasons (every join is a left join from the
+            plot rows, so the result equals the matching rows of a full merge)
+        verbose: Print merge diagnostics
+        farmer_id: Farm whose identity row is attached (default: the first farm)
+
+    Returns:
+        One row per plot season (more when a joined table has several matching rows)
+    """
+    # Start with plot details as the base (has the most granular data)
+    if 'plot_details' not in dataframes:
+        raise ValueError("plot_details_and_status.csv is required as the base dataset")
+
+    base_df = dataframes['plot_details'].copy()
+    if plot_ids is not None:
+        base_df = base_df[base_df['plot_id'].isin(plot_ids)].reset_index(drop=True)
+
+    # Extract base plot_id for merging
+    base_df['base_plot_id'] = base_df['plot_id'].apply(lambda x: '_'.join(x.split('_')[:2]))
+
+    # Merge with plot base information
+    if 'plot_base_info' in dataframes:
+        plot_base_cols = dataframes['plot_base_info'].columns
+        if 'plot_id' in plot_base_cols:
+            base_df = pd.merge(base_df, dataframes['plot_base_info'],
+                               left_on='base_plot_id', right_on='plot_id',
+                               how='left', suffixes=('', '_base'))
+
+    # Merge with farm identity (for farm-level coordinates)
+    if 'farm_identity' in dataframes:
+        # Add farm identity data to all records
+        identity = dataframes['farm_identity']
+        if farmer_id is not None:
+            identity = identity[identity['farmer_id'].astype(str) == farmer_id]
+            if identity.empty:
+                raise ValueError(f"farmer_id {farmer_id} not found in farm_identity.csv")
+        farm_info = identity.iloc[0]
+        for col in dataframes['farm_identity'].columns:
+            base_df[f'farm_{col}'] = farm_info[col]
+
+    # Merge with crop performance
+    if 'crop_performance' in dataframes:
+        crop_perf_cols = dataframes['crop_performance'].columns
+        if 'crop_type' in crop_perf_cols:
+            base_df = pd.merge(base_df, dataframes['crop_performance'],
+                               left_on='current_crop', right_on='crop_type',
+                               how='left', suffixes=('', '_perf'))
+
+    # Merge with financial data by season
+    if 'financial_summary' in dataframes:
+        fin_cols = dataframes['financial_summary'].columns
+        if 'plot_id' in fin_cols:
+            if verbose:
+                print(f"Base plot_ids sample: {base_df['plot_id'].head().tolist()}")
+                print(f"Financial plot_ids: {dataframes['financial_summary']['plot_id'].tolist()}")
+
+                # Check which base plot_ids are missing from financial
+                missing_financial = set(base_df['plot_id']) - set(dataframes['financial_summary']['plot_id'])
+                print(f"Plot_ids in base but NOT in financial: {missing_financial}")
+
+            # Direct merge on plot_id
+            before_merge = len(base_df)
+            base_df = pd.merge(base_df, dataframes['financial_summary'],
+                               on='plot_id', how='left', suffixes=('', '_fin'))
+            after_merge = len(base_df)
+            if verbose:
+                print(f"Financial merge: {before_merge} -> {after_merge} records")
+
+    # Merge with financial history (aggregate by plot)
+    if 'financial_history' in dataframes:
+        fin_hist_cols = dataframes['financial_history'].columns
+        if 'related_plot_id' in fin_hist_cols:
+            if verbose:
+                print(f"Financial history plot_ids: {dataframes['financial_history']['related_plot_id'].unique().tolist()}")
+
+            # Aggregate financial history by plot
+            fin_hist_agg = dataframes['financial_history'].groupby('related_plot_id').agg({
+                'cost_kes': 'sum',
+                'category': lambda x: ', '.join(x.unique())
+            }).reset_index()
+            fin_hist_agg.rename(columns={'related_plot_id': 'plot_id'}, inplace=True)
+
+            if verbose:
+                missing_hist = set(base_df['plot_id']) - set(fin_hist_agg['plot_id'])
+                print(f"Plot_ids in base but NOT in financial history: {len(missing_hist)} records")
+
+            base_df = pd.merge(base_df, fin_hist_agg, on='plot_id', how='left', suffixes=('', '_hist'))
+
+    # Merge with yields and inventory
+    if 'yields_inventory' in dataframes:
+        yields_cols = dataframes['yields_inventory'].columns
+        if 'plot_id' in yields_cols:
+            base_df = pd.merge(base_df, dataframes['yields_inventory'],
+                               on='plot_id', how='left', suffixes=('', '_yield'))
+
+    # Merge with profitability data
+    if 'profitability' in dataframes:
+        profit_cols = dataframes['profitability'].columns
+        if 'plot_id' in profit_cols:
+            base_df = pd.merge(base_df, dataframes['profitability'],
+                               on='plot_id', how='left', suffixes=('', '_profit'))
+
+    # Merge with input costs (aggregate data - add to all records)
+    if 'input_costs' in dataframes:
+        input_cols = dataframes['input_costs'].columns
+        if 'category' in input_cols and 'total_cost_kes' in input_cols:
+            # Convert input costs to a single record with all categories
+            input_costs_pivot = dataframes['input_costs'].set_index('category')['total_cost_kes'].to_dict()
+            for category, cost in input_costs_pivot.items():
+                base_df[f'{category.lower()}_cost_kes'] = cost
+
+    # Merge with current inventory
+    if 'current_inventory' in dataframes:
+        inv_cols = dataframes['current_inventory'].columns
+        if 'crop_type' in inv_cols:
+            base_df = pd.merge(base_df, dataframes['current_inventory'],
+                               left_on='current_crop', right_on='crop_type',
+                               how='left', suffixes=('', '_inv'))
+
+    # Merge with crop rotation schedule
+    if 'crop_rotation' in dataframes:
+        rotation_cols = dataframes['crop_rotation'].columns
+        if 'plot_id' in rotation_cols:
+            # Create a mapping for next crop in rotation
+            rotation_df = dataframes['crop_rotation'].copy()
+            rotation_df['base_plot_id'] = rotation_df['plot_id']
+            # Get the next crop for each plot (simplified - just get the next row)
+            rotation_df = rotation_df.sort_values(['plot_id', 'year', 'season'])
+            rotation_df['next_crop'] = rotation_df.groupby('plot_id')['crop'].shift(-1)
+            rotation_next = rotation_df.groupby('base_plot_id')['next_crop'].last().reset_index()
+            base_df = pd.merge(base_df, rotation_next, on='base_plot_id', how='left')
+
+    return base_df
+
+
+def to_documents(merged_df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Convert the merged frame to a list of JSON objects"""
+    return merged_df.to_dict(orient="records")
+
+
+def partition_fingerprint(frames: Dict[str, pd.DataFrame]) -> str:
+    """Content hash of one farm's source frames (changes when any of its rows change)"""
+    digest = hashlib.sha256()
+    for key in sorted(frames):
+        digest.update(key.encode('utf-8'))
+        digest.update(frames[key].to_csv(index=False).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def write_farm_partitions(dataframes: Dict[str, pd.DataFrame], farms_dir: str = FARMS_DIR,
+                          verbose: bool = False, farmer_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Merge and write one partition (merged JSON, columnar snapshot and ledger) per farm.
+
+    Args:
+        farmer_ids: Only write these farms (default: every farm in farm_identity.csv)
+
+    Returns:
+        Per-farm summaries with the farmer_id, record count and snapshot version
+    """
+    summaries = []
+    for farmer_id, frames in split_by_farmer(dataframes).items():
+        if farmer_ids is not None and farmer_id not in farmer_ids:
+            continue
+        documents = to_documents(merge_farm_data(frames, farmer_id=farmer_id))
+        output_file = partition_path(farmer_id, farms_dir)
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        with open(output_file, 'w') as f:
+            json.dump(documents, f, indent=2)
+        manifest = write_snapshot(documents, os.path.join(os.path.dirname(output_file), 'snapshot'),
+                                  source_path=output_file)
+
+        # The farm's transaction ledger, streamed by the expense engine
+        if 'financial_history' in frames:
+            frames['financial_history'].to_csv(
+                os.path.join(os.path.dirname(output_file), CSV_FILES['financial_history']), index=False)
+        summaries.append({"farmer_id": farmer_id, "record_count": len(documents),
+                          "version": manifest['version']})
+        if verbose:
+            print(f"Partition {farmer_id}: {len(documents)} records written to {output_file}")
+    return summaries
@@ -0,0 +1,341 @@
+"""
+Columnar query engine over the merged farm records.
+Answers structured analytics questions (filters, group-by, aggregates) exactly
+over every matching row, using pandas/NumPy instead of semantic similarity.
+"""
+
+import json
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from .farm_data_store import JSON_DATA_PATH, get_farm_data_store
+from .farm_records import FarmRecord
+
+STRING_COLUMNS = ['plot_id', 'base_plot_id', 'plot_name', 'crop', 'stage', 'season']
+NUMERIC_COLUMNS = ['year', 'yield_tons_per_ha', 'revenue_kes', 'cost_kes', 'profit_kes',
+                   'profit_margin_percent', 'price_per_kg', 'area_hectares']
+
+AGGREGATES = ['count', 'sum', 'mean', 'min', 'max', 'std']
+
+# Declarative query specs (see FarmQueryEngine.query)
+NUMERIC_OPERATORS = ['eq', 'ne', 'gt', 'gte', 'lt', 'lte', 'in']
+STRING_OPERATORS = ['eq', 'ne', 'in', 'contains']
+FILTER_OPERATORS = NUMERIC_OPERATORS + ['contains']
+DEFAULT_QUERY_LIMIT = 50
+MAX_QUERY_LIMIT = 500
+
+QUERY_SPEC_SCHEMA = {
+    "filters": "object: column -> value | [values] | {operator: value}; operators " + ", ".join(FILTER_OPERATORS),
+    "group_by": "array of columns (" + ", ".join(STRING_COLUMNS + ['year']) + ")",
+    "metrics": "array of 'count' or '<numeric column>:<aggregate>' (" + ", ".join(AGGREGATES) + ")",
+    "columns": "array of columns returned when there are no metrics (default: all)",
+    "sort": "array of output columns, prefix '-' for descending",
+    "limit": f"integer 1-{MAX_QUERY_LIMIT} (default {DEFAULT_QUERY_LIMIT})",
+    "string_columns": STRING_COLUMNS,
+    "numeric_columns": NUMERIC_COLUMNS
+}
+
+
+def validate_query_spec(spec: Any) -> Dict[str, Any]:
+    """
+    Check a query spec against QUERY_SPEC_SCHEMA and return it normalised.
+
+    Raises:
+        ValueError: listing every problem found in the spec
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("Query spec must be a JSON object")
+
+    errors = []
+    columns = STRING_COLUMNS + NUMERIC_COLUMNS
+    unknown = set(spec) - {'filters', 'group_by', 'metrics', 'columns', 'sort', 'limit'}
+    if unknown:
+        errors.append(f"Unknown spec keys: {sorted(unknown)}")
+
+    filters = []
+    raw_filters = spec.get('filters') or {}
+    if not isinstance(raw_filters, dict):
+        errors.append("filters must be an object of column -> condition")
+        raw_filters = {}
+    for column, condition in raw_filters.items():
+        if column not in columns:
+            errors.append(f"Unknown filter column '{column}'")
+            continue
+        if isinstance(condition, dict):
+            conditions = list(condition.items())
+        elif isinstance(condition, list):
+            conditions = [('in', condition)]
+        else:
+            conditions = [('eq', condition)]
+        allowed = STRING_OPERATORS if column in STRING_COLUMNS else NUMERIC_OPERATORS
+        for operator, value in conditions:
+            if operator not in allowed:
+                errors.append(f"Operator '{operator}' is not supported on '{column}' (use {', '.join(allowed)})")
+            elif operator == 'in' and not isinstance(value, list):
+                errors.append(f"'in' on '{column}' needs a list of values")
+            elif column in NUMERIC_COLUMNS and not all(
+                    isinstance(v, (int, float)) and not isinstance(v, bool)
+                    for v in (value if isinstance(value, list) else [value])):
+                errors.append(f"'{column}' filters need numeric values")
+            else:
+                filters.append((column, operator, value))
+
+    group_by = spec.get('group_by') or []
+    if not isinstance(group_by, list) or any(c not in STRING_COLUMNS + ['year'] for c in group_by):
+        errors.append(f"group_by must be a list of {STRING_COLUMNS + ['year']}")
+        group_by = []
+
+    metrics = []
+    for metric in spec.get('metrics') or ([] if not group_by else ['count']):
+        if metric == 'count':
+            metrics.append(('count', None, 'count'))
+            continue
+        column, _, aggregate = str(metric).partition(':')
+        if column not in NUMERIC_COLUMNS or aggregate not in AGGREGATES:
+            errors.append(f"Invalid metric '{metric}' (use 'count' or '<numeric column>:<{'|'.join(AGGREGATES)}>')")
+        else:
+            metrics.append((f"{column}_{aggregate}", column, aggregate))
+
+    selected = spec.get('columns') or columns
+    if not isinstance(selected, list) or any(c not in columns for c in selected):
+        errors.append(f"columns must be a list of {columns}")
+        selected = columns
+
+    output_columns = group_by + [name for name, _, _ in metrics] if metrics else selected
+    sort = []
+    for key in spec.get('sort') or []:
+        name = str(key).lstrip('-')
+        if name not in output_columns:
+            errors.append(f"Cannot sort by '{name}'; output columns are {output_columns}")
+        else:
+            sort.append((name, not str(key).startswith('-')))
+
+    limit = spec.get('limit', DEFAULT_QUERY_LIMIT)
+    if not isinstance(limit, int) or isinstance(limit, bool) or not 1 <= limit <= MAX_QUERY_LIMIT:
+        errors.append(f"limit must be an integer between 1 and {MAX_QUERY_LIMIT}")
+        limit = DEFAULT_QUERY_LIMIT
+
+    if errors:
+        raise ValueError("; ".join(errors))
+
+    return {'filters': filters, 'group_by': group_by, 'metrics': metrics,
+            'columns': selected, 'sort': sort, 'limit': limit}
+
+
+class FarmQueryEngine:
+    """Exact filter, group-by and aggregate over merged farm records held as columns"""
+
+    def __init__(self, records: List[Any]):
+        records = [record if isinstance(record, FarmRecord) else FarmRecord.from_dict(record)
+                   for record in records]
+        # Filled column at a time; no per-row dicts
+        frame = pd.DataFrame({column: [getattr(record, column) for record in records]
+                              for column in STRING_COLUMNS + NUMERIC_COLUMNS},
+                             columns=STRING_COLUMNS + NUMERIC_COLUMNS)
+        for column in NUMERIC_COLUMNS:
+            frame[column] = pd.to_numeric(frame[column], errors='coerce')
+        for column in STRING_COLUMNS:
+            frame[column] = frame[column].astype(object)
+
+        self.frame = frame
+        # Lower-cased copies for case-insensitive matching
+        self._lower = {column: frame[column].fillna('').astype(str).str.lower().to_numpy()
+                       for column in ['plot_name', 'crop', 'stage', 'season', 'plot_id', 'base_plot_id']}
+
+    @classmethod
+    def from_json(cls, path: str = JSON_DATA_PATH) -> 'FarmQueryEngine':
+        """Build an engine from the merged farm data JSON file"""
+        with open(path, 'r') as f:
+            return cls(json.load(f))
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def mask(self, crop: Optional[str] = None, plot_name: Optional[str] = None,
+             min_yield: Optional[float] = None, year: Optional[int] = None,
+             season: Optional[str] = None, stage: Optional[str] = None) -> np.ndarray:
+        """
+        Boolean row mask for the given filters.
+        Crop, season and stage match case-insensitively; plot_name matches as a substring.
+        """
+        mask = np.ones(len(self.frame), dtype=bool)
+        if crop:
+            mask &= self._lower['crop'] == crop.strip().lower()
+        if plot_name:
+            needle = plot_name.strip().lower()
+            mask &= np.fromiter((needle in name for name in self._lower['plot_name']),
+                                dtype=bool, count=len(self.frame))
+        if min_yield is not None:
+            mask &= self.frame['yield_tons_per_ha'].to_numpy() >= min_yield
+        if year is not None:
+            mask &= self.frame['year'].to_numpy() == int(year)
+        if season:
+            mask &= self._lower['season'] == season.strip().lower()
+        if stage:
+            mask &= self._lower['stage'] == stage.strip().lower()
+        return mask
+
+    def select(self, **filters) -> pd.DataFrame:
+        """Rows matching the filters accepted by mask()"""
+        return self.frame[self.mask(**filters)]
+
+    @staticmethod
+    def summarize(values: pd.Series, positive_only: bool = True) -> Dict[str, float]:
+        """Exact statistics over a column, ignoring missing (and optionally non-positive) values"""
+        array = values.to_numpy(dtype=float)
+        array = array[~np.isnan(array)]
+        if positive_only:
+            array = array[array > 0]
+        if array.size == 0:
+            return {'count': 0}
+        return {
+            'count': int(array.size),
+            'sum': float(array.sum()),
+            'mean': float(array.mean()),
+            'min': float(array.min()),
+            'max': float(array.max()),
+            'std': float(array.std(ddof=1)) if array.size > 1 else 0.0
+        }
+
+    @staticmethod
+    def group_stats(frame: pd.DataFrame, by: List[str], metrics: Dict[str, List[str]]) -> pd.DataFrame:
+        """
+        Group rows and aggregate metric columns.
+        Non-positive values are treated as missing, matching summarize().
+
+        Args:
+            frame: Rows to aggregate (usually from select())
+            by: Columns to group by
+            metrics: Column -> aggregates (any of AGGREGATES)
+
+        Returns:
+            DataFrame with one row per group and '<column>_<aggregate>' columns
+        """
+        values = frame[by + list(metrics)].copy()
+        for column in metrics:
+            values[column] = values[column].where(values[column] > 0)
+
+        grouped = values.groupby(by, dropna=False, sort=True).agg(
+            {column: aggregates for column, aggregates in metrics.items()}
+        )
+        grouped.columns = [f"{column}_{aggregate}" for column, aggregate in grouped.columns]
+        return grouped.reset_index()
+
+    def spec_mask(self, filters: List[tuple]) -> np.ndarray:
+        """Boolean row mask for validated (column, operator, value) filters"""
+        mask = np.ones(len(self.frame), dtype=bool)
+        for column, operator, value in filters:
+            if column in STRING_COLUMNS:
+                values = self._lower[column]
+                if operator == 'in':
+                    mask &= np.isin(values, [str(v).strip().lower() for v in value])
+                elif operator == 'contains':
+                    needle = str(value).strip().lower()
+                    mask &= np.fromiter((needle in v for v in values), dtype=bool, count=len(values))
+                else:
+                    matches = values == str(value).strip().lower()
+                    mask &= matches if operator == 'eq' else ~matches
+                continue
+
+            values = self.frame[column].to_numpy(dtype=float)
+            if operator == 'in':
+                mask &= np.isin(values, np.asarray(value, dtype=float))
+            elif operator == 'eq':
+                mask &= values == value
+            elif operator == 'ne':
+                mask &= values != value
+            elif operator == 'gt':
+                mask &= values > value
+            elif operator == 'gte':
+                mask &= values >= value
+            elif operator == 'lt':
+                mask &= values < value
+            elif operator == 'lte':
+                mask &= values <= value
+        return mask
+
+    def query(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run a declarative query: filter, then group and aggregate (or list rows), sort and limit.
+        Missing values are ignored by aggregates; 'count' counts matching rows.
+
+        Args:
+            spec: Query spec (see QUERY_SPEC_SCHEMA), validated before running
+
+        Returns:
+            Compact table: {"columns": [...], "rows": [[...], ...]} plus row counts
+        """
+        spec = validate_query_spec(spec)
+        mask = self.spec_mask(spec['filters'])
+        selected = self.frame[mask]
+
+        if spec['metrics']:
+            named = {}
+            for name, column, aggregate in spec['metrics']:
+                # 'count' is the group size; column counts skip missing values
+                named[name] = (column, aggregate) if column else ('plot_id', 'size')
+            if spec['group_by']:
+                result = selected.groupby(spec['group_by'], dropna=False, sort=True).agg(**named).reset_index()
+            else:
+                result = pd.DataFrame([{
+                    name: len(selected) if column is None else selected[column].agg(aggregate)
+                    for name, column, aggregate in spec['metrics']
+                }])
+        else:
+            result = selected[spec['columns']]
+
+        if spec['sort']:
+            result = result.sort_values([name for name, _ in spec['sort']],
+                                        ascending=[ascending for _, ascending in spec['sort']],
+                                        na_position='last', kind='mergesort')
+
+        total_rows = len(result)
+        result = result.head(spec['limit'])
+        rows = [[_json_value(value, column) for column, value in zip(result.columns, row)]
+                for row in result.itertuples(index=False, name=None)]
+        return {
+            "columns": list(result.columns),
+            "rows": rows,
+            "row_count": len(rows),
+            "total_rows": total_rows,
+            "matched_records": int(mask.sum()),
+            "truncated": total_rows > len(rows)
+        }
+
+    @staticmethod
+    def to_records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Convert rows to JSON-safe dicts (NaN becomes None)"""
+        columns = list(frame.columns)
+        records = []
+        for values in zip(*(frame[column].to_numpy() for column in columns)):
+            record = {}
+            for column, value in zip(columns, values):
+                if isinstance(value, np.generic):
+                    value = value.item()
+                if isinstance(value, float) and value != value:
+                    value = None
+                record[column] = value
+            if record.get('year') is not None:
+                record['year'] = int(record['year'])
+            records.append(record)
+        return records
+
+
+def _json_value(value: Any, column: str) -> Any:
+    """Compact JSON-safe cell value (NaN becomes None, floats rounded)"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float):
+        if value != value:
+            return None
+        if column == 'year' or column.endswith('_count') or column == 'count':
+            return int(value)
+        return round(value, 4)
+    return value
+
+
+def get_query_engine(path: Optional[str] = None) -> FarmQueryEngine:
+    """Return the engine for the shared data store, rebuilt only when the merged data changes"""
+    return get_farm_data_store(path).derived('query_engine', lambda snapshot: FarmQueryEngine(snapshot.farm_records))
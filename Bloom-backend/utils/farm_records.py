@@ -0,0 +1,163 @@
+"""
+Typed, normalised representation of the merged farm records.
+Each merged dict carries 60+ keys with duplicated columns from the CSV joins
+(current_crop/crop, revenue_kes/revenue_kes_profit, ...). FarmRecord resolves
+those fallbacks, parses year and season from the plot_id once at load time,
+and stores only the fields the tools use in __slots__.
+"""
+
+import sys
+from typing import Dict, List, Any, Optional
+
+# Normalised field -> source keys, first non-empty value wins
+COLUMN_SOURCES = {
+    'plot_id': ['plot_id'],
+    'plot_name': ['plot_name', 'plot_name_fin'],
+    'crop': ['current_crop', 'crop'],
+    'stage': ['crop_stage'],
+    'yield_tons_per_ha': ['yield_tonnes_per_ha', 'yield_tonnes_per_ha_profit'],
+    'revenue_kes': ['revenue_kes', 'revenue_kes_profit'],
+    'cost_kes': ['total_cost_kes', 'total_cost_kes_profit'],
+    'profit_kes': ['profit_kes'],
+    'profit_margin_percent': ['profit_margin_percent'],
+    'price_per_kg': ['selling_price_kes_per_kg', 'selling_price_kes_per_kg_profit'],
+    'area_hectares': ['area_hectares', 'area_hectares_fin'],
+}
+
+# Expense categories and their per-record cost columns
+COST_CATEGORIES = ['fertilizer', 'seeds', 'labor', 'pesticide', 'fuel', 'maintenance', 'transport']
+
+# Every merged key FarmRecord.from_dict reads (the only columns decoded from a snapshot)
+SOURCE_KEYS = sorted(
+    {key for keys in COLUMN_SOURCES.values() for key in keys}
+    | {f"{category}_cost_kes" for category in COST_CATEGORIES}
+    | {'planting_date', 'expected_harvest', 'crop_type_inv', 'current_stock_kg_inv', 'estimated_value_kes'}
+)
+
+STRING_FIELDS = ['plot_id', 'plot_name', 'crop', 'stage']
+NUMERIC_FIELDS = ['yield_tons_per_ha', 'revenue_kes', 'cost_kes', 'profit_kes',
+                  'profit_margin_percent', 'price_per_kg', 'area_hectares']
+
+
+def first_present(record: Dict[str, Any], keys: List[str]) -> Any:
+    """Return the first non-empty, non-NaN value for the given keys"""
+    for key in keys:
+        value = record.get(key)
+        if value is None or value == '' or value != value:
+            continue
+        return value
+    return None
+
+
+def parse_plot_id(plot_id: Optional[str]) -> Dict[str, Any]:
+    """Split a plot_id (format: plot_X_YYYY_SN) into base plot id, year and season"""
+    parts = (plot_id or '').split('_')
+    year = None
+    if len(parts) >= 4:
+        try:
+            year = int(parts[2])
+        except ValueError:
+            year = None
+    return {
+        'base_plot_id': '_'.join(parts[:2]) if len(parts) >= 2 else None,
+        'year': year,
+        'season': parts[3] if len(parts) >= 4 else None
+    }
+
+
+def _number(value: Any) -> Optional[float]:
+    # Integers stay integers so JSON outputs keep their original form
+    if value is None or value == '':
+        return None
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if number != number else number
+
+
+def _intern(value: Any) -> Optional[str]:
+    # Crop, plot and season names repeat across records; share one string object
+    return sys.intern(str(value)) if value is not None else None
+
+
+class FarmRecord:
+    """One merged farm record with deduplicated, typed fields"""
+
+    __slots__ = (
+        'plot_id', 'base_plot_id', 'year', 'season', 'plot_name', 'crop', 'stage',
+        'planting_date', 'expected_harvest',
+        'yield_tons_per_ha', 'revenue_kes', 'cost_kes', 'profit_kes', 'profit_margin_percent',
+        'price_per_kg', 'area_hectares',
+        'costs', 'inventory_crop', 'stock_kg', 'stock_value_kes'
+    )
+
+    @classmethod
+    def from_dict(cls, record: Dict[str, Any]) -> 'FarmRecord':
+        """Normalise a merged record dict"""
+        self = cls.__new__(cls)
+        for field in STRING_FIELDS:
+            setattr(self, field, _intern(first_present(record, COLUMN_SOURCES[field])))
+        for field in NUMERIC_FIELDS:
+            setattr(self, field, _number(first_present(record, COLUMN_SOURCES[field])))
+
+        parsed = parse_plot_id(self.plot_id)
+        self.base_plot_id = _intern(parsed['base_plot_id'])
+        self.year = parsed['year']
+        self.season = _intern(parsed['season'])
+
+        self.planting_date = record.get('planting_date')
+        self.expected_harvest = record.get('expected_harvest')
+
+        # Per-category costs aligned with COST_CATEGORIES (0 when missing)
+        self.costs = tuple(_number(record.get(f"{category}_cost_kes")) or 0 for category in COST_CATEGORIES)
+
+        self.inventory_crop = _intern(record.get('crop_type_inv') or None)
+        self.stock_kg = _number(record.get('current_stock_kg_inv'))
+        self.stock_value_kes = _number(record.get('estimated_value_kes'))
+        return self
+
+    @property
+    def period(self) -> Optional[str]:
+        """Season label such as '2024 S2'"""
+        if self.year is None or self.season is None:
+            return None
+        return f"{self.year} {self.season}"
+
+    def cost(self, category: str) -> float:
+        """Cost for one expense category"""
+        return self.costs[COST_CATEGORIES.index(category)]
+
+    def __repr__(self) -> str:
+        return f"FarmRecord(plot_id={self.plot_id!r}, crop={self.crop!r}, period={self.period!r})"
+
+
+def build_farm_records(records: List[Dict[str, Any]]) -> List[FarmRecord]:
+    """Normalise all merged records (done once per data version)"""
+    return [FarmRecord.from_dict(record) for record in records]
+
+
+class _ColumnRow:
+    """Record view over decoded columns, moved row by row (no per-record dict)"""
+
+    __slots__ = ('columns', 'position')
+
+    def __init__(self, columns: Dict[str, List[Any]]):
+        self.columns = columns
+        self.position = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        values = self.columns.get(key)
+        return default if values is None else values[self.position]
+
+
+def build_farm_records_from_columns(columns: Dict[str, List[Any]], count: int) -> List[FarmRecord]:
+    """Normalise records straight from decoded snapshot columns (see SOURCE_KEYS)"""
+    row = _ColumnRow(columns)
+    records = []
+    for position in range(count):
+        row.position = position
+        records.append(FarmRecord.from_dict(row))
+    return records
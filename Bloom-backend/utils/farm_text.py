@@ -0,0 +1,90 @@
+"""
+Text and metadata representations of merged farm records.
+Shared by the embedding setup and the in-memory lexical index so both
+search paths see exactly the same documents.
+"""
+
+from typing import Dict, List, Any
+
+
+def create_text_representation(record: Dict[str, Any]) -> str:
+    """Convert farm record to text for embedding"""
+
+    # Get coordinates from either plot-level or farm-level data
+    plot_coords = record.get('coordinates_geojson', '')
+    farm_lat = record.get('farm_latitude', record.get('latitude', ''))
+    farm_lon = record.get('farm_longitude', record.get('longitude', ''))
+
+    text = f"""
+    Farm: {record.get('farm_farm_name', 'Unknown Farm')}
+    Farm Location: Latitude {farm_lat}, Longitude {farm_lon}
+    County: {record.get('farm_county', 'Unknown')}
+    Plot: {record.get('plot_name', 'Unknown')} ({record.get('plot_id', 'Unknown')})
+    Plot Coordinates: {plot_coords}
+    Area: {record.get('area_hectares', 0)} hectares
+    Soil Type: {record.get('farm_soil_type_main', 'Unknown')}
+    Current Crop: {record.get('current_crop', 'Unknown')}
+    Planting Date: {record.get('planting_date', 'Unknown')}
+    Expected Harvest: {record.get('expected_harvest', 'Unknown')}
+    Crop Stage: {record.get('crop_stage', 'Unknown')}
+    Average Yield per Hectare: {record.get('avg_yield_per_ha', 0)} tons
+    Total Harvest: {record.get('total_harvest_kg', 0)} kg
+    Total Revenue: {record.get('total_revenue_kes', 0)} KES
+    Profit Margin: {record.get('profit_margin_percent', 0)}%
+    Input Costs: Seeds {record.get('seeds_cost_kes', 0)} KES, Fertilizer {record.get('fertilizer_cost_kes', 0)} KES
+    Current Inventory: {record.get('current_stock_kg', 0)} kg available
+    Next Rotation Crop: {record.get('next_crop', 'Unknown')}
+    Yield Performance: Min {record.get('min_yield_per_ha', 0)} - Max {record.get('max_yield_per_ha', 0)} tons/ha
+    """.strip()
+    return text
+
+
+def record_datapoint_id(record: Dict[str, Any], position: int) -> str:
+    """Datapoint id used for a record in every search index"""
+    return record.get('plot_id') or record.get('plot_id_y', f"record_{position}")
+
+
+def create_record_metadata(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Metadata stored with each datapoint (returned as restricts by Vector Search)"""
+    return {
+        "plot_name": record.get('plot_name') or record.get('plot_name_x', 'Unknown'),
+        "crop": record.get('current_crop', 'Unknown'),
+        "stage": record.get('crop_stage', 'Unknown'),
+        "yield": record.get('avg_yield_per_ha', 0),
+        "revenue": record.get('total_revenue_kes', 0),
+        "area": record.get('area_hectares') or record.get('area_hectares_x', 0),
+        "farm_name": record.get('farm_farm_name', 'Unknown'),
+        "farmer_id": record.get('farm_farmer_id'),
+        "latitude": record.get('farm_latitude', 0),
+        "longitude": record.get('farm_longitude', 0),
+        "county": record.get('farm_county', 'Unknown'),
+        "coordinates_geojson": record.get('coordinates_geojson', ''),
+        "text": create_text_representation(record)
+    }
+
+
+# Metadata fields exported as datapoint restricts so queries can filter inside the index
+NUMERIC_RESTRICT_FIELDS = ['yield', 'revenue', 'area']
+
+
+def build_restricts(metadata: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Token restricts for every metadata field (also how results carry their metadata)"""
+    restricts = []
+    for namespace, value in metadata.items():
+        if value is None or value != value:  # Skip missing and NaN values
+            continue
+        restricts.append({"namespace": namespace, "allow": [str(value)]})
+    return restricts
+
+
+def build_numeric_restricts(metadata: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Numeric restricts so range filters such as a minimum yield run inside the index"""
+    numeric_restricts = []
+    for namespace in NUMERIC_RESTRICT_FIELDS:
+        try:
+            value = float(metadata.get(namespace))
+        except (TypeError, ValueError):
+            continue
+        if value == value:  # NaN cannot be indexed
+            numeric_restricts.append({"namespace": namespace, "value_float": value})
+    return numeric_restricts
@@ -0,0 +1,162 @@
+"""
+Persistent cache of Earth Engine analysis results (NDVI statistics, imagery).
+Entries are keyed by the analysis, a hash of the geometry and the date window
+parameters, and remember the Sentinel-2 image the result was computed from.
+
+Sentinel-2 revisits a plot every few days, so a cached result stays valid until
+a newer qualifying image can exist: within one revisit interval of the newest
+acquisition it is served without contacting Earth Engine. After that a
+metadata-only probe (best image id and newest acquisition time) revalidates it,
+and the analysis is recomputed only when the chosen image changed. "No suitable
+images" results are cached too and re-probed after a shorter interval.
+
+Entries live in generated_data/imagery_cache.sqlite (see sqlite_store).
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List, Any, Optional
+
+from .sqlite_store import SQLiteStore, SharedStores
+
+CACHE_PATH = os.getenv("IMAGERY_CACHE_PATH", os.path.join(
+    os.path.dirname(__file__), '..', 'generated_data', 'imagery_cache.sqlite'))
+
+# Days between Sentinel-2 acquisitions of the same plot (2A and 2B combined)
+REVISIT_DAYS = float(os.getenv("SENTINEL2_REVISIT_DAYS", "5"))
+
+# Minimum hours between metadata probes of one entry (cloudy spells add no qualifying images)
+PROBE_INTERVAL_HOURS = 6
+
+# Hours before a cached "no suitable images" result is probed again
+NEGATIVE_TTL_HOURS = 12
+
+# Entries not validated for this many days are dropped by prune()
+MAX_ENTRY_AGE_DAYS = 60
+
+# Hours between the automatic prunes run from put()
+PRUNE_INTERVAL_HOURS = 24
+
+DAY_MS = 86400 * 1000
+
+
+def geometry_hash(coordinates: List[List[float]]) -> str:
+    """Stable hash of a geometry (coordinates rounded to ~1 cm)"""
+    rounded = [[round(float(value), 7) for value in point] for point in coordinates]
+    return hashlib.sha256(json.dumps(rounded).encode()).hexdigest()[:16]
+
+
+def cache_key(analysis: str, coordinates: List[List[float]], **params) -> str:
+    """Cache key for one analysis of a geometry with its date window parameters"""
+    window = json.dumps(params, sort_keys=True)
+    return f"{analysis}:{geometry_hash(coordinates)}:{hashlib.sha256(window.encode()).hexdigest()[:8]}"
+
+
+class ImageryCache(SQLiteStore):
+    """SQLite-backed analysis results with revisit-aware freshness"""
+
+    SCHEMA = ("""
+        CREATE TABLE IF NOT EXISTS analyses (
+            key TEXT PRIMARY KEY,
+            image_id TEXT,
+            image_time INTEGER,
+            latest_time INTEGER,
+            result TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            checked_at REAL NOT NULL
+        )
+    """,)
+
+    def __init__(self, path: str = CACHE_PATH):
+        super().__init__(path)
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0}
+        self._pruned_at = 0.0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT image_id, image_time, latest_time, result, created_at, checked_at "
+                "FROM analyses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return {
+            'image_id': row[0],
+            'image_time': row[1],
+            'latest_time': row[2],
+            'result': json.loads(row[3]),
+            'created_at': row[4],
+            'checked_at': row[5]
+        }
+
+    def put(self, key: str, result: Dict[str, Any], image_id: Optional[str] = None,
+            image_time: Optional[int] = None, latest_time: Optional[int] = None,
+            now: Optional[float] = None) -> Dict[str, Any]:
+        """Store a freshly computed result (image_id None for "no suitable images")"""
+        now = time.time() if now is None else now
+        self._prune_if_due()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, image_id, image_time, latest_time, json.dumps(result), now, now))
+        return {'image_id': image_id, 'image_time': image_time, 'latest_time': latest_time,
+                'result': result, 'created_at': now, 'checked_at': now}
+
+    def revalidate(self, key: str, latest_time: Optional[int], now: Optional[float] = None,
+                   result: Optional[Dict[str, Any]] = None):
+        """Record a probe that found the same image (optionally with a refreshed result)"""
+        now = time.time() if now is None else now
+        with self._lock, self._connection:
+            if result is None:
+                self._connection.execute(
+                    "UPDATE analyses SET latest_time = ?, checked_at = ? WHERE key = ?",
+                    (latest_time, now, key))
+            else:
+                self._connection.execute(
+                    "UPDATE analyses SET latest_time = ?, checked_at = ?, result = ?, created_at = ? "
+                    "WHERE key = ?", (latest_time, now, json.dumps(result), now, key))
+
+    def is_fresh(self, entry: Dict[str, Any], window_start_ms: int, now: Optional[float] = None) -> bool:
+        """Whether an entry can be served without probing Earth Engine"""
+        now = time.time() if now is None else now
+        if entry['image_id'] is None:
+            return now - entry['checked_at'] < NEGATIVE_TTL_HOURS * 3600
+        # The chosen image must still fall in the date window
+        if entry['image_time'] is None or entry['image_time'] < window_start_ms:
+            return False
+        if now - entry['checked_at'] < PROBE_INTERVAL_HOURS * 3600:
+            return True
+        # No newer acquisition can exist within one revisit of the newest one
+        latest = entry['latest_time'] or entry['image_time']
+        return now * 1000 < latest + REVISIT_DAYS * DAY_MS
+
+    def record(self, status: str):
+        with self._lock:
+            self.stats[status] += 1
+
+    def prune(self, max_age_days: float = MAX_ENTRY_AGE_DAYS) -> int:
+        """Drop entries not validated for max_age_days; returns how many were removed"""
+        cutoff = time.time() - max_age_days * 86400
+        with self._lock, self._connection:
+            return self._connection.execute("DELETE FROM analyses WHERE checked_at < ?", (cutoff,)).rowcount
+
+    def _prune_if_due(self):
+        """Prune at most once per PRUNE_INTERVAL_HOURS (per process) so abandoned geometries don't accumulate"""
+        now = time.time()
+        if now - self._pruned_at < PRUNE_INTERVAL_HOURS * 3600:
+            return
+        self._pruned_at = now
+        self.prune()
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM analyses")
+
+
+_caches = SharedStores(ImageryCache)
+
+
+def get_imagery_cache(path: Optional[str] = None) -> ImageryCache:
+    """The shared cache for a database path (one connection per process)"""
+    return _caches.get(path or CACHE_PATH)
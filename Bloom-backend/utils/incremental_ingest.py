@@ -0,0 +1,491 @@
+"""
+Incremental ingestion of the farm CSV exports.
+Each source row is identified by its key columns and fingerprinted by a
+content hash. On ingest only the plot seasons linked to new, changed or
+removed rows are re-merged and spliced into merged_farm_data.json; the
+columnar snapshot is rewritten, the shared data store hot-reloads (which
+rebuilds the materialised aggregates), and only datapoints whose text
+changed are re-embedded and upserted into Vector Search. Optionally the soil
+properties of plots missing from the soil cache are fetched in one request.
+
+In a partitioned deployment (generated_data/farms/<farmer_id>/ exists) the
+partitions of farms whose source rows changed are rewritten as well (merged
+JSON, columnar snapshot and ledger), so their stores hot-reload too.
+
+Triggered by POST /api/ingest or by IngestWatcher polling the data directory.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+import pandas as pd
+
+from .columnar_snapshot import SNAPSHOT_DIR, write_snapshot
+from .farm_data_store import JSON_DATA_PATH, FarmPartitionRegistry, get_partition_registry, partition_path
+from .farm_merge import (
+    CSV_FILES,
+    DATA_DIR,
+    load_source_frames,
+    merge_farm_data,
+    partition_fingerprint,
+    split_by_farmer,
+    to_documents,
+    write_farm_partitions
+)
+from .farm_text import (
+    create_text_representation,
+    create_record_metadata,
+    record_datapoint_id,
+    build_restricts,
+    build_numeric_restricts
+)
+
+INGEST_STATE_PATH = os.path.join(os.path.dirname(__file__), '..', 'generated_data', 'ingest_state.json')
+INGEST_STATE_VERSION = 1
+
+# Source -> (row key columns, what the rows link to, link column)
+#   plot: a plot season id; base_plot: every season of a plot; crop: every season
+#   growing the crop; all: farm-wide values copied onto every record
+SOURCE_LINKS = {
+    'plot_details': (['plot_id'], 'plot', 'plot_id'),
+    'financial_summary': (['plot_id'], 'plot', 'plot_id'),
+    'financial_history': (['transaction_id'], 'plot', 'related_plot_id'),
+    'yields_inventory': (['record_id'], 'plot', 'plot_id'),
+    'profitability': (['plot_id'], 'plot', 'plot_id'),
+    'plot_base_info': (['plot_id'], 'base_plot', 'plot_id'),
+    'crop_rotation': (['plot_id', 'year', 'season'], 'base_plot', 'plot_id'),
+    'crop_performance': (['crop_type'], 'crop', 'crop_type'),
+    'current_inventory': (['crop_type'], 'crop', 'crop_type'),
+    'farm_identity': (['farmer_id'], 'all', None),
+    'input_costs': (['category'], 'all', None),
+}
+
+_ingest_lock = threading.Lock()
+
+
+def _hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _file_hash(path: str) -> Optional[str]:
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _clean(value: Any) -> Any:
+    return None if isinstance(value, float) and value != value else value
+
+
+def read_raw_rows(path: str) -> pd.DataFrame:
+    """
+    Read a CSV as text. Fingerprints are taken from the exported values so that
+    one edited cell cannot change every row through column dtype inference.
+    """
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+def fingerprint_rows(source: str, frame: pd.DataFrame) -> Dict[str, List[Any]]:
+    """Row key -> [content hash, link value] for one source table"""
+    key_columns, _, link_column = SOURCE_LINKS[source]
+    if not all(column in frame.columns for column in key_columns):
+        # Unknown layout: fingerprint rows by position so any edit is still detected
+        key_columns = []
+
+    rows = {}
+    seen: Dict[str, int] = {}
+    columns = list(frame.columns)
+    for position, values in enumerate(frame.itertuples(index=False, name=None)):
+        row = dict(zip(columns, values))
+        base_key = '|'.join(str(row[c]) for c in key_columns) if key_columns else f"row_{position}"
+        # Repeated keys (e.g. duplicated exports) get an occurrence suffix
+        occurrence = seen.get(base_key, 0)
+        seen[base_key] = occurrence + 1
+        key = base_key if occurrence == 0 else f"{base_key}#{occurrence}"
+
+        content = json.dumps([_clean(v) for v in values], default=str)
+        link = _clean(row.get(link_column)) if link_column else None
+        rows[key] = [_hash_text(content)[:16], link]
+    return rows
+
+
+def diff_rows(old: Dict[str, List[Any]], new: Dict[str, List[Any]]) -> Dict[str, Any]:
+    """Added, changed and removed row keys plus every link value they touch (old and new)"""
+    added = [key for key in new if key not in old]
+    removed = [key for key in old if key not in new]
+    changed = [key for key in new if key in old and new[key][0] != old[key][0]]
+
+    links = set()
+    for key in added + changed:
+        links.add(new[key][1])
+    for key in removed + changed:
+        links.add(old[key][1])
+    links.discard(None)
+    return {'added': added, 'changed': changed, 'removed': removed, 'links': links}
+
+
+def _base_plot(plot_id: str) -> str:
+    return '_'.join(str(plot_id).split('_')[:2])
+
+
+def affected_plot_ids(changes: Dict[str, Dict[str, Any]], plot_details: pd.DataFrame,
+                      records: List[Dict[str, Any]]) -> Optional[Set[str]]:
+    """
+    Plot season ids whose merged records depend on the changed rows.
+    Returns None when a farm-wide table changed and every record must be re-merged.
+    """
+    current = [(row['plot_id'], row.get('current_crop'))
+               for row in plot_details[['plot_id', 'current_crop']].to_dict(orient='records')]
+    previous = [(record.get('plot_id'), record.get('current_crop')) for record in records]
+    candidates = [(plot_id, crop) for plot_id, crop in current + previous if plot_id]
+
+    affected: Set[str] = set()
+    for source, change in changes.items():
+        link_type = SOURCE_LINKS[source][1]
+        links = {str(link) for link in change['links']}
+        if link_type == 'all':
+            return None
+        if link_type == 'plot':
+            affected |= links
+        elif link_type == 'base_plot':
+            affected |= {plot_id for plot_id, _ in candidates if _base_plot(plot_id) in links}
+        elif link_type == 'crop':
+            affected |= {plot_id for plot_id, crop in candidates if crop in links}
+    return affected
+
+
+def _reconcile_types(records: List[Dict[str, Any]]):
+    """
+    A full merge upcasts an int column to float when any row is missing a value.
+    Apply the same rule after splicing so both paths produce identical JSON.
+    """
+    float_columns = set()
+    for record in records:
+        for key, value in record.items():
+            if isinstance(value, float):
+                float_columns.add(key)
+    for record in records:
+        for key in float_columns:
+            value = record.get(key)
+            if isinstance(value, int) and not isinstance(value, bool):
+                record[key] = float(value)
+
+
+def splice_records(records: List[Dict[str, Any]], new_records: List[Dict[str, Any]],
+                   affected: Set[str], plot_order: List[str]) -> List[Dict[str, Any]]:
+    """Replace the records of the affected plot seasons, keeping the plot_details row order"""
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for record in records:
+        if record.get('plot_id') not in affected:
+            groups.setdefault(record.get('plot_id'), []).append(record)
+    replacements: Dict[str, List[Dict[str, Any]]] = {}
+    for record in new_records:
+        replacements.setdefault(record.get('plot_id'), []).append(record)
+
+    spliced = []
+    emitted = set()
+    for plot_id in plot_order:
+        if plot_id in emitted:
+            continue
+        emitted.add(plot_id)
+        spliced.extend(replacements.get(plot_id, []) if plot_id in affected else groups.get(plot_id, []))
+
+    _reconcile_types(spliced)
+    return spliced
+
+
+def _datapoints(records: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Datapoint id -> record (the last record wins for repeated ids, as in a batch import)"""
+    datapoints = {}
+    for position, record in enumerate(records):
+        datapoints[record_datapoint_id(record, position)] = record
+    return datapoints
+
+
+def _load_state(state_path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(state_path):
+        return None
+    try:
+        with open(state_path, 'r') as f:
+            state = json.load(f)
+        return state if state.get('format_version') == INGEST_STATE_VERSION else None
+    except Exception as e:
+        print(f"Error loading ingest state: {e}")
+        return None
+
+
+def _write_json_atomic(path: str, data: Any, indent: Optional[int] = None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=indent)
+    os.replace(tmp_path, path)
+
+
+def update_vector_index(upserts: Dict[str, Dict[str, Any]], removals: List[str]) -> Dict[str, Any]:
+    """
+    Re-embed and upsert changed datapoints and remove deleted ones.
+    Requires a stream-update enabled index (VECTOR_SEARCH_INDEX_ID).
+    """
+    import requests
+
+    index_id = os.getenv("VECTOR_SEARCH_INDEX_ID")
+    region = os.getenv("GCP_REGION", "us-central1")
+    if not index_id:
+        return {"error": "VECTOR_SEARCH_INDEX_ID is not configured"}
+
+    try:
+        # The search tool owns the embedding client and credentials setup
+        from tools.vector_search_tool import VectorSearchTool
+        tool = VectorSearchTool()
+    except Exception as e:
+        return {"error": f"Embedding client unavailable: {e}"}
+
+    access_token = tool._get_access_token()
+    if not access_token:
+        return {"error": "Could not get an access token"}
+    headers = {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"}
+    base_url = f"https://{region}-aiplatform.googleapis.com/v1/{index_id}"
+
+    result = {"upserted": 0, "removed": 0}
+    ids = list(upserts)
+    batch_size = 50
+    for start in range(0, len(ids), batch_size):
+        batch_ids = ids[start:start + batch_size]
+        texts = [create_text_representation(upserts[i]) for i in batch_ids]
+        embeddings = tool._create_embeddings(texts)
+        if not embeddings:
+            result["error"] = "Embedding request failed"
+            return result
+
+        datapoints = []
+        for datapoint_id, embedding in zip(batch_ids, embeddings):
+            metadata = create_record_metadata(upserts[datapoint_id])
+            datapoints.append({
+                "datapointId": datapoint_id,
+                "featureVector": embedding,
+                "restricts": [{"namespace": r["namespace"], "allowList": r["allow"]}
+                              for r in build_restricts(metadata)],
+                "numericRestricts": [{"namespace": r["namespace"], "valueFloat": r["value_float"]}
+                                     for r in build_numeric_restricts(metadata)]
+            })
+        try:
+            response = requests.post(f"{base_url}:upsertDatapoints", headers=headers,
+                                     json={"datapoints": datapoints})
+            response.raise_for_status()
+            result["upserted"] += len(datapoints)
+        except Exception as e:
+            result["error"] = f"Upsert failed: {e}"
+            return result
+
+    if removals:
+        try:
+            response = requests.post(f"{base_url}:removeDatapoints", headers=headers,
+                                     json={"datapointIds": removals})
+            response.raise_for_status()
+            result["removed"] = len(removals)
+        except Exception as e:
+            result["error"] = f"Remove failed: {e}"
+    return result
+
+
+def update_soil_cache(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Fetch soil properties for plots not yet in the soil cache (one Earth Engine request)"""
+    try:
+        # The Earth Engine tool owns the session and the soil datasets
+        from tools.earth_engine_tool import prefetch_soil_properties
+        return prefetch_soil_properties(records)
+    except Exception as e:
+        return {"error": f"Soil prefetch failed: {e}"}
+
+
+def update_farm_partitions(dataframes: Dict[str, pd.DataFrame], farms_dir: str,
+                           fingerprints: Dict[str, str]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Rewrite the partitions of farms whose source rows changed since the given fingerprints.
+
+    Returns:
+        (summary, fingerprints to store for the next ingest)
+    """
+    try:
+        current = {farmer_id: partition_fingerprint(frames)
+                   for farmer_id, frames in split_by_farmer(dataframes).items()}
+        changed = sorted(farmer_id for farmer_id, fingerprint in current.items()
+                         if fingerprints.get(farmer_id) != fingerprint
+                         or not os.path.exists(partition_path(farmer_id, farms_dir)))
+        if changed:
+            write_farm_partitions(dataframes, farms_dir, farmer_ids=changed)
+    except Exception as e:
+        # Previous fingerprints are kept, so the next ingest retries every farm
+        return {"error": f"Partition update failed: {e}"}, fingerprints
+    return {"farms": len(current), "rewritten": changed}, current
+
+
+def ingest_sources(data_dir: str = DATA_DIR, json_path: str = JSON_DATA_PATH,
+                   state_path: str = INGEST_STATE_PATH, snapshot_dir: str = SNAPSHOT_DIR,
+                   update_embeddings: bool = False, force_full: bool = False,
+                   prefetch_soil: bool = False, farms_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Bring the merged data (and optionally the vector index) up to date with the CSVs.
+
+    Returns:
+        Summary with the mode used (unchanged, incremental or full), the changed
+        rows per source, the plot seasons re-merged, the datapoints updated,
+        the farm partitions rewritten (partitioned deployments) and (with
+        prefetch_soil) the plots whose soil properties were fetched
+    """
+    with _ingest_lock:
+        started = time.perf_counter()
+        state = None if force_full else _load_state(state_path)
+
+        file_hashes = {source: _file_hash(os.path.join(data_dir, filename))
+                       for source, filename in CSV_FILES.items()}
+        if state and all(state['sources'].get(source, {}).get('file_hash') == file_hash
+                         for source, file_hash in file_hashes.items()):
+            return {"mode": "unchanged", "duration_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+        dataframes = load_source_frames(data_dir)
+        fingerprints = {source: fingerprint_rows(source, read_raw_rows(os.path.join(data_dir, CSV_FILES[source])))
+                        for source in dataframes}
+
+        records: List[Dict[str, Any]] = []
+        if state and os.path.exists(json_path):
+            with open(json_path, 'r') as f:
+                records = json.load(f)
+
+        changes = {}
+        affected: Optional[Set[str]] = None
+        if state:
+            for source in CSV_FILES:
+                old_rows = state['sources'].get(source, {}).get('rows', {})
+                change = diff_rows(old_rows, fingerprints.get(source, {}))
+                if change['added'] or change['changed'] or change['removed']:
+                    changes[source] = change
+            affected = affected_plot_ids(changes, dataframes['plot_details'], records)
+
+        if affected is None:
+            mode = "full"
+            merged = to_documents(merge_farm_data(dataframes))
+        else:
+            mode = "incremental"
+            new_records = to_documents(merge_farm_data(dataframes, plot_ids=sorted(affected)))
+            merged = splice_records(records, new_records, affected, dataframes['plot_details']['plot_id'].tolist())
+
+        _write_json_atomic(json_path, merged, indent=2)
+        write_snapshot(merged, snapshot_dir, source_path=json_path)
+
+        # Datapoints whose text changed since the last ingest
+        old_text_hashes = (state or {}).get('text_hashes', {})
+        datapoints = _datapoints(merged)
+        text_hashes = {datapoint_id: _hash_text(create_text_representation(record))[:16]
+                       for datapoint_id, record in datapoints.items()}
+        stale = {datapoint_id: datapoints[datapoint_id] for datapoint_id, text_hash in text_hashes.items()
+                 if old_text_hashes.get(datapoint_id) != text_hash}
+        removed = [datapoint_id for datapoint_id in old_text_hashes if datapoint_id not in text_hashes]
+
+        summary = {
+            "mode": mode,
+            "sources_changed": {
+                source: {k: len(change[k]) for k in ('added', 'changed', 'removed')}
+                for source, change in changes.items()
+            },
+            "records_remerged": len(merged) if affected is None else len(affected),
+            "total_records": len(merged),
+            "datapoints_stale": len(stale),
+            "datapoints_removed": len(removed)
+        }
+
+        embeddings_current = True
+        if update_embeddings and (stale or removed):
+            index_result = update_vector_index(stale, removed)
+            summary["vector_index"] = index_result
+            embeddings_current = "error" not in index_result
+
+        farms_dir = farms_dir or get_partition_registry().farms_dir
+        partition_fingerprints = (state or {}).get('partitions', {})
+        if FarmPartitionRegistry(farms_dir).farmer_ids():
+            summary["partitions"], partition_fingerprints = update_farm_partitions(
+                dataframes, farms_dir, partition_fingerprints)
+
+        if prefetch_soil:
+            summary["soil_cache"] = update_soil_cache(merged)
+
+        # Text hashes only advance once the index holds the new vectors, so a failed
+        # or skipped update is retried by the next ingest. On the first ingest the
+        # index is assumed to have been built from these records by the setup script.
+        if old_text_hashes and not (update_embeddings and embeddings_current):
+            text_hashes = old_text_hashes
+
+        _write_json_atomic(state_path, {
+            "format_version": INGEST_STATE_VERSION,
+            "sources": {
+                source: {"file_hash": file_hashes[source], "rows": fingerprints.get(source, {})}
+                for source in CSV_FILES
+            },
+            "text_hashes": text_hashes,
+            "partitions": partition_fingerprints
+        })
+
+        summary["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return summary
+
+
+class IngestWatcher:
+    """Polls the CSV exports and runs an incremental ingest when any of them changes"""
+
+    def __init__(self, interval: float = 10.0, data_dir: str = DATA_DIR,
+                 update_embeddings: bool = False, **ingest_kwargs):
+        self.interval = interval
+        self.data_dir = data_dir
+        self.update_embeddings = update_embeddings
+        self.ingest_kwargs = ingest_kwargs
+        self.last_result: Optional[Dict[str, Any]] = None
+        self._signature: Optional[Tuple] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _current_signature(self) -> Tuple:
+        signature = []
+        for filename in CSV_FILES.values():
+            try:
+                stat = os.stat(os.path.join(self.data_dir, filename))
+                signature.append((filename, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append((filename, None, None))
+        return tuple(signature)
+
+    def check(self) -> Optional[Dict[str, Any]]:
+        """Run one ingest if the exports changed since the last check"""
+        signature = self._current_signature()
+        if signature == self._signature:
+            return None
+        self._signature = signature
+        try:
+            self.last_result = ingest_sources(self.data_dir, update_embeddings=self.update_embeddings,
+                                              **self.ingest_kwargs)
+        except Exception as e:
+            self.last_result = {"error": f"Ingest failed: {e}"}
+            print(f"Error during incremental ingest: {e}")
+        return self.last_result
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.check()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ingest-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
@@ -0,0 +1,241 @@
+"""
+BM25 lexical index over farm record text.
+Complements vector search for exact identifiers such as plot ids, dates and
+crop stages. Built at ingestion time, kept in memory and persisted as JSON.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+from collections import Counter, OrderedDict, defaultdict
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+from .farm_text import create_record_metadata, record_datapoint_id
+from .farm_data_store import MAX_LOADED_PARTITIONS, get_farm_data_store
+
+# Default locations of the merged data and the persisted index
+JSON_DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'generated_data', 'merged_farm_data.json')
+LEXICAL_INDEX_PATH = os.path.join(os.path.dirname(__file__), '..', 'generated_data', 'lexical_index.json')
+LEXICAL_INDEX_FILE = 'lexical_index.json'
+
+INDEX_FORMAT_VERSION = 1
+
+# Compound tokens keep identifiers like plot_c_2023_s2 or 2023-03-31 intact
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[_\-./:][a-z0-9]+)*")
+SPLIT_PATTERN = re.compile(r"[_\-./:]")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case tokens; compound identifiers also emit their parts"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        parts = SPLIT_PATTERN.split(token)
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if part)
+    return tokens
+
+
+def file_hash(path: str) -> str:
+    """SHA-256 of a file, used to tie a persisted index to its source data"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BM25Index:
+    """Okapi BM25 inverted index with per-document metadata"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_ids: List[str] = []
+        self.metadata: List[Dict[str, Any]] = []
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.avg_doc_length = 0.0
+        self.source_hash: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]], source_hash: Optional[str] = None) -> 'BM25Index':
+        """Index merged farm records using the same text as the embeddings"""
+        index = cls()
+        postings = defaultdict(list)
+
+        for position, record in enumerate(records):
+            metadata = create_record_metadata(record)
+            term_counts = Counter(tokenize(metadata['text']))
+
+            doc = len(index.doc_ids)
+            index.doc_ids.append(record_datapoint_id(record, position))
+            index.metadata.append(metadata)
+            index.doc_lengths.append(sum(term_counts.values()))
+            for term, count in term_counts.items():
+                postings[term].append((doc, count))
+
+        index.postings = dict(postings)
+        index.avg_doc_length = sum(index.doc_lengths) / len(index.doc_lengths) if index.doc_lengths else 0.0
+        index.source_hash = source_hash
+        return index
+
+    def _idf(self, term: str) -> float:
+        doc_freq = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.doc_ids) - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    def search(self, query: str, k: int = 10,
+               doc_filter: Optional[Callable[[Dict[str, Any]], bool]] = None) -> List[Dict[str, Any]]:
+        """
+        Rank documents for a query.
+
+        Args:
+            query: Free-text query
+            k: Maximum number of results
+            doc_filter: Optional predicate on document metadata, applied before ranking
+
+        Returns:
+            List of {'id', 'score', 'metadata'} sorted by descending BM25 score
+        """
+        allowed = None
+        if doc_filter is not None:
+            allowed = {doc for doc, metadata in enumerate(self.metadata) if doc_filter(metadata)}
+
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            entries = self.postings.get(term)
+            if not entries:
+                continue
+            idf = self._idf(term)
+            for doc, tf in entries:
+                if allowed is not None and doc not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc] / self.avg_doc_length)
+                scores[doc] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [{
+            'id': self.doc_ids[doc],
+            'score': round(score, 4),
+            'metadata': self.metadata[doc]
+        } for doc, score in ranked]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'format_version': INDEX_FORMAT_VERSION,
+            'source_hash': self.source_hash,
+            'k1': self.k1,
+            'b': self.b,
+            'doc_ids': self.doc_ids,
+            'metadata': self.metadata,
+            'doc_lengths': self.doc_lengths,
+            'postings': self.postings
+        }
+
+    def save(self, path: str = LEXICAL_INDEX_PATH):
+        """Persist the index atomically"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = LEXICAL_INDEX_PATH) -> 'BM25Index':
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if data.get('format_version') != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported lexical index format: {data.get('format_version')}")
+
+        index = cls(k1=data['k1'], b=data['b'])
+        index.doc_ids = data['doc_ids']
+        index.metadata = data['metadata']
+        index.doc_lengths = data['doc_lengths']
+        index.postings = {term: [tuple(entry) for entry in entries] for term, entries in data['postings'].items()}
+        index.avg_doc_length = sum(index.doc_lengths) / len(index.doc_lengths) if index.doc_lengths else 0.0
+        index.source_hash = data.get('source_hash')
+        return index
+
+
+def build_lexical_index(records: List[Dict[str, Any]], data_path: str = JSON_DATA_PATH,
+                        index_path: str = LEXICAL_INDEX_PATH) -> BM25Index:
+    """Build and persist the lexical index for the given merged records (ingestion step)"""
+    source_hash = file_hash(data_path) if os.path.exists(data_path) else None
+    index = BM25Index.from_records(records, source_hash=source_hash)
+    index.save(index_path)
+    _cache_index(data_path, (index_path, _mtime(data_path)), index)
+    return index
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Fuse several ranked id lists with reciprocal-rank fusion.
+
+    Returns:
+        (id, fused score) pairs sorted by descending score
+    """
+    scores = defaultdict(float)
+    for ranking in rankings:
+        seen = set()
+        for rank, doc_id in enumerate(ranking, start=1):
+            if doc_id in seen:
+                continue
+            seen.add(doc_id)
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def _mtime(path: str) -> Optional[float]:
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+
+# data path -> (cache key, index); one entry per loaded farm partition
+_index_cache: 'OrderedDict[str, Tuple[Any, BM25Index]]' = OrderedDict()
+
+def get_lexical_index(data_path: Optional[str] = None, index_path: Optional[str] = None) -> BM25Index:
+    """
+    Return the in-memory lexical index for the merged data.
+    Loads the persisted index when it matches the data file, otherwise rebuilds it.
+    Without a data path, the current farm's partition (or the single-farm data) is used.
+    """
+    if data_path is None:
+        data_path = get_farm_data_store().path
+    if index_path is None:
+        # Persisted next to the data it indexes
+        index_path = os.path.join(os.path.dirname(data_path), LEXICAL_INDEX_FILE)
+
+    key = (index_path, _mtime(data_path))
+    cached = _index_cache.get(data_path)
+    if cached is not None and cached[0] == key:
+        _index_cache.move_to_end(data_path)
+        return cached[1]
+
+    index = None
+    if os.path.exists(index_path):
+        try:
+            index = BM25Index.load(index_path)
+            if index.source_hash != file_hash(data_path):
+                index = None
+        except Exception as e:
+            print(f"Error loading lexical index: {e}")
+            index = None
+
+    if index is None:
+        with open(data_path, 'r') as f:
+            records = json.load(f)
+        index = build_lexical_index(records, data_path, index_path)
+
+    _cache_index(data_path, key, index)
+    return index
+
+
+def _cache_index(data_path: str, key: Any, index: BM25Index):
+    _index_cache[data_path] = (key, index)
+    _index_cache.move_to_end(data_path)
+    while len(_index_cache) > MAX_LOADED_PARTITIONS:
+        _index_cache.popitem(last=False)
@@ -0,0 +1,173 @@
+"""
+Local append-only store of per-plot NDVI time series.
+
+Each Sentinel-2 acquisition over a plot is stored once as (time, mean NDVI,
+cloud cover). The store remembers which date range it has already fetched
+for each plot, so a time-series request only asks Earth Engine for images
+outside that range. In practice that means acquisitions newer than the last
+sync. The most recent INGEST_LAG_DAYS are fetched again because Earth Engine
+can publish an acquisition a few days after it was taken.
+
+Weekly and monthly rollups (count, sum, min, max) are updated as new
+observations are inserted, so serving them never rescans the series.
+Series are kept in generated_data/ndvi_series.sqlite (see sqlite_store).
+"""
+
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Tuple
+
+from .sqlite_store import SQLiteStore, SharedStores
+
+SERIES_PATH = os.getenv("NDVI_SERIES_PATH", os.path.join(
+    os.path.dirname(__file__), '..', 'generated_data', 'ndvi_series.sqlite'))
+
+# Days re-fetched before the last sync (late-published acquisitions)
+INGEST_LAG_DAYS = 3
+
+DAY_MS = 86400 * 1000
+
+ROLLUP_PERIODS = ('week', 'month')
+
+
+def rollup_bucket(period: str, time_ms: int) -> str:
+    """Bucket label of an acquisition: ISO week ("2025-W41") or month ("2025-10")"""
+    date = datetime.fromtimestamp(time_ms / 1000, tz=timezone.utc)
+    if period == 'week':
+        year, week, _ = date.isocalendar()
+        return f"{year}-W{week:02d}"
+    if period == 'month':
+        return date.strftime('%Y-%m')
+    raise ValueError(f"Unknown rollup period: {period}")
+
+
+class NdviSeriesStore(SQLiteStore):
+    """SQLite-backed NDVI observations per series with incremental rollups"""
+
+    SCHEMA = ("""
+        CREATE TABLE IF NOT EXISTS observations (
+            series TEXT NOT NULL,
+            time_ms INTEGER NOT NULL,
+            ndvi REAL NOT NULL,
+            cloud_cover REAL,
+            PRIMARY KEY (series, time_ms)
+        )
+    """, """
+        CREATE TABLE IF NOT EXISTS coverage (
+            series TEXT PRIMARY KEY,
+            fetched_from INTEGER NOT NULL,
+            fetched_until INTEGER NOT NULL
+        )
+    """, """
+        CREATE TABLE IF NOT EXISTS rollups (
+            series TEXT NOT NULL,
+            period TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            ndvi_sum REAL NOT NULL,
+            ndvi_min REAL NOT NULL,
+            ndvi_max REAL NOT NULL,
+            PRIMARY KEY (series, period, bucket)
+        )
+    """)
+
+    def __init__(self, path: str = SERIES_PATH):
+        super().__init__(path)
+
+    def coverage(self, series: str) -> Optional[Tuple[int, int]]:
+        """(fetched_from, fetched_until) in ms, or None if the series was never fetched"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT fetched_from, fetched_until FROM coverage WHERE series = ?", (series,)).fetchone()
+        return tuple(row) if row else None
+
+    def missing_ranges(self, series: str, start_ms: int, end_ms: int) -> List[Tuple[int, int]]:
+        """Date ranges of [start_ms, end_ms) that still have to be fetched from Earth Engine"""
+        covered = self.coverage(series)
+        if covered is None:
+            return [(start_ms, end_ms)]
+        fetched_from, fetched_until = covered
+        ranges = []
+        if start_ms < fetched_from:
+            ranges.append((start_ms, fetched_from))
+        # Re-fetch the last few days too: acquisitions are published with a delay
+        newer_from = max(fetched_from, fetched_until - INGEST_LAG_DAYS * DAY_MS)
+        # A window starting after the coverage still fetches from its end, so the
+        # coverage stays one interval with no unfetched gap inside it
+        if start_ms <= fetched_until:
+            newer_from = max(start_ms, newer_from)
+        if end_ms > newer_from:
+            ranges.append((newer_from, end_ms))
+        return ranges
+
+    def append(self, series: str, observations: List[Tuple[int, float, Optional[float]]],
+               start_ms: int, end_ms: int) -> int:
+        """Store (time_ms, ndvi, cloud_cover) observations fetched for one of missing_ranges
+
+        Acquisitions already stored are ignored. Returns how many were new.
+        """
+        added = 0
+        with self._lock, self._connection:
+            for time_ms, ndvi, cloud_cover in observations:
+                inserted = self._connection.execute(
+                    "INSERT OR IGNORE INTO observations VALUES (?, ?, ?, ?)",
+                    (series, int(time_ms), float(ndvi), cloud_cover)).rowcount
+                if not inserted:
+                    continue
+                added += 1
+                for period in ROLLUP_PERIODS:
+                    self._connection.execute("""
+                        INSERT INTO rollups VALUES (?, ?, ?, 1, ?, ?, ?)
+                        ON CONFLICT (series, period, bucket) DO UPDATE SET
+                            count = count + 1,
+                            ndvi_sum = ndvi_sum + excluded.ndvi_sum,
+                            ndvi_min = MIN(ndvi_min, excluded.ndvi_min),
+                            ndvi_max = MAX(ndvi_max, excluded.ndvi_max)
+                    """, (series, period, rollup_bucket(period, time_ms), ndvi, ndvi, ndvi))
+            # Ranges from missing_ranges overlap or adjoin the existing coverage, so it stays one interval
+            self._connection.execute("""
+                INSERT INTO coverage VALUES (?, ?, ?)
+                ON CONFLICT (series) DO UPDATE SET
+                    fetched_from = MIN(fetched_from, excluded.fetched_from),
+                    fetched_until = MAX(fetched_until, excluded.fetched_until)
+            """, (series, int(start_ms), int(end_ms)))
+        return added
+
+    def observations(self, series: str, start_ms: int, end_ms: int) -> List[Dict[str, Any]]:
+        """Stored observations in [start_ms, end_ms), oldest first"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT time_ms, ndvi, cloud_cover FROM observations "
+                "WHERE series = ? AND time_ms >= ? AND time_ms < ? ORDER BY time_ms",
+                (series, int(start_ms), int(end_ms))).fetchall()
+        return [{'time_ms': row[0], 'ndvi': row[1], 'cloud_cover': row[2]} for row in rows]
+
+    def rollups(self, series: str, period: str, start_ms: int, end_ms: int) -> List[Dict[str, Any]]:
+        """Weekly or monthly NDVI rollups from the bucket of start_ms to the bucket of end_ms"""
+        if period not in ROLLUP_PERIODS:
+            raise ValueError(f"Unknown rollup period: {period}")
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT bucket, count, ndvi_sum, ndvi_min, ndvi_max FROM rollups "
+                "WHERE series = ? AND period = ? AND bucket >= ? AND bucket <= ? ORDER BY bucket",
+                (series, period, rollup_bucket(period, start_ms), rollup_bucket(period, end_ms))).fetchall()
+        return [{
+            period: row[0],
+            'observations': row[1],
+            'mean_ndvi': round(row[2] / row[1], 3),
+            'min_ndvi': round(row[3], 3),
+            'max_ndvi': round(row[4], 3)
+        } for row in rows]
+
+    def clear(self):
+        with self._lock, self._connection:
+            for table in ('observations', 'coverage', 'rollups'):
+                self._connection.execute(f"DELETE FROM {table}")
+
+
+_stores = SharedStores(NdviSeriesStore)
+
+
+def get_ndvi_series_store(path: Optional[str] = None) -> NdviSeriesStore:
+    """The shared series store for a database path (one connection per process)"""
+    return _stores.get(path or SERIES_PATH)
@@ -0,0 +1,281 @@
+"""
+Vectorised price analytics over the farm records.
+Prices are laid out as a crops x periods matrix (mean selling price per season)
+so moving averages, seasonal indices, volatility and additive Holt-Winters
+forecasts are computed for every crop at once. Holt-Winters parameters are
+chosen per crop by a grid search evaluated across all crops and parameter sets
+in one pass over the periods.
+
+Fitted models are materialised once per data version (like FarmAggregates), so
+the market tools serve them by key lookup.
+"""
+
+import warnings
+from itertools import product
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from .farm_data_store import FarmDataSnapshot, get_farm_data_store
+from .farm_records import FarmRecord
+
+# Trailing window (in seasons) of the moving average
+MOVING_AVERAGE_WINDOW = 3
+
+# Seasons forecast ahead of the latest period
+FORECAST_HORIZON = 2
+
+# Holt-Winters smoothing grid: level (alpha), trend (beta), seasonal (gamma)
+ALPHA_GRID = (0.1, 0.3, 0.5, 0.7, 0.9)
+BETA_GRID = (0.0, 0.1, 0.2, 0.3)
+GAMMA_GRID = (0.0, 0.1, 0.3, 0.5)
+
+# z-score of the forecast interval
+INTERVAL_Z = 1.96
+
+
+def _round(values: np.ndarray) -> List[Optional[float]]:
+    return [None if np.isnan(v) else round(float(v), 2) for v in values]
+
+
+def next_periods(last_period: str, seasons: List[str], count: int) -> List[str]:
+    """The count periods following last_period ("YYYY Sn"), cycling through seasons"""
+    year, season = last_period.split(' ')
+    year, index = int(year), seasons.index(season)
+    periods = []
+    for _ in range(count):
+        index += 1
+        if index == len(seasons):
+            year, index = year + 1, 0
+        periods.append(f"{year} {seasons[index]}")
+    return periods
+
+
+def price_matrix(records: List[FarmRecord]) -> Tuple[List[str], List[str], List[str], np.ndarray]:
+    """
+    Mean price per crop and period.
+
+    Returns:
+        (crops, periods, seasons, prices) where prices is a crops x periods array (NaN where unobserved)
+    """
+    rows = [(r.crop, r.year, r.season, r.price_per_kg) for r in records
+            if r.crop and r.price_per_kg and r.period]
+    crops = sorted({row[0] for row in rows})
+    seasons = sorted({row[2] for row in rows})
+    if not rows:
+        return crops, [], seasons, np.empty((0, 0))
+
+    years = [row[1] for row in rows]
+    first_year, last_year = min(years), max(years)
+    periods = [f"{year} {season}" for year in range(first_year, last_year + 1) for season in seasons]
+
+    crop_index = {crop: i for i, crop in enumerate(crops)}
+    season_index = {season: i for i, season in enumerate(seasons)}
+    crop_codes = np.array([crop_index[row[0]] for row in rows])
+    period_codes = np.array([(row[1] - first_year) * len(seasons) + season_index[row[2]] for row in rows])
+    values = np.array([row[3] for row in rows], dtype=float)
+
+    cells = crop_codes * len(periods) + period_codes
+    size = len(crops) * len(periods)
+    sums = np.bincount(cells, weights=values, minlength=size)
+    counts = np.bincount(cells, minlength=size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        prices = (sums / counts).reshape(len(crops), len(periods))
+
+    # Trim periods after the last observation of any crop (e.g. a season not yet sold)
+    observed = np.flatnonzero(~np.isnan(prices).all(axis=0))
+    end = observed[-1] + 1
+    return crops, periods[:end], seasons, prices[:, :end]
+
+
+def moving_average(prices: np.ndarray, window: int = MOVING_AVERAGE_WINDOW) -> np.ndarray:
+    """Trailing mean of the observed prices in each window (NaN before a crop's first observation)"""
+    observed = ~np.isnan(prices)
+    filled = np.where(observed, prices, 0.0)
+    pad = np.zeros((prices.shape[0], 1))
+    sums = np.cumsum(np.hstack([pad, filled]), axis=1)
+    counts = np.cumsum(np.hstack([pad, observed.astype(float)]), axis=1)
+    start = np.maximum(np.arange(1, prices.shape[1] + 1) - window, 0)
+    window_sums = sums[:, 1:] - sums[:, start]
+    window_counts = counts[:, 1:] - counts[:, start]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(window_counts > 0, window_sums / window_counts, np.nan)
+
+
+def seasonal_indices(prices: np.ndarray, season_count: int) -> np.ndarray:
+    """Crops x seasons ratio of each season's mean price to the crop's overall mean"""
+    crops, periods = prices.shape
+    padded = np.full((crops, -(-periods // season_count) * season_count), np.nan)
+    padded[:, :periods] = prices
+    by_season = padded.reshape(crops, -1, season_count)
+    # A crop never sold in a season has no index for it (NaN)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        season_means = np.nanmean(by_season, axis=1)
+        return season_means / np.nanmean(prices, axis=1, keepdims=True)
+
+
+def volatility(prices: np.ndarray) -> np.ndarray:
+    """Standard deviation of season-over-season log returns between observed prices, in percent"""
+    volatilities = np.full(prices.shape[0], np.nan)
+    for i, row in enumerate(prices):
+        observed = row[~np.isnan(row)]
+        if len(observed) >= 3:
+            volatilities[i] = np.std(np.diff(np.log(observed)), ddof=1) * 100
+    return volatilities
+
+
+def _fill_gaps(prices: np.ndarray) -> np.ndarray:
+    """Carry the last observation forward and the first one backward"""
+    periods = prices.shape[1]
+    observed = ~np.isnan(prices)
+    last = np.where(observed, np.arange(periods), -1)
+    np.maximum.accumulate(last, axis=1, out=last)
+    first = np.argmax(observed, axis=1)
+    last = np.where(last < 0, first[:, None], last)
+    return np.take_along_axis(prices, last, axis=1)
+
+
+def fit_holt_winters(prices: np.ndarray, season_count: int,
+                     horizon: int = FORECAST_HORIZON) -> Dict[str, np.ndarray]:
+    """
+    Additive Holt-Winters for every crop, with (alpha, beta, gamma) chosen per crop
+    by one-step-ahead squared error over the observed periods.
+
+    Returns:
+        Arrays per crop: alpha, beta, gamma, rmse, forecast (crops x horizon) and fitted (crops x periods)
+    """
+    crops, periods = prices.shape
+    m = season_count
+    grid = np.array(list(product(ALPHA_GRID, BETA_GRID, GAMMA_GRID)))
+    alpha, beta, gamma = (grid[:, i][:, None] for i in range(3))
+    shape = (len(grid), crops)
+
+    y = _fill_gaps(prices)
+    observed = ~np.isnan(prices)
+
+    level = np.broadcast_to(y[:, :m].mean(axis=1), shape).copy()
+    if periods >= 2 * m:
+        initial_trend = (y[:, m:2 * m].mean(axis=1) - y[:, :m].mean(axis=1)) / m
+    else:
+        initial_trend = np.zeros(crops)
+    trend = np.broadcast_to(initial_trend, shape).copy()
+    season = np.broadcast_to((y[:, :m] - y[:, :m].mean(axis=1, keepdims=True)).T[:, None, :],
+                             (m, len(grid), crops)).copy()
+
+    squared_error = np.zeros(shape)
+    error_count = np.zeros(crops)
+    fitted = np.full((len(grid), crops, periods), np.nan)
+    for t in range(m, periods):
+        s = season[t % m]
+        prediction = level + trend + s
+        fitted[:, :, t] = prediction
+        error = np.where(observed[:, t], y[:, t] - prediction, 0.0)
+        squared_error += error ** 2
+        error_count += observed[:, t]
+
+        previous_level = level
+        level = alpha * (y[:, t] - s) + (1 - alpha) * (level + trend)
+        trend = beta * (level - previous_level) + (1 - beta) * trend
+        season[t % m] = gamma * (y[:, t] - level) + (1 - gamma) * s
+
+    best = np.argmin(squared_error, axis=0)
+    columns = np.arange(crops)
+    steps = np.arange(1, horizon + 1)
+    forecast = (level[best, columns][:, None] + steps * trend[best, columns][:, None]
+                + season[(periods + steps - 1) % m][:, best, columns].T)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rmse = np.sqrt(squared_error[best, columns] / error_count)
+
+    return {
+        'alpha': grid[best, 0],
+        'beta': grid[best, 1],
+        'gamma': grid[best, 2],
+        'rmse': rmse,
+        'forecast': forecast,
+        'fitted': fitted[best, columns]
+    }
+
+
+class PriceAnalytics:
+    """Price analytics and fitted forecast models for one data version, served by crop"""
+
+    def __init__(self, version: Optional[str] = None):
+        self.version = version
+        self.periods: List[str] = []
+        self.seasons: List[str] = []
+        self.models: Dict[str, Dict[str, Any]] = {}
+        self.crop_names: Dict[str, List[str]] = {}
+
+    @classmethod
+    def build(cls, records: List[FarmRecord], version: Optional[str] = None,
+              horizon: int = FORECAST_HORIZON) -> 'PriceAnalytics':
+        """Fit every crop's series in one vectorised pass"""
+        analytics = cls(version)
+        crops, periods, seasons, prices = price_matrix(records)
+        analytics.periods, analytics.seasons = periods, seasons
+        if not crops or not periods:
+            return analytics
+
+        m = len(seasons)
+        averages = moving_average(prices)
+        indices = seasonal_indices(prices, m)
+        volatilities = volatility(prices)
+        observed_counts = (~np.isnan(prices)).sum(axis=1)
+        forecast_periods = next_periods(periods[-1], seasons, horizon)
+        model = fit_holt_winters(prices, m, horizon) if len(periods) > m else None
+
+        for i, crop in enumerate(crops):
+            observed = np.flatnonzero(~np.isnan(prices[i]))
+            first, last = observed[0], observed[-1]
+            last_price = float(prices[i, last])
+
+            # Holt-Winters needs a full season of history; otherwise carry the last price forward
+            if model is not None and observed_counts[i] > m:
+                method = 'holt_winters_additive'
+                forecast = model['forecast'][i]
+                rmse = float(model['rmse'][i]) if not np.isnan(model['rmse'][i]) else 0.0
+                parameters = {'alpha': float(model['alpha'][i]), 'beta': float(model['beta'][i]),
+                              'gamma': float(model['gamma'][i])}
+            else:
+                method = 'naive'
+                forecast = np.full(horizon, last_price)
+                rmse = float(np.nanstd(prices[i])) if observed_counts[i] > 1 else 0.0
+                parameters = {}
+
+            steps = np.sqrt(np.arange(1, horizon + 1))
+            analytics.models[crop] = {
+                'periods': periods[first:last + 1],
+                'prices': _round(prices[i, first:last + 1]),
+                'moving_average': _round(averages[i, first:last + 1]),
+                'moving_average_window': MOVING_AVERAGE_WINDOW,
+                'seasonal_index': {season: (None if np.isnan(value) else round(float(value), 3))
+                                   for season, value in zip(seasons, indices[i])},
+                'volatility_percent': None if np.isnan(volatilities[i]) else round(float(volatilities[i]), 1),
+                'latest_period': periods[last],
+                'latest_price': round(last_price, 2),
+                'forecast': [{
+                    'period': period,
+                    'price': round(float(price), 2),
+                    'lower': round(float(max(price - INTERVAL_Z * rmse * step, 0.0)), 2),
+                    'upper': round(float(price + INTERVAL_Z * rmse * step), 2)
+                } for period, price, step in zip(forecast_periods, forecast, steps)],
+                'model': dict(method=method, rmse=round(rmse, 2), **parameters)
+            }
+            analytics.crop_names.setdefault(crop.lower(), []).append(crop)
+        return analytics
+
+    def analytics(self, crop: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Analytics per crop, optionally for one crop (case-insensitive)"""
+        if not crop:
+            return self.models
+        return {name: self.models[name] for name in self.crop_names.get(crop.lower(), [])}
+
+
+def get_price_analytics(path: Optional[str] = None) -> PriceAnalytics:
+    """Price analytics for the shared store's current data version (refitted when the data changes)"""
+    return get_farm_data_store(path).derived('price_analytics', _build_price_analytics, eager=True)
+
+
+def _build_price_analytics(snapshot: FarmDataSnapshot) -> PriceAnalytics:
+    return PriceAnalytics.build(snapshot.farm_records, snapshot.version)
@@ -0,0 +1,517 @@
+"""
+Whole-farm crop rotation optimiser.
+Chooses a crop (or fallow) for every plot and future season to maximise
+expected profit under rotation rules (no crop twice in a row, a legume or
+fallow break in every window of seasons) and farm-wide limits per season
+(input budget, hectares per crop).
+
+Each plot's sequence is solved by dynamic programming over (season, recent
+crops) with memoised subproblems. The farm-wide limits couple the plots, so
+they are priced into the plot objectives by Lagrangian relaxation: plots that
+start from the same recent crops share one DP table per iteration, the
+relaxed optimum bounds the achievable profit, and a capacity-aware repair
+pass turns the multipliers into a feasible plan. When that plan is not provably
+optimal, branch and bound over the plots (bounded by the same relaxation)
+closes the gap within a node budget.
+"""
+
+import heapq
+import itertools
+import time
+from collections import defaultdict
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+from .farm_records import FarmRecord
+from .price_analytics import next_periods
+
+FALLOW = 'Fallow'
+
+# Crops that count as a rotation break (nitrogen-fixing)
+LEGUME_CROPS = ('Beans',)
+
+# Every run of this many consecutive seasons needs a legume or fallow season
+LEGUME_WINDOW = 3
+
+MAX_ITERATIONS = 200
+# Stop once the plan is within this fraction of the relaxation bound
+GAP_TOLERANCE = 0.001
+REPAIR_EVERY = 10
+LOCAL_SEARCH_PASSES = 3
+# Subgradient steps are halved after this many iterations without a better bound
+STALL_ITERATIONS = 5
+MIN_STEP_SCALE = 0.005
+
+# Branch-and-bound candidate evaluations before settling for the relaxation's plan
+BRANCH_NODE_LIMIT = 20000
+
+
+def season_economics(records: List[FarmRecord]) -> Tuple[Dict[str, Dict[str, float]], Dict[str, Dict[str, float]]]:
+    """
+    Mean profit and input cost per hectare for each crop and season label (S1, S2, ...).
+    Seasons a crop was never grown in fall back to its all-season mean.
+    """
+    totals = defaultdict(lambda: defaultdict(lambda: [0.0, 0.0, 0]))
+    for record in records:
+        if record.crop and record.season and record.revenue_kes and record.cost_kes and record.area_hectares:
+            cell = totals[record.crop][record.season]
+            cell[0] += (record.revenue_kes - record.cost_kes) / record.area_hectares
+            cell[1] += record.cost_kes / record.area_hectares
+            cell[2] += 1
+
+    seasons = sorted({season for by_season in totals.values() for season in by_season})
+    profit, cost = {}, {}
+    for crop, by_season in totals.items():
+        count = sum(cell[2] for cell in by_season.values())
+        mean_profit = sum(cell[0] for cell in by_season.values()) / count
+        mean_cost = sum(cell[1] for cell in by_season.values()) / count
+        profit[crop] = {s: by_season[s][0] / by_season[s][2] if s in by_season else mean_profit for s in seasons}
+        cost[crop] = {s: by_season[s][1] / by_season[s][2] if s in by_season else mean_cost for s in seasons}
+    return profit, cost
+
+
+def plot_histories(records: List[FarmRecord]) -> List[Dict[str, Any]]:
+    """One entry per base plot: name, area and crop sequence by period (first record per period)"""
+    plots = {}
+    for record in sorted(records, key=lambda r: (r.year or 0, r.season or '')):
+        if not record.base_plot_id or not record.crop or not record.period:
+            continue
+        plot = plots.setdefault(record.base_plot_id, {
+            'plot_id': record.base_plot_id, 'plot_name': record.plot_name or record.base_plot_id,
+            'area_hectares': 0.0, 'periods': [], 'history': []
+        })
+        if record.area_hectares:
+            plot['area_hectares'] = record.area_hectares
+        if record.period not in plot['periods']:
+            plot['periods'].append(record.period)
+            plot['history'].append(record.crop)
+    return sorted(plots.values(), key=lambda p: p['plot_id'])
+
+
+class RotationProblem:
+    """Plots, candidate crops, future periods and the economics and limits of one planning run"""
+
+    def __init__(self, plots: List[Dict[str, Any]], periods: List[str],
+                 profit_per_ha: Dict[str, Dict[str, float]], cost_per_ha: Dict[str, Dict[str, float]],
+                 budget_per_season: Optional[float] = None, max_crop_hectares: Optional[Dict[str, float]] = None,
+                 legume_crops: Sequence[str] = LEGUME_CROPS, legume_window: int = LEGUME_WINDOW):
+        self.plots = plots
+        self.periods = periods
+        self.seasons = [period.split(' ')[1] for period in periods]
+        self.crops = sorted(profit_per_ha)
+        self.options = self.crops + [FALLOW]
+        self.profit = [{c: profit_per_ha[c][s] for c in self.crops} for s in self.seasons]
+        self.cost = [{c: cost_per_ha[c][s] for c in self.crops} for s in self.seasons]
+        for t in range(len(periods)):
+            self.profit[t][FALLOW] = 0.0
+            self.cost[t][FALLOW] = 0.0
+        self.budget = budget_per_season
+        self.max_crop_hectares = max_crop_hectares or {}
+        self.breaks = set(legume_crops) | {FALLOW}
+        self.memory = max(legume_window - 1, 1)
+        self._rules: Dict[Tuple[Tuple, str], bool] = {}
+
+    def initial_state(self, plot: Dict[str, Any]) -> Tuple[Optional[str], ...]:
+        """The plot's most recent crops (None where history is shorter than the rotation window)"""
+        recent = tuple(plot['history'][-self.memory:])
+        return (None,) * (self.memory - len(recent)) + recent
+
+    def allowed_after(self, state: Tuple[Optional[str], ...], crop: str) -> bool:
+        """Rotation rules for planting crop after the recent crops in state"""
+        key = (state, crop)
+        allowed = self._rules.get(key)
+        if allowed is None:
+            window = state + (crop,)
+            # Unknown history cannot violate the break rule
+            allowed = (crop == FALLOW or crop != state[-1]) and (
+                None in window or any(c in self.breaks for c in window))
+            self._rules[key] = allowed
+        return allowed
+
+    def usage(self, plan: Dict[str, List[str]]) -> Tuple[List[float], List[Dict[str, float]]]:
+        """Input spend and hectares per crop in each season"""
+        spend = [0.0] * len(self.periods)
+        hectares = [defaultdict(float) for _ in self.periods]
+        for plot in self.plots:
+            for t, crop in enumerate(plan[plot['plot_id']]):
+                spend[t] += plot['area_hectares'] * self.cost[t][crop]
+                if crop != FALLOW:
+                    hectares[t][crop] += plot['area_hectares']
+        return spend, hectares
+
+    def feasible(self, plan: Dict[str, List[str]]) -> bool:
+        spend, hectares = self.usage(plan)
+        for t in range(len(self.periods)):
+            if self.budget is not None and spend[t] > self.budget + 1e-6:
+                return False
+            if any(hectares[t][c] > limit + 1e-9 for c, limit in self.max_crop_hectares.items()):
+                return False
+        for plot in self.plots:
+            state = self.initial_state(plot)
+            for crop in plan[plot['plot_id']]:
+                if not self.allowed_after(state, crop):
+                    return False
+                state = state[1:] + (crop,)
+        return True
+
+    def profit_of(self, plan: Dict[str, List[str]]) -> float:
+        return sum(plot['area_hectares'] * self.profit[t][crop]
+                   for plot in self.plots for t, crop in enumerate(plan[plot['plot_id']]))
+
+
+class _SequenceSolver:
+    """Memoised DP over (season, recent crops) for one set of per-hectare weights and allowed crops"""
+
+    def __init__(self, problem: RotationProblem, weights: List[Dict[str, float]],
+                 allowed: Optional[List[Sequence[str]]] = None):
+        self.problem = problem
+        self.weights = weights
+        self.allowed = allowed or [problem.options] * len(weights)
+        self.memo: Dict[Tuple[int, Tuple], Tuple[float, Optional[str]]] = {}
+
+    def value(self, t: int, state: Tuple) -> float:
+        if t == len(self.weights):
+            return 0.0
+        key = (t, state)
+        cached = self.memo.get(key)
+        if cached is not None:
+            return cached[0]
+
+        best_value, best_crop = float('-inf'), None
+        for crop in self.allowed[t]:
+            if not self.problem.allowed_after(state, crop):
+                continue
+            candidate = self.weights[t][crop] + self.value(t + 1, state[1:] + (crop,))
+            if candidate > best_value:
+                best_value, best_crop = candidate, crop
+        self.memo[key] = (best_value, best_crop)
+        return best_value
+
+    def sequence(self, state: Tuple) -> Tuple[float, List[str]]:
+        """Best per-hectare value and crop sequence from a starting state"""
+        total = self.value(0, state)
+        crops = []
+        for t in range(len(self.weights)):
+            crop = self.memo[(t, state)][1]
+            crops.append(crop)
+            state = state[1:] + (crop,)
+        return total, crops
+
+
+def _relaxed_weights(problem: RotationProblem, budget_price: List[float],
+                     area_price: List[Dict[str, float]]) -> List[Dict[str, float]]:
+    """Per-hectare profit less the priced budget and crop-area use"""
+    return [{crop: problem.profit[t][crop] - budget_price[t] * problem.cost[t][crop] - area_price[t].get(crop, 0.0)
+             for crop in problem.options} for t in range(len(problem.periods))]
+
+
+def _repair(problem: RotationProblem, weights: List[Dict[str, float]]) -> Dict[str, List[str]]:
+    """
+    Feasible plan: plots (largest first) take their best sequence within the capacity
+    left by earlier plots, then plots are re-solved on true profit against the others
+    until no single plot can improve.
+    """
+    horizon = len(problem.periods)
+    true_weights = [dict(problem.profit[t]) for t in range(horizon)]
+    spend = [0.0] * horizon
+    hectares = [defaultdict(float) for _ in range(horizon)]
+
+    def allowed_for(plot):
+        area = plot['area_hectares']
+        allowed = []
+        for t in range(horizon):
+            options = [FALLOW]
+            for crop in problem.crops:
+                if problem.budget is not None and spend[t] + area * problem.cost[t][crop] > problem.budget + 1e-6:
+                    continue
+                limit = problem.max_crop_hectares.get(crop)
+                if limit is not None and hectares[t][crop] + area > limit + 1e-9:
+                    continue
+                options.append(crop)
+            allowed.append(options)
+        return allowed
+
+    def apply(plot, crops, sign):
+        for t, crop in enumerate(crops):
+            spend[t] += sign * plot['area_hectares'] * problem.cost[t][crop]
+            if crop != FALLOW:
+                hectares[t][crop] += sign * plot['area_hectares']
+
+    plan = {}
+    for plot in sorted(problem.plots, key=lambda p: -p['area_hectares']):
+        _, crops = _SequenceSolver(problem, weights, allowed_for(plot)).sequence(problem.initial_state(plot))
+        plan[plot['plot_id']] = crops
+        apply(plot, crops, 1)
+
+    for _ in range(LOCAL_SEARCH_PASSES):
+        improved = False
+        for plot in problem.plots:
+            current = plan[plot['plot_id']]
+            apply(plot, current, -1)
+            state = problem.initial_state(plot)
+            value, crops = _SequenceSolver(problem, true_weights, allowed_for(plot)).sequence(state)
+            if value > sum(true_weights[t][c] for t, c in enumerate(current)) + 1e-9:
+                current, improved = crops, True
+            plan[plot['plot_id']] = current
+            apply(plot, current, 1)
+        if not improved:
+            break
+    return plan
+
+
+class _RankedSequences:
+    """
+    Rule-abiding crop sequences from one starting state, generated lazily in
+    relaxed-value order: a best-first search over prefixes, ranked by the prefix
+    value plus the DP value of the best completion (an exact bound). Sequences
+    already generated are kept, so re-visiting the state after backtracking
+    replays them before extending the search.
+    """
+
+    def __init__(self, problem: RotationProblem, weights: List[Dict[str, float]],
+                 solver: _SequenceSolver, state: Tuple):
+        self.problem = problem
+        self.weights = weights
+        self.solver = solver
+        self.ranked: List[Tuple[float, float, Tuple[str, ...]]] = []
+        self._order = itertools.count()
+        self._frontier = [(-solver.value(0, state), next(self._order), 0.0, 0.0, (), state)]
+
+    def __iter__(self):
+        position = 0
+        while position < len(self.ranked) or self._extend():
+            yield self.ranked[position]
+            position += 1
+
+    def _extend(self) -> bool:
+        """Generate the next best sequence; False once every sequence has been generated"""
+        horizon = len(self.weights)
+        while self._frontier:
+            _, _, relaxed, profit, prefix, recent = heapq.heappop(self._frontier)
+            t = len(prefix)
+            if t == horizon:
+                self.ranked.append((relaxed, profit, prefix))
+                return True
+            for crop in self.problem.options:
+                if not self.problem.allowed_after(recent, crop):
+                    continue
+                state = recent[1:] + (crop,)
+                value = relaxed + self.weights[t][crop]
+                heapq.heappush(self._frontier, (
+                    -(value + self.solver.value(t + 1, state)), next(self._order),
+                    value, profit + self.problem.profit[t][crop], prefix + (crop,), state))
+        return False
+
+
+def _branch_and_bound(problem: RotationProblem, weights: List[Dict[str, float]], budget_price: List[float],
+                      area_price: List[Dict[str, float]], incumbent: float,
+                      node_limit: int = BRANCH_NODE_LIMIT) -> Tuple[Optional[Dict[str, List[str]]], float, bool]:
+    """
+    Exact search over plots (largest first), each taking one of its rule-abiding sequences.
+    The bound at a node is the Lagrangian relaxation of the remaining plots with the
+    residual capacity, so each plot's candidates are tried in relaxed-value order and
+    the loop stops at the first candidate that cannot beat the incumbent.
+    Candidates are generated lazily per starting state (see _RankedSequences), so
+    the work stays within node_limit however many sequences the horizon allows.
+
+    Returns:
+        (best plan found or None, its profit, whether the search finished within node_limit)
+    """
+    horizon = len(problem.periods)
+    plots = sorted(problem.plots, key=lambda p: -p['area_hectares'])
+    solver = _SequenceSolver(problem, weights)
+    candidates = {}
+    for plot in plots:
+        state = problem.initial_state(plot)
+        if state not in candidates:
+            candidates[state] = _RankedSequences(problem, weights, solver, state)
+
+    # Relaxed value of the plots after position i
+    suffix = [0.0] * (len(plots) + 1)
+    for i in range(len(plots) - 1, -1, -1):
+        suffix[i] = suffix[i + 1] + plots[i]['area_hectares'] * solver.value(0, problem.initial_state(plots[i]))
+
+    spend = [0.0] * horizon
+    hectares = [defaultdict(float) for _ in range(horizon)]
+    chosen: List[Tuple[str, ...]] = []
+    best = {'plan': None, 'profit': incumbent}
+    nodes = [0]
+
+    def residual_credit():
+        credit = 0.0
+        for t in range(horizon):
+            if problem.budget is not None:
+                credit += budget_price[t] * (problem.budget - spend[t])
+            for crop, limit in problem.max_crop_hectares.items():
+                credit += area_price[t].get(crop, 0.0) * (limit - hectares[t][crop])
+        return credit
+
+    def fits(area, crops):
+        for t, crop in enumerate(crops):
+            if problem.budget is not None and spend[t] + area * problem.cost[t][crop] > problem.budget + 1e-6:
+                return False
+            limit = problem.max_crop_hectares.get(crop)
+            if limit is not None and hectares[t][crop] + area > limit + 1e-9:
+                return False
+        return True
+
+    def apply(area, crops, sign):
+        for t, crop in enumerate(crops):
+            spend[t] += sign * area * problem.cost[t][crop]
+            if crop != FALLOW:
+                hectares[t][crop] += sign * area
+
+    def search(i, value):
+        if i == len(plots):
+            if value > best['profit'] + 1e-6:
+                best['profit'] = value
+                best['plan'] = {plot['plot_id']: list(crops) for plot, crops in zip(plots, chosen)}
+            return True
+        area = plots[i]['area_hectares']
+        # Bound for a candidate = base + area * its relaxed value, so candidates are in bound order
+        base = value + suffix[i + 1] + residual_credit()
+        for relaxed, profit, crops in candidates[problem.initial_state(plots[i])]:
+            if base + area * relaxed <= best['profit'] + 1e-6:
+                break
+            nodes[0] += 1
+            if nodes[0] > node_limit:
+                return False
+            if not fits(area, crops):
+                continue
+            apply(area, crops, 1)
+            chosen.append(crops)
+            finished = search(i + 1, value + area * profit)
+            chosen.pop()
+            apply(area, crops, -1)
+            if not finished:
+                return False
+        return True
+
+    finished = search(0, 0.0)
+    return best['plan'], best['profit'], finished
+
+
+def optimize_rotation(problem: RotationProblem, max_iterations: int = MAX_ITERATIONS,
+                      gap_tolerance: float = GAP_TOLERANCE, node_limit: int = BRANCH_NODE_LIMIT) -> Dict[str, Any]:
+    """
+    Maximise expected profit over every plot and period.
+    Unconstrained farms are solved exactly by the per-plot DP. With farm-wide limits,
+    subgradient steps on the Lagrange multipliers give a bound and repaired plans;
+    if those are not within gap_tolerance, branch and bound closes the gap (up to
+    node_limit candidate evaluations).
+
+    Returns:
+        plan (plot_id -> crops per period), expected_profit_kes, upper_bound_kes,
+        gap_percent, iterations, status and solve_ms
+    """
+    start = time.perf_counter()
+    horizon = len(problem.periods)
+    constrained = problem.budget is not None or bool(problem.max_crop_hectares)
+    budget_price = [0.0] * horizon
+    area_price = [defaultdict(float) for _ in range(horizon)]
+    step_scale = 2.0
+    stalled = 0
+
+    best_plan, best_profit, bound, iterations = None, float('-inf'), float('inf'), 0
+    best_multipliers = (list(budget_price), [dict(prices) for prices in area_price])
+    for iteration in range(max_iterations if constrained else 1):
+        iterations = iteration + 1
+        weights = _relaxed_weights(problem, budget_price, area_price)
+        # Plots starting from the same recent crops share one DP table
+        solver = _SequenceSolver(problem, weights)
+        relaxed, relaxed_value = {}, 0.0
+        for plot in problem.plots:
+            value, crops = solver.sequence(problem.initial_state(plot))
+            relaxed[plot['plot_id']] = crops
+            relaxed_value += plot['area_hectares'] * value
+
+        # Lagrangian dual value: an upper bound on every feasible plan's profit
+        dual = relaxed_value + sum(
+            budget_price[t] * (problem.budget or 0.0)
+            + sum(price * problem.max_crop_hectares.get(crop, 0.0) for crop, price in area_price[t].items())
+            for t in range(horizon))
+        if dual < bound - 1e-6:
+            bound, stalled = dual, 0
+            best_multipliers = (list(budget_price), [dict(prices) for prices in area_price])
+        else:
+            stalled += 1
+
+        candidates = [relaxed] if problem.feasible(relaxed) else []
+        if iteration % REPAIR_EVERY == 0:
+            candidates.append(_repair(problem, weights))
+        for plan in candidates:
+            profit = problem.profit_of(plan)
+            if profit > best_profit:
+                best_plan, best_profit = plan, profit
+
+        if not constrained or bound - best_profit <= gap_tolerance * max(abs(bound), 1.0):
+            break
+
+        # Polyak subgradient step, on multipliers scaled by their limits (kept non-negative);
+        # the step shrinks whenever the bound stops improving
+        if stalled >= STALL_ITERATIONS:
+            step_scale, stalled = step_scale / 2, 0
+            if step_scale < MIN_STEP_SCALE:
+                break
+        spend, hectares = problem.usage(relaxed)
+        budget_excess = [(spend[t] / problem.budget - 1) if problem.budget else 0.0 for t in range(horizon)]
+        area_excess = [{crop: hectares[t][crop] / limit - 1 for crop, limit in problem.max_crop_hectares.items() if limit > 0}
+                       for t in range(horizon)]
+        norm = sum(g * g for g in budget_excess) + sum(g * g for row in area_excess for g in row.values())
+        if norm == 0:
+            break
+        step = step_scale * max(dual - max(best_profit, 0.0), 1.0) / norm
+        for t in range(horizon):
+            if problem.budget:
+                budget_price[t] = max(0.0, budget_price[t] + step * budget_excess[t] / problem.budget)
+            for crop, excess in area_excess[t].items():
+                area_price[t][crop] = max(0.0, area_price[t][crop] + step * excess / problem.max_crop_hectares[crop])
+
+    if constrained:
+        budget_price, area_price = best_multipliers
+        plan = _repair(problem, _relaxed_weights(problem, budget_price, area_price))
+        if problem.profit_of(plan) > best_profit:
+            best_plan, best_profit = plan, problem.profit_of(plan)
+
+    searched = False
+    if constrained and bound - best_profit > gap_tolerance * max(abs(bound), 1.0) and node_limit > 0:
+        budget_price, area_price = best_multipliers
+        weights = _relaxed_weights(problem, budget_price, area_price)
+        plan, profit, searched = _branch_and_bound(problem, weights, budget_price, area_price, best_profit, node_limit)
+        if plan is not None:
+            best_plan, best_profit = plan, profit
+        if searched:
+            bound = best_profit
+
+    bound = max(bound, best_profit)
+    gap = (bound - best_profit) / abs(bound) * 100 if bound else 0.0
+    return {
+        'plan': best_plan,
+        'expected_profit_kes': round(best_profit, 2),
+        'upper_bound_kes': round(bound, 2),
+        'gap_percent': round(gap, 3),
+        'iterations': iterations,
+        'branch_and_bound_complete': searched,
+        'status': 'optimal' if gap <= gap_tolerance * 100 else 'feasible',
+        'solve_ms': round((time.perf_counter() - start) * 1000, 2)
+    }
+
+
+def build_rotation_problem(records: List[FarmRecord], seasons_ahead: int = 4,
+                           budget_per_season: Optional[float] = None,
+                           max_crop_share_percent: Optional[float] = None) -> RotationProblem:
+    """Rotation problem for the farm's plots over the seasons after its latest period"""
+    profit, cost = season_economics(records)
+    plots = [p for p in plot_histories(records) if p['area_hectares']]
+    if not profit or not plots:
+        raise ValueError("No plots with crop revenue, cost and area to plan rotations from")
+    season_labels = sorted({season for by_season in profit.values() for season in by_season})
+    latest = max((r for r in records if r.period and r.season in season_labels),
+                 key=lambda r: (r.year, r.season)).period
+    periods = next_periods(latest, season_labels, seasons_ahead)
+
+    max_crop_hectares = None
+    if max_crop_share_percent is not None:
+        total_area = sum(p['area_hectares'] for p in plots)
+        max_crop_hectares = {crop: total_area * max_crop_share_percent / 100 for crop in profit}
+    return RotationProblem(plots, periods, profit, cost, budget_per_season=budget_per_season,
+                           max_crop_hectares=max_crop_hectares)
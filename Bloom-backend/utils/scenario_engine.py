@@ -0,0 +1,188 @@
+"""
+Monte Carlo scenario engine for crop profitability.
+Each crop's historical seasons give joint (yield, price, cost per hectare)
+observations; simulated seasons resample them together (keeping their
+correlation) with Gaussian kernel jitter, so every draw is a plausible season
+rather than a copy of a past one. All draws are vectorised NumPy arrays.
+
+Simulated seasons are per hectare and are materialised once per crop and data
+version, so scenario questions (area, price or yield shocks) and sensitivity
+grids reuse them instead of re-simulating.
+"""
+
+import os
+import threading
+import time
+import zlib
+from typing import Dict, List, Any, Optional, Sequence
+
+import numpy as np
+
+from .farm_data_store import FarmDataSnapshot, get_farm_data_store
+from .farm_records import FarmRecord
+
+# Simulated seasons per crop, capped by the latency budget of the first (building) call
+DEFAULT_SIMULATIONS = int(os.getenv("SCENARIO_SIMULATIONS", "100000"))
+MIN_SIMULATIONS = 10000
+SIMULATION_BUDGET_MS = float(os.getenv("SCENARIO_BUDGET_MS", "150"))
+SIMULATION_CHUNK = 25000
+
+# Per-hectare statistics kept per model for distinct price x yield multipliers
+MAX_CACHED_SCENARIOS = 32
+
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+
+# Default sensitivity grid: multipliers on simulated price and yield, and planted areas
+PRICE_FACTORS = (0.7, 0.85, 1.0, 1.15, 1.3)
+YIELD_FACTORS = (0.7, 0.85, 1.0, 1.15, 1.3)
+SENSITIVITY_AREAS = (0.5, 1.0, 2.0, 5.0)
+
+
+def historical_seasons(records: List[FarmRecord]) -> np.ndarray:
+    """seasons x (yield t/ha, price KES/kg, cost KES/ha) for records with all three"""
+    rows = [(r.yield_tons_per_ha, r.price_per_kg, r.cost_kes / r.area_hectares)
+            for r in records
+            if r.yield_tons_per_ha and r.price_per_kg and r.cost_kes and r.area_hectares]
+    return np.array(rows, dtype=float).reshape(-1, 3)
+
+
+def _bandwidth(observations: np.ndarray) -> np.ndarray:
+    """Silverman's rule-of-thumb kernel bandwidth per column"""
+    n = len(observations)
+    if n < 2:
+        return np.zeros(observations.shape[1])
+    return 1.06 * observations.std(axis=0, ddof=1) * n ** (-1 / 5)
+
+
+class ScenarioModel:
+    """Simulated seasons per hectare for one crop"""
+
+    def __init__(self, crop: str, observations: np.ndarray, simulations: int = DEFAULT_SIMULATIONS,
+                 seed: Optional[int] = None, budget_ms: float = SIMULATION_BUDGET_MS):
+        self.crop = crop
+        self.observations = observations
+        rng = np.random.default_rng(zlib.crc32(crop.lower().encode()) if seed is None else seed)
+        bandwidth = _bandwidth(observations)
+
+        # Draw in chunks so a slow host stops at the latency budget (never below MIN_SIMULATIONS)
+        chunks, drawn = [], 0
+        start = time.perf_counter()
+        while drawn < simulations:
+            size = min(SIMULATION_CHUNK, simulations - drawn)
+            picks = observations[rng.integers(0, len(observations), size)]
+            chunks.append(np.maximum(picks + rng.standard_normal((size, 3)) * bandwidth, 0.0))
+            drawn += size
+            if drawn >= MIN_SIMULATIONS and (time.perf_counter() - start) * 1000 > budget_ms:
+                break
+        samples = np.vstack(chunks)
+
+        self.yield_t_ha = samples[:, 0]
+        self.price_per_kg = samples[:, 1]
+        self.cost_per_ha = samples[:, 2]
+        self.revenue_per_ha = self.yield_t_ha * 1000 * self.price_per_kg
+        self.simulations = len(samples)
+        self.build_ms = (time.perf_counter() - start) * 1000
+
+        # Sorted cost/revenue ratios: a season loses money under a price x yield
+        # multiplier f exactly when its ratio exceeds f, so P(loss) is one binary search
+        with np.errstate(divide='ignore'):
+            self._loss_ratios = np.sort(np.where(self.revenue_per_ha > 0,
+                                                 self.cost_per_ha / self.revenue_per_ha, np.inf))
+        self._scenarios: Dict[Any, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._per_hectare(1.0, 1.0)
+
+    def probability_of_loss(self, price_factor: float = 1.0, yield_factor: float = 1.0) -> float:
+        factor = price_factor * yield_factor
+        losses = self.simulations - np.searchsorted(self._loss_ratios, factor, side='right')
+        return float(losses / self.simulations)
+
+    def _per_hectare(self, price_factor: float, yield_factor: float) -> Dict[str, Any]:
+        """Scenario statistics for one hectare, cached per (price, yield) multiplier"""
+        key = (round(price_factor, 6), round(yield_factor, 6))
+        cached = self._scenarios.get(key)
+        if cached is not None:
+            return cached
+
+        revenue = self.revenue_per_ha * (price_factor * yield_factor)
+        profit = revenue - self.cost_per_ha
+        losses = profit[profit < 0]
+        tail_size = max(1, self.simulations // 20)
+        stats = {
+            'revenue': float(revenue.mean()),
+            'cost': float(self.cost_per_ha.mean()),
+            'profit': float(profit.mean()),
+            'profit_std': float(profit.std()),
+            'profit_percentiles': np.percentile(profit, PERCENTILES),
+            'revenue_percentiles': np.percentile(revenue, PERCENTILES),
+            'loss_if_loss': float(-losses.mean()) if len(losses) else 0.0,
+            'tail': float(np.partition(profit, tail_size - 1)[:tail_size].mean())
+        }
+        with self._lock:
+            if len(self._scenarios) >= MAX_CACHED_SCENARIOS:
+                self._scenarios.pop(next(iter(self._scenarios)))
+            self._scenarios[key] = stats
+        return stats
+
+    def simulate(self, area_hectares: float = 1.0, price_factor: float = 1.0,
+                 yield_factor: float = 1.0) -> Dict[str, Any]:
+        """Distribution of revenue, cost and profit for one scenario (every amount scales with area)"""
+        stats = self._per_hectare(price_factor, yield_factor)
+        area = area_hectares
+
+        def kes(value):
+            return round(float(value) * area, 2)
+
+        return {
+            'simulations': self.simulations,
+            'expected_revenue_kes': kes(stats['revenue']),
+            'expected_cost_kes': kes(stats['cost']),
+            'expected_profit_kes': kes(stats['profit']),
+            'profit_std_kes': kes(stats['profit_std']),
+            'profit_percentiles_kes': {f"p{q}": kes(v) for q, v in zip(PERCENTILES, stats['profit_percentiles'])},
+            'revenue_percentiles_kes': {f"p{q}": kes(v) for q, v in zip(PERCENTILES, stats['revenue_percentiles'])},
+            'probability_of_loss': round(self.probability_of_loss(price_factor, yield_factor), 4),
+            # Average size of the loss in the seasons that lose money
+            'expected_loss_if_loss_kes': kes(stats['loss_if_loss']),
+            'worst_5_percent_avg_profit_kes': kes(stats['tail'])
+        }
+
+    def sensitivity(self, price_factors: Sequence[float] = PRICE_FACTORS,
+                    yield_factors: Sequence[float] = YIELD_FACTORS,
+                    areas: Sequence[float] = SENSITIVITY_AREAS) -> Dict[str, Any]:
+        """
+        Expected profit over price x yield x area and probability of loss over price x yield.
+        Profit is linear in each factor, so the grid needs only the simulated means
+        plus one binary search per (price, yield) cell.
+        """
+        prices = np.asarray(price_factors, dtype=float)
+        yields = np.asarray(yield_factors, dtype=float)
+        area_values = np.asarray(areas, dtype=float)
+        per_ha = (prices[:, None] * yields[None, :] * self.revenue_per_ha.mean()
+                  - self.cost_per_ha.mean())
+        expected = per_ha[:, :, None] * area_values[None, None, :]
+        factors = (prices[:, None] * yields[None, :]).ravel()
+        losses = self.simulations - np.searchsorted(self._loss_ratios, factors, side='right')
+        probability = (losses / self.simulations).reshape(len(prices), len(yields))
+        return {
+            'price_factors': [float(p) for p in prices],
+            'yield_factors': [float(y) for y in yields],
+            'areas_hectares': [float(a) for a in area_values],
+            'expected_profit_kes': np.round(expected, 2).tolist(),
+            'probability_of_loss': [[round(float(p), 4) for p in row] for row in probability]
+        }
+
+
+def get_scenario_model(crop: str, path: Optional[str] = None) -> Optional[ScenarioModel]:
+    """Simulated seasons for a crop (case-insensitive) and the current data version; None without history"""
+    key = crop.lower()
+    return get_farm_data_store(path).derived(f'scenario:{key}', lambda snapshot: _build_scenario(snapshot, key))
+
+
+def _build_scenario(snapshot: FarmDataSnapshot, crop_key: str) -> Optional[ScenarioModel]:
+    positions = snapshot.positions(crop=crop_key) or []
+    records = [snapshot.farm_records[p] for p in positions]
+    observations = historical_seasons(records)
+    if not len(observations):
+        return None
+    return ScenarioModel(records[0].crop, observations)
@@ -0,0 +1,68 @@
+"""
+Permanent cache of soil properties per plot geometry.
+
+The OpenLandMap soil pH and texture rasters are static, so the soil statistics
+(and area) of a geometry are fetched from Earth Engine once and kept with no
+expiry. Each entry records the dataset version it was computed from. A lookup
+under a different version (a new dataset release) misses, and the entry is
+replaced when the statistics are fetched again.
+
+Pre-populated for every known plot at ingest time (ingest_sources with
+prefetch_soil) with one reduceRegions call, into
+generated_data/soil_cache.sqlite (see sqlite_store).
+"""
+
+import json
+import os
+import time
+from typing import Dict, List, Any, Optional
+
+from .imagery_cache import geometry_hash
+from .sqlite_store import SQLiteStore, SharedStores
+
+CACHE_PATH = os.getenv("SOIL_CACHE_PATH", os.path.join(
+    os.path.dirname(__file__), '..', 'generated_data', 'soil_cache.sqlite'))
+
+
+class SoilCache(SQLiteStore):
+    """SQLite-backed soil statistics per geometry, valid until the dataset version changes"""
+
+    SCHEMA = ("""
+        CREATE TABLE IF NOT EXISTS soil (
+            geometry TEXT PRIMARY KEY,
+            dataset_version TEXT NOT NULL,
+            soil_values TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+    """,)
+
+    def __init__(self, path: str = CACHE_PATH):
+        super().__init__(path)
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get(self, coordinates: List[List[float]], dataset_version: str) -> Optional[Dict[str, Any]]:
+        """Cached soil values of a geometry for this dataset version, or None"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT soil_values FROM soil WHERE geometry = ? AND dataset_version = ?",
+                (geometry_hash(coordinates), dataset_version)).fetchone()
+            self.stats['hits' if row else 'misses'] += 1
+        return json.loads(row[0]) if row else None
+
+    def put(self, coordinates: List[List[float]], dataset_version: str, values: Dict[str, Any]):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO soil VALUES (?, ?, ?, ?)",
+                (geometry_hash(coordinates), dataset_version, json.dumps(values), time.time()))
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM soil")
+
+
+_caches = SharedStores(SoilCache)
+
+
+def get_soil_cache(path: Optional[str] = None) -> SoilCache:
+    """The shared soil cache for a database path (one connection per process)"""
+    return _caches.get(path or CACHE_PATH)
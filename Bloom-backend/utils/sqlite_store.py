@@ -0,0 +1,55 @@
+"""
+Shared SQLite plumbing for the local Earth Engine caches and stores.
+
+Each store opens one WAL-mode connection per database file and process, so
+every worker process reads and writes the same entries on disk while the
+threads of one process take turns on the store's lock. Subclasses only
+declare their tables and queries.
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict, Generic, Tuple, TypeVar
+
+
+class SQLiteStore:
+    """One WAL-mode connection to a database file, guarded by a lock"""
+
+    # CREATE TABLE IF NOT EXISTS statements run when the store is opened
+    SCHEMA: Tuple[str, ...] = ()
+
+    def __init__(self, database_path: str):
+        self.database_path = database_path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(database_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(database_path, check_same_thread=False, timeout=10)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            for statement in self.SCHEMA:
+                self._connection.execute(statement)
+
+
+S = TypeVar('S')
+
+
+class SharedStores(Generic[S]):
+    """One store per absolute path and process, created on first use"""
+
+    def __init__(self, factory: Callable[[str], S]):
+        self._factory = factory
+        self._stores: Dict[str, S] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> S:
+        path = os.path.abspath(path)
+        store = self._stores.get(path)
+        if store is None:
+            with self._lock:
+                store = self._stores.get(path)
+                if store is None:
+                    store = self._factory(path)
+                    self._stores[path] = store
+        return store
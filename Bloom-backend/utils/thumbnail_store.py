@@ -0,0 +1,160 @@
+"""
+Local store of rendered Earth Engine thumbnails (RGB and NDVI PNGs).
+
+A thumbnail is rendered and downloaded from Earth Engine once per render key,
+which combines the Sentinel-2 image id, the visualisation and the plot geometry.
+The PNG is stored content-addressed (generated_data/imagery/<sha256>.png) and
+served by the backend at /api/imagery/<digest>.png. Because a digest never
+changes, those URLs do not expire and browsers can cache them indefinitely,
+while later requests for the same render skip Earth Engine entirely.
+
+The store is bounded to IMAGERY_STORE_MAX_MB; least recently served images
+are evicted first. The render-key index is <directory>/index.sqlite (see
+sqlite_store).
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Any, Optional
+
+import requests
+
+from .sqlite_store import SQLiteStore, SharedStores
+
+IMAGERY_DIR = os.getenv("IMAGERY_STORE_DIR", os.path.join(
+    os.path.dirname(__file__), '..', 'generated_data', 'imagery'))
+
+MAX_BYTES = int(float(os.getenv("IMAGERY_STORE_MAX_MB", "200")) * 1024 * 1024)
+
+# Seconds to wait for Earth Engine to render and send one thumbnail
+DOWNLOAD_TIMEOUT = 60
+
+DIGEST_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+URL_PATTERN = re.compile(r'/api/imagery/([0-9a-f]{64})\.png$')
+
+
+def thumbnail_key(image_id: str, name: str, vis_params: Dict[str, Any], coordinates: List[List[float]]) -> str:
+    """Render key of one visualisation of an image over a geometry"""
+    rounded = [[round(float(value), 7) for value in point] for point in coordinates]
+    render = json.dumps([image_id, name, vis_params, rounded], sort_keys=True)
+    return hashlib.sha256(render.encode()).hexdigest()
+
+
+def digest_from_url(url: Optional[str]) -> Optional[str]:
+    """Digest of a locally served thumbnail URL (None for Earth Engine URLs)"""
+    match = URL_PATTERN.search(url or '')
+    return match.group(1) if match else None
+
+
+class ThumbnailStore(SQLiteStore):
+    """Content-addressed PNGs on disk with a render-key index and size-bounded eviction"""
+
+    SCHEMA = ("""
+        CREATE TABLE IF NOT EXISTS thumbnails (
+            key TEXT PRIMARY KEY,
+            digest TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            last_access REAL NOT NULL
+        )
+    """,)
+
+    def __init__(self, directory: str = IMAGERY_DIR, max_bytes: int = MAX_BYTES):
+        super().__init__(os.path.join(directory, 'index.sqlite'))
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'downloads': 0, 'evicted': 0}
+
+    def _file(self, digest: str) -> str:
+        return os.path.join(self.directory, f"{digest}.png")
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Digest of a stored render, or None if it has to be fetched"""
+        with self._lock, self._connection:
+            row = self._connection.execute("SELECT digest FROM thumbnails WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if not os.path.exists(self._file(row[0])):
+                self._connection.execute("DELETE FROM thumbnails WHERE key = ?", (key,))
+                return None
+            self._connection.execute("UPDATE thumbnails SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.stats['hits'] += 1
+        return row[0]
+
+    def put(self, key: str, data: bytes) -> str:
+        """Store a rendered PNG under its content digest; returns the digest"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._file(digest)
+        if not os.path.exists(path):
+            partial = f"{path}.{threading.get_ident()}.tmp"
+            with open(partial, 'wb') as handle:
+                handle.write(data)
+            os.replace(partial, path)
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO thumbnails VALUES (?, ?, ?, ?)",
+                                     (key, digest, len(data), time.time()))
+        self.evict()
+        return digest
+
+    def fetch(self, key: str, url: str) -> str:
+        """Download a rendered thumbnail from Earth Engine and store it"""
+        response = requests.get(url, timeout=DOWNLOAD_TIMEOUT)
+        response.raise_for_status()
+        with self._lock:
+            self.stats['downloads'] += 1
+        return self.put(key, response.content)
+
+    def path(self, digest: str) -> Optional[str]:
+        """File of a stored thumbnail for serving (None if unknown or evicted)"""
+        if not DIGEST_PATTERN.match(digest or ''):
+            return None
+        path = self._file(digest)
+        if not os.path.exists(path):
+            return None
+        with self._lock, self._connection:
+            self._connection.execute("UPDATE thumbnails SET last_access = ? WHERE digest = ?", (time.time(), digest))
+        return path
+
+    def has(self, digest: str) -> bool:
+        return bool(DIGEST_PATTERN.match(digest or '')) and os.path.exists(self._file(digest))
+
+    def evict(self) -> int:
+        """Delete least recently served thumbnails until the store fits max_bytes; returns how many"""
+        evicted = 0
+        with self._lock, self._connection:
+            files = self._connection.execute(
+                "SELECT digest, MAX(size), MAX(last_access) FROM thumbnails GROUP BY digest "
+                "ORDER BY MAX(last_access)").fetchall()
+            total = sum(size for _, size, _ in files)
+            for digest, size, _ in files:
+                if total <= self.max_bytes:
+                    break
+                self._connection.execute("DELETE FROM thumbnails WHERE digest = ?", (digest,))
+                try:
+                    os.remove(self._file(digest))
+                except FileNotFoundError:
+                    pass
+                total -= size
+                evicted += 1
+            self.stats['evicted'] += evicted
+        return evicted
+
+    def clear(self):
+        with self._lock, self._connection:
+            for (digest,) in self._connection.execute("SELECT DISTINCT digest FROM thumbnails").fetchall():
+                try:
+                    os.remove(self._file(digest))
+                except FileNotFoundError:
+                    pass
+            self._connection.execute("DELETE FROM thumbnails")
+
+
+_stores = SharedStores(ThumbnailStore)
+
+
+def get_thumbnail_store(directory: Optional[str] = None) -> ThumbnailStore:
+    """The shared thumbnail store for a directory (one index connection per process)"""
+    return _stores.get(directory or IMAGERY_DIR)
@@ -0,0 +1,326 @@
+"""
+Yield prediction model trained on the merged farm records.
+Features are the crop, plot, season, farm soil type, the crop grown before on
+the plot, year, area, input cost per hectare and NDVI when the records carry
+it. The target is log yield (t/ha), so one model covers crops whose yields
+differ by an order of magnitude. Candidate scikit-learn pipelines are compared
+by cross-validated error against the per-crop historical mean, and the best is
+persisted with a manifest as a versioned artifact under generated_data/models/.
+
+Models are trained offline by setup/train_yield_model.py, one artifact per
+farm partition (generated_data/models/farms/<farmer_id>/) or one for the
+single-farm data. Requests never train: the current farm's artifact is
+loaded once per data version and artifact, and predict_yields scores every
+plot x crop combination for a season in one batch call. Without an artifact
+both return None and callers fall back to historical means.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from itertools import product
+from typing import Dict, List, Any, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import Ridge
+from sklearn.model_selection import KFold, cross_val_predict
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from .farm_data_store import JSON_DATA_PATH, get_current_farmer, get_farm_data_store, validate_farmer_id
+from .farm_records import build_farm_records, first_present
+
+MODELS_DIR = os.getenv("YIELD_MODELS_DIR", os.path.join(os.path.dirname(JSON_DATA_PATH), 'models'))
+LATEST_FILE = 'latest.json'
+
+CATEGORICAL_FEATURES = ['crop', 'plot', 'season', 'soil_type', 'previous_crop']
+NUMERIC_FEATURES = ['year', 'area_hectares', 'cost_per_hectare']
+# Vegetation index columns, used when the merged records carry them
+NDVI_FEATURES = ['ndvi_mean', 'ndvi_max']
+
+FEATURE_SOURCES = {
+    'soil_type': ['soil_type', 'farm_soil_type_main'],
+    'cost_per_hectare': ['cost_per_hectare'],
+    'ndvi_mean': ['ndvi_mean'],
+    'ndvi_max': ['ndvi_max'],
+}
+
+# Categorical feature sets tried per estimator: with a few dozen seasons the plot-level
+# columns can cost more in variance than they explain, so cross-validation decides
+FEATURE_SETS = {
+    'crop_season': ['crop', 'season'],
+    'full': CATEGORICAL_FEATURES,
+}
+
+CV_FOLDS = 5
+
+
+def _estimators() -> Dict[str, Any]:
+    return {
+        'ridge': Ridge(alpha=0.1),
+        'gradient_boosting': GradientBoostingRegressor(n_estimators=150, max_depth=2, learning_rate=0.05,
+                                                       subsample=0.8, random_state=0),
+    }
+
+
+def training_frame(records: List[Dict[str, Any]]) -> pd.DataFrame:
+    """One row per record with a yield: feature columns plus the yield and the previous crop on the plot"""
+    rows = []
+    for raw, record in zip(records, build_farm_records(records)):
+        if not record.crop or not record.base_plot_id or record.year is None:
+            continue
+        cost = first_present(raw, FEATURE_SOURCES['cost_per_hectare'])
+        if cost is None and record.cost_kes and record.area_hectares:
+            cost = record.cost_kes / record.area_hectares
+        rows.append({
+            'crop': record.crop,
+            'plot': record.base_plot_id,
+            'season': record.season,
+            'soil_type': first_present(raw, FEATURE_SOURCES['soil_type']),
+            'year': record.year,
+            'area_hectares': record.area_hectares,
+            'cost_per_hectare': cost,
+            'ndvi_mean': first_present(raw, FEATURE_SOURCES['ndvi_mean']),
+            'ndvi_max': first_present(raw, FEATURE_SOURCES['ndvi_max']),
+            'yield_tons_per_ha': record.yield_tons_per_ha,
+            'period_key': (record.year, record.season or ''),
+        })
+
+    frame = pd.DataFrame(rows)
+    if frame.empty:
+        return frame
+    # Crop grown in the plot's previous period (rotation effect)
+    periods = (frame[['plot', 'period_key', 'crop']].drop_duplicates(['plot', 'period_key'])
+               .sort_values(['plot', 'period_key']))
+    periods['previous_crop'] = periods.groupby('plot')['crop'].shift(1)
+    frame = frame.merge(periods[['plot', 'period_key', 'previous_crop']], on=['plot', 'period_key'], how='left')
+    return frame.drop(columns=['period_key'])
+
+
+def _pipeline(estimator, categorical: List[str], numeric: List[str]) -> Pipeline:
+    preprocess = ColumnTransformer([
+        ('categorical', Pipeline([
+            ('impute', SimpleImputer(strategy='constant', fill_value='unknown')),
+            ('encode', OneHotEncoder(handle_unknown='ignore'))
+        ]), categorical),
+        ('numeric', Pipeline([
+            ('impute', SimpleImputer(strategy='median')),
+            ('scale', StandardScaler())
+        ]), numeric),
+    ])
+    return Pipeline([('features', preprocess), ('model', estimator)])
+
+
+class YieldModel:
+    """A fitted yield pipeline and its manifest"""
+
+    def __init__(self, pipeline: Pipeline, manifest: Dict[str, Any]):
+        self.pipeline = pipeline
+        self.manifest = manifest
+
+    @property
+    def version(self) -> str:
+        return self.manifest['version']
+
+    @property
+    def features(self) -> List[str]:
+        return self.manifest['categorical_features'] + self.manifest['numeric_features']
+
+    def predict(self, frame: pd.DataFrame) -> np.ndarray:
+        """Yield (t/ha) for every row of a feature frame"""
+        frame = frame.reindex(columns=self.features)
+        for column in self.manifest['numeric_features']:
+            frame[column] = pd.to_numeric(frame[column], errors='coerce')
+        return np.exp(self.pipeline.predict(frame))
+
+    def save(self, models_dir: Optional[str] = None) -> str:
+        """Write the artifact and manifest and point latest.json at them; returns the artifact path"""
+        models_dir = models_dir or MODELS_DIR
+        os.makedirs(models_dir, exist_ok=True)
+        artifact = os.path.join(models_dir, f"yield_model-{self.version}.joblib")
+        joblib.dump(self.pipeline, artifact)
+        with open(os.path.join(models_dir, f"yield_model-{self.version}.json"), 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        latest = os.path.join(models_dir, LATEST_FILE)
+        with open(latest + '.tmp', 'w') as f:
+            json.dump({'version': self.version, 'artifact': os.path.basename(artifact)}, f)
+        os.replace(latest + '.tmp', latest)
+        return artifact
+
+    @classmethod
+    def load(cls, models_dir: Optional[str] = None) -> Optional['YieldModel']:
+        """The artifact latest.json points at, or None"""
+        models_dir = models_dir or MODELS_DIR
+        try:
+            with open(os.path.join(models_dir, LATEST_FILE)) as f:
+                latest = json.load(f)
+            with open(os.path.join(models_dir, f"yield_model-{latest['version']}.json")) as f:
+                manifest = json.load(f)
+            pipeline = joblib.load(os.path.join(models_dir, latest['artifact']))
+        except (OSError, ValueError, KeyError):
+            return None
+        return cls(pipeline, manifest)
+
+
+def train_yield_model(records: List[Dict[str, Any]], data_version: Optional[str] = None) -> YieldModel:
+    """
+    Fit every estimator x feature set on the records and keep the pipeline with the
+    lowest cross-validated mean absolute error (t/ha).
+    """
+    frame = training_frame(records)
+    frame = frame[frame['yield_tons_per_ha'].fillna(0) > 0]
+    if len(frame) < CV_FOLDS:
+        raise ValueError(f"Need at least {CV_FOLDS} records with yields to train, got {len(frame)}")
+
+    numeric = NUMERIC_FEATURES + [c for c in NDVI_FEATURES if frame[c].notna().any()]
+    X = frame[CATEGORICAL_FEATURES + numeric]
+    y = np.log(frame['yield_tons_per_ha'].astype(float))
+    actual = frame['yield_tons_per_ha'].astype(float).to_numpy()
+    folds = KFold(n_splits=CV_FOLDS, shuffle=True, random_state=0)
+
+    # Baseline: the crop's mean yield in the other folds (what the tools used before)
+    baseline = np.empty(len(frame))
+    for train, test in folds.split(X):
+        means = frame.iloc[train].groupby('crop')['yield_tons_per_ha'].mean()
+        baseline[test] = frame.iloc[test]['crop'].map(means).fillna(frame.iloc[train]['yield_tons_per_ha'].mean())
+
+    scores = {}
+    for (name, estimator), (feature_set, categorical) in product(_estimators().items(), FEATURE_SETS.items()):
+        pipeline = _pipeline(estimator, categorical, numeric)
+        predicted = np.exp(cross_val_predict(pipeline, X, y, cv=folds))
+        scores[f"{name}:{feature_set}"] = float(np.mean(np.abs(predicted - actual)))
+    best = min(scores, key=scores.get)
+    name, feature_set = best.split(':')
+    categorical = FEATURE_SETS[feature_set]
+    pipeline = _pipeline(_estimators()[name], categorical, numeric).fit(X, y)
+    baseline_mae = float(np.mean(np.abs(baseline - actual)))
+
+    trained_at = datetime.now().isoformat()
+    fingerprint = hashlib.sha256(
+        json.dumps([data_version, best, numeric, len(frame)]).encode()).hexdigest()[:12]
+    manifest = {
+        'version': f"{datetime.now():%Y%m%d%H%M%S}-{fingerprint}",
+        'model': name,
+        'feature_set': feature_set,
+        'data_version': data_version,
+        'trained_at': trained_at,
+        'training_rows': int(len(frame)),
+        'categorical_features': categorical,
+        'numeric_features': numeric,
+        'cv_mae_tons_per_ha': round(scores[best], 4),
+        'candidate_cv_mae_tons_per_ha': {key: round(score, 4) for key, score in scores.items()},
+        'baseline_mae_tons_per_ha': round(baseline_mae, 4),
+        'beats_baseline': scores[best] < baseline_mae,
+        'sklearn_version': sklearn.__version__,
+    }
+    return YieldModel(pipeline, manifest)
+
+
+def farm_models_dir(farmer_id: Optional[str] = None, models_dir: Optional[str] = None) -> str:
+    """Artifact directory of one farm's model (the models directory itself without a farm)"""
+    models_dir = models_dir or MODELS_DIR
+    if farmer_id is None:
+        return models_dir
+    return os.path.join(models_dir, 'farms', validate_farmer_id(farmer_id))
+
+
+def _latest_stamp(models_dir: str) -> Optional[int]:
+    try:
+        return os.stat(os.path.join(models_dir, LATEST_FILE)).st_mtime_ns
+    except OSError:
+        return None
+
+
+# Bumped by reset_yield_model so cached models are loaded again
+_generation = 0
+
+
+def get_yield_model(models_dir: Optional[str] = None, farmer_id: Optional[str] = None) -> Optional[YieldModel]:
+    """
+    The current farm's model from its latest artifact, or None when no artifact exists.
+    Cached with the farm's data version and the artifact pointer, so an ingest or a
+    retrained artifact is picked up on the next call.
+    """
+    farmer_id = farmer_id or get_current_farmer()
+    directory = farm_models_dir(farmer_id, models_dir)
+    key = f"yield_model:{os.path.abspath(directory)}:{_latest_stamp(directory)}:{_generation}"
+    return get_farm_data_store(farmer_id=farmer_id).derived(key, lambda snapshot: YieldModel.load(directory))
+
+
+def reset_yield_model():
+    """Forget loaded models so the next call loads the latest artifacts again"""
+    global _generation
+    _generation += 1
+
+
+def scoring_frame(records: List[Dict[str, Any]], crops: Optional[List[str]] = None,
+                  season: Optional[str] = None) -> pd.DataFrame:
+    """
+    Feature rows for every plot x crop combination in the plot's next season:
+    the plot's latest context (area, soil, last crop) with the crop's mean cost per hectare.
+    """
+    history = training_frame(records)
+    if history.empty:
+        return history
+    history = history.sort_values(['plot', 'year', 'season'])
+    latest = history.groupby('plot').tail(1).set_index('plot')
+    crops = crops or sorted(history['crop'].unique())
+    cost_by_crop = history.groupby('crop')['cost_per_hectare'].mean()
+    ndvi_by_plot = history.groupby('plot')[NDVI_FEATURES].mean()
+    seasons = sorted(history['season'].dropna().unique())
+
+    rows = []
+    for plot, context in latest.iterrows():
+        if season:
+            next_season, next_year = season, context['year'] + (1 if season <= context['season'] else 0)
+        else:
+            index = seasons.index(context['season']) + 1
+            next_season = seasons[index % len(seasons)]
+            next_year = context['year'] + index // len(seasons)
+        for crop in crops:
+            rows.append({
+                'plot': plot, 'crop': crop, 'season': next_season, 'year': next_year,
+                'soil_type': context['soil_type'], 'previous_crop': context['crop'],
+                'area_hectares': context['area_hectares'], 'cost_per_hectare': cost_by_crop.get(crop),
+                **ndvi_by_plot.loc[plot].to_dict()
+            })
+    return pd.DataFrame(rows)
+
+
+def predict_yields(crops: Optional[List[str]] = None, season: Optional[str] = None,
+                   records: Optional[List[Dict[str, Any]]] = None) -> pd.DataFrame:
+    """
+    Predicted yield for every plot x crop combination in one batch.
+
+    Returns:
+        Frame with plot, crop, season, year and predicted_yield_tons_per_ha, or
+        None when the current farm has no trained model
+    """
+    model = get_yield_model()
+    if model is None:
+        return None
+    if records is None:
+        # The default batch (every plot x crop, next season) is scored once per data version and model
+        store = get_farm_data_store()
+        if crops is None and season is None:
+            return store.derived(f'yield_predictions:{model.version}',
+                                 lambda snapshot: _score(model, snapshot.records, None, None))
+        return _score(model, store.records, crops, season)
+    return _score(model, records, crops, season)
+
+
+def _score(model: YieldModel, records: List[Dict[str, Any]], crops: Optional[List[str]],
+           season: Optional[str]) -> pd.DataFrame:
+    frame = scoring_frame(records, crops, season)
+    if frame.empty:
+        return pd.DataFrame(columns=['plot', 'crop', 'season', 'year', 'predicted_yield_tons_per_ha'])
+    frame['predicted_yield_tons_per_ha'] = np.round(model.predict(frame), 3)
+    return frame[['plot', 'crop', 'season', 'year', 'predicted_yield_tons_per_ha']]
+